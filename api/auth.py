@@ -11,12 +11,13 @@ import os
 from typing import Dict, Any
 
 from auth.logto_config import get_logto_client
-from auth.decorators import authenticated, optional_auth
+from auth.decorators import apply_rate_limit_headers, authenticated, optional_auth
 from auth.organizations import get_organization_manager
 
 
 # Create Blueprint for auth routes
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
+auth_bp.after_request(apply_rate_limit_headers)
 
 
 @auth_bp.route('/login', methods=['GET'])
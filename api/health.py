@@ -1,5 +1,4 @@
 from http.server import BaseHTTPRequestHandler
-import json
 import sys
 import os
 from datetime import datetime
@@ -7,12 +6,7 @@ from datetime import datetime
 # Add the parent directory to the path to import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from monitoring import get_monitor
-    from config import Config
-except ImportError:
-    # Fallback for deployment
-    pass
+from response_writer import JSON_GET_HEADERS, write_json
 
 # Import auth decorators separately
 try:
@@ -32,6 +26,7 @@ class handler(BaseHTTPRequestHandler):
     
     @optional_auth_vercel
     def do_GET(self):
+        """Liveness probe; kept free of monitoring and agent work."""
         try:
             # Basic health check
             health_data = {
@@ -49,38 +44,15 @@ class handler(BaseHTTPRequestHandler):
                     "organization_id": getattr(self, 'organization_id', None)
                 })
             
-            # Try to get system health if monitoring is available
-            try:
-                monitor = get_monitor()
-                system_health = monitor.get_system_health()
-                health_data.update({
-                    "system_health": system_health,
-                    "langsmith_enabled": Config.LANGCHAIN_TRACING_V2 if 'Config' in globals() else False
-                })
-            except Exception as e:
-                health_data["monitoring_status"] = f"Limited: {str(e)}"
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-            self.end_headers()
+            # Liveness only: system health and metrics are served by /api/status
             
-            self.wfile.write(json.dumps(health_data, indent=2).encode())
+            write_json(self, 200, health_data, JSON_GET_HEADERS)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-            self.end_headers()
-            
             error_response = {
                 "status": "error",
                 "message": str(e),
                 "timestamp": datetime.now().isoformat()
             }
             
-            self.wfile.write(json.dumps(error_response).encode())
\ No newline at end of file
+            write_json(self, 500, error_response, JSON_GET_HEADERS)
\ No newline at end of file
@@ -1,7 +1,18 @@
 from http.server import BaseHTTPRequestHandler
-import json
+import sys
+import os
 from datetime import datetime
 
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_writer import HeaderBlock, write_json
+
+INDEX_HEADERS = HeaderBlock((
+    ('Content-Type', 'application/json'),
+    ('Access-Control-Allow-Origin', '*'),
+))
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         response_data = {
@@ -19,9 +30,4 @@ class handler(BaseHTTPRequestHandler):
             "deployment": "vercel"
         }
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        self.wfile.write(json.dumps(response_data, indent=2).encode())
\ No newline at end of file
+        write_json(self, 200, response_data, INDEX_HEADERS)
\ No newline at end of file
@@ -7,47 +7,214 @@ including creating organizations, managing members, and handling invitations.
 
 from flask import Blueprint, request, jsonify, g
 from typing import Dict, Any, List
+from itertools import islice
 import re
 
-from auth.decorators import authenticated, organization_required, role_required
+from config import Config
+from auth.context import Permission
+from auth.decorators import apply_rate_limit_headers, authenticated, organization_required, role_required
 from auth.organizations import (
     get_organization_manager, 
     OrganizationRole,
-    Organization
+    Organization,
+    decode_cursor,
+    encode_cursor,
+    invitation_page_key,
+    member_page_key,
+    membership_page_key
 )
 
 
 # Create Blueprint for organization routes
 organizations_bp = Blueprint('organizations', __name__, url_prefix='/organizations')
+organizations_bp.after_request(apply_rate_limit_headers)
+
+# Listing page sizes
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# Selectable fields of each listing, in response order
+ORGANIZATION_FIELDS = {
+    'id': lambda org, member: org.id,
+    'name': lambda org, member: org.name,
+    'slug': lambda org, member: org.slug,
+    'description': lambda org, member: org.description,
+    'role': lambda org, member: member.role.value,
+    'created_at': lambda org, member: _isoformat(org.created_at),
+    'updated_at': lambda org, member: _isoformat(org.updated_at),
+}
+
+MEMBER_FIELDS = {
+    'user_id': lambda member: member.user_id,
+    'role': lambda member: member.role.value,
+    'joined_at': lambda member: member.joined_at.isoformat(),
+    'invited_by': lambda member: member.invited_by,
+}
+
+INVITATION_FIELDS = {
+    'id': lambda inv: inv.id,
+    'email': lambda inv: inv.email,
+    'role': lambda inv: inv.role.value,
+    'expires_at': lambda inv: inv.expires_at.isoformat(),
+    'created_by': lambda inv: inv.created_by,
+    'created_at': lambda inv: inv.created_at.isoformat(),
+    'accepted': lambda inv: inv.accepted_at is not None,
+    'expired': lambda inv: inv.expires_at < inv.created_at,  # This should check against current time
+}
+
+
+def _page_args(available_fields: Dict[str, Any]):
+    """
+    Read the limit, cursor and fields query parameters of a listing.
+    
+    Returns:
+        (limit, after, fields, error_response); error_response is None when valid
+    """
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        return None, None, None, (jsonify({'error': f'limit must be between 1 and {MAX_PAGE_LIMIT}'}), 400)
+    
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            return None, None, None, (jsonify({'error': 'Invalid cursor'}), 400)
+    
+    fields = available_fields
+    requested = request.args.get('fields')
+    if requested:
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in available_fields]
+        if unknown:
+            return None, None, None, (jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400)
+        fields = {name: available_fields[name] for name in available_fields if name in names}
+    
+    return limit, after, fields, None
+
+
+def _paginate(rows, limit: int, page_key):
+    """
+    Take one page from a lazy row iterator.
+    
+    Returns:
+        (page, next_cursor); next_cursor is None on the last page
+    """
+    page = list(islice(rows, limit + 1))
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(page_key(page[-1]))
+
+
+def _bulk_items(field: str):
+    """
+    Read the item list of a bulk request.
+    
+    Returns:
+        (items, all_or_nothing, error_response); error_response is None when valid
+    """
+    # The role check applied to the organization selected by @organization_required
+    if request.view_args.get('org_id') != g.organization_id:
+        return None, True, (jsonify({'error': 'User does not have access to this organization'}), 403)
+    
+    if not request.is_json:
+        return None, True, (jsonify({'error': 'Content-Type must be application/json'}), 400)
+    
+    data = request.json or {}
+    items = data.get(field)
+    if not isinstance(items, list) or not items:
+        return None, True, (jsonify({'error': f'{field} must be a non-empty list'}), 400)
+    if len(items) > Config.ORG_BULK_MAX_ITEMS:
+        return None, True, (jsonify({'error': f'At most {Config.ORG_BULK_MAX_ITEMS} items per request'}), 413)
+    
+    return items, bool(data.get('atomic', True)), None
+
+
+def _bulk_response(results, all_or_nothing: bool, serialize, success_status: int = 200):
+    """
+    Per-item bulk results.
+    
+    Status is success_status when every item succeeded, 422 when nothing was
+    written because of invalid items, and 207 for partial success.
+    """
+    failed = sum(1 for result in results if result.error)
+    applied = failed == 0 or not all_or_nothing
+    
+    items = []
+    for result in results:
+        item = {'index': result.index, 'status': result.status}
+        if result.error:
+            item['error'] = result.error
+        item.update(serialize(result))
+        items.append(item)
+    
+    if failed == 0:
+        status = success_status
+    elif not applied or failed == len(results):
+        status = 422
+    else:
+        status = 207
+    
+    return jsonify({
+        'results': items,
+        'total': len(results),
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'applied': applied
+    }), status
+
+
+def _serialize_member_result(result) -> Dict[str, Any]:
+    item = {'user_id': result.key}
+    if result.member:
+        item['role'] = result.member.role.value
+    return item
 
 
 @organizations_bp.route('', methods=['GET'])
 @authenticated
 def list_organizations():
     """
-    List all organizations the current user belongs to.
+    List the organizations the current user belongs to, oldest membership first.
+    
+    Query parameters:
+        limit: Page size (default: 100, max: 1000)
+        cursor: next_cursor of the previous page
+        fields: Comma-separated fields to return (default: all)
     
     Returns:
         JSON array of organizations with user's role in each
     """
+    limit, after, fields, error = _page_args(ORGANIZATION_FIELDS)
+    if error:
+        return error
+    
     org_manager = get_organization_manager()
-    user_orgs = org_manager.get_user_organizations(g.user_id)
-    
-    organizations = []
-    for org, role in user_orgs:
-        organizations.append({
-            'id': org.id,
-            'name': org.name,
-            'slug': org.slug,
-            'description': org.description,
-            'role': role.value,
-            'created_at': org.created_at.isoformat() if org.created_at else None,
-            'updated_at': org.updated_at.isoformat() if org.updated_at else None
-        })
+    page, next_cursor = _paginate(
+        org_manager.iter_user_memberships(g.user_id, after=after, page_size=limit + 1),
+        limit,
+        lambda row: membership_page_key(row[1])
+    )
+    
+    organizations = [
+        {name: field(org, member) for name, field in fields.items()}
+        for org, member in page
+    ]
     
     return jsonify({
         'organizations': organizations,
-        'total': len(organizations)
+        'total': len(organizations),
+        'next_cursor': next_cursor
     })
 
 
@@ -205,29 +372,100 @@ def delete_organization(org_id: str):
 @organization_required
 def list_organization_members(org_id: str):
     """
-    List all members of an organization.
+    List members of an organization, oldest first.
+    
+    Query parameters:
+        limit: Page size (default: 100, max: 1000)
+        cursor: next_cursor of the previous page
+        fields: Comma-separated fields to return (default: all)
     
     Returns:
         JSON array of organization members
     """
+    limit, after, fields, error = _page_args(MEMBER_FIELDS)
+    if error:
+        return error
+    
     org_manager = get_organization_manager()
-    members = org_manager.get_organization_members(org_id)
+    page, next_cursor = _paginate(
+        org_manager.iter_organization_members(org_id, after=after, page_size=limit + 1),
+        limit,
+        member_page_key
+    )
     
-    member_list = []
-    for member in members:
-        member_list.append({
-            'user_id': member.user_id,
-            'role': member.role.value,
-            'joined_at': member.joined_at.isoformat(),
-            'invited_by': member.invited_by
-        })
+    member_list = [{name: field(member) for name, field in fields.items()} for member in page]
     
     return jsonify({
         'members': member_list,
-        'total': len(member_list)
+        'total': len(member_list),
+        'next_cursor': next_cursor
     })
 
 
+@organizations_bp.route('/<org_id>/members/bulk', methods=['POST'])
+@authenticated
+@organization_required
+@role_required(OrganizationRole.ADMIN.value)
+def add_members_bulk(org_id: str):
+    """
+    Add or re-role many members in one request.
+    
+    Requires admin role. All items are validated before any is written and
+    the valid ones are committed in a single transaction. As with PATCH, the
+    caller's own role cannot be changed and the organization must keep at
+    least one admin.
+    
+    JSON payload:
+        members: List of {user_id, role}
+        atomic: Write nothing if any item is invalid (default true)
+        
+    Returns:
+        Per-item results
+    """
+    items, all_or_nothing, error = _bulk_items('members')
+    if error:
+        return error
+    
+    results = get_organization_manager().add_members(
+        org_id, items, invited_by=g.user_id, protected_user_ids=(g.user_id,), all_or_nothing=all_or_nothing
+    )
+    if results is None:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    return _bulk_response(results, all_or_nothing, _serialize_member_result)
+
+
+@organizations_bp.route('/<org_id>/members/bulk', methods=['PATCH'])
+@authenticated
+@organization_required
+@role_required(OrganizationRole.ADMIN.value)
+def update_member_roles_bulk(org_id: str):
+    """
+    Change the roles of many members in one request.
+    
+    Requires admin role. The caller's own role cannot be changed and the
+    organization must keep at least one admin.
+    
+    JSON payload:
+        members: List of {user_id, role}
+        atomic: Write nothing if any item is invalid (default true)
+        
+    Returns:
+        Per-item results
+    """
+    items, all_or_nothing, error = _bulk_items('members')
+    if error:
+        return error
+    
+    results = get_organization_manager().update_member_roles(
+        org_id, items, protected_user_ids=(g.user_id,), all_or_nothing=all_or_nothing
+    )
+    if results is None:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    return _bulk_response(results, all_or_nothing, _serialize_member_result)
+
+
 @organizations_bp.route('/<org_id>/members/<user_id>', methods=['PATCH'])
 @authenticated
 @organization_required
@@ -320,31 +558,31 @@ def list_invitations(org_id: str):
     
     Query parameters:
         include_expired: Include expired invitations (default: false)
+        limit: Page size (default: 100, max: 1000)
+        cursor: next_cursor of the previous page
+        fields: Comma-separated fields to return (default: all)
         
     Returns:
-        JSON array of invitations
+        JSON array of invitations, oldest first
     """
     include_expired = request.args.get('include_expired', 'false').lower() == 'true'
+    limit, after, fields, error = _page_args(INVITATION_FIELDS)
+    if error:
+        return error
     
     org_manager = get_organization_manager()
-    invitations = org_manager.get_organization_invitations(org_id, include_expired)
-    
-    invitation_list = []
-    for inv in invitations:
-        invitation_list.append({
-            'id': inv.id,
-            'email': inv.email,
-            'role': inv.role.value,
-            'expires_at': inv.expires_at.isoformat(),
-            'created_by': inv.created_by,
-            'created_at': inv.created_at.isoformat(),
-            'accepted': inv.accepted_at is not None,
-            'expired': inv.expires_at < inv.created_at  # This should check against current time
-        })
+    page, next_cursor = _paginate(
+        org_manager.iter_organization_invitations(org_id, include_expired, after=after, page_size=limit + 1),
+        limit,
+        invitation_page_key
+    )
+    
+    invitation_list = [{name: field(inv) for name, field in fields.items()} for inv in page]
     
     return jsonify({
         'invitations': invitation_list,
-        'total': len(invitation_list)
+        'total': len(invitation_list),
+        'next_cursor': next_cursor
     })
 
 
@@ -390,7 +628,7 @@ def create_invitation(org_id: str):
         return jsonify({'error': f'Invalid role. Must be one of: {", ".join([r.value for r in OrganizationRole])}'}), 400
     
     # Editors can only invite viewers
-    if g.organization_role == OrganizationRole.EDITOR.value and role != OrganizationRole.VIEWER:
+    if not g.auth_context.has_permission(Permission.MANAGE_MEMBERS) and role != OrganizationRole.VIEWER:
         return jsonify({'error': 'Editors can only invite viewers'}), 403
     
     org_manager = get_organization_manager()
@@ -419,6 +657,58 @@ def create_invitation(org_id: str):
     }), 201
 
 
+@organizations_bp.route('/<org_id>/invitations/bulk', methods=['POST'])
+@authenticated
+@organization_required
+@role_required(OrganizationRole.ADMIN.value, OrganizationRole.EDITOR.value)
+def create_invitations_bulk(org_id: str):
+    """
+    Create many invitations in one request.
+    
+    Requires admin or editor role; editors can only invite viewers.
+    
+    JSON payload:
+        invitations: List of {email, role}
+        expires_in_hours: Hours until expiration (optional, default 72)
+        atomic: Write nothing if any item is invalid (default true)
+        
+    Returns:
+        Per-item results with invitation URLs
+    """
+    items, all_or_nothing, error = _bulk_items('invitations')
+    if error:
+        return error
+    
+    assignable_roles = None
+    if not g.auth_context.has_permission(Permission.MANAGE_MEMBERS):
+        assignable_roles = (OrganizationRole.VIEWER,)
+    
+    results = get_organization_manager().create_invitations(
+        org_id,
+        items,
+        created_by=g.user_id,
+        expires_in_hours=request.json.get('expires_in_hours', 72),
+        assignable_roles=assignable_roles,
+        all_or_nothing=all_or_nothing
+    )
+    if results is None:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    def serialize(result) -> Dict[str, Any]:
+        item = {'email': result.key}
+        invitation = result.invitation
+        if invitation and result.success:
+            item.update({
+                'id': invitation.id,
+                'role': invitation.role.value,
+                'expires_at': invitation.expires_at.isoformat(),
+                'invitation_url': f"{request.host_url}auth/accept-invitation?token={invitation.token}"
+            })
+        return item
+    
+    return _bulk_response(results, all_or_nothing, serialize, success_status=201)
+
+
 @organizations_bp.route('/<org_id>/invitations/<invitation_id>', methods=['DELETE'])
 @authenticated
 @organization_required
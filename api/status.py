@@ -1,11 +1,14 @@
 from http.server import BaseHTTPRequestHandler
-import json
 import sys
 import os
 
 # Add the parent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from resilience import llm_guard_snapshot, llm_guard_version
+from response_writer import JSON_GET_HEADERS, json_headers, write_json
+from status_snapshot import StatusSnapshot, etag_matches, extend_document, extend_etag
+
 try:
     from master_agent import get_master_agent
     from monitoring import get_monitor
@@ -24,6 +27,53 @@ except ImportError:
         handler.send_response(200)
         handler.end_headers()
 
+def build_status_document():
+    """Build the shared (user-independent) part of the status response"""
+    try:
+        master_agent = get_master_agent()
+        status = master_agent.get_system_status()
+        
+        monitor = get_monitor()
+        health = monitor.get_system_health()
+        metrics = monitor.get_performance_metrics()
+        
+        return {
+            "system_status": status,
+            "health": health,
+            "metrics": metrics,
+            "llm": llm_guard_snapshot(),
+            "deployment": "vercel",
+            "environment": "production"
+        }
+    
+    except Exception as e:
+        return {
+            "status": "partial",
+            "message": "System partially available",
+            "error": str(e),
+            "deployment": "vercel",
+            "environment": "production"
+        }
+
+
+def _monitor_version():
+    # Breaker transitions and limit changes show up without waiting for the snapshot to age out
+    return get_monitor().version, llm_guard_version()
+
+
+def _is_partial(document):
+    return document.get("status") == "partial"
+
+
+# Rebuilt at most every STATUS_SNAPSHOT_INTERVAL_MS, shared across requests;
+# a partial document is retried after STATUS_SNAPSHOT_DEGRADED_MAX_AGE_MS
+status_snapshot = StatusSnapshot(build_status_document, version_fn=_monitor_version, degraded_fn=_is_partial)
+
+STATUS_HEADERS = json_headers(
+    'GET, OPTIONS', 'Content-Type, Authorization, X-Organization-Id, If-None-Match'
+).extend(('Cache-Control', 'no-cache'), ('Access-Control-Expose-Headers', 'ETag'))
+
+
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         """Handle CORS preflight requests."""
@@ -32,68 +82,35 @@ class handler(BaseHTTPRequestHandler):
     @optional_auth_vercel
     def do_GET(self):
         try:
-            # Get system status
-            try:
-                master_agent = get_master_agent()
-                status = master_agent.get_system_status()
-                
-                monitor = get_monitor()
-                health = monitor.get_system_health()
-                metrics = monitor.get_performance_metrics()
-                
-                response_data = {
-                    "system_status": status,
-                    "health": health,
-                    "metrics": metrics,
-                    "deployment": "vercel",
-                    "environment": "production",
-                    "authenticated": getattr(self, 'is_authenticated', False)
-                }
-                
-                # Add user context if authenticated
-                if hasattr(self, 'user_id') and self.user_id:
-                    response_data.update({
-                        "user_id": self.user_id,
-                        "organization_id": getattr(self, 'organization_id', None)
-                    })
-                
-            except Exception as e:
-                response_data = {
-                    "status": "partial",
-                    "message": "System partially available",
-                    "error": str(e),
-                    "deployment": "vercel",
-                    "environment": "production",
-                    "authenticated": getattr(self, 'is_authenticated', False)
-                }
-                
-                # Add user context if authenticated
-                if hasattr(self, 'user_id') and self.user_id:
-                    response_data.update({
-                        "user_id": self.user_id,
-                        "organization_id": getattr(self, 'organization_id', None)
-                    })
+            snapshot = status_snapshot.get()
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-            self.end_headers()
+            # Per-request fields are appended to the pre-serialized document
+            request_fields = {"authenticated": getattr(self, 'is_authenticated', False)}
             
-            self.wfile.write(json.dumps(response_data, indent=2).encode())
+            # Add user context if authenticated
+            if hasattr(self, 'user_id') and self.user_id:
+                request_fields.update({
+                    "user_id": self.user_id,
+                    "organization_id": getattr(self, 'organization_id', None)
+                })
             
-        except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-            self.end_headers()
+            body = extend_document(snapshot.body, request_fields)
+            etag = extend_etag(snapshot.etag, request_fields)
             
+            if etag_matches(self.headers.get('If-None-Match'), etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+            
+            write_json(self, 200, headers=STATUS_HEADERS, extra_headers={'ETag': etag}, body=body)
+            
+        except Exception as e:
             error_response = {
                 "status": "error",
                 "message": str(e)
             }
             
-            self.wfile.write(json.dumps(error_response).encode())
\ No newline at end of file
+            write_json(self, 500, error_response, JSON_GET_HEADERS)
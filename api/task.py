@@ -1,16 +1,31 @@
 from http.server import BaseHTTPRequestHandler
-import json
 import sys
 import os
 import asyncio
-from urllib.parse import parse_qs
+import uuid
+from urllib.parse import parse_qs, urlparse
 
 # Add the parent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from deadline import Deadline
+from idempotency import MAX_KEY_LENGTH, IdempotencyError, get_idempotency_store, request_fingerprint
+from request_body import BodyError, iter_jsonl, read_json
+from response_writer import JSON_HEADERS, dumps, json_headers, write_error, write_json
+from webhooks import validate_callback_url
+
+NO_STORE = {'Cache-Control': 'no-store'}
+REPLAYED = {'Idempotent-Replayed': 'true'}
+# HTTP status for pipeline outcomes without an answer; 5xx results are never stored for idempotent replay
+TASK_FAILURE_STATUS = {'failed': 500, 'unavailable': 503, 'timeout': 504}
+
+# Request Content-Types handled as JSONL batches
+JSONL_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl')
+JSONL_HEADERS = json_headers(content_type='application/x-ndjson')
+
 try:
     from master_agent import get_master_agent
-    from monitoring import get_monitor
+    from monitoring import PRIVATE_TASK_FIELDS, get_coordinator
 except ImportError:
     pass
 
@@ -37,81 +52,245 @@ class handler(BaseHTTPRequestHandler):
     @authenticated_vercel
     def do_POST(self):
         try:
-            # Read the request body
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
+            content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type in JSONL_CONTENT_TYPES:
+                self.process_batch()
+                return
             
+            # Read the request body, refusing oversized ones before reading them
             try:
-                data = json.loads(post_data.decode('utf-8'))
-            except json.JSONDecodeError:
-                self.send_error_response(400, "Invalid JSON")
+                data = read_json(self, Config.TASK_MAX_BODY_BYTES)
+            except BodyError as e:
+                self.close_connection = True
+                self.send_error_response(e.status, str(e))
                 return
             
-            # Extract task parameters
-            task_content = data.get('task')
-            priority = data.get('priority', 'medium')
-            context = data.get('context', {})
-            
-            # Add user context if authenticated
-            if hasattr(self, 'user_id') and self.user_id:
-                context['user_id'] = self.user_id
-                context['user_email'] = self.user_email
-                if hasattr(self, 'organization_id') and self.organization_id:
-                    context['organization_id'] = self.organization_id
-                    context['organization_role'] = self.organization_role
+            if not isinstance(data, dict):
+                self.send_error_response(400, "Request body must be a JSON object")
+                return
             
+            task_content = data.get('task')
             if not task_content:
                 self.send_error_response(400, "Task content is required")
                 return
             
-            # Process the task
-            try:
-                master_agent = get_master_agent()
-                
-                # Run async task processing
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                response = loop.run_until_complete(
-                    master_agent.process_task(task_content, priority, context)
-                )
-                
-                loop.close()
-                
-                # Record metrics if available
+            # mode=async queues the task and answers 202 straight away
+            asynchronous = self.requested_mode(data) == 'async'
+            callback_url = data.get('callback_url')
+            if callback_url is not None:
+                if not asynchronous:
+                    self.send_error_response(400, "callback_url requires mode=async")
+                    return
                 try:
-                    monitor = get_monitor()
-                    # Could add task tracking here
-                except:
-                    pass
-                
-                response_data = {
-                    "status": "completed",
-                    "task": task_content,
-                    "priority": priority,
-                    "response": response,
-                    "context": context,
-                    "user_id": getattr(self, 'user_id', None),
-                    "organization_id": getattr(self, 'organization_id', None)
-                }
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-                self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-                self.end_headers()
-                
-                self.wfile.write(json.dumps(response_data, indent=2).encode())
-                
-            except Exception as e:
-                self.send_error_response(500, f"Task processing failed: {str(e)}")
+                    validate_callback_url(callback_url)
+                except ValueError as e:
+                    self.send_error_response(400, str(e))
+                    return
+            run = self.submit_task if asynchronous else self.execute_task
+            
+            idempotency_key = self.headers.get('Idempotency-Key')
+            if not idempotency_key:
+                status, body = run(data)
+                write_json(self, status, body=body)
+                return
+            
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                self.send_error_response(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+                return
+            
+            # Keys are per user so one caller can never replay another's result
+            scoped_key = f"{getattr(self, 'user_id', None) or ''}:{idempotency_key}"
+            store = get_idempotency_store()
+            try:
+                stored = store.begin(scoped_key, request_fingerprint(data))
+            except IdempotencyError as e:
+                self.send_error_response(e.status, str(e))
+                return
+            
+            if stored is not None:
+                write_json(self, stored.status, body=stored.body, extra_headers=REPLAYED)
+                return
+            
+            try:
+                status, body = run(data)
+            except BaseException:
+                store.release(scoped_key)
+                raise
+            store.complete(scoped_key, status, body)
+            write_json(self, status, body=body)
                 
         except Exception as e:
             self.send_error_response(500, f"Request handling failed: {str(e)}")
     
+    def requested_mode(self, data):
+        """'async' or 'sync', from ?mode= or the body's "mode" field"""
+        mode = parse_qs(urlparse(self.path).query).get('mode', [None])[0] or data.get('mode') or 'sync'
+        return str(mode).lower()
+    
+    def submit_task(self, data):
+        """Queue one task payload on the coordinator; returns 202 with the job id to poll"""
+        coordinator = get_coordinator()
+        task_id = str(uuid.uuid4())
+        priority = data.get('priority', 'medium')
+        owner = getattr(self, 'user_id', None)
+        callback_url = data.get('callback_url')
+        try:
+            if coordinator.durable_queue is not None:
+                payload = {"task": data.get('task'), "priority": priority, "context": self.task_context(data)}
+                coordinator.submit(coordinator.enqueue_durable(
+                    "agent_task", payload, priority, task_id, owner, callback_url
+                ))
+            else:
+                coordinator.submit(coordinator.coordinate_task(
+                    task_id, self.run_task(data), priority, owner, callback_url
+                ))
+        except Exception as e:
+            return 503, dumps({"status": "error", "message": f"Task could not be queued: {str(e)}"})
+        
+        return 202, dumps({
+            "status": "accepted",
+            "task_id": task_id,
+            "status_url": f"/api/task/{task_id}",
+            "callback_url": callback_url
+        })
+    
+    def execute_task(self, data):
+        """Run one task payload; returns the status code and serialized response body"""
+        try:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                response_data = loop.run_until_complete(self.run_task(data))
+            finally:
+                loop.close()
+            return TASK_FAILURE_STATUS.get(response_data["status"], 200), dumps(response_data)
+        except Exception as e:
+            return 500, dumps({"status": "error", "message": f"Task processing failed: {str(e)}"})
+    
+    def request_deadline(self):
+        """TASK_DEADLINE_SECONDS from now, shortened by an X-Request-Timeout header (seconds)"""
+        seconds = Config.TASK_DEADLINE_SECONDS
+        try:
+            requested = float(self.headers.get('X-Request-Timeout') or 0)
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            seconds = min(seconds, requested)
+        return Deadline(seconds)
+    
+    def task_context(self, data):
+        """The payload's context with the authenticated user's details added"""
+        context = data.get('context') or {}
+        
+        # Add user context if authenticated
+        if hasattr(self, 'user_id') and self.user_id:
+            context['user_id'] = self.user_id
+            context['user_email'] = self.user_email
+            if hasattr(self, 'organization_id') and self.organization_id:
+                context['organization_id'] = self.organization_id
+                context['organization_role'] = self.organization_role
+        return context
+    
+    async def run_task(self, data):
+        """Run one task payload through the master agent and build its response body"""
+        # Extract task parameters
+        task_content = data.get('task')
+        priority = data.get('priority', 'medium')
+        context = self.task_context(data)
+        
+        master_agent = get_master_agent()
+        response, outcome = await master_agent.process_task_with_status(task_content, priority, context,
+                                                                        deadline=self.request_deadline())
+        
+        return {
+            "status": outcome if outcome in TASK_FAILURE_STATUS else "completed",
+            "task": task_content,
+            "priority": priority,
+            "response": response,
+            "context": context,
+            "user_id": getattr(self, 'user_id', None),
+            "organization_id": getattr(self, 'organization_id', None)
+        }
+    
+    def process_batch(self):
+        """
+        Run a JSONL batch (one task object per line) and stream one JSONL
+        result per task as it completes.
+        
+        The body is parsed a line at a time, so memory stays flat however
+        many tasks are sent. Once results have started streaming, a bad line
+        ends the batch with an error line rather than an HTTP error status.
+        """
+        try:
+            tasks = iter_jsonl(self, Config.TASK_MAX_BATCH_BYTES, Config.TASK_MAX_LINE_BYTES)
+        except BodyError as e:
+            self.close_connection = True
+            self.send_error_response(e.status, str(e))
+            return
+        
+        # Streamed without Content-Length; the end of the body is the end of the connection
+        self.close_connection = True
+        self.send_response(200)
+        JSONL_HEADERS.write(self)
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        index = 0
+        try:
+            for data in tasks:
+                if index >= Config.TASK_MAX_BATCH_ITEMS:
+                    self.write_line({"status": "error", "index": index,
+                                     "message": f"Batch exceeds {Config.TASK_MAX_BATCH_ITEMS} tasks"})
+                    return
+                if not isinstance(data, dict) or not data.get('task'):
+                    result = {"status": "error", "message": "Task content is required"}
+                else:
+                    try:
+                        result = loop.run_until_complete(self.run_task(data))
+                    except Exception as e:
+                        result = {"status": "error", "message": f"Task processing failed: {str(e)}"}
+                self.write_line(dict(result, index=index))
+                index += 1
+        except BodyError as e:
+            self.write_line({"status": "error", "index": index, "message": str(e)})
+        finally:
+            loop.close()
+    
+    def write_line(self, data):
+        self.wfile.write(dumps(data) + b'\n')
+        self.wfile.flush()
+    
+    def _requested_task_id(self):
+        """Task id from /api/task/{id} or /api/task?id=..., if any"""
+        parsed = urlparse(self.path)
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        if len(segments) >= 2 and segments[-2] == 'task':
+            return segments[-1]
+        return parse_qs(parsed.query).get('id', [None])[0]
+    
+    def send_task_result(self, task_id):
+        """Respond with a coordinated task's status and, once finished, its result"""
+        result = get_coordinator().get_result(task_id)
+        
+        # Tasks submitted by a user are only visible to that user
+        if result is None or (result.get('owner') and result.get('owner') != getattr(self, 'user_id', None)):
+            self.send_error_response(404, f"Task {task_id} not found")
+            return
+        
+        response_data = {key: value for key, value in result.items() if key not in PRIVATE_TASK_FIELDS}
+        
+        write_json(self, 200, response_data, JSON_HEADERS, NO_STORE)
+    
     @optional_auth_vercel
     def do_GET(self):
+        # Poll a coordinated task: /api/task/{id}
+        task_id = self._requested_task_id()
+        if task_id:
+            self.send_task_result(task_id)
+            return
+        
         # Simple GET endpoint for testing
         response_data = {
             "message": "Task endpoint is ready",
@@ -119,7 +298,9 @@ class handler(BaseHTTPRequestHandler):
             "expected_payload": {
                 "task": "Your task description",
                 "priority": "high|medium|low",
-                "context": {}
+                "context": {},
+                "mode": "sync|async",
+                "callback_url": "Optional URL that receives the result (mode=async only)"
             },
             "authentication_required": True,
             "authenticated": getattr(self, 'is_authenticated', False)
@@ -129,26 +310,7 @@ class handler(BaseHTTPRequestHandler):
             response_data['user_id'] = self.user_id
             response_data['organization_id'] = getattr(self, 'organization_id', None)
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-        self.end_headers()
-        
-        self.wfile.write(json.dumps(response_data, indent=2).encode())
+        write_json(self, 200, response_data)
     
     def send_error_response(self, status_code, message):
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-        self.end_headers()
-        
-        error_response = {
-            "status": "error",
-            "message": message
-        }
-        
-        self.wfile.write(json.dumps(error_response).encode())
\ No newline at end of file
+        write_error(self, status_code, message)
\ No newline at end of file
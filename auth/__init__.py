@@ -9,8 +9,10 @@ from .middleware import (
     get_current_user, 
     get_organization_context,
     validate_jwt_token,
-    get_organization_from_token
+    get_organization_from_token,
+    get_organization_from_payload
 )
+from .context import AuthContext, Permission
 from .decorators import authenticated, organization_required, role_required
 from .organizations import OrganizationManager, OrganizationRole
 
@@ -22,6 +24,9 @@ __all__ = [
     'get_organization_context',
     'validate_jwt_token',
     'get_organization_from_token',
+    'get_organization_from_payload',
+    'AuthContext',
+    'Permission',
     'authenticated',
     'organization_required', 
     'role_required',
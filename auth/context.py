@@ -0,0 +1,124 @@
+"""
+Per-request authorization context for 12thhaus Spiritual Platform
+Built once from verified JWT claims so organization membership and role
+checks are dictionary lookups instead of scans over the claims
+"""
+from enum import IntFlag
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+
+class Permission(IntFlag):
+    """Capabilities granted by organization roles"""
+    READ = 1
+    WRITE = 2
+    MANAGE_MEMBERS = 4
+    MANAGE_ORGANIZATION = 8
+
+
+# Permission bitmask per role value; each role includes every lower role's bits,
+# so "role A satisfies role B" is a single mask test
+ROLE_PERMISSIONS: Dict[str, Permission] = {
+    'viewer': Permission.READ,
+    'editor': Permission.READ | Permission.WRITE,
+    'admin': Permission.READ | Permission.WRITE | Permission.MANAGE_MEMBERS | Permission.MANAGE_ORGANIZATION,
+}
+
+# Role assumed when an organization claim carries no role
+DEFAULT_CLAIM_ROLE = 'viewer'
+
+
+def role_permissions(role: Optional[str]) -> Permission:
+    """Permission mask for a role value; empty for unknown roles"""
+    return ROLE_PERMISSIONS.get(role, Permission(0))
+
+
+def role_satisfies(role: Optional[str], required_role: str) -> bool:
+    """True if ``role`` grants everything ``required_role`` does (admin > editor > viewer)"""
+    required = ROLE_PERMISSIONS.get(required_role)
+    if required is None:
+        return False
+    return role_permissions(role) & required == required
+
+
+def compile_roles(roles: Iterable[str]) -> FrozenSet[Permission]:
+    """
+    Permission masks of the allowed roles, built once at decoration time.
+
+    Each role has its own mask, so membership is an exact role match;
+    unknown role names compile to nothing and never match.
+    """
+    return frozenset(ROLE_PERMISSIONS[role] for role in roles if role in ROLE_PERMISSIONS)
+
+
+class AuthContext:
+    """
+    Authorization state for one request.
+
+    ``roles_by_org`` maps organization ID to role (first claim wins, as the
+    decorators have always done) and ``organizations_by_id`` to the raw claim.
+    select_organization() fixes the active organization; permission checks
+    then read the precomputed mask for its role.
+    """
+
+    __slots__ = ('user_id', 'email', 'roles', 'organizations', 'payload',
+                 'roles_by_org', 'organizations_by_id',
+                 'organization_id', 'organization', 'organization_role', 'permissions')
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.user_id = payload.get('sub')
+        self.email = payload.get('email')
+        self.roles = payload.get('roles', [])
+        self.organizations: List[Dict[str, Any]] = payload.get('organizations', []) or []
+
+        self.roles_by_org: Dict[str, Optional[str]] = {}
+        self.organizations_by_id: Dict[str, Dict[str, Any]] = {}
+        for org in self.organizations:
+            if not isinstance(org, dict):
+                continue
+            org_id = org.get('id')
+            if org_id is not None and org_id not in self.organizations_by_id:
+                self.organizations_by_id[org_id] = org
+                self.roles_by_org[org_id] = org.get('role', DEFAULT_CLAIM_ROLE)
+
+        self.organization_id: Optional[str] = None
+        self.organization: Optional[Dict[str, Any]] = None
+        self.organization_role: Optional[str] = None
+        self.permissions = Permission(0)
+
+    @classmethod
+    def from_claims(cls, user_id: Optional[str], organizations: List[Dict[str, Any]]) -> 'AuthContext':
+        """Context for request state set without a verified payload"""
+        return cls({'sub': user_id, 'organizations': organizations})
+
+    @property
+    def default_organization_id(self) -> Optional[str]:
+        """First organization in the claims"""
+        if self.organizations and isinstance(self.organizations[0], dict):
+            return self.organizations[0].get('id')
+        return None
+
+    def is_member(self, org_id: Optional[str]) -> bool:
+        return org_id in self.roles_by_org
+
+    def role_for(self, org_id: Optional[str]) -> Optional[str]:
+        return self.roles_by_org.get(org_id)
+
+    def select_organization(self, org_id: Optional[str]) -> bool:
+        """Make ``org_id`` the active organization if the user belongs to it"""
+        if org_id not in self.organizations_by_id:
+            return False
+        self.organization_id = org_id
+        self.organization = self.organizations_by_id[org_id]
+        self.organization_role = self.roles_by_org[org_id]
+        self.permissions = role_permissions(self.organization_role)
+        return True
+
+    def has_permission(self, permission: Permission, org_id: Optional[str] = None) -> bool:
+        """Check a permission in ``org_id``, or in the active organization"""
+        mask = self.permissions if org_id is None else role_permissions(self.role_for(org_id))
+        return mask & permission == permission
+
+    def has_role(self, allowed_roles: FrozenSet[Permission]) -> bool:
+        """Whether the active organization's role is in a set built by compile_roles"""
+        return bool(self.permissions) and self.permissions in allowed_roles
@@ -11,7 +11,65 @@ from flask import request, jsonify, g
 from jose import jwt, JWTError
 import os
 
-from .middleware import validate_jwt_token, get_organization_from_token
+from .context import AuthContext, compile_roles
+from .middleware import validate_jwt_token, get_organization_from_token, get_organization_from_payload
+from .rate_limit import RateLimitResult, client_ip, client_key, get_rate_limiter, is_rate_limit_exempt
+
+
+def _set_user_context(payload) -> AuthContext:
+    """Store verified claims and their AuthContext on flask.g"""
+    context = AuthContext(payload)
+    g.user_id = context.user_id
+    g.user_email = context.email
+    g.user_roles = context.roles
+    g.organizations = context.organizations
+    g.token_payload = payload
+    g.auth_context = context
+    return context
+
+
+def _select_organization(context: AuthContext, org_id) -> bool:
+    """Activate an organization on the context and mirror it onto flask.g"""
+    if not context.select_organization(org_id):
+        return False
+    g.organization_id = context.organization_id
+    g.organization = context.organization
+    g.organization_role = context.organization_role
+    return True
+
+
+def _request_ip() -> str:
+    return client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+
+
+def _too_many_requests(result: RateLimitResult):
+    """429 response carrying the X-RateLimit-* and Retry-After headers"""
+    return jsonify({
+        'error': 'Rate limit exceeded',
+        'retry_after': result.headers()['Retry-After']
+    }), 429, result.headers()
+
+
+def _charge(kind: str, value: str):
+    """Charge one request to a client bucket; returns a 429 response when it is empty"""
+    result = get_rate_limiter().hit(client_key(kind, value))
+    if result is None:
+        return None
+    g.rate_limit = result
+    return None if result.allowed else _too_many_requests(result)
+
+
+def apply_rate_limit_headers(response):
+    """
+    after_request hook adding X-RateLimit-* headers for the request's bucket.
+    
+    Register on blueprints or the app: ``bp.after_request(apply_rate_limit_headers)``.
+    """
+    result = getattr(g, 'rate_limit', None)
+    if result is not None:
+        for name, value in result.headers().items():
+            response.headers.setdefault(name, value)
+    return response
 
 
 def authenticated(f: Callable) -> Callable:
@@ -23,6 +81,7 @@ def authenticated(f: Callable) -> Callable:
     Returns:
         401 if no valid token is provided
         403 if token is invalid or expired
+        429 if the user, or the IP after repeated invalid tokens, is over its rate limit
     """
     @functools.wraps(f)
     def decorated_function(*args: Any, **kwargs: Any) -> Any:
@@ -33,16 +92,25 @@ def authenticated(f: Callable) -> Callable:
         
         token = auth_header.split(' ')[1]
         
+        # Refuse clients that keep sending bad tokens before doing any verification
+        limiter = get_rate_limiter()
+        ip = _request_ip()
+        blocked = limiter.auth_blocked(ip)
+        if blocked:
+            return _too_many_requests(blocked)
+        
         # Validate token
         payload = validate_jwt_token(token)
         if not payload:
+            limiter.auth_failed(ip)
             return jsonify({'error': 'Invalid or expired token'}), 403
         
         # Add user info to request context
-        g.user_id = payload.get('sub')
-        g.user_email = payload.get('email')
-        g.user_roles = payload.get('roles', [])
-        g.organizations = payload.get('organizations', [])
+        _set_user_context(payload)
+        
+        limited = _charge('user', g.user_id or ip)
+        if limited:
+            return limited
         
         return f(*args, **kwargs)
     
@@ -67,36 +135,32 @@ def organization_required(f: Callable) -> Callable:
         
         # Get organization from token or header
         org_id = request.headers.get('X-Organization-Id')
-        if not org_id:
+        if not org_id and getattr(g, 'token_payload', None):
+            # Reuse the claims verified by @authenticated
+            org_id = get_organization_from_payload(g.token_payload)
+        elif not org_id:
             # Try to get from token
             auth_header = request.headers.get('Authorization')
             if auth_header and auth_header.startswith('Bearer '):
                 token = auth_header.split(' ')[1]
                 org_id = get_organization_from_token(token)
         
+        context = getattr(g, 'auth_context', None)
+        if context is None:
+            context = g.auth_context = AuthContext.from_claims(g.user_id, getattr(g, 'organizations', []))
+        
         if not org_id:
             # Check if user has any organizations
-            if not g.organizations:
+            if not context.organizations:
                 return jsonify({'error': 'User does not belong to any organization'}), 403
             
             # Use first organization as default
-            org_id = g.organizations[0].get('id')
+            org_id = context.default_organization_id
         
-        # Validate user belongs to this organization
-        user_orgs = [org.get('id') for org in g.organizations]
-        if org_id not in user_orgs:
+        # Validate user belongs to this organization and set organization context
+        if not _select_organization(context, org_id):
             return jsonify({'error': 'User does not have access to this organization'}), 403
         
-        # Set organization context
-        g.organization_id = org_id
-        
-        # Find organization details
-        for org in g.organizations:
-            if org.get('id') == org_id:
-                g.organization = org
-                g.organization_role = org.get('role', 'viewer')
-                break
-        
         return f(*args, **kwargs)
     
     return decorated_function
@@ -119,6 +183,8 @@ def role_required(*required_roles: str) -> Callable:
     Returns:
         403 if user doesn't have any of the required roles
     """
+    allowed_roles = compile_roles(required_roles)
+    
     def decorator(f: Callable) -> Callable:
         @functools.wraps(f)
         def decorated_function(*args: Any, **kwargs: Any) -> Any:
@@ -126,17 +192,16 @@ def role_required(*required_roles: str) -> Callable:
             if not hasattr(g, 'user_id'):
                 return jsonify({'error': 'Authentication required'}), 401
             
-            if not hasattr(g, 'organization_id'):
+            # Role checks read the mask @organization_required precomputed on the context
+            context = getattr(g, 'auth_context', None)
+            if context is None or context.organization_id is None:
                 return jsonify({'error': 'Organization context required'}), 403
             
-            # Get user's role in current organization
-            user_role = getattr(g, 'organization_role', None)
-            
-            if not user_role:
+            if not context.permissions:
                 return jsonify({'error': 'User has no role in this organization'}), 403
             
             # Check if user has any of the required roles
-            if user_role not in required_roles:
+            if not context.has_role(allowed_roles):
                 return jsonify({
                     'error': f'Insufficient permissions. Required roles: {", ".join(required_roles)}'
                 }), 403
@@ -157,34 +222,42 @@ def optional_auth(f: Callable) -> Callable:
     """
     @functools.wraps(f)
     def decorated_function(*args: Any, **kwargs: Any) -> Any:
+        limiter = get_rate_limiter()
+        ip = _request_ip()
+        # Liveness probes are never limited, by either bucket
+        exempt = is_rate_limit_exempt(request.path)
+        
         # Try to get token from Authorization header
         auth_header = request.headers.get('Authorization')
         if auth_header and auth_header.startswith('Bearer '):
             token = auth_header.split(' ')[1]
             
+            blocked = None if exempt else limiter.auth_blocked(ip)
+            if blocked:
+                return _too_many_requests(blocked)
+            
             # Try to validate token
             payload = validate_jwt_token(token)
             if payload:
                 # Add user info to request context
-                g.user_id = payload.get('sub')
-                g.user_email = payload.get('email')
-                g.user_roles = payload.get('roles', [])
-                g.organizations = payload.get('organizations', [])
+                context = _set_user_context(payload)
                 
                 # Try to get organization context
                 org_id = request.headers.get('X-Organization-Id')
                 if not org_id:
-                    org_id = get_organization_from_token(token)
+                    org_id = get_organization_from_payload(payload)
                 
-                if org_id and g.organizations:
-                    user_orgs = [org.get('id') for org in g.organizations]
-                    if org_id in user_orgs:
-                        g.organization_id = org_id
-                        for org in g.organizations:
-                            if org.get('id') == org_id:
-                                g.organization = org
-                                g.organization_role = org.get('role', 'viewer')
-                                break
+                if org_id:
+                    _select_organization(context, org_id)
+            elif not exempt:
+                limiter.auth_failed(ip)
+        
+        # Anonymous callers share their IP's bucket
+        user_id = getattr(g, 'user_id', None)
+        if not exempt:
+            limited = _charge('user', user_id) if user_id else _charge('ip', ip)
+            if limited:
+                return limited
         
         return f(*args, **kwargs)
     
@@ -203,11 +276,22 @@ def require_api_key(f: Callable) -> Callable:
         if not api_key:
             return jsonify({'error': 'Missing API key'}), 401
         
+        limiter = get_rate_limiter()
+        ip = _request_ip()
+        blocked = limiter.auth_blocked(ip)
+        if blocked:
+            return _too_many_requests(blocked)
+        
         # Validate API key (you would check against stored keys)
         valid_api_keys = os.environ.get('VALID_API_KEYS', '').split(',')
         if api_key not in valid_api_keys:
+            limiter.auth_failed(ip)
             return jsonify({'error': 'Invalid API key'}), 403
         
+        limited = _charge('key', api_key)
+        if limited:
+            return limited
+        
         # Add API key info to context
         g.api_key = api_key
         g.is_service_account = True
@@ -0,0 +1,208 @@
+"""
+JWKS cache for 12thhaus Spiritual Platform
+Keeps Logto signing keys in memory, keyed by key ID, so token validation
+does not need a network round trip per request
+"""
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import Config
+
+from .shared_cache import SharedCache
+
+_MAX_AGE_PATTERN = re.compile(r'(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+def parse_max_age(cache_control: Any) -> Optional[int]:
+    """Extract max-age from a Cache-Control header value; 0 for no-store/no-cache, None if absent"""
+    if not isinstance(cache_control, str):
+        return None
+    lowered = cache_control.lower()
+    if 'no-store' in lowered or 'no-cache' in lowered:
+        return 0
+    match = _MAX_AGE_PATTERN.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+class JWKSCache:
+    """
+    In-memory JWKS keyed by ``kid``.
+
+    Keys expire according to the response's Cache-Control max-age (clamped
+    between the min and max TTL). Shortly before expiry a single background
+    thread refreshes them while requests keep using the current set. An
+    unknown ``kid`` triggers at most one synchronous refetch at a time, and
+    no more often than ``unknown_kid_interval``. If the IdP is unreachable
+    the last-known-good keys are served for up to ``max_stale`` seconds.
+
+    With ``shared_cache``, a process that needs keys first adopts a set
+    another process already fetched (with its remaining lifetime) and only
+    calls the IdP when the shared copy is missing, close to expiry, or lacks
+    a requested ``kid``; keys it fetches are published for the others.
+
+    ``fetch`` returns ``(jwks_document, cache_control_header)``.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[], Tuple[Dict[str, Any], Any]],
+                 default_ttl: Optional[int] = None,
+                 min_ttl: Optional[int] = None,
+                 max_ttl: Optional[int] = None,
+                 max_stale: Optional[int] = None,
+                 unknown_kid_interval: Optional[float] = None,
+                 refresh_ahead: float = 0.2,
+                 clock: Callable[[], float] = time.monotonic,
+                 shared_cache: Optional[SharedCache] = None,
+                 shared_key: str = 'jwks'):
+        self._fetch = fetch
+        self.default_ttl = default_ttl if default_ttl is not None else Config.JWKS_DEFAULT_TTL_SECONDS
+        self.min_ttl = min_ttl if min_ttl is not None else Config.JWKS_MIN_TTL_SECONDS
+        self.max_ttl = max_ttl if max_ttl is not None else Config.JWKS_MAX_TTL_SECONDS
+        self.max_stale = max_stale if max_stale is not None else Config.JWKS_MAX_STALE_SECONDS
+        self.unknown_kid_interval = (unknown_kid_interval if unknown_kid_interval is not None
+                                     else Config.JWKS_UNKNOWN_KID_INTERVAL_SECONDS)
+        self.refresh_ahead = refresh_ahead
+        self._clock = clock
+        self.shared_cache = shared_cache
+        self.shared_key = shared_key
+
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._refresh_at = 0.0
+        self._expires_at = 0.0
+        self._last_attempt = float('-inf')
+        self._generation = 0
+
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self.fetch_count = 0
+        self.failure_count = 0
+
+    @staticmethod
+    def _index(jwks: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        return {key['kid']: key for key in jwks.get('keys', []) if key.get('kid')}
+
+    def _install(self, jwks: Dict[str, Any], keys: Dict[str, Dict[str, Any]], ttl: float):
+        now = self._clock()
+        self._jwks = jwks
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + ttl
+        self._refresh_at = now + ttl * (1 - self.refresh_ahead)
+        self._generation += 1
+
+    def _load_shared(self) -> bool:
+        """Adopt a key set another process fetched, unless it is due for refresh"""
+        entry = self.shared_cache.get(self.shared_key)
+        if not isinstance(entry, dict) or not isinstance(entry.get('jwks'), dict):
+            return False
+        ttl = entry.get('ttl') or self.default_ttl
+        remaining = entry.get('expires_at', 0) - time.time()
+        if remaining <= ttl * self.refresh_ahead:
+            return False
+        try:
+            keys = self._index(entry['jwks'])
+        except Exception:
+            return False
+        self._install(entry['jwks'], keys, remaining)
+        # Keep the original refresh point rather than one relative to the remaining lifetime
+        self._refresh_at = self._expires_at - ttl * self.refresh_ahead
+        return True
+
+    def _load(self, satisfied: Optional[Callable[[], bool]] = None) -> bool:
+        """Fetch and install a fresh key set; keeps the current set on failure"""
+        self._last_attempt = self._clock()
+        if self.shared_cache is not None and self._load_shared():
+            if satisfied is None or satisfied():
+                return True
+        self.fetch_count += 1
+        try:
+            jwks, cache_control = self._fetch()
+            keys = self._index(jwks)
+        except Exception as e:
+            self.failure_count += 1
+            print(f"JWKS refresh failed, serving last known keys: {str(e)}")
+            return False
+
+        max_age = parse_max_age(cache_control)
+        ttl = self.default_ttl if max_age is None else max_age
+        ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+        self._install(jwks, keys, ttl)
+        if self.shared_cache is not None:
+            self.shared_cache.set(self.shared_key, {'jwks': jwks, 'ttl': ttl, 'expires_at': time.time() + ttl},
+                                  ttl, invalidate=False)
+        return True
+
+    def _refresh_blocking(self, min_interval: float = 0.0,
+                          satisfied: Optional[Callable[[], bool]] = None) -> bool:
+        """Single-flight fetch; callers that waited on another fetch reuse its result"""
+        generation = self._generation
+        with self._fetch_lock:
+            if self._generation != generation or (satisfied is not None and satisfied()):
+                return True
+            if self._clock() - self._last_attempt < min_interval:
+                return False
+            return self._load(satisfied)
+
+    def _refresh_in_background(self):
+        with self._fetch_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._fetch_lock:
+                    self._load()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='jwks-refresh', daemon=True).start()
+
+    def _usable(self, now: float) -> bool:
+        return self._jwks is not None and now < self._expires_at + self.max_stale
+
+    def get_jwks(self) -> Optional[Dict[str, Any]]:
+        """Current key set, fetching it if missing or expired"""
+        now = self._clock()
+        if self._jwks is None or now >= self._expires_at:
+            # Nothing usable or hard-expired: fetch inline, but fall back to stale keys
+            fresh = lambda: self._jwks is not None and self._clock() < self._expires_at
+            min_interval = 0.0 if self._jwks is None else self.unknown_kid_interval
+            if not self._refresh_blocking(min_interval, fresh):
+                return self._jwks if self._usable(self._clock()) else None
+        elif now >= self._refresh_at:
+            self._refresh_in_background()
+        return self._jwks
+
+    def get_key(self, kid: str) -> Optional[Dict[str, Any]]:
+        """Signing key for ``kid``, refetching once if the key is unknown"""
+        if self.get_jwks() is None:
+            return None
+        key = self._keys.get(kid)
+        if key is None and self._refresh_blocking(self.unknown_kid_interval, lambda: kid in self._keys):
+            key = self._keys.get(kid)
+        return key
+
+    def clear(self):
+        """Drop all cached keys"""
+        with self._fetch_lock:
+            self._jwks = None
+            self._keys = {}
+            self._expires_at = self._refresh_at = 0.0
+            self._last_attempt = float('-inf')
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache state for status reporting"""
+        now = self._clock()
+        return {
+            'keys': len(self._keys),
+            'age_seconds': round(now - self._fetched_at, 1) if self._jwks is not None else None,
+            'stale': self._jwks is not None and now >= self._expires_at,
+            'fetches': self.fetch_count,
+            'failures': self.failure_count
+        }
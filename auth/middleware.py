@@ -4,12 +4,19 @@ Provides JWT validation and organization context extraction
 """
 import json
 import os
+import time
 from functools import wraps
 from typing import Optional, Dict, Any, List
 from flask import request, g, jsonify
 from jose import jwt, JWTError
 import requests
 
+from config import Config
+
+from .jwks import JWKSCache
+from .shared_cache import get_shared_cache
+from .token_cache import RejectedTokenCache, VerifiedTokenCache
+
 # Import with fallback for config
 try:
     from .logto_config import logto_config
@@ -59,33 +66,123 @@ def get_token_auth_header() -> str:
     return parts[1]
 
 
+def _fetch_jwks():
+    """Fetch the Logto JWKS document and its Cache-Control header"""
+    jwks_uri = f"{logto_config.LOGTO_ENDPOINT}/oidc/jwks"
+    response = requests.get(jwks_uri, timeout=10)
+    response.raise_for_status()
+    return response.json(), response.headers.get('Cache-Control')
+
+
+# Shared signing key cache; refreshed in the background before expiry
+jwks_cache = JWKSCache(_fetch_jwks, shared_cache=get_shared_cache(),
+                       shared_key=f"jwks:{logto_config.LOGTO_ENDPOINT}")
+
+# Payloads of tokens that already passed signature verification
+verified_tokens = VerifiedTokenCache(shared_cache=get_shared_cache())
+
+# Tokens that recently failed validation for a reason that will not change
+rejected_tokens = RejectedTokenCache()
+
+
+def precheck_token(token: str, now: Optional[float] = None) -> Optional[str]:
+    """
+    Reason to reject a token without verifying it, or None.
+    
+    Reads only the unverified header and claims: three segments that decode
+    to JSON objects, a signing algorithm other than "none" and an exp that
+    has not passed. The signing key lookup that follows refetches the JWKS
+    for an unknown kid at most once per Config.JWKS_UNKNOWN_KID_INTERVAL_SECONDS.
+    """
+    if token.count('.') != 2:
+        return 'malformed'
+    try:
+        header = jwt.get_unverified_header(token)
+        claims = jwt.get_unverified_claims(token)
+    except JWTError:
+        return 'malformed'
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        return 'malformed'
+    
+    if str(header.get('alg', 'RS256')).lower() == 'none':
+        return 'unsupported_algorithm'
+    
+    exp = claims.get('exp')
+    if exp is not None:
+        if isinstance(exp, bool) or not isinstance(exp, (int, float)):
+            return 'malformed'
+        if exp + Config.TOKEN_PRECHECK_LEEWAY_SECONDS <= (time.time() if now is None else now):
+            return 'expired'
+    return None
+
+
+def _not_yet_valid(token: str, now: Optional[float] = None) -> bool:
+    """Whether the token's nbf or iat is still in the future, so a rejection now may not hold later"""
+    try:
+        claims = jwt.get_unverified_claims(token)
+    except JWTError:
+        return False
+    now = time.time() if now is None else now
+    for name in ('nbf', 'iat'):
+        value = claims.get(name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > now:
+            return True
+    return False
+
+
 def validate_jwt_token(token: str) -> Optional[Dict[str, Any]]:
     """Validate JWT token and return payload"""
+    # Reuse the payload of a token verified earlier and still within exp/nbf
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+    
+    # Replayed garbage, expired or forged tokens fail without any crypto
+    if rejected_tokens.get(token) is not None:
+        return None
+    
+    reason = precheck_token(token)
+    if reason:
+        print(f"JWT validation error: {reason} token")
+        rejected_tokens.put(token, reason)
+        return None
+    
     try:
-        # Get JWKS from Logto endpoint
-        jwks_uri = f"{logto_config.LOGTO_ENDPOINT}/oidc/jwks"
-        response = requests.get(jwks_uri, timeout=10)
-        response.raise_for_status()
-        jwks = response.json()
-        
-        # Get token header to determine algorithm
+        # Get token header to determine algorithm and signing key
         unverified_header = jwt.get_unverified_header(token)
         algorithm = unverified_header.get('alg', 'RS256')
+        kid = unverified_header.get('kid')
+        
+        # Look up the signing key from the cached Logto JWKS
+        if kid:
+            key = jwks_cache.get_key(kid)
+            if key is None:
+                print(f"JWT validation error: unknown signing key {kid}")
+                return None
+        else:
+            key = jwks_cache.get_jwks()
+            if key is None:
+                print("Token validation failed: JWKS unavailable")
+                return None
         
         # Decode and verify token
         payload = jwt.decode(
             token,
-            jwks,
+            key,
             algorithms=[algorithm],
             audience=logto_config.LOGTO_APP_ID,  # Use APP_ID as audience
             issuer=f"{logto_config.LOGTO_ENDPOINT}/oidc",
             options={"verify_at_hash": False}
         )
         
+        verified_tokens.put(token, payload)
         return payload
         
     except JWTError as e:
         print(f"JWT validation error: {str(e)}")
+        # A token that is only not valid yet becomes valid later; don't remember it as rejected
+        if not _not_yet_valid(token):
+            rejected_tokens.put(token, 'invalid')
         return None
     except Exception as e:
         print(f"Token validation failed: {str(e)}")
@@ -146,6 +243,18 @@ def get_organization_context() -> Optional[str]:
     return org_id
 
 
+def get_organization_from_payload(payload: Dict[str, Any]) -> Optional[str]:
+    """Extract organization ID from already verified JWT claims"""
+    # Check for organization in token claims
+    organizations = payload.get("organizations", [])
+    if organizations and isinstance(organizations, list):
+        # Return first organization ID
+        return organizations[0].get("id") if organizations[0] else None
+    
+    # Check for org_id claim directly
+    return payload.get("org_id")
+
+
 def get_organization_from_token(token: str) -> Optional[str]:
     """Extract organization ID from JWT token"""
     try:
@@ -153,14 +262,7 @@ def get_organization_from_token(token: str) -> Optional[str]:
         if not payload:
             return None
         
-        # Check for organization in token claims
-        organizations = payload.get("organizations", [])
-        if organizations and isinstance(organizations, list):
-            # Return first organization ID
-            return organizations[0].get("id") if organizations[0] else None
-        
-        # Check for org_id claim directly
-        return payload.get("org_id")
+        return get_organization_from_payload(payload)
         
     except Exception as e:
         print(f"Error extracting organization from token: {str(e)}")
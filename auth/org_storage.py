@@ -0,0 +1,1239 @@
+"""
+Organization storage backends for the 12thhaus Spiritual Platform.
+
+All backends implement OrganizationRepository:
+- MemoryOrganizationRepository: indexed in-process dicts (default, tests)
+- SQLiteOrganizationRepository: local file database for development
+- PostgresOrganizationRepository: pooled connections with prepared statements
+
+CachedOrganizationRepository wraps a persistent backend with a per-instance
+write-through read cache, optionally backed by a SharedCache so processes
+reuse each other's reads and drop stale copies when another process writes.
+"""
+
+import bisect
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import fields, is_dataclass, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import Config
+
+from .organizations import (
+    FIRST_PAGE_KEY,
+    Organization,
+    OrganizationInvitation,
+    OrganizationMember,
+    OrganizationRole,
+    PageKey,
+    invitation_page_key,
+    member_page_key,
+    membership_page_key
+)
+from .shared_cache import SharedCache, get_shared_cache
+
+
+class OrganizationRepository(ABC):
+    """Storage interface shared by all organization backends."""
+
+    # Organizations
+    @abstractmethod
+    def get_organization(self, org_id: str) -> Optional[Organization]: ...
+
+    @abstractmethod
+    def save_organization(self, organization: Organization) -> None: ...
+
+    @abstractmethod
+    def delete_organization(self, org_id: str) -> bool:
+        """Delete an organization with its members and invitations."""
+
+    # Members
+    @abstractmethod
+    def get_member(self, org_id: str, user_id: str) -> Optional[OrganizationMember]: ...
+
+    @abstractmethod
+    def save_member(self, member: OrganizationMember) -> None: ...
+
+    @abstractmethod
+    def delete_member(self, org_id: str, user_id: str) -> bool: ...
+
+    @abstractmethod
+    def list_members(self, org_id: str) -> List[OrganizationMember]: ...
+
+    @abstractmethod
+    def list_user_organization_ids(self, user_id: str) -> List[str]: ...
+
+    def get_organizations(self, org_ids: List[str]) -> Dict[str, Organization]:
+        """Organizations by ID; missing IDs are left out."""
+        found = {}
+        for org_id in org_ids:
+            organization = self.get_organization(org_id)
+            if organization is not None:
+                found[org_id] = organization
+        return found
+
+    # Keyset pages: rows strictly after ``after`` in the listing's sort order.
+    # These defaults sort full lists; backends override them with indexed queries.
+    def list_members_page(self, org_id: str, after: Optional[PageKey] = None,
+                          limit: int = 100) -> List[OrganizationMember]:
+        members = sorted(self.list_members(org_id), key=member_page_key)
+        return [m for m in members if member_page_key(m) > (after or FIRST_PAGE_KEY)][:limit]
+
+    def list_user_memberships_page(self, user_id: str, after: Optional[PageKey] = None,
+                                   limit: int = 100) -> List[OrganizationMember]:
+        members = [self.get_member(org_id, user_id) for org_id in self.list_user_organization_ids(user_id)]
+        members = sorted((m for m in members if m is not None), key=membership_page_key)
+        return [m for m in members if membership_page_key(m) > (after or FIRST_PAGE_KEY)][:limit]
+
+    # Invitations
+    @abstractmethod
+    def get_invitation(self, invitation_id: str) -> Optional[OrganizationInvitation]: ...
+
+    @abstractmethod
+    def get_invitation_by_token(self, token: str) -> Optional[OrganizationInvitation]: ...
+
+    @abstractmethod
+    def save_invitation(self, invitation: OrganizationInvitation) -> None: ...
+
+    @abstractmethod
+    def delete_invitation(self, invitation_id: str) -> bool: ...
+
+    @abstractmethod
+    def list_invitations(self, org_id: str) -> List[OrganizationInvitation]: ...
+
+    def list_invitations_page(self, org_id: str, after: Optional[PageKey] = None,
+                              limit: int = 100) -> List[OrganizationInvitation]:
+        invitations = sorted(self.list_invitations(org_id), key=invitation_page_key)
+        return [i for i in invitations if invitation_page_key(i) > (after or FIRST_PAGE_KEY)][:limit]
+
+    @abstractmethod
+    def delete_expired_invitations(self, now: datetime, limit: Optional[int] = None) -> int:
+        """Delete invitations with expires_at <= now, oldest first."""
+
+    def purge_expired_cache(self, limit: Optional[int] = None) -> int:
+        """Drop expired read-cache entries; repositories without a cache have none."""
+        return 0
+
+    def save_members(self, members: List[OrganizationMember]) -> None:
+        """Store several members in one transaction."""
+        with self.transaction():
+            for member in members:
+                self.save_member(member)
+
+    def save_invitations(self, invitations: List[OrganizationInvitation]) -> None:
+        """Store several invitations in one transaction."""
+        with self.transaction():
+            for invitation in invitations:
+                self.save_invitation(invitation)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several writes so they commit together."""
+        yield
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+
+class MemoryOrganizationRepository(OrganizationRepository):
+    """In-process storage with O(1) lookups; data is per process and lost on restart."""
+
+    def __init__(self):
+        self._organizations: Dict[str, Organization] = {}
+        # org_id -> user_id -> member
+        self._members: Dict[str, Dict[str, OrganizationMember]] = {}
+        # user_id -> org ids in join order (dict used as an ordered set)
+        self._user_organizations: Dict[str, Dict[str, None]] = {}
+        self._invitations: Dict[str, OrganizationInvitation] = {}
+        self._invitations_by_token: Dict[str, str] = {}
+        self._org_invitations: Dict[str, Dict[str, None]] = {}
+        # (expires_at, invitation_id) min-heap; entries for removed invitations are skipped lazily
+        self._invitation_expiry: List[Tuple[datetime, str]] = []
+        # Expiry last pushed per invitation, so in-place edits are re-indexed on save
+        self._indexed_expiry: Dict[str, datetime] = {}
+        # Sorted (keys, rows) per org/user for keyset pages; dropped on write, rebuilt on next read
+        self._member_pages: Dict[str, Tuple[List[PageKey], List[OrganizationMember]]] = {}
+        self._membership_pages: Dict[str, Tuple[List[PageKey], List[OrganizationMember]]] = {}
+        self._invitation_pages: Dict[str, Tuple[List[PageKey], List[OrganizationInvitation]]] = {}
+        self._lock = threading.RLock()
+
+    def _page(self, pages: Dict, owner: str, rows: Callable[[], Iterable], key: Callable,
+              after: Optional[PageKey], limit: int) -> List:
+        """Slice a sorted snapshot with bisect; the snapshot is built once per write."""
+        with self._lock:
+            snapshot = pages.get(owner)
+            if snapshot is None:
+                ordered = sorted(rows(), key=key)
+                snapshot = pages[owner] = ([key(row) for row in ordered], ordered)
+        keys, ordered = snapshot
+        start = bisect.bisect_right(keys, after) if after is not None else 0
+        return ordered[start:start + limit]
+
+    def get_organization(self, org_id: str) -> Optional[Organization]:
+        return self._organizations.get(org_id)
+
+    def save_organization(self, organization: Organization) -> None:
+        self._organizations[organization.id] = organization
+
+    def delete_organization(self, org_id: str) -> bool:
+        with self._lock:
+            if self._organizations.pop(org_id, None) is None:
+                return False
+            self._member_pages.pop(org_id, None)
+            for user_id in self._members.pop(org_id, {}):
+                self._user_organizations.get(user_id, {}).pop(org_id, None)
+                self._membership_pages.pop(user_id, None)
+            for invitation_id in list(self._org_invitations.get(org_id, {})):
+                self.delete_invitation(invitation_id)
+            return True
+
+    def get_member(self, org_id: str, user_id: str) -> Optional[OrganizationMember]:
+        return self._members.get(org_id, {}).get(user_id)
+
+    def save_member(self, member: OrganizationMember) -> None:
+        with self._lock:
+            self._members.setdefault(member.organization_id, {})[member.user_id] = member
+            self._user_organizations.setdefault(member.user_id, {})[member.organization_id] = None
+            self._member_pages.pop(member.organization_id, None)
+            self._membership_pages.pop(member.user_id, None)
+
+    def delete_member(self, org_id: str, user_id: str) -> bool:
+        with self._lock:
+            removed = self._members.get(org_id, {}).pop(user_id, None)
+            self._user_organizations.get(user_id, {}).pop(org_id, None)
+            self._member_pages.pop(org_id, None)
+            self._membership_pages.pop(user_id, None)
+            return removed is not None
+
+    def list_members(self, org_id: str) -> List[OrganizationMember]:
+        return list(self._members.get(org_id, {}).values())
+
+    def save_members(self, members: List[OrganizationMember]) -> None:
+        with self._lock:
+            for member in members:
+                self.save_member(member)
+
+    def list_user_organization_ids(self, user_id: str) -> List[str]:
+        return list(self._user_organizations.get(user_id, {}))
+
+    def list_members_page(self, org_id: str, after: Optional[PageKey] = None,
+                          limit: int = 100) -> List[OrganizationMember]:
+        return self._page(self._member_pages, org_id, lambda: self._members.get(org_id, {}).values(),
+                          member_page_key, after, limit)
+
+    def list_user_memberships_page(self, user_id: str, after: Optional[PageKey] = None,
+                                   limit: int = 100) -> List[OrganizationMember]:
+        def rows():
+            return [self._members[org_id][user_id] for org_id in self._user_organizations.get(user_id, {})]
+        return self._page(self._membership_pages, user_id, rows, membership_page_key, after, limit)
+
+    def get_invitation(self, invitation_id: str) -> Optional[OrganizationInvitation]:
+        return self._invitations.get(invitation_id)
+
+    def get_invitation_by_token(self, token: str) -> Optional[OrganizationInvitation]:
+        return self._invitations.get(self._invitations_by_token.get(token, ''))
+
+    def save_invitation(self, invitation: OrganizationInvitation) -> None:
+        with self._lock:
+            self._invitations[invitation.id] = invitation
+            self._invitations_by_token[invitation.token] = invitation.id
+            self._org_invitations.setdefault(invitation.organization_id, {})[invitation.id] = None
+            self._invitation_pages.pop(invitation.organization_id, None)
+            if self._indexed_expiry.get(invitation.id) != invitation.expires_at:
+                self._indexed_expiry[invitation.id] = invitation.expires_at
+                heapq.heappush(self._invitation_expiry, (invitation.expires_at, invitation.id))
+
+    def delete_invitation(self, invitation_id: str) -> bool:
+        with self._lock:
+            invitation = self._invitations.pop(invitation_id, None)
+            if invitation is None:
+                return False
+            self._indexed_expiry.pop(invitation_id, None)
+            self._invitations_by_token.pop(invitation.token, None)
+            self._invitation_pages.pop(invitation.organization_id, None)
+            org_invitations = self._org_invitations.get(invitation.organization_id)
+            if org_invitations is not None:
+                org_invitations.pop(invitation_id, None)
+                if not org_invitations:
+                    del self._org_invitations[invitation.organization_id]
+            return True
+
+    def list_invitations(self, org_id: str) -> List[OrganizationInvitation]:
+        return [self._invitations[inv_id] for inv_id in self._org_invitations.get(org_id, {})]
+
+    def save_invitations(self, invitations: List[OrganizationInvitation]) -> None:
+        with self._lock:
+            for invitation in invitations:
+                self.save_invitation(invitation)
+
+    def list_invitations_page(self, org_id: str, after: Optional[PageKey] = None,
+                              limit: int = 100) -> List[OrganizationInvitation]:
+        return self._page(self._invitation_pages, org_id, lambda: self.list_invitations(org_id),
+                          invitation_page_key, after, limit)
+
+    def delete_expired_invitations(self, now: datetime, limit: Optional[int] = None) -> int:
+        removed = 0
+        with self._lock:
+            while self._invitation_expiry and self._invitation_expiry[0][0] <= now:
+                if limit is not None and removed >= limit:
+                    break
+                expires_at, invitation_id = heapq.heappop(self._invitation_expiry)
+                invitation = self._invitations.get(invitation_id)
+                # Skip entries for invitations already revoked or re-dated
+                if invitation and invitation.expires_at == expires_at:
+                    self.delete_invitation(invitation_id)
+                    removed += 1
+        return removed
+
+
+SCHEMA_STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS auth_organizations (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        slug TEXT NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        metadata TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS auth_organization_members (
+        organization_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        joined_at TIMESTAMP NOT NULL,
+        invited_by TEXT,
+        PRIMARY KEY (organization_id, user_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_auth_org_members_user ON auth_organization_members (user_id)",
+    ("CREATE INDEX IF NOT EXISTS idx_auth_org_members_page "
+     "ON auth_organization_members (organization_id, joined_at, user_id)"),
+    ("CREATE INDEX IF NOT EXISTS idx_auth_org_members_user_page "
+     "ON auth_organization_members (user_id, joined_at, organization_id)"),
+    """CREATE TABLE IF NOT EXISTS auth_organization_invitations (
+        id TEXT PRIMARY KEY,
+        organization_id TEXT NOT NULL,
+        email TEXT NOT NULL,
+        role TEXT NOT NULL,
+        token TEXT NOT NULL UNIQUE,
+        expires_at TIMESTAMP NOT NULL,
+        created_by TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        accepted_at TIMESTAMP,
+        accepted_by TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_auth_org_invitations_org ON auth_organization_invitations (organization_id)",
+    "CREATE INDEX IF NOT EXISTS idx_auth_org_invitations_expiry ON auth_organization_invitations (expires_at)",
+    ("CREATE INDEX IF NOT EXISTS idx_auth_org_invitations_page "
+     "ON auth_organization_invitations (organization_id, created_at, id)"),
+]
+
+ORG_COLUMNS = "id, name, slug, description, created_at, updated_at, metadata"
+MEMBER_COLUMNS = "organization_id, user_id, role, joined_at, invited_by"
+INVITATION_COLUMNS = ("id, organization_id, email, role, token, expires_at, "
+                      "created_by, created_at, accepted_at, accepted_by")
+
+# Statements are named so the Postgres backend can prepare each one once per connection.
+# Placeholders are written as '?' and translated per backend.
+STATEMENTS = {
+    "get_org": f"SELECT {ORG_COLUMNS} FROM auth_organizations WHERE id = ?",
+    "upsert_org": (
+        f"INSERT INTO auth_organizations ({ORG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET name = excluded.name, slug = excluded.slug, "
+        "description = excluded.description, updated_at = excluded.updated_at, metadata = excluded.metadata"
+    ),
+    "delete_org": "DELETE FROM auth_organizations WHERE id = ?",
+    "delete_org_members": "DELETE FROM auth_organization_members WHERE organization_id = ?",
+    "delete_org_invitations": "DELETE FROM auth_organization_invitations WHERE organization_id = ?",
+    "get_member": f"SELECT {MEMBER_COLUMNS} FROM auth_organization_members WHERE organization_id = ? AND user_id = ?",
+    "upsert_member": (
+        f"INSERT INTO auth_organization_members ({MEMBER_COLUMNS}) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (organization_id, user_id) DO UPDATE SET role = excluded.role, "
+        "invited_by = excluded.invited_by"
+    ),
+    "delete_member": "DELETE FROM auth_organization_members WHERE organization_id = ? AND user_id = ?",
+    "list_members": (
+        f"SELECT {MEMBER_COLUMNS} FROM auth_organization_members WHERE organization_id = ? "
+        "ORDER BY joined_at, user_id"
+    ),
+    "list_user_orgs": (
+        "SELECT organization_id FROM auth_organization_members WHERE user_id = ? "
+        "ORDER BY joined_at, organization_id"
+    ),
+    # Keyset pages: (owner, after_time, after_time, after_id, limit)
+    "list_members_page": (
+        f"SELECT {MEMBER_COLUMNS} FROM auth_organization_members WHERE organization_id = ? "
+        "AND (joined_at > ? OR (joined_at = ? AND user_id > ?)) ORDER BY joined_at, user_id LIMIT ?"
+    ),
+    "list_user_memberships_page": (
+        f"SELECT {MEMBER_COLUMNS} FROM auth_organization_members WHERE user_id = ? "
+        "AND (joined_at > ? OR (joined_at = ? AND organization_id > ?)) ORDER BY joined_at, organization_id LIMIT ?"
+    ),
+    "get_invitation": f"SELECT {INVITATION_COLUMNS} FROM auth_organization_invitations WHERE id = ?",
+    "get_invitation_by_token": f"SELECT {INVITATION_COLUMNS} FROM auth_organization_invitations WHERE token = ?",
+    "upsert_invitation": (
+        f"INSERT INTO auth_organization_invitations ({INVITATION_COLUMNS}) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET role = excluded.role, expires_at = excluded.expires_at, "
+        "accepted_at = excluded.accepted_at, accepted_by = excluded.accepted_by"
+    ),
+    "delete_invitation": "DELETE FROM auth_organization_invitations WHERE id = ?",
+    "list_invitations": (
+        f"SELECT {INVITATION_COLUMNS} FROM auth_organization_invitations WHERE organization_id = ? "
+        "ORDER BY created_at, id"
+    ),
+    "list_invitations_page": (
+        f"SELECT {INVITATION_COLUMNS} FROM auth_organization_invitations WHERE organization_id = ? "
+        "AND (created_at > ? OR (created_at = ? AND id > ?)) ORDER BY created_at, id LIMIT ?"
+    ),
+    "delete_expired_invitations": (
+        "DELETE FROM auth_organization_invitations WHERE id IN ("
+        "SELECT id FROM auth_organization_invitations WHERE expires_at <= ? ORDER BY expires_at LIMIT ?)"
+    ),
+}
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    """Normalize a stored timestamp (ISO text in SQLite, datetime in Postgres)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class SQLOrganizationRepository(OrganizationRepository):
+    """Row mapping and queries shared by the SQL backends."""
+
+    @abstractmethod
+    def _query(self, name: str, params: Tuple = ()) -> List[Tuple]:
+        """Run a named SELECT and return all rows."""
+
+    @abstractmethod
+    def _execute(self, name: str, params: Tuple = ()) -> int:
+        """Run a named write and return the affected row count."""
+
+    def _execute_many(self, name: str, rows: List[Tuple]) -> None:
+        """Run a named write once per parameter row inside one transaction."""
+        with self.transaction():
+            for params in rows:
+                self._execute(name, params)
+
+    @abstractmethod
+    def _select(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        """Run an ad hoc SELECT with '?' placeholders (variable-length IN lists)."""
+
+    def _page_params(self, owner: str, after: Optional[PageKey], limit: int) -> Tuple:
+        after_time, after_id = after or FIRST_PAGE_KEY
+        return (owner, self._db_time(after_time), self._db_time(after_time), after_id, limit)
+
+    def _db_time(self, value: Optional[datetime]) -> Any:
+        return value
+
+    def _organization(self, row: Tuple) -> Organization:
+        return Organization(
+            id=row[0], name=row[1], slug=row[2], description=row[3],
+            created_at=_timestamp(row[4]), updated_at=_timestamp(row[5]),
+            metadata=json.loads(row[6]) if row[6] else {}
+        )
+
+    def _member(self, row: Tuple) -> OrganizationMember:
+        return OrganizationMember(
+            organization_id=row[0], user_id=row[1], role=OrganizationRole(row[2]),
+            joined_at=_timestamp(row[3]), invited_by=row[4]
+        )
+
+    def _invitation(self, row: Tuple) -> OrganizationInvitation:
+        return OrganizationInvitation(
+            id=row[0], organization_id=row[1], email=row[2], role=OrganizationRole(row[3]),
+            token=row[4], expires_at=_timestamp(row[5]), created_by=row[6],
+            created_at=_timestamp(row[7]), accepted_at=_timestamp(row[8]), accepted_by=row[9]
+        )
+
+    def get_organization(self, org_id: str) -> Optional[Organization]:
+        rows = self._query("get_org", (org_id,))
+        return self._organization(rows[0]) if rows else None
+
+    def save_organization(self, organization: Organization) -> None:
+        self._execute("upsert_org", (
+            organization.id, organization.name, organization.slug, organization.description,
+            self._db_time(organization.created_at), self._db_time(organization.updated_at),
+            json.dumps(organization.metadata or {})
+        ))
+
+    def delete_organization(self, org_id: str) -> bool:
+        with self.transaction():
+            self._execute("delete_org_members", (org_id,))
+            self._execute("delete_org_invitations", (org_id,))
+            return self._execute("delete_org", (org_id,)) > 0
+
+    def get_member(self, org_id: str, user_id: str) -> Optional[OrganizationMember]:
+        rows = self._query("get_member", (org_id, user_id))
+        return self._member(rows[0]) if rows else None
+
+    def _member_params(self, member: OrganizationMember) -> Tuple:
+        return (member.organization_id, member.user_id, member.role.value,
+                self._db_time(member.joined_at), member.invited_by)
+
+    def save_member(self, member: OrganizationMember) -> None:
+        self._execute("upsert_member", self._member_params(member))
+
+    def save_members(self, members: List[OrganizationMember]) -> None:
+        self._execute_many("upsert_member", [self._member_params(member) for member in members])
+
+    def delete_member(self, org_id: str, user_id: str) -> bool:
+        return self._execute("delete_member", (org_id, user_id)) > 0
+
+    def list_members(self, org_id: str) -> List[OrganizationMember]:
+        return [self._member(row) for row in self._query("list_members", (org_id,))]
+
+    def list_user_organization_ids(self, user_id: str) -> List[str]:
+        return [row[0] for row in self._query("list_user_orgs", (user_id,))]
+
+    def get_organizations(self, org_ids: List[str]) -> Dict[str, Organization]:
+        if not org_ids:
+            return {}
+        placeholders = ", ".join("?" * len(org_ids))
+        rows = self._select(f"SELECT {ORG_COLUMNS} FROM auth_organizations WHERE id IN ({placeholders})",
+                            tuple(org_ids))
+        return {row[0]: self._organization(row) for row in rows}
+
+    def list_members_page(self, org_id: str, after: Optional[PageKey] = None,
+                          limit: int = 100) -> List[OrganizationMember]:
+        rows = self._query("list_members_page", self._page_params(org_id, after, limit))
+        return [self._member(row) for row in rows]
+
+    def list_user_memberships_page(self, user_id: str, after: Optional[PageKey] = None,
+                                   limit: int = 100) -> List[OrganizationMember]:
+        rows = self._query("list_user_memberships_page", self._page_params(user_id, after, limit))
+        return [self._member(row) for row in rows]
+
+    def get_invitation(self, invitation_id: str) -> Optional[OrganizationInvitation]:
+        rows = self._query("get_invitation", (invitation_id,))
+        return self._invitation(rows[0]) if rows else None
+
+    def get_invitation_by_token(self, token: str) -> Optional[OrganizationInvitation]:
+        rows = self._query("get_invitation_by_token", (token,))
+        return self._invitation(rows[0]) if rows else None
+
+    def _invitation_params(self, invitation: OrganizationInvitation) -> Tuple:
+        return (invitation.id, invitation.organization_id, invitation.email, invitation.role.value,
+                invitation.token, self._db_time(invitation.expires_at), invitation.created_by,
+                self._db_time(invitation.created_at), self._db_time(invitation.accepted_at),
+                invitation.accepted_by)
+
+    def save_invitation(self, invitation: OrganizationInvitation) -> None:
+        self._execute("upsert_invitation", self._invitation_params(invitation))
+
+    def save_invitations(self, invitations: List[OrganizationInvitation]) -> None:
+        self._execute_many("upsert_invitation",
+                           [self._invitation_params(invitation) for invitation in invitations])
+
+    def delete_invitation(self, invitation_id: str) -> bool:
+        return self._execute("delete_invitation", (invitation_id,)) > 0
+
+    def list_invitations(self, org_id: str) -> List[OrganizationInvitation]:
+        return [self._invitation(row) for row in self._query("list_invitations", (org_id,))]
+
+    def list_invitations_page(self, org_id: str, after: Optional[PageKey] = None,
+                              limit: int = 100) -> List[OrganizationInvitation]:
+        rows = self._query("list_invitations_page", self._page_params(org_id, after, limit))
+        return [self._invitation(row) for row in rows]
+
+    def delete_expired_invitations(self, now: datetime, limit: Optional[int] = None) -> int:
+        return self._execute("delete_expired_invitations",
+                             (self._db_time(now), limit if limit is not None else -1))
+
+
+class SQLiteOrganizationRepository(SQLOrganizationRepository):
+    """SQLite file database in WAL mode; one connection per thread."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path if path is not None else Config.ORG_SQLITE_PATH
+        self._local = threading.local()
+        with self.transaction():
+            conn = self._connection()
+            for statement in SCHEMA_STATEMENTS:
+                conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    def _db_time(self, value: Optional[datetime]) -> Any:
+        # ISO text sorts chronologically, which the expiry query relies on
+        return value.isoformat() if value is not None else None
+
+    def _query(self, name: str, params: Tuple = ()) -> List[Tuple]:
+        return self._connection().execute(STATEMENTS[name], params).fetchall()
+
+    def _execute(self, name: str, params: Tuple = ()) -> int:
+        return self._connection().execute(STATEMENTS[name], params).rowcount
+
+    def _execute_many(self, name: str, rows: List[Tuple]) -> None:
+        with self.transaction():
+            self._connection().executemany(STATEMENTS[name], rows)
+
+    def _select(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        return self._connection().execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        conn = self._connection()
+        outermost = self._local.depth == 0
+        if outermost:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield
+        except Exception:
+            self._local.depth -= 1
+            if outermost:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if outermost:
+            conn.execute("COMMIT")
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class PostgresOrganizationRepository(SQLOrganizationRepository):
+    """
+    Postgres backend using a thread-safe connection pool.
+
+    Each named statement is PREPAREd the first time a pooled connection runs
+    it and EXECUTEd on later calls, so the server parses and plans it once
+    per connection.
+    """
+
+    def __init__(self,
+                 dsn: Optional[str] = None,
+                 min_connections: Optional[int] = None,
+                 max_connections: Optional[int] = None):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError as e:
+            raise RuntimeError("psycopg2 is required for the Postgres organization backend") from e
+
+        dsn = dsn or os.getenv('DATABASE_URL')
+        if not dsn:
+            raise ValueError("DATABASE_URL must be set for the Postgres organization backend")
+
+        self._pool = ThreadedConnectionPool(
+            min_connections if min_connections is not None else Config.ORG_DB_POOL_MIN,
+            max_connections if max_connections is not None else Config.ORG_DB_POOL_MAX,
+            dsn)
+        self._local = threading.local()
+        # id(connection) -> statement names prepared on that connection
+        self._prepared: Dict[int, Set[str]] = {}
+        self._prepared_lock = threading.Lock()
+
+        with self.transaction():
+            with self._cursor() as cursor:
+                for statement in SCHEMA_STATEMENTS:
+                    cursor.execute(statement)
+
+    @staticmethod
+    def _to_postgres(sql: str) -> Tuple[str, int]:
+        """Rewrite '?' placeholders as $1..$n for PREPARE."""
+        parts = sql.split('?')
+        rewritten = parts[0]
+        for index, part in enumerate(parts[1:], start=1):
+            rewritten += f"${index}" + part
+        return rewritten, len(parts) - 1
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Inside transaction(): reuse its connection
+            yield conn
+            return
+
+        conn = self._pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            self._reset(conn)
+            raise
+        finally:
+            self._pool.putconn(conn)
+
+    @contextmanager
+    def _cursor(self):
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    def _reset(self, conn) -> None:
+        """Roll back and forget prepared statements that may not have survived."""
+        conn.rollback()
+        with self._prepared_lock:
+            self._prepared.pop(id(conn), None)
+        with conn.cursor() as cursor:
+            cursor.execute("DEALLOCATE ALL")
+        conn.commit()
+
+    def _run(self, cursor, name: str, params: Tuple) -> None:
+        conn_id = id(cursor.connection)
+        with self._prepared_lock:
+            prepared = self._prepared.setdefault(conn_id, set())
+            needs_prepare = name not in prepared
+
+        if needs_prepare:
+            sql, _ = self._to_postgres(STATEMENTS[name])
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            with self._prepared_lock:
+                prepared.add(name)
+
+        if params:
+            placeholders = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+    def _query(self, name: str, params: Tuple = ()) -> List[Tuple]:
+        with self._cursor() as cursor:
+            self._run(cursor, name, params)
+            return cursor.fetchall()
+
+    def _execute(self, name: str, params: Tuple = ()) -> int:
+        with self._cursor() as cursor:
+            self._run(cursor, name, params)
+            return cursor.rowcount
+
+    def _execute_many(self, name: str, rows: List[Tuple]) -> None:
+        with self.transaction():
+            with self._cursor() as cursor:
+                for params in rows:
+                    self._run(cursor, name, params)
+
+    def _select(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._cursor() as cursor:
+            cursor.execute(sql.replace("?", "%s"), params)
+            return cursor.fetchall()
+
+    def delete_expired_invitations(self, now: datetime, limit: Optional[int] = None) -> int:
+        # Postgres treats LIMIT NULL as no limit
+        return self._execute("delete_expired_invitations", (now, limit))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if getattr(self._local, 'conn', None) is not None:
+            yield
+            return
+
+        conn = self._pool.getconn()
+        self._local.conn = conn
+        try:
+            yield
+            conn.commit()
+        except Exception:
+            self._reset(conn)
+            raise
+        finally:
+            self._local.conn = None
+            self._pool.putconn(conn)
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+_MISSING = object()
+# Marks a key a transaction invalidated, so its own reads skip the committed copy
+_INVALIDATED = object()
+
+# Record type stored under each cache key kind; other kinds hold plain values
+RECORD_TYPES = {
+    "org": Organization,
+    "member": OrganizationMember,
+    "members": OrganizationMember,
+    "invitation_token": OrganizationInvitation,
+    "invitations": OrganizationInvitation,
+}
+
+
+def _dump_record(record: Any) -> Dict[str, Any]:
+    """Dataclass record as JSON/msgpack-safe values."""
+    data = {}
+    for field in fields(record):
+        value = getattr(record, field.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, OrganizationRole):
+            value = value.value
+        data[field.name] = value
+    return data
+
+
+def _load_record(record_type: type, data: Dict[str, Any]) -> Any:
+    values = dict(data)
+    for name, value in data.items():
+        if value is None:
+            continue
+        if name == "role":
+            values[name] = OrganizationRole(value)
+        elif name.endswith("_at"):
+            values[name] = datetime.fromisoformat(value)
+    return record_type(**values)
+
+
+def _dump_cached(kind: str, value: Any) -> Dict[str, Any]:
+    """Wrap a value for the shared cache; a cached None (known absent) is not a miss."""
+    record_type = RECORD_TYPES.get(kind)
+    if value is None or record_type is None:
+        return {"v": value}
+    if isinstance(value, list):
+        return {"v": [_dump_record(item) for item in value]}
+    return {"v": _dump_record(value)}
+
+
+def _copy_cached(value: Any) -> Any:
+    """Copy records going into or out of the cache so callers never mutate cached state."""
+    if isinstance(value, list):
+        return [_copy_cached(item) for item in value]
+    if is_dataclass(value) and not isinstance(value, type):
+        return replace(value, **{f.name: dict(getattr(value, f.name)) for f in fields(value)
+                                 if isinstance(getattr(value, f.name), dict)})
+    return value
+
+
+def _load_cached(kind: str, data: Dict[str, Any]) -> Any:
+    value = data["v"]
+    record_type = RECORD_TYPES.get(kind)
+    if value is None or record_type is None:
+        return value
+    if isinstance(value, list):
+        return [_load_record(record_type, item) for item in value]
+    return _load_record(record_type, value)
+
+
+class CachedOrganizationRepository(OrganizationRepository):
+    """
+    Write-through read cache in front of a persistent repository.
+
+    Reads are served from memory for up to ``ttl_seconds``; writes go to the
+    backing repository first and then update or invalidate the affected keys.
+    Without a shared cache, other instances see changes once their entries
+    expire, or immediately after an explicit invalidate_*() call. Records are
+    copied into and out of the cache, so changes a caller makes to a returned
+    record only reach the cache through a successful save.
+
+    With ``shared_cache``, local misses are looked up in the shared tier
+    before the backend, and every write deletes the affected shared keys and
+    broadcasts them so other instances drop their local copies. Inside a
+    transaction the shared tier is bypassed and invalidations are sent after
+    commit, so uncommitted rows never leave this process.
+
+    Local cache writes made inside a transaction are buffered per thread:
+    the writing thread reads its own changes, other threads keep seeing
+    committed data, and the buffer is applied on commit or dropped on
+    rollback.
+    """
+
+    def __init__(self,
+                 backend: OrganizationRepository,
+                 ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None,
+                 clock=time.monotonic,
+                 shared_cache: Optional[SharedCache] = None):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.ORG_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else Config.ORG_CACHE_MAX_ENTRIES
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # (expires_at, key) in expiry order (the TTL is fixed); stale pairs are skipped when purged
+        self._expiry_queue: "deque[Tuple[float, Tuple]]" = deque()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_cache = shared_cache
+        self._tx = threading.local()
+        if shared_cache is not None:
+            shared_cache.on_invalidate(self._on_shared_invalidate)
+
+    def _in_transaction(self) -> bool:
+        return getattr(self._tx, 'depth', 0) > 0
+
+    def _get(self, key: Tuple) -> Any:
+        if self._in_transaction() and key in self._tx.overlay:
+            value = self._tx.overlay[key]
+            return _MISSING if value is _INVALIDATED else _copy_cached(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy_cached(value)
+
+    def _set(self, key: Tuple, value: Any) -> None:
+        value = _copy_cached(value)
+        if self._in_transaction():
+            self._tx.overlay[key] = value
+            self._tx.local.append(lambda: self._store(key, value))
+            return
+        self._store(key, value)
+
+    def _store(self, key: Tuple, value: Any) -> None:
+        with self._lock:
+            expires_at = self._clock() + self.ttl_seconds
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._expiry_queue.append((expires_at, key))
+            if len(self._expiry_queue) > 2 * self.max_entries:
+                # Overwrites and evictions leave stale pairs; rebuild from live entries
+                self._expiry_queue = deque(sorted(((entry[0], k) for k, entry in self._entries.items()),
+                                                  key=lambda pair: pair[0]))
+
+    def _invalidate(self, *keys: Tuple) -> None:
+        if self._in_transaction():
+            for key in keys:
+                self._tx.overlay[key] = _INVALIDATED
+            self._tx.local.append(lambda: self._drop(keys))
+            return
+        self._drop(keys)
+
+    def _drop(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def _invalidate_matching(self, stale: Callable[[Tuple, Any], bool]) -> None:
+        """Drop cached entries matching ``stale(key, value)``, at commit inside a transaction."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if stale(key, entry[1])]
+        if not self._in_transaction():
+            self._drop(keys)
+            return
+        for key in keys:
+            self._tx.overlay[key] = _INVALIDATED
+        for key, value in list(self._tx.overlay.items()):
+            if value is not _INVALIDATED and stale(key, value):
+                self._tx.overlay[key] = _INVALIDATED
+        # Entries other threads cache before the commit are dropped too
+        self._tx.local.append(lambda: self._invalidate_matching(stale))
+
+    @staticmethod
+    def _shared_key(key: Tuple) -> str:
+        return "org:" + ":".join(key)
+
+    def _use_shared(self) -> bool:
+        return self.shared_cache is not None and getattr(self._tx, 'depth', 0) == 0
+
+    def _cached(self, key: Tuple, load):
+        value = self._get(key)
+        if value is not _MISSING:
+            return value
+
+        use_shared = self._use_shared()
+        if use_shared:
+            data = self.shared_cache.get(self._shared_key(key))
+            if data is not None:
+                try:
+                    value = _load_cached(key[0], data)
+                except (KeyError, TypeError, ValueError):
+                    value = _MISSING
+                if value is not _MISSING:
+                    self._set(key, value)
+                    return value
+
+        value = load()
+        self._set(key, value)
+        if use_shared:
+            self.shared_cache.set(self._shared_key(key), _dump_cached(key[0], value),
+                                  self.ttl_seconds, invalidate=False)
+        return value
+
+    def _publish(self, *keys: Tuple) -> None:
+        """Invalidate keys in the shared tier and in other instances; deferred until commit."""
+        if self.shared_cache is None or not keys:
+            return
+        names = [self._shared_key(key) for key in keys]
+        if getattr(self._tx, 'depth', 0) > 0:
+            self._tx.pending.extend(names)
+        else:
+            self._flush_shared(names)
+
+    def _flush_shared(self, names: List[str]) -> None:
+        exact = [name for name in names if not name.endswith("*")]
+        prefixes = [name for name in names if name.endswith("*")]
+        if exact:
+            self.shared_cache.delete_many(exact)
+        if prefixes:
+            self.shared_cache.publish_invalidation(prefixes)
+
+    def _on_shared_invalidate(self, names: List[str]) -> None:
+        """Drop local copies of keys another instance changed."""
+        with self._lock:
+            for name in names:
+                if not name.startswith("org:"):
+                    continue
+                parts = tuple(name[len("org:"):].split(":"))
+                if parts[-1] == "*":
+                    prefix = parts[:-1]
+                    for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                        del self._entries[key]
+                else:
+                    self._entries.pop(parts, None)
+
+    def invalidate_organization(self, org_id: str) -> None:
+        """Drop every cached entry derived from one organization."""
+        self._invalidate_matching(
+            lambda key, value: key[1] == org_id or (key[0] == "user_orgs" and org_id in (value or [])))
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop a user's cached organization list."""
+        self._invalidate(("user_orgs", user_id))
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._expiry_queue.clear()
+
+    def purge_expired_cache(self, limit: Optional[int] = None) -> int:
+        """Drop up to ``limit`` expired entries, oldest first, without scanning live ones."""
+        removed = 0
+        with self._lock:
+            now = self._clock()
+            while self._expiry_queue and self._expiry_queue[0][0] <= now:
+                if limit is not None and removed >= limit:
+                    break
+                expires_at, key = self._expiry_queue.popleft()
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == expires_at:
+                    del self._entries[key]
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit counters."""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    # Organizations
+    def get_organization(self, org_id: str) -> Optional[Organization]:
+        return self._cached(("org", org_id), lambda: self.backend.get_organization(org_id))
+
+    def save_organization(self, organization: Organization) -> None:
+        self.backend.save_organization(organization)
+        self._set(("org", organization.id), organization)
+        self._publish(("org", organization.id))
+
+    def delete_organization(self, org_id: str) -> bool:
+        member_ids = [m.user_id for m in self.list_members(org_id)]
+        tokens = ([i.token for i in self.backend.list_invitations(org_id)]
+                  if self.shared_cache is not None else [])
+        deleted = self.backend.delete_organization(org_id)
+        self.invalidate_organization(org_id)
+        self._invalidate(*[("user_orgs", user_id) for user_id in member_ids])
+        self._invalidate_matching(lambda key, value: key[0] == "invitation_token" and value is not None
+                                  and value.organization_id == org_id)
+        self._publish(("org", org_id), ("members", org_id), ("invitations", org_id),
+                      *[("member", org_id, user_id) for user_id in member_ids],
+                      *[("user_orgs", user_id) for user_id in member_ids],
+                      *[("invitation_token", token) for token in tokens])
+        return deleted
+
+    # Members
+    def get_member(self, org_id: str, user_id: str) -> Optional[OrganizationMember]:
+        return self._cached(("member", org_id, user_id), lambda: self.backend.get_member(org_id, user_id))
+
+    def save_member(self, member: OrganizationMember) -> None:
+        self.backend.save_member(member)
+        self._set(("member", member.organization_id, member.user_id), member)
+        self._invalidate(("members", member.organization_id), ("user_orgs", member.user_id))
+        self._publish(("member", member.organization_id, member.user_id),
+                      ("members", member.organization_id), ("user_orgs", member.user_id))
+
+    def delete_member(self, org_id: str, user_id: str) -> bool:
+        deleted = self.backend.delete_member(org_id, user_id)
+        self._set(("member", org_id, user_id), None)
+        self._invalidate(("members", org_id), ("user_orgs", user_id))
+        self._publish(("member", org_id, user_id), ("members", org_id), ("user_orgs", user_id))
+        return deleted
+
+    def save_members(self, members: List[OrganizationMember]) -> None:
+        self.backend.save_members(members)
+        keys = []
+        for member in members:
+            self._set(("member", member.organization_id, member.user_id), member)
+            keys += [("members", member.organization_id), ("user_orgs", member.user_id)]
+        self._invalidate(*keys)
+        self._publish(*keys, *[("member", m.organization_id, m.user_id) for m in members])
+
+    def list_members(self, org_id: str) -> List[OrganizationMember]:
+        return list(self._cached(("members", org_id), lambda: self.backend.list_members(org_id)))
+
+    def list_user_organization_ids(self, user_id: str) -> List[str]:
+        return list(self._cached(("user_orgs", user_id),
+                                 lambda: self.backend.list_user_organization_ids(user_id)))
+
+    def get_organizations(self, org_ids: List[str]) -> Dict[str, Organization]:
+        found, missing = {}, []
+        for org_id in org_ids:
+            value = self._get(("org", org_id))
+            if value is _MISSING:
+                missing.append(org_id)
+            elif value is not None:
+                found[org_id] = value
+
+        use_shared = self._use_shared() and missing
+        if use_shared:
+            # One pipelined multi-get for everything missing locally
+            shared = self.shared_cache.get_many(self._shared_key(("org", org_id)) for org_id in missing)
+            still_missing = []
+            for org_id in missing:
+                data = shared.get(self._shared_key(("org", org_id)))
+                if data is None:
+                    still_missing.append(org_id)
+                    continue
+                value = _load_cached("org", data)
+                self._set(("org", org_id), value)
+                if value is not None:
+                    found[org_id] = value
+            missing = still_missing
+
+        if missing:
+            loaded = self.backend.get_organizations(missing)
+            for org_id in missing:
+                self._set(("org", org_id), loaded.get(org_id))
+            found.update(loaded)
+            if use_shared:
+                self.shared_cache.set_many({self._shared_key(("org", org_id)): _dump_cached("org", loaded.get(org_id))
+                                            for org_id in missing}, self.ttl_seconds, invalidate=False)
+        return found
+
+    # Pages are read from the backend; they are bounded and change with every write
+    def list_members_page(self, org_id: str, after: Optional[PageKey] = None,
+                          limit: int = 100) -> List[OrganizationMember]:
+        return self.backend.list_members_page(org_id, after, limit)
+
+    def list_user_memberships_page(self, user_id: str, after: Optional[PageKey] = None,
+                                   limit: int = 100) -> List[OrganizationMember]:
+        return self.backend.list_user_memberships_page(user_id, after, limit)
+
+    def list_invitations_page(self, org_id: str, after: Optional[PageKey] = None,
+                              limit: int = 100) -> List[OrganizationInvitation]:
+        return self.backend.list_invitations_page(org_id, after, limit)
+
+    # Invitations
+    def get_invitation(self, invitation_id: str) -> Optional[OrganizationInvitation]:
+        return self.backend.get_invitation(invitation_id)
+
+    def get_invitation_by_token(self, token: str) -> Optional[OrganizationInvitation]:
+        return self._cached(("invitation_token", token), lambda: self.backend.get_invitation_by_token(token))
+
+    def save_invitation(self, invitation: OrganizationInvitation) -> None:
+        self.backend.save_invitation(invitation)
+        self._set(("invitation_token", invitation.token), invitation)
+        self._invalidate(("invitations", invitation.organization_id))
+        self._publish(("invitation_token", invitation.token), ("invitations", invitation.organization_id))
+
+    def delete_invitation(self, invitation_id: str) -> bool:
+        invitation = self.backend.get_invitation(invitation_id)
+        deleted = self.backend.delete_invitation(invitation_id)
+        if invitation:
+            self._invalidate(("invitation_token", invitation.token), ("invitations", invitation.organization_id))
+            self._publish(("invitation_token", invitation.token), ("invitations", invitation.organization_id))
+        return deleted
+
+    def save_invitations(self, invitations: List[OrganizationInvitation]) -> None:
+        self.backend.save_invitations(invitations)
+        for invitation in invitations:
+            self._set(("invitation_token", invitation.token), invitation)
+        org_keys = {("invitations", invitation.organization_id) for invitation in invitations}
+        self._invalidate(*org_keys)
+        self._publish(*org_keys, *[("invitation_token", i.token) for i in invitations])
+
+    def list_invitations(self, org_id: str) -> List[OrganizationInvitation]:
+        return list(self._cached(("invitations", org_id), lambda: self.backend.list_invitations(org_id)))
+
+    def delete_expired_invitations(self, now: datetime, limit: Optional[int] = None) -> int:
+        removed = self.backend.delete_expired_invitations(now, limit)
+        if removed:
+            # Expired rows may be cached under several keys; drop all invitation entries
+            self._invalidate_matching(lambda key, value: key[0] in ("invitation_token", "invitations"))
+            # Shared copies are not enumerable; they age out within ttl_seconds
+            self._publish(("invitation_token", "*"), ("invitations", "*"))
+        return removed
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        depth = getattr(self._tx, 'depth', 0)
+        if depth == 0:
+            self._tx.pending = []
+            self._tx.local = []
+            self._tx.overlay = {}
+        self._tx.depth = depth + 1
+        try:
+            with self.backend.transaction():
+                yield
+        except Exception:
+            self._tx.depth = depth
+            if depth == 0:
+                # Only this thread's buffered writes belonged to the rolled-back transaction
+                self._tx.pending, self._tx.local, self._tx.overlay = [], [], {}
+            raise
+        self._tx.depth = depth
+        if depth == 0:
+            local, self._tx.local, self._tx.overlay = self._tx.local, [], {}
+            for apply in local:
+                apply()
+            if self._tx.pending:
+                pending, self._tx.pending = self._tx.pending, []
+                self._flush_shared(pending)
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def create_repository(storage_backend: Optional[str] = "memory") -> OrganizationRepository:
+    """
+    Build the repository for a storage backend name.
+
+    'memory' is used as-is; 'sqlite' and 'database'/'postgres' are wrapped
+    in a write-through cache, shared between processes when SHARED_CACHE_URL
+    is set.
+    """
+    backend = (storage_backend or "memory").lower()
+
+    if backend == "memory":
+        return MemoryOrganizationRepository()
+    if backend == "sqlite":
+        return CachedOrganizationRepository(SQLiteOrganizationRepository(),
+                                            shared_cache=get_shared_cache())
+    if backend in ("database", "postgres", "postgresql"):
+        return CachedOrganizationRepository(PostgresOrganizationRepository(),
+                                            shared_cache=get_shared_cache())
+    if backend == "redis":
+        print("Warning: Redis is a shared cache, not an organization store; set SHARED_CACHE_URL "
+              "with 'sqlite' or 'database' storage. Using in-memory storage")
+        return MemoryOrganizationRepository()
+
+    raise ValueError(f"Unknown organization storage backend: {storage_backend}")
@@ -6,16 +6,24 @@ and invitation system for multi-tenant support.
 """
 
 import uuid
+import base64
 import secrets
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import json
 import os
+import re
 from logto import LogtoClient
 
+from config import Config
+
 from .logto_config import get_logto_client
+from .context import role_satisfies
+from .sweeper import ExpirySweeper
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
 
 class OrganizationRole(Enum):
@@ -62,6 +70,68 @@ class OrganizationInvitation:
     accepted_by: Optional[str] = None
 
 
+# Keyset pagination keys; every listing is ordered by one of these
+PageKey = Tuple[datetime, str]
+# Key before every real row, used for the first page
+FIRST_PAGE_KEY: PageKey = (datetime.min, '')
+
+
+def member_page_key(member: OrganizationMember) -> PageKey:
+    """Sort key of an organization's member list: join time, then user ID."""
+    return (member.joined_at, member.user_id)
+
+
+def membership_page_key(member: OrganizationMember) -> PageKey:
+    """Sort key of a user's memberships: join time, then organization ID."""
+    return (member.joined_at, member.organization_id)
+
+
+def invitation_page_key(invitation: OrganizationInvitation) -> PageKey:
+    """Sort key of an organization's invitations: creation time, then ID."""
+    return (invitation.created_at, invitation.id)
+
+
+def encode_cursor(key: PageKey) -> str:
+    """Opaque URL-safe cursor for a page key."""
+    raw = json.dumps([key[0].isoformat(), key[1]], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> PageKey:
+    """Page key from a cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, key_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(key_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+@dataclass
+class BulkItemResult:
+    """Outcome of one item in a bulk member or invitation operation."""
+    index: int
+    key: Optional[str]
+    status: str  # added, updated, unchanged, created, invalid, skipped
+    error: Optional[str] = None
+    member: Optional[OrganizationMember] = None
+    invitation: Optional[OrganizationInvitation] = None
+    
+    @property
+    def success(self) -> bool:
+        return self.error is None and self.status != 'skipped'
+
+
+def _parse_role(value) -> Optional[OrganizationRole]:
+    """Role from an enum member or its string value."""
+    if isinstance(value, OrganizationRole):
+        return value
+    try:
+        return OrganizationRole(value)
+    except ValueError:
+        return None
+
+
 class OrganizationManager:
     """
     Manages organizations, members, and invitations.
@@ -70,22 +140,20 @@ class OrganizationManager:
     sending invitations, and handling role assignments.
     """
     
-    def __init__(self, storage_backend: Optional[str] = "memory"):
+    def __init__(self, storage_backend: Optional[str] = "memory", repository=None):
         """
         Initialize the OrganizationManager.
         
         Args:
-            storage_backend: Storage backend to use ('memory', 'redis', 'database')
+            storage_backend: Storage backend to use ('memory', 'sqlite', 'database')
                            For production, use 'database' with proper persistence
+            repository: Explicit OrganizationRepository, overriding storage_backend
         """
+        from .org_storage import create_repository
+        
         self.storage_backend = storage_backend
         self.logto_client = get_logto_client()
-        
-        # In-memory storage for demo (replace with proper database in production)
-        self._organizations: Dict[str, Organization] = {}
-        self._members: Dict[str, List[OrganizationMember]] = {}
-        self._invitations: Dict[str, OrganizationInvitation] = {}
-        self._user_organizations: Dict[str, List[str]] = {}
+        self.repository = repository if repository is not None else create_repository(storage_backend)
     
     def create_organization(self, 
                           name: str, 
@@ -123,17 +191,18 @@ class OrganizationManager:
             metadata=metadata or {}
         )
         
-        # Store organization
-        self._organizations[org_id] = organization
-        
-        # Add creator as admin
-        self.add_member(org_id, created_by, OrganizationRole.ADMIN, invited_by=None)
+        with self.repository.transaction():
+            # Store organization
+            self.repository.save_organization(organization)
+            
+            # Add creator as admin
+            self.add_member(org_id, created_by, OrganizationRole.ADMIN, invited_by=None)
         
         return organization
     
     def get_organization(self, org_id: str) -> Optional[Organization]:
         """Get organization by ID."""
-        return self._organizations.get(org_id)
+        return self.repository.get_organization(org_id)
     
     def update_organization(self, 
                           org_id: str,
@@ -141,7 +210,7 @@ class OrganizationManager:
                           description: Optional[str] = None,
                           metadata: Optional[Dict] = None) -> Optional[Organization]:
         """Update organization details."""
-        org = self._organizations.get(org_id)
+        org = self.repository.get_organization(org_id)
         if not org:
             return None
         
@@ -153,6 +222,7 @@ class OrganizationManager:
             org.metadata = metadata
         
         org.updated_at = datetime.utcnow()
+        self.repository.save_organization(org)
         return org
     
     def delete_organization(self, org_id: str) -> bool:
@@ -165,28 +235,8 @@ class OrganizationManager:
         Returns:
             True if deleted, False if not found
         """
-        if org_id not in self._organizations:
-            return False
-        
-        # Remove organization
-        del self._organizations[org_id]
-        
-        # Remove all members
-        if org_id in self._members:
-            for member in self._members[org_id]:
-                if member.user_id in self._user_organizations:
-                    self._user_organizations[member.user_id].remove(org_id)
-            del self._members[org_id]
-        
-        # Remove all invitations
-        invitation_ids = [
-            inv_id for inv_id, inv in self._invitations.items()
-            if inv.organization_id == org_id
-        ]
-        for inv_id in invitation_ids:
-            del self._invitations[inv_id]
-        
-        return True
+        # Members and invitations are removed with the organization
+        return self.repository.delete_organization(org_id)
     
     def add_member(self, 
                    org_id: str, 
@@ -205,7 +255,7 @@ class OrganizationManager:
         Returns:
             Created member or None if organization doesn't exist
         """
-        if org_id not in self._organizations:
+        if not self.repository.get_organization(org_id):
             return None
         
         member = OrganizationMember(
@@ -216,34 +266,17 @@ class OrganizationManager:
             invited_by=invited_by
         )
         
-        # Store member
-        if org_id not in self._members:
-            self._members[org_id] = []
-        self._members[org_id].append(member)
-        
-        # Update user's organization list
-        if user_id not in self._user_organizations:
-            self._user_organizations[user_id] = []
-        self._user_organizations[user_id].append(org_id)
+        # Store member; the repository also updates the user's organization index
+        self.repository.save_member(member)
         
         return member
     
     def remove_member(self, org_id: str, user_id: str) -> bool:
         """Remove a member from an organization."""
-        if org_id not in self._members:
+        if not self.repository.get_organization(org_id):
             return False
         
-        # Find and remove member
-        self._members[org_id] = [
-            m for m in self._members[org_id] if m.user_id != user_id
-        ]
-        
-        # Update user's organization list
-        if user_id in self._user_organizations:
-            self._user_organizations[user_id] = [
-                o for o in self._user_organizations[user_id] if o != org_id
-            ]
-        
+        self.repository.delete_member(org_id, user_id)
         return True
     
     def update_member_role(self, 
@@ -251,30 +284,21 @@ class OrganizationManager:
                           user_id: str, 
                           new_role: OrganizationRole) -> bool:
         """Update a member's role in an organization."""
-        if org_id not in self._members:
+        member = self.get_member(org_id, user_id)
+        if not member:
             return False
         
-        for member in self._members[org_id]:
-            if member.user_id == user_id:
-                member.role = new_role
-                return True
-        
-        return False
+        member.role = new_role
+        self.repository.save_member(member)
+        return True
     
     def get_member(self, org_id: str, user_id: str) -> Optional[OrganizationMember]:
         """Get a specific member of an organization."""
-        if org_id not in self._members:
-            return None
-        
-        for member in self._members[org_id]:
-            if member.user_id == user_id:
-                return member
-        
-        return None
+        return self.repository.get_member(org_id, user_id)
     
     def get_organization_members(self, org_id: str) -> List[OrganizationMember]:
         """Get all members of an organization."""
-        return self._members.get(org_id, [])
+        return self.repository.list_members(org_id)
     
     def get_user_organizations(self, user_id: str) -> List[Tuple[Organization, OrganizationRole]]:
         """
@@ -283,17 +307,51 @@ class OrganizationManager:
         Returns:
             List of (Organization, Role) tuples
         """
-        result = []
-        org_ids = self._user_organizations.get(user_id, [])
+        return [(org, member.role) for org, member in self.iter_user_memberships(user_id)]
+    
+    def iter_user_memberships(self,
+                              user_id: str,
+                              after: Optional[PageKey] = None,
+                              page_size: int = 100) -> Iterator[Tuple[Organization, OrganizationMember]]:
+        """
+        Yield (Organization, membership) pairs ordered by join time, then organization ID.
         
-        for org_id in org_ids:
-            org = self._organizations.get(org_id)
-            if org:
-                member = self.get_member(org_id, user_id)
-                if member:
-                    result.append((org, member.role))
+        Reads one page of memberships and one batch of organizations at a time.
         
-        return result
+        Args:
+            user_id: User ID
+            after: Page key to resume after (see membership_page_key)
+            page_size: Rows fetched per repository call
+        """
+        while True:
+            memberships = self.repository.list_user_memberships_page(user_id, after, page_size)
+            organizations = self.repository.get_organizations([m.organization_id for m in memberships])
+            for member in memberships:
+                org = organizations.get(member.organization_id)
+                if org:
+                    yield org, member
+            if len(memberships) < page_size:
+                return
+            after = membership_page_key(memberships[-1])
+    
+    def iter_organization_members(self,
+                                  org_id: str,
+                                  after: Optional[PageKey] = None,
+                                  page_size: int = 100) -> Iterator[OrganizationMember]:
+        """
+        Yield members ordered by join time, then user ID, one page at a time.
+        
+        Args:
+            org_id: Organization ID
+            after: Page key to resume after (see member_page_key)
+            page_size: Rows fetched per repository call
+        """
+        while True:
+            members = self.repository.list_members_page(org_id, after, page_size)
+            yield from members
+            if len(members) < page_size:
+                return
+            after = member_page_key(members[-1])
     
     def create_invitation(self,
                          org_id: str,
@@ -314,7 +372,7 @@ class OrganizationManager:
         Returns:
             Created invitation or None if organization doesn't exist
         """
-        if org_id not in self._organizations:
+        if not self.repository.get_organization(org_id):
             return None
         
         invitation = OrganizationInvitation(
@@ -328,14 +386,258 @@ class OrganizationManager:
             created_at=datetime.utcnow()
         )
         
-        self._invitations[invitation.id] = invitation
+        self.repository.save_invitation(invitation)
         return invitation
     
+    def _finish_bulk(self, results: List[BulkItemResult], pending: List, save, all_or_nothing: bool) -> List[BulkItemResult]:
+        """Write the validated items in one transaction, or none of them if the batch is rejected."""
+        if all_or_nothing and any(result.error for result in results):
+            for result in results:
+                if result.error is None and result.status != 'unchanged':
+                    result.status = 'skipped'
+            return results
+        
+        if pending:
+            with self.repository.transaction():
+                save(pending)
+        return results
+    
+    def add_members(self,
+                    org_id: str,
+                    items: List[Dict],
+                    invited_by: Optional[str] = None,
+                    protected_user_ids: Tuple[str, ...] = (),
+                    all_or_nothing: bool = True) -> Optional[List[BulkItemResult]]:
+        """
+        Add several members to an organization.
+        
+        Every item is validated before anything is written. Existing members
+        keep their join date and only have their role updated, under the same
+        rules as update_member_roles: protected users keep their role and the
+        organization must keep at least one admin.
+        
+        Args:
+            org_id: Organization ID
+            items: Dicts with 'user_id' and 'role' (enum or value)
+            invited_by: User ID recorded as the inviter
+            protected_user_ids: Users whose role may not be changed (e.g. the caller)
+            all_or_nothing: Write nothing if any item is invalid
+            
+        Returns:
+            One result per item, or None if the organization doesn't exist
+        """
+        if not self.repository.get_organization(org_id):
+            return None
+        
+        existing = {member.user_id: member for member in self.repository.list_members(org_id)}
+        results, changes, seen = [], {}, set()
+        now = datetime.utcnow()
+        
+        for index, item in enumerate(items):
+            user_id = item.get('user_id') if isinstance(item, dict) else None
+            role = _parse_role(item.get('role')) if isinstance(item, dict) else None
+            result = BulkItemResult(index=index, key=user_id, status='invalid')
+            results.append(result)
+            
+            if not user_id or not isinstance(user_id, str):
+                result.error = 'user_id is required'
+            elif role is None:
+                result.error = f'Invalid role. Must be one of: {", ".join(r.value for r in OrganizationRole)}'
+            elif user_id in seen:
+                result.error = 'Duplicate user_id in request'
+            else:
+                seen.add(user_id)
+                current = existing.get(user_id)
+                if current is not None and current.role == role:
+                    result.status, result.member = 'unchanged', current
+                    continue
+                if current is not None and user_id in protected_user_ids:
+                    result.error = 'Cannot change your own role'
+                    continue
+                result.status = 'updated' if current else 'added'
+                changes[user_id] = (result, role)
+        
+        self._reject_admin_loss(existing, changes)
+        
+        pending = []
+        for user_id, (result, role) in changes.items():
+            if result.error is None:
+                current = existing.get(user_id)
+                result.member = OrganizationMember(
+                    user_id=user_id,
+                    organization_id=org_id,
+                    role=role,
+                    joined_at=current.joined_at if current else now,
+                    invited_by=current.invited_by if current else invited_by
+                )
+                pending.append(result.member)
+        
+        return self._finish_bulk(results, pending, self.repository.save_members, all_or_nothing)
+    
+    @staticmethod
+    def _reject_admin_loss(existing: Dict[str, OrganizationMember],
+                           changes: Dict[str, Tuple[BulkItemResult, OrganizationRole]]):
+        """Mark the admin demotions invalid if the batch would leave the organization without an admin"""
+        roles_after = {user_id: member.role for user_id, member in existing.items()}
+        for user_id, (_, role) in changes.items():
+            roles_after[user_id] = role
+        if existing and OrganizationRole.ADMIN not in roles_after.values():
+            for user_id, (result, _) in changes.items():
+                current = existing.get(user_id)
+                if current is not None and current.role == OrganizationRole.ADMIN:
+                    result.status, result.error = 'invalid', 'Organization must keep at least one admin'
+    
+    def update_member_roles(self,
+                            org_id: str,
+                            items: List[Dict],
+                            protected_user_ids: Tuple[str, ...] = (),
+                            all_or_nothing: bool = True) -> Optional[List[BulkItemResult]]:
+        """
+        Change the roles of several existing members.
+        
+        A batch that would leave the organization without an admin is
+        rejected for the items that demote admins.
+        
+        Args:
+            org_id: Organization ID
+            items: Dicts with 'user_id' and 'role'
+            protected_user_ids: Users whose role may not be changed (e.g. the caller)
+            all_or_nothing: Write nothing if any item is invalid
+            
+        Returns:
+            One result per item, or None if the organization doesn't exist
+        """
+        if not self.repository.get_organization(org_id):
+            return None
+        
+        existing = {member.user_id: member for member in self.repository.list_members(org_id)}
+        results, changes, seen = [], {}, set()
+        
+        for index, item in enumerate(items):
+            user_id = item.get('user_id') if isinstance(item, dict) else None
+            role = _parse_role(item.get('role')) if isinstance(item, dict) else None
+            result = BulkItemResult(index=index, key=user_id, status='invalid')
+            results.append(result)
+            
+            if not user_id or not isinstance(user_id, str):
+                result.error = 'user_id is required'
+            elif role is None:
+                result.error = f'Invalid role. Must be one of: {", ".join(r.value for r in OrganizationRole)}'
+            elif user_id in seen:
+                result.error = 'Duplicate user_id in request'
+            elif user_id in protected_user_ids:
+                result.error = 'Cannot change your own role'
+            elif user_id not in existing:
+                result.error = 'Member not found'
+            else:
+                seen.add(user_id)
+                current = existing[user_id]
+                if current.role == role:
+                    result.status, result.member = 'unchanged', current
+                    continue
+                result.status = 'updated'
+                changes[user_id] = (result, role)
+        
+        # The organization must keep at least one admin after the batch
+        self._reject_admin_loss(existing, changes)
+        
+        pending = []
+        for user_id, (result, role) in changes.items():
+            if result.error is None:
+                current = existing[user_id]
+                result.member = OrganizationMember(
+                    user_id=user_id,
+                    organization_id=org_id,
+                    role=role,
+                    joined_at=current.joined_at,
+                    invited_by=current.invited_by
+                )
+                pending.append(result.member)
+        
+        return self._finish_bulk(results, pending, self.repository.save_members, all_or_nothing)
+    
+    def create_invitations(self,
+                           org_id: str,
+                           items: List[Dict],
+                           created_by: str,
+                           expires_in_hours: int = 72,
+                           assignable_roles: Optional[Tuple[OrganizationRole, ...]] = None,
+                           all_or_nothing: bool = True) -> Optional[List[BulkItemResult]]:
+        """
+        Create invitations for several email addresses.
+        
+        Args:
+            org_id: Organization ID
+            items: Dicts with 'email' and 'role'
+            created_by: User ID of inviter
+            expires_in_hours: Hours until expiration (default 72)
+            assignable_roles: Roles the caller may grant (None allows all)
+            all_or_nothing: Write nothing if any item is invalid
+            
+        Returns:
+            One result per item, or None if the organization doesn't exist
+        """
+        if not self.repository.get_organization(org_id):
+            return None
+        
+        results, pending, seen = [], [], set()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=expires_in_hours)
+        
+        for index, item in enumerate(items):
+            email = item.get('email') if isinstance(item, dict) else None
+            role = _parse_role(item.get('role')) if isinstance(item, dict) else None
+            result = BulkItemResult(index=index, key=email, status='invalid')
+            results.append(result)
+            
+            if not email or not isinstance(email, str) or not EMAIL_PATTERN.match(email):
+                result.error = 'Invalid email format'
+            elif role is None:
+                result.error = f'Invalid role. Must be one of: {", ".join(r.value for r in OrganizationRole)}'
+            elif assignable_roles is not None and role not in assignable_roles:
+                result.error = f'Cannot invite with role {role.value}'
+            elif email.lower() in seen:
+                result.error = 'Duplicate email in request'
+            else:
+                seen.add(email.lower())
+                result.status = 'created'
+                result.invitation = OrganizationInvitation(
+                    id=str(uuid.uuid4()),
+                    organization_id=org_id,
+                    email=email,
+                    role=role,
+                    token=secrets.token_urlsafe(32),
+                    expires_at=expires_at,
+                    created_by=created_by,
+                    created_at=now
+                )
+                pending.append(result.invitation)
+        
+        return self._finish_bulk(results, pending, self.repository.save_invitations, all_or_nothing)
+    
+    def sweep_expired_invitations(self, 
+                                  now: Optional[datetime] = None,
+                                  limit: Optional[int] = None) -> int:
+        """
+        Remove invitations whose expiry has passed.
+        
+        Cost is proportional to the number of expired invitations rather than
+        the total number of invitations.
+        
+        Args:
+            now: Reference time (defaults to current UTC time)
+            limit: Maximum number of invitations to remove in this call
+            
+        Returns:
+            Number of invitations removed
+        """
+        return self.repository.delete_expired_invitations(now or datetime.utcnow(), limit)
+    
     def get_invitation_by_token(self, token: str) -> Optional[OrganizationInvitation]:
         """Find an invitation by its token."""
-        for invitation in self._invitations.values():
-            if invitation.token == token and invitation.expires_at > datetime.utcnow():
-                return invitation
+        invitation = self.repository.get_invitation_by_token(token)
+        if invitation and invitation.expires_at > datetime.utcnow():
+            return invitation
         return None
     
     def accept_invitation(self, 
@@ -355,33 +657,29 @@ class OrganizationManager:
         if not invitation or invitation.accepted_at:
             return None
         
-        # Mark invitation as accepted
-        invitation.accepted_at = datetime.utcnow()
-        invitation.accepted_by = user_id
-        
-        # Add user to organization
-        return self.add_member(
-            invitation.organization_id,
-            user_id,
-            invitation.role,
-            invited_by=invitation.created_by
-        )
+        with self.repository.transaction():
+            # Mark invitation as accepted
+            invitation.accepted_at = datetime.utcnow()
+            invitation.accepted_by = user_id
+            self.repository.save_invitation(invitation)
+            
+            # Add user to organization
+            return self.add_member(
+                invitation.organization_id,
+                user_id,
+                invitation.role,
+                invited_by=invitation.created_by
+            )
     
     def revoke_invitation(self, invitation_id: str) -> bool:
         """Revoke an invitation."""
-        if invitation_id in self._invitations:
-            del self._invitations[invitation_id]
-            return True
-        return False
+        return self.repository.delete_invitation(invitation_id)
     
     def get_organization_invitations(self, 
                                    org_id: str, 
                                    include_expired: bool = False) -> List[OrganizationInvitation]:
         """Get all invitations for an organization."""
-        invitations = [
-            inv for inv in self._invitations.values()
-            if inv.organization_id == org_id
-        ]
+        invitations = self.repository.list_invitations(org_id)
         
         if not include_expired:
             invitations = [
@@ -391,6 +689,30 @@ class OrganizationManager:
         
         return invitations
     
+    def iter_organization_invitations(self,
+                                      org_id: str,
+                                      include_expired: bool = False,
+                                      after: Optional[PageKey] = None,
+                                      page_size: int = 100) -> Iterator[OrganizationInvitation]:
+        """
+        Yield invitations ordered by creation time, then ID, one page at a time.
+        
+        Args:
+            org_id: Organization ID
+            include_expired: Also yield expired and accepted invitations
+            after: Page key to resume after (see invitation_page_key)
+            page_size: Rows fetched per repository call
+        """
+        while True:
+            invitations = self.repository.list_invitations_page(org_id, after, page_size)
+            now = datetime.utcnow()
+            for inv in invitations:
+                if include_expired or (inv.expires_at > now and not inv.accepted_at):
+                    yield inv
+            if len(invitations) < page_size:
+                return
+            after = invitation_page_key(invitations[-1])
+    
     def switch_organization_context(self, user_id: str, org_id: str) -> Optional[Dict]:
         """
         Switch user's active organization context.
@@ -431,27 +753,28 @@ class OrganizationManager:
         if not member:
             return False
         
-        role_hierarchy = {
-            OrganizationRole.VIEWER: 0,
-            OrganizationRole.EDITOR: 1,
-            OrganizationRole.ADMIN: 2
-        }
-        
-        user_level = role_hierarchy.get(member.role, -1)
-        required_level = role_hierarchy.get(required_role, 999)
-        
-        return user_level >= required_level
+        # Each role's permission mask contains the masks of the roles below it
+        return role_satisfies(member.role.value, getattr(required_role, 'value', required_role))
 
 
 # Global instance for easy access
 _organization_manager: Optional[OrganizationManager] = None
+_expiry_sweeper: Optional[ExpirySweeper] = None
 
 
 def get_organization_manager() -> OrganizationManager:
     """Get or create the global OrganizationManager instance."""
-    global _organization_manager
+    global _organization_manager, _expiry_sweeper
     if _organization_manager is None:
         # In production, use proper storage backend
         storage_backend = os.environ.get('ORG_STORAGE_BACKEND', 'memory')
         _organization_manager = OrganizationManager(storage_backend=storage_backend)
-    return _organization_manager
\ No newline at end of file
+        if Config.ORG_SWEEP_INTERVAL_SECONDS > 0:
+            _expiry_sweeper = ExpirySweeper(_organization_manager)
+            _expiry_sweeper.start()
+    return _organization_manager
+
+
+def get_expiry_sweeper() -> Optional[ExpirySweeper]:
+    """Sweeper of the global manager; None until the manager exists or when disabled."""
+    return _expiry_sweeper
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Per-client rate limiting for 12thhaus Spiritual Platform
+Token buckets keyed by API key, user or client IP, kept in process memory or
+in a Redis-protocol store so every API process draws from the same bucket
+"""
+import hashlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from config import Config
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of one bucket check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until one token is available (0 when allowed) and until the bucket is full
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(int(time.time() + self.reset_after + 0.999)),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(max(int(self.retry_after + 0.999), 1))
+        return headers
+
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: int, rate: float) -> float:
+    return min(capacity, tokens + max(now - updated_at, 0.0) * rate)
+
+
+def _take(tokens: float, capacity: int, rate: float, cost: int) -> Tuple[bool, float, RateLimitResult]:
+    """Spend ``cost`` tokens if available; cost 0 only checks that one is left"""
+    allowed = tokens >= max(cost, 1)
+    if allowed:
+        tokens -= cost
+    retry_after = 0.0 if allowed else (max(cost, 1) - tokens) / rate
+    result = RateLimitResult(allowed, capacity, int(tokens), retry_after, (capacity - tokens) / rate)
+    return allowed, tokens, result
+
+
+class RateLimitStore(ABC):
+    """Token bucket state keyed by client"""
+
+    @abstractmethod
+    def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> RateLimitResult:
+        """Refill the bucket for elapsed time at ``rate`` tokens/second, then spend ``cost``"""
+
+    def reset(self, key: str) -> None:
+        """Refill one bucket"""
+
+    def close(self) -> None:
+        """Release store resources"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process buckets in a bounded LRU; idle buckets are the first evicted"""
+
+    def __init__(self, max_buckets: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_buckets = max_buckets if max_buckets is not None else Config.RATE_LIMIT_MAX_BUCKETS
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> RateLimitResult:
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, capacity, rate)
+            _, tokens, result = _take(tokens, capacity, rate, cost)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return result
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Refill and spend in one round trip; the server clock keeps processes consistent
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local allowed = 0
+if tokens >= math.max(cost, 1) then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity / rate) * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets shared by every process through a Redis-protocol server"""
+
+    def __init__(self, url: str, namespace: Optional[str] = None, socket_timeout: Optional[float] = None):
+        socket_timeout = socket_timeout if socket_timeout is not None else Config.SHARED_CACHE_SOCKET_TIMEOUT
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("redis is required for a redis:// RATE_LIMIT_STORAGE_URL") from e
+
+        self._client = redis.Redis.from_url(url, socket_timeout=socket_timeout,
+                                            socket_connect_timeout=socket_timeout)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+        self.namespace = namespace if namespace is not None else Config.SHARED_CACHE_NAMESPACE
+
+    def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> RateLimitResult:
+        allowed, tokens = self._script(keys=[f"{self.namespace}:ratelimit:{key}"], args=[capacity, rate, cost])
+        tokens = float(tokens)
+        retry_after = 0.0 if allowed else (max(cost, 1) - tokens) / rate
+        return RateLimitResult(bool(allowed), capacity, int(tokens), retry_after, (capacity - tokens) / rate)
+
+    def reset(self, key: str) -> None:
+        self._client.delete(f"{self.namespace}:ratelimit:{key}")
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_rate_limit_store(url: Optional[str] = None) -> RateLimitStore:
+    """Store for a URL; in-process buckets when no URL is configured"""
+    url = Config.RATE_LIMIT_STORAGE_URL if url is None else url
+    if not url or url.startswith('memory://'):
+        return MemoryRateLimitStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisRateLimitStore(url)
+    raise ValueError(f"Unsupported rate limit storage URL: {url}")
+
+
+def client_key(kind: str, value: str) -> str:
+    """Bucket key; API keys are hashed so they never reach the store in clear text"""
+    if kind == 'key':
+        value = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f"{kind}:{value}"
+
+
+def client_ip(remote_addr: Optional[str], forwarded_for: Optional[str] = None,
+              trust_proxy: Optional[bool] = None, trusted_hops: Optional[int] = None) -> str:
+    """
+    Client address.
+
+    Behind trusted proxies each one appends the address it saw to
+    X-Forwarded-For, so the client is the ``trusted_hops``-th entry from the
+    right; anything further left was sent by the client and is ignored.
+    """
+    trust_proxy = trust_proxy if trust_proxy is not None else Config.RATE_LIMIT_TRUST_PROXY
+    trusted_hops = trusted_hops if trusted_hops is not None else Config.RATE_LIMIT_TRUSTED_HOPS
+    if trust_proxy and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return remote_addr or 'unknown'
+
+
+def is_rate_limit_exempt(path: Optional[str]) -> bool:
+    """Whether requests to ``path`` (query string ignored) skip the request buckets"""
+    return isinstance(path, str) and path.split('?', 1)[0].rstrip('/') in Config.RATE_LIMIT_EXEMPT_PATHS
+
+
+class RateLimiter:
+    """
+    Request and failed-authentication budgets per client.
+
+    ``hit`` charges one request to an API key, user or IP bucket.
+    ``auth_blocked``/``auth_failed`` keep a separate, smaller bucket per IP so
+    a client sending garbage tokens is refused before any verification work.
+    A store error allows the request rather than taking the API down.
+    """
+
+    def __init__(self,
+                 store: Optional[RateLimitStore] = None,
+                 per_minute: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 auth_failures_per_minute: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        per_minute = per_minute if per_minute is not None else Config.RATE_LIMIT_PER_MINUTE
+        auth_failures_per_minute = (auth_failures_per_minute if auth_failures_per_minute is not None
+                                    else Config.RATE_LIMIT_AUTH_FAILURES_PER_MINUTE)
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else Config.RATE_LIMIT_BURST
+        self.auth_failure_rate = auth_failures_per_minute / 60.0
+        self.auth_failure_capacity = max(int(auth_failures_per_minute), 1)
+        self.enabled = enabled if enabled is not None else Config.RATE_LIMIT_ENABLED
+        self.limited = 0
+        self.errors = 0
+
+    def _consume(self, key: str, capacity: int, rate: float, cost: int) -> Optional[RateLimitResult]:
+        if not self.enabled:
+            return None
+        try:
+            result = self.store.consume(key, capacity, rate, cost)
+        except Exception as e:
+            self.errors += 1
+            print(f"Rate limit store error: {str(e)}")
+            return None
+        if not result.allowed and cost:
+            self.limited += 1
+        return result
+
+    def hit(self, key: str, cost: int = 1) -> Optional[RateLimitResult]:
+        """Charge a request to ``key``; None when limiting is disabled or unavailable"""
+        return self._consume(key, self.capacity, self.rate, cost)
+
+    def auth_blocked(self, ip: str) -> Optional[RateLimitResult]:
+        """Result when ``ip`` has used up its failed-authentication budget, else None"""
+        result = self._consume(f"authfail:{ip}", self.auth_failure_capacity, self.auth_failure_rate, 0)
+        if result is not None and not result.allowed:
+            self.limited += 1
+            return result
+        return None
+
+    def auth_failed(self, ip: str) -> None:
+        """Charge a rejected token to ``ip``"""
+        self._consume(f"authfail:{ip}", self.auth_failure_capacity, self.auth_failure_rate, 1)
+
+    def stats(self) -> Dict[str, int]:
+        """Rejection counters"""
+        return {'limited': self.limited, 'errors': self.errors}
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide RateLimiter from the RATE_LIMIT_* settings"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(create_rate_limit_store())
+    return _rate_limiter
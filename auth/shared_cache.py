@@ -0,0 +1,381 @@
+"""
+Shared cache for 12thhaus Spiritual Platform
+Lets every API process reuse organization lookups, verified tokens and the
+Logto JWKS fetched by any other process, backed by Redis (or any server
+speaking its protocol) or by an in-process fake for tests and development
+"""
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+
+class JSONSerializer:
+    """Compact JSON; readable with any Redis client"""
+    name = 'json'
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """MessagePack; smaller and faster than JSON, needs the optional msgpack package"""
+    name = 'msgpack'
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError("msgpack is required for SHARED_CACHE_SERIALIZER=msgpack") from e
+        self._msgpack = msgpack
+
+    def dumps(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {
+    'json': JSONSerializer,
+    'msgpack': MsgpackSerializer
+}
+
+
+def get_serializer(name: str):
+    """Serializer instance for a configured name"""
+    try:
+        return SERIALIZERS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown shared cache serializer: {name}")
+
+
+class CacheBackend(ABC):
+    """Byte-level key/value and pub/sub operations; each call is one round trip"""
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]: ...
+
+    @abstractmethod
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None: ...
+
+    @abstractmethod
+    def delete_many(self, keys: List[str]) -> None: ...
+
+    @abstractmethod
+    def publish(self, channel: str, message: bytes) -> None: ...
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> None: ...
+
+    def close(self) -> None:
+        """Release connections and listener threads"""
+
+
+class MemoryCacheServer:
+    """
+    In-process stand-in for a Redis server.
+
+    Several MemoryCacheBackend clients attached to one server behave like
+    separate API processes sharing a cache. Messages are delivered
+    synchronously to every subscriber, including the publisher.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+        self._subscribers: Dict[str, List[Callable[[bytes], None]]] = {}
+        self._lock = threading.Lock()
+        self.round_trips = 0
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if self._clock() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def keys(self) -> List[str]:
+        """Unexpired keys, for tests"""
+        with self._lock:
+            return [key for key in list(self._data) if self._live(key) is not None]
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Client for a MemoryCacheServer"""
+
+    def __init__(self, server: Optional[MemoryCacheServer] = None):
+        self.server = server or MemoryCacheServer()
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        server = self.server
+        with server._lock:
+            server.round_trips += 1
+            return [server._live(key) for key in keys]
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        server = self.server
+        with server._lock:
+            server.round_trips += 1
+            expires_at = server._clock() + ttl
+            for key, value in items.items():
+                server._data[key] = (value, expires_at)
+
+    def delete_many(self, keys: List[str]) -> None:
+        server = self.server
+        with server._lock:
+            server.round_trips += 1
+            for key in keys:
+                server._data.pop(key, None)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        with self.server._lock:
+            self.server.round_trips += 1
+            subscribers = list(self.server._subscribers.get(channel, []))
+        for callback in subscribers:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> None:
+        with self.server._lock:
+            self.server._subscribers.setdefault(channel, []).append(callback)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis protocol client.
+
+    Multi-key reads use a single MGET and multi-key writes a single
+    non-transactional pipeline, so a batch costs one round trip. Each
+    subscription gets its own pub/sub connection and listener thread.
+    """
+
+    def __init__(self, url: str, socket_timeout: Optional[float] = None):
+        socket_timeout = socket_timeout if socket_timeout is not None else Config.SHARED_CACHE_SOCKET_TIMEOUT
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("redis is required for a redis:// SHARED_CACHE_URL") from e
+
+        self._client = redis.Redis.from_url(url, socket_timeout=socket_timeout,
+                                            socket_connect_timeout=socket_timeout)
+        self._listeners = []
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return self._client.mget(keys)
+
+    def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        if not items:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        ttl_ms = max(int(ttl * 1000), 1)
+        for key, value in items.items():
+            pipe.set(key, value, px=ttl_ms)
+        pipe.execute()
+
+    def delete_many(self, keys: List[str]) -> None:
+        if keys:
+            self._client.delete(*keys)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self._client.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> None:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{channel: lambda message: callback(message['data'])})
+        self._listeners.append(pubsub.run_in_thread(sleep_time=0.5, daemon=True))
+
+    def close(self) -> None:
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+        self._client.close()
+
+
+class SharedCache:
+    """
+    Namespaced, serialized cache shared by all API processes.
+
+    Callers keep their own in-process (near) cache in front of this one.
+    Writes and deletes publish the changed keys on an invalidation channel;
+    every other SharedCache subscribed to it passes the keys to its
+    ``on_invalidate`` callbacks so near-cache copies can be dropped.
+
+    Backend errors are logged and treated as misses so an unavailable cache
+    server degrades to per-process caching instead of failing requests.
+    """
+
+    def __init__(self,
+                 backend: CacheBackend,
+                 serializer: Any = None,
+                 namespace: Optional[str] = None):
+        serializer = serializer if serializer is not None else Config.SHARED_CACHE_SERIALIZER
+        namespace = namespace if namespace is not None else Config.SHARED_CACHE_NAMESPACE
+        self.backend = backend
+        self.serializer = get_serializer(serializer) if isinstance(serializer, str) else serializer
+        self.namespace = namespace
+        self.channel = f"{namespace}:invalidate"
+        self.instance_id = uuid.uuid4().hex
+        self._callbacks: List[Callable[[List[str]], None]] = []
+        self._subscribed = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _failed(self, operation: str, error: Exception):
+        self.errors += 1
+        print(f"Shared cache {operation} failed: {str(error)}")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values for the keys that are present, fetched in one round trip"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            raw = self.backend.get_many([self._key(key) for key in keys])
+        except Exception as e:
+            self._failed('read', e)
+            return {}
+
+        found = {}
+        for key, data in zip(keys, raw):
+            if data is not None:
+                try:
+                    found[key] = self.serializer.loads(data)
+                except Exception as e:
+                    self._failed('decode', e)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: Dict[str, Any], ttl: float, invalidate: bool = True) -> None:
+        """
+        Store values for ``ttl`` seconds in one round trip.
+
+        ``invalidate=False`` is for filling the cache with data read from
+        the source of truth, which does not change anything other processes
+        have cached.
+        """
+        if not items or ttl <= 0:
+            return
+        try:
+            payload = {self._key(key): self.serializer.dumps(value) for key, value in items.items()}
+            self.backend.set_many(payload, ttl)
+        except Exception as e:
+            self._failed('write', e)
+            return
+        if invalidate:
+            self.publish_invalidation(list(items))
+
+    def set(self, key: str, value: Any, ttl: float, invalidate: bool = True) -> None:
+        self.set_many({key: value}, ttl, invalidate)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove keys here and tell other processes to drop their copies"""
+        keys = list(keys)
+        if not keys:
+            return
+        try:
+            self.backend.delete_many([self._key(key) for key in keys])
+        except Exception as e:
+            self._failed('delete', e)
+        self.publish_invalidation(keys)
+
+    def delete(self, key: str) -> None:
+        self.delete_many([key])
+
+    def publish_invalidation(self, keys: List[str]) -> None:
+        """Broadcast changed keys; a trailing '*' marks a prefix"""
+        message = json.dumps({'origin': self.instance_id, 'keys': keys}).encode()
+        try:
+            self.backend.publish(self.channel, message)
+        except Exception as e:
+            self._failed('publish', e)
+
+    def on_invalidate(self, callback: Callable[[List[str]], None]) -> None:
+        """Call ``callback(keys)`` when another process changes keys"""
+        with self._lock:
+            self._callbacks.append(callback)
+            subscribe = not self._subscribed
+            self._subscribed = True
+        if subscribe:
+            try:
+                self.backend.subscribe(self.channel, self._handle_message)
+            except Exception as e:
+                self._failed('subscribe', e)
+
+    def _handle_message(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get('origin') == self.instance_id:
+            return
+        keys = message.get('keys') or []
+        for callback in list(self._callbacks):
+            try:
+                callback(keys)
+            except Exception as e:
+                print(f"Shared cache invalidation handler failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit counters for status reporting"""
+        return {
+            'serializer': self.serializer.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def create_shared_cache(url: Optional[str] = None,
+                        serializer: Optional[str] = None) -> Optional[SharedCache]:
+    """Build a SharedCache from a URL; None when no URL is configured"""
+    url = Config.SHARED_CACHE_URL if url is None else url
+    if not url:
+        return None
+
+    if url.startswith('memory://'):
+        backend = MemoryCacheBackend()
+    elif url.startswith(('redis://', 'rediss://', 'unix://')):
+        backend = RedisCacheBackend(url)
+    else:
+        raise ValueError(f"Unsupported shared cache URL: {url}")
+
+    return SharedCache(backend, serializer)
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_created = False
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Process-wide SharedCache from SHARED_CACHE_URL, or None if unset"""
+    global _shared_cache, _shared_cache_created
+    with _shared_cache_lock:
+        if not _shared_cache_created:
+            _shared_cache = create_shared_cache()
+            _shared_cache_created = True
+    return _shared_cache
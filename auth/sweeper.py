@@ -0,0 +1,123 @@
+"""
+Background expiry sweeper for 12thhaus Spiritual Platform organization data
+
+Expired invitations are otherwise only filtered at lookup time, so they pile up
+in storage. ExpirySweeper removes them, along with expired read-cache entries,
+on a daemon thread. Both sources are consumed in expiry order (the invitation
+heap or the ``expires_at`` index, and the cache's expiry queue), and each
+batch is a separate short call, so request handlers never wait behind a full
+sweep.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+
+class ExpirySweeper:
+    """Periodically removes expired invitations and cache entries in small batches."""
+
+    def __init__(self,
+                 manager,
+                 interval_seconds: Optional[float] = None,
+                 batch_size: Optional[int] = None,
+                 max_batches: Optional[int] = None,
+                 batch_pause: float = 0.005):
+        self.manager = manager
+        self.interval_seconds = interval_seconds if interval_seconds is not None else Config.ORG_SWEEP_INTERVAL_SECONDS
+        self.batch_size = batch_size if batch_size is not None else Config.ORG_SWEEP_BATCH_SIZE
+        # Batches per source per run; leftovers wait for the next run
+        self.max_batches = max_batches if max_batches is not None else Config.ORG_SWEEP_MAX_BATCHES
+        # Gap between batches so waiting requests get the repository lock
+        self.batch_pause = batch_pause
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.errors = 0
+        self.invitations_swept = 0
+        self.cache_entries_purged = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def _drain(self, sweep: Callable[[int], int]) -> int:
+        total = 0
+        for _ in range(self.max_batches):
+            removed = sweep(self.batch_size)
+            total += removed
+            if removed < self.batch_size or self._stop.is_set():
+                break
+            time.sleep(self.batch_pause)
+        return total
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Sweep once.
+
+        Args:
+            now: Reference time for invitation expiry (defaults to current UTC time)
+
+        Returns:
+            Counts removed by this run
+        """
+        now = now or datetime.utcnow()
+        started = time.perf_counter()
+        invitations = self._drain(lambda limit: self.manager.sweep_expired_invitations(now, limit))
+        cache_entries = self._drain(self.manager.repository.purge_expired_cache)
+        result = {
+            'invitations': invitations,
+            'cache_entries': cache_entries,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self.runs += 1
+            self.invitations_swept += invitations
+            self.cache_entries_purged += cache_entries
+            self.last_run = result
+        if invitations or cache_entries:
+            print(f"Expiry sweep removed {invitations} invitations and {cache_entries} cache entries")
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"Expiry sweep failed: {e}")
+
+    def start(self) -> bool:
+        """Start the sweeper thread; returns False if it is already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='org-expiry-sweeper', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the sweeper thread, letting an in-flight batch finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals since start and the last run's counts."""
+        with self._lock:
+            return {
+                'running': self.running,
+                'runs': self.runs,
+                'errors': self.errors,
+                'invitations_swept': self.invitations_swept,
+                'cache_entries_purged': self.cache_entries_purged,
+                'last_run': self.last_run
+            }
@@ -0,0 +1,185 @@
+"""
+Verified token cache for 12thhaus Spiritual Platform
+Remembers JWT payloads that already passed signature verification so a
+token reused across requests is only verified once while it is valid,
+optionally across processes through a shared cache, and tokens that were
+recently rejected so replaying them costs a hash lookup
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import Config
+
+from .shared_cache import SharedCache
+
+
+def token_digest(token: str) -> str:
+    """Cache key for a token; raw tokens are never kept as keys"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified payloads keyed by SHA-256 of the token.
+
+    An entry is only served inside the token's validity window: not before
+    ``nbf`` and not at or after ``exp`` (or ``max_ttl`` after caching,
+    whichever comes first).
+
+    With ``shared_cache``, verified payloads are also published there under
+    the same digest, so a token verified by one process is not re-verified
+    by the others.
+    """
+
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 max_ttl: Optional[int] = None,
+                 clock: Callable[[], float] = time.time,
+                 shared_cache: Optional[SharedCache] = None):
+        self.max_entries = max_entries if max_entries is not None else Config.TOKEN_CACHE_MAX_ENTRIES
+        self.max_ttl = max_ttl if max_ttl is not None else Config.TOKEN_CACHE_MAX_TTL_SECONDS
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.shared_cache = shared_cache
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Cached payload for a token still inside its validity window"""
+        key = token_digest(token)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, not_before, expires_at = entry
+                if now >= expires_at:
+                    del self._entries[key]
+                elif now < not_before:
+                    self.misses += 1
+                    return None
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+
+        if self.shared_cache is not None:
+            payload = self._get_shared(key, now)
+            if payload is not None:
+                return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _get_shared(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self.shared_cache.get(f"token:{key}")
+        if not isinstance(entry, dict):
+            return None
+        payload, not_before, expires_at = entry.get('payload'), entry.get('nbf', 0.0), entry.get('exp', 0.0)
+        if payload is None or not (not_before <= now < expires_at):
+            return None
+        self._store(key, payload, not_before, expires_at)
+        with self._lock:
+            self.shared_hits += 1
+        return payload
+
+    def _store(self, key: str, payload: Dict[str, Any], not_before: float, expires_at: float):
+        with self._lock:
+            self._entries[key] = (payload, not_before, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        """Remember a payload that just passed verification"""
+        now = self._clock()
+        expires_at = now + self.max_ttl
+        exp = payload.get('exp')
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= now:
+            return
+
+        nbf = payload.get('nbf')
+        not_before = nbf if isinstance(nbf, (int, float)) else 0.0
+
+        key = token_digest(token)
+        self._store(key, payload, not_before, expires_at)
+        if self.shared_cache is not None:
+            # Tokens never change, so there is nothing for other processes to invalidate
+            self.shared_cache.set(f"token:{key}", {'payload': payload, 'nbf': not_before, 'exp': expires_at},
+                                  expires_at - now, invalidate=False)
+
+    def clear(self):
+        """Forget all verified tokens"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit counters"""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'shared_hits': self.shared_hits}
+
+
+class RejectedTokenCache:
+    """
+    Bounded LRU of recently rejected tokens, keyed by SHA-256 of the token.
+
+    Only deterministic failures (malformed, expired, bad signature or claims)
+    should be added; entries expire after ``ttl`` so the cache never outlives
+    a key rotation by long.
+    """
+
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries if max_entries is not None else Config.REJECTED_TOKEN_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.REJECTED_TOKEN_TTL_SECONDS
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, token: str) -> Optional[str]:
+        """Rejection reason of a recently rejected token, else None"""
+        key = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, reason = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return reason
+
+    def put(self, token: str, reason: str):
+        """Remember a rejected token"""
+        key = token_digest(token)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, reason)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all rejected tokens"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit counter"""
+        return {'entries': len(self._entries), 'hits': self.hits}
@@ -5,13 +5,15 @@ This module provides authentication decorators that work with Vercel's
 BaseHTTPRequestHandler pattern for serverless functions.
 """
 
-import json
 import functools
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Dict, Optional
 from http.server import BaseHTTPRequestHandler
 
-from .middleware import validate_jwt_token, get_organization_from_token
+from .context import AuthContext, compile_roles
+from .middleware import validate_jwt_token, get_organization_from_payload
 from .organizations import get_organization_manager
+from .rate_limit import RateLimitResult, client_ip, client_key, get_rate_limiter, is_rate_limit_exempt
+from response_writer import JSON_HEADERS, write_json
 
 
 class AuthenticationError(Exception):
@@ -22,20 +24,61 @@ class AuthenticationError(Exception):
         super().__init__(message)
 
 
-def send_error_response(handler: BaseHTTPRequestHandler, message: str, status_code: int):
+def send_error_response(handler: BaseHTTPRequestHandler, message: str, status_code: int,
+                        headers: Optional[Dict[str, str]] = None):
     """Send a JSON error response."""
-    handler.send_response(status_code)
-    handler.send_header('Content-Type', 'application/json')
-    handler.send_header('Access-Control-Allow-Origin', '*')
-    handler.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-    handler.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
-    handler.end_headers()
-    
     response = {
         'error': message,
         'status_code': status_code
     }
-    handler.wfile.write(json.dumps(response).encode())
+    write_json(handler, status_code, response, JSON_HEADERS, headers)
+
+
+def _handler_ip(handler: BaseHTTPRequestHandler) -> str:
+    address = getattr(handler, 'client_address', None)
+    remote_addr = address[0] if isinstance(address, tuple) and address else None
+    return client_ip(remote_addr, handler.headers.get('X-Forwarded-For'))
+
+
+def send_rate_limited(handler: BaseHTTPRequestHandler, result: RateLimitResult):
+    """Send a 429 response with the X-RateLimit-* and Retry-After headers."""
+    send_error_response(handler, 'Rate limit exceeded', 429, result.headers())
+
+
+def _charge_handler(handler: BaseHTTPRequestHandler, kind: str, value: str) -> bool:
+    """
+    Charge one request to a client bucket and expose the result as handler.rate_limit.
+    
+    Sends a 429 response and returns False when the bucket is empty.
+    """
+    result = get_rate_limiter().hit(client_key(kind, value))
+    handler.rate_limit = result
+    if result is not None and not result.allowed:
+        send_rate_limited(handler, result)
+        return False
+    return True
+
+
+def _set_handler_context(handler: BaseHTTPRequestHandler, payload) -> AuthContext:
+    """Store verified claims and their AuthContext on the handler."""
+    context = AuthContext(payload)
+    handler.user_id = context.user_id
+    handler.user_email = context.email
+    handler.user_roles = context.roles
+    handler.organizations = context.organizations
+    handler.token_payload = payload
+    handler.auth_context = context
+    return context
+
+
+def _select_handler_organization(handler: BaseHTTPRequestHandler, context: AuthContext, org_id) -> bool:
+    """Activate an organization on the context and mirror it onto the handler."""
+    if not context.select_organization(org_id):
+        return False
+    handler.organization_id = context.organization_id
+    handler.organization = context.organization
+    handler.organization_role = context.organization_role
+    return True
 
 
 def authenticated_vercel(f: Callable) -> Callable:
@@ -55,34 +98,36 @@ def authenticated_vercel(f: Callable) -> Callable:
             
             token = auth_header.split(' ')[1]
             
+            # Refuse clients that keep sending bad tokens before doing any verification
+            limiter = get_rate_limiter()
+            ip = _handler_ip(handler)
+            blocked = limiter.auth_blocked(ip)
+            if blocked:
+                send_rate_limited(handler, blocked)
+                return
+            
             # Validate token
             payload = validate_jwt_token(token)
             if not payload:
+                limiter.auth_failed(ip)
                 send_error_response(handler, 'Invalid or expired token', 403)
                 return
             
             # Add user info to handler instance
-            handler.user_id = payload.get('sub')
-            handler.user_email = payload.get('email')
-            handler.user_roles = payload.get('roles', [])
-            handler.organizations = payload.get('organizations', [])
+            context = _set_handler_context(handler, payload)
+            if not _charge_handler(handler, 'user', handler.user_id or ip):
+                return
             
             # Try to get organization context
             org_id = handler.headers.get('X-Organization-Id')
             if not org_id:
-                org_id = get_organization_from_token(token)
+                org_id = get_organization_from_payload(payload)
             
             handler.organization_id = org_id
             handler.organization_role = None
             
-            if org_id and handler.organizations:
-                user_orgs = [org.get('id') for org in handler.organizations]
-                if org_id in user_orgs:
-                    for org in handler.organizations:
-                        if org.get('id') == org_id:
-                            handler.organization = org
-                            handler.organization_role = org.get('role', 'viewer')
-                            break
+            if org_id:
+                _select_handler_organization(handler, context, org_id)
             
             return f(handler, *args, **kwargs)
             
@@ -111,37 +156,49 @@ def optional_auth_vercel(f: Callable) -> Callable:
             handler.organization_id = None
             handler.organization_role = None
             handler.is_authenticated = False
+            limiter = get_rate_limiter()
+            ip = _handler_ip(handler)
+            # Liveness probes are never limited, by either bucket
+            exempt = is_rate_limit_exempt(getattr(handler, 'path', None))
             
             # Try to get token from Authorization header
             auth_header = handler.headers.get('Authorization')
             if auth_header and auth_header.startswith('Bearer '):
                 token = auth_header.split(' ')[1]
                 
+                blocked = None if exempt else limiter.auth_blocked(ip)
+                if blocked:
+                    send_rate_limited(handler, blocked)
+                    return
+                
                 # Try to validate token
                 payload = validate_jwt_token(token)
                 if payload:
                     # Add user info to handler instance
-                    handler.user_id = payload.get('sub')
-                    handler.user_email = payload.get('email')
-                    handler.user_roles = payload.get('roles', [])
-                    handler.organizations = payload.get('organizations', [])
+                    context = _set_handler_context(handler, payload)
                     handler.is_authenticated = True
                     
                     # Try to get organization context
                     org_id = handler.headers.get('X-Organization-Id')
                     if not org_id:
-                        org_id = get_organization_from_token(token)
+                        org_id = get_organization_from_payload(payload)
                     
                     handler.organization_id = org_id
                     
-                    if org_id and handler.organizations:
-                        user_orgs = [org.get('id') for org in handler.organizations]
-                        if org_id in user_orgs:
-                            for org in handler.organizations:
-                                if org.get('id') == org_id:
-                                    handler.organization = org
-                                    handler.organization_role = org.get('role', 'viewer')
-                                    break
+                    if org_id:
+                        _select_handler_organization(handler, context, org_id)
+                elif not exempt:
+                    limiter.auth_failed(ip)
+            
+            # Anonymous callers share their IP's bucket
+            if exempt:
+                allowed = True
+            elif handler.user_id:
+                allowed = _charge_handler(handler, 'user', handler.user_id)
+            else:
+                allowed = _charge_handler(handler, 'ip', ip)
+            if not allowed:
+                return
             
             return f(handler, *args, **kwargs)
             
@@ -174,9 +231,13 @@ def organization_required_vercel(f: Callable) -> Callable:
                     return
                 
                 # Use first organization as default
-                handler.organization_id = handler.organizations[0].get('id')
-                handler.organization = handler.organizations[0]
-                handler.organization_role = handler.organizations[0].get('role', 'viewer')
+                context = getattr(handler, 'auth_context', None)
+                if not isinstance(context, AuthContext):
+                    context = AuthContext.from_claims(handler.user_id, handler.organizations)
+                    handler.auth_context = context
+                if not _select_handler_organization(handler, context, context.default_organization_id):
+                    send_error_response(handler, 'User does not belong to any organization', 403)
+                    return
             
             return f(handler, *args, **kwargs)
             
@@ -193,6 +254,8 @@ def role_required_vercel(*required_roles: str) -> Callable:
     
     Must be used after @organization_required_vercel.
     """
+    allowed_roles = compile_roles(required_roles)
+    
     def decorator(f: Callable) -> Callable:
         @functools.wraps(f)
         def decorated_function(handler: BaseHTTPRequestHandler, *args: Any, **kwargs: Any) -> Any:
@@ -202,13 +265,13 @@ def role_required_vercel(*required_roles: str) -> Callable:
                     send_error_response(handler, 'Authentication required', 401)
                     return
                 
-                if not hasattr(handler, 'organization_id') or not handler.organization_id:
+                context = getattr(handler, 'auth_context', None)
+                if not isinstance(context, AuthContext) or not context.organization_id:
                     send_error_response(handler, 'Organization context required', 403)
                     return
                 
-                # Check role
-                user_role = getattr(handler, 'organization_role', None)
-                if not user_role or user_role not in required_roles:
+                # Check role against the mask precomputed on the context
+                if not context.has_role(allowed_roles):
                     send_error_response(
                         handler,
                         f'Insufficient permissions. Required roles: {", ".join(required_roles)}',
@@ -242,13 +305,24 @@ def api_key_required_vercel(f: Callable) -> Callable:
                 send_error_response(handler, 'Missing API key', 401)
                 return
             
+            limiter = get_rate_limiter()
+            ip = _handler_ip(handler)
+            blocked = limiter.auth_blocked(ip)
+            if blocked:
+                send_rate_limited(handler, blocked)
+                return
+            
             # Validate API key (get from environment)
             import os
             valid_api_keys = os.environ.get('VALID_API_KEYS', '').split(',')
             if api_key not in valid_api_keys or not api_key:
+                limiter.auth_failed(ip)
                 send_error_response(handler, 'Invalid API key', 403)
                 return
             
+            if not _charge_handler(handler, 'key', api_key):
+                return
+            
             # Add API key info to handler
             handler.api_key = api_key
             handler.is_service_account = True
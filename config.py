@@ -17,9 +17,107 @@ class Config:
     # Anthropic Configuration (for Claude)
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     
+    # LLM Backend Configuration ("anthropic", or "fake" for offline load and latency testing)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "anthropic")
+    LLM_MODEL = os.getenv("LLM_MODEL", "claude-3-5-sonnet-20241022")
+    FAKE_LLM_LATENCY_DISTRIBUTION = os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal")  # fixed, uniform, exponential, lognormal
+    FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))  # Median time to first token
+    FAKE_LLM_LATENCY_SPREAD = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5"))  # Lognormal sigma / uniform +-fraction
+    FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+    FAKE_LLM_RESPONSE_TOKENS = int(os.getenv("FAKE_LLM_RESPONSE_TOKENS", "200"))
+    FAKE_LLM_ROUTES = os.getenv("FAKE_LLM_ROUTES", "keyword")  # "keyword" or agent types to cycle through
+    FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+    FAKE_LLM_ERROR_STATUS = int(os.getenv("FAKE_LLM_ERROR_STATUS", "429"))
+    FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED", "")  # Set for repeatable latencies and errors
+    
     # Agent Configuration
     AGENT_TEMPERATURE = float(os.getenv("AGENT_TEMPERATURE", "0.7"))
     AGENT_MAX_TOKENS = int(os.getenv("AGENT_MAX_TOKENS", "4000"))
+    AGENT_STREAMING = os.getenv("AGENT_STREAMING", "false") == "true"  # Enables time-to-first-token timing
+    
+    # Deadline Configuration (seconds; defaults follow testing/test_config.py)
+    TASK_DEADLINE_SECONDS = float(os.getenv("TASK_DEADLINE_SECONDS", "60"))  # Whole pipeline, from the HTTP edge
+    AGENT_TIMEOUTS = {
+        "code_generation": float(os.getenv("CODE_GENERATION_AGENT_TIMEOUT", "120")),
+        "deployment": float(os.getenv("DEPLOYMENT_AGENT_TIMEOUT", "300")),
+        "business_intelligence": float(os.getenv("BUSINESS_INTELLIGENCE_AGENT_TIMEOUT", "90")),
+        "customer_operations": float(os.getenv("CUSTOMER_OPERATIONS_AGENT_TIMEOUT", "45")),
+        "marketing_automation": float(os.getenv("MARKETING_AUTOMATION_AGENT_TIMEOUT", "60")),
+    }
+    
+    # LLM Resilience Configuration (per-model circuit breaker and AIMD concurrency limit)
+    LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures
+    LLM_BREAKER_RECOVERY_SECONDS = float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", "30"))  # Open before probing
+    LLM_BREAKER_HALF_OPEN_CALLS = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "1"))
+    LLM_LIMIT_INITIAL = int(os.getenv("LLM_LIMIT_INITIAL", "20"))
+    LLM_LIMIT_MIN = int(os.getenv("LLM_LIMIT_MIN", "1"))
+    LLM_LIMIT_MAX = int(os.getenv("LLM_LIMIT_MAX", "100"))
+    LLM_LIMIT_BACKOFF = float(os.getenv("LLM_LIMIT_BACKOFF", "0.5"))  # Multiplier on rate limits and timeouts
+    LLM_LATENCY_TOLERANCE = float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0"))  # x baseline median before backing off
+    LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "20"))  # Calls per site whose median is compared
+    LLM_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("LLM_LIMIT_MAX_WAIT_SECONDS", "2"))  # Wait for a slot
+    
+    # LLM Retry Configuration (jittered exponential backoff, shared retry budget, hedged requests)
+    LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))  # Including the first attempt
+    LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8"))
+    LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))  # Retries per call, long run
+    LLM_RETRY_BUDGET_BURST = int(os.getenv("LLM_RETRY_BUDGET_BURST", "10"))
+    LLM_HEDGE_PRIORITIES = os.getenv("LLM_HEDGE_PRIORITIES", "high")  # Comma separated; empty disables hedging
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # Latencies seen before p95 is trusted
+    
+    # Health Evaluation Configuration
+    HEALTH_WINDOW_SECONDS = int(os.getenv("HEALTH_WINDOW_SECONDS", "300"))  # 60, 300 or 900
+    HEALTH_WARNING_ERROR_RATE = float(os.getenv("HEALTH_WARNING_ERROR_RATE", "0.1"))
+    HEALTH_UNHEALTHY_ERROR_RATE = float(os.getenv("HEALTH_UNHEALTHY_ERROR_RATE", "0.3"))
+    HEALTH_MIN_SAMPLES = int(os.getenv("HEALTH_MIN_SAMPLES", "1"))
+    
+    # Status Snapshot Configuration
+    STATUS_SNAPSHOT_INTERVAL_MS = int(os.getenv("STATUS_SNAPSHOT_INTERVAL_MS", "1000"))
+    STATUS_SNAPSHOT_MAX_AGE_MS = int(os.getenv("STATUS_SNAPSHOT_MAX_AGE_MS", "15000"))
+    STATUS_SNAPSHOT_DEGRADED_MAX_AGE_MS = int(os.getenv("STATUS_SNAPSHOT_DEGRADED_MAX_AGE_MS", "250"))
+    
+    # Coordination Task Store Configuration
+    TASK_STORE_MAX_ENTRIES = int(os.getenv("TASK_STORE_MAX_ENTRIES", "1000"))
+    TASK_RESULT_TTL_SECONDS = int(os.getenv("TASK_RESULT_TTL_SECONDS", "3600"))
+    TASK_RESULT_MAX_BYTES = int(os.getenv("TASK_RESULT_MAX_BYTES", "262144"))
+    TASK_RESULT_SPILL_DIR = os.getenv("TASK_RESULT_SPILL_DIR")  # Unset disables spilling
+    
+    # Durable Task Queue Configuration
+    TASK_QUEUE_BACKEND = os.getenv("TASK_QUEUE_BACKEND", "memory")  # memory or sqlite
+    TASK_QUEUE_PATH = os.getenv("TASK_QUEUE_PATH", "task_queue.db")
+    TASK_QUEUE_VISIBILITY_TIMEOUT = float(os.getenv("TASK_QUEUE_VISIBILITY_TIMEOUT", "300"))
+    TASK_QUEUE_MAX_ATTEMPTS = int(os.getenv("TASK_QUEUE_MAX_ATTEMPTS", "5"))
+    TASK_QUEUE_BACKOFF_BASE_SECONDS = float(os.getenv("TASK_QUEUE_BACKOFF_BASE_SECONDS", "2"))
+    TASK_QUEUE_BACKOFF_MAX_SECONDS = float(os.getenv("TASK_QUEUE_BACKOFF_MAX_SECONDS", "300"))
+    TASK_QUEUE_POLL_INTERVAL = float(os.getenv("TASK_QUEUE_POLL_INTERVAL", "0.5"))
+    
+    # API Response Configuration (shared JSON response writer)
+    RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))  # Smaller bodies sent as-is
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+    
+    # Request Body Limits (/api/task)
+    TASK_MAX_BODY_BYTES = int(os.getenv("TASK_MAX_BODY_BYTES", "1048576"))  # Single JSON task
+    TASK_MAX_BATCH_BYTES = int(os.getenv("TASK_MAX_BATCH_BYTES", "67108864"))  # Whole JSONL batch
+    TASK_MAX_LINE_BYTES = int(os.getenv("TASK_MAX_LINE_BYTES", "1048576"))  # One JSONL line
+    TASK_MAX_BATCH_ITEMS = int(os.getenv("TASK_MAX_BATCH_ITEMS", "1000"))
+    
+    # Idempotency Key Configuration (POST /api/task retries)
+    IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1000"))  # Kept in memory
+    IDEMPOTENCY_SPILL_PATH = os.getenv("IDEMPOTENCY_SPILL_PATH")  # SQLite file for older entries; unset drops them
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))  # Duplicate waits for the original
+    
+    # Async Task Webhook Configuration (callback_url on POST /api/task?mode=async)
+    WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+    WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "5"))
+    WEBHOOK_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_SECONDS", "0.5"))  # Doubles per retry
+    WEBHOOK_POOL_SIZE = int(os.getenv("WEBHOOK_POOL_SIZE", "10"))  # Kept-alive connections per host
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # Signs deliveries when set
+    WEBHOOK_ALLOWED_HOSTS = os.getenv("WEBHOOK_ALLOWED_HOSTS", "")  # Comma-separated; empty allows any public host
+    WEBHOOK_ALLOW_PRIVATE_HOSTS = os.getenv("WEBHOOK_ALLOW_PRIVATE_HOSTS", "false") == "true"  # Local development only
     
     # Logto Authentication Configuration
     LOGTO_ENDPOINT = os.getenv("LOGTO_ENDPOINT")  # e.g., https://your-tenant.logto.app
@@ -27,10 +125,52 @@ class Config:
     LOGTO_APP_SECRET = os.getenv("LOGTO_APP_SECRET")
     LOGTO_RESOURCE_INDICATOR = os.getenv("LOGTO_RESOURCE_INDICATOR")  # Optional API resource
     
+    # JWKS Cache Configuration (Logto signing keys)
+    JWKS_DEFAULT_TTL_SECONDS = int(os.getenv("JWKS_DEFAULT_TTL_SECONDS", "300"))  # When Cache-Control has no max-age
+    JWKS_MIN_TTL_SECONDS = int(os.getenv("JWKS_MIN_TTL_SECONDS", "30"))
+    JWKS_MAX_TTL_SECONDS = int(os.getenv("JWKS_MAX_TTL_SECONDS", "86400"))
+    JWKS_MAX_STALE_SECONDS = int(os.getenv("JWKS_MAX_STALE_SECONDS", "86400"))  # Last-known-good keys while the IdP fails
+    JWKS_UNKNOWN_KID_INTERVAL_SECONDS = float(os.getenv("JWKS_UNKNOWN_KID_INTERVAL_SECONDS", "10"))  # Between unknown-kid refetches
+    
+    # Verified Token Cache Configuration
+    TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    TOKEN_CACHE_MAX_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "900"))  # Even if exp is later
+    REJECTED_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("REJECTED_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    REJECTED_TOKEN_TTL_SECONDS = float(os.getenv("REJECTED_TOKEN_TTL_SECONDS", "60"))  # Invalid tokens refused unverified
+    TOKEN_PRECHECK_LEEWAY_SECONDS = int(os.getenv("TOKEN_PRECHECK_LEEWAY_SECONDS", "30"))  # Clock skew for the unverified exp check
+    
     # Multi-tenant Configuration
     MULTI_TENANT_ENABLED = os.getenv("MULTI_TENANT_ENABLED", "true") == "true"
     DEFAULT_ORG_ROLE = os.getenv("DEFAULT_ORG_ROLE", "viewer")
-    ORG_STORAGE_BACKEND = os.getenv("ORG_STORAGE_BACKEND", "memory")  # memory, redis, database
+    ORG_STORAGE_BACKEND = os.getenv("ORG_STORAGE_BACKEND", "memory")  # memory, sqlite, database (Postgres via DATABASE_URL)
+    ORG_SQLITE_PATH = os.getenv("ORG_SQLITE_PATH", "organizations.db")
+    ORG_DB_POOL_MIN = int(os.getenv("ORG_DB_POOL_MIN", "1"))  # Postgres connections kept open
+    ORG_DB_POOL_MAX = int(os.getenv("ORG_DB_POOL_MAX", "10"))
+    ORG_CACHE_TTL_SECONDS = float(os.getenv("ORG_CACHE_TTL_SECONDS", "30"))  # Read cache in front of sqlite/database
+    ORG_CACHE_MAX_ENTRIES = int(os.getenv("ORG_CACHE_MAX_ENTRIES", "10000"))
+    ORG_SWEEP_INTERVAL_SECONDS = float(os.getenv("ORG_SWEEP_INTERVAL_SECONDS", "60"))  # 0 disables the expiry sweeper
+    ORG_SWEEP_BATCH_SIZE = int(os.getenv("ORG_SWEEP_BATCH_SIZE", "100"))
+    ORG_SWEEP_MAX_BATCHES = int(os.getenv("ORG_SWEEP_MAX_BATCHES", "50"))  # Per source per run; leftovers wait for the next
+    ORG_BULK_MAX_ITEMS = int(os.getenv("ORG_BULK_MAX_ITEMS", "1000"))  # Items accepted by one bulk members/invitations call
+    
+    # Shared Cache Configuration (org lookups, verified tokens and JWKS across API processes)
+    SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")  # redis://host:6379/0 or memory://; empty disables
+    SHARED_CACHE_SERIALIZER = os.getenv("SHARED_CACHE_SERIALIZER", "json")  # json or msgpack
+    SHARED_CACHE_NAMESPACE = os.getenv("SHARED_CACHE_NAMESPACE", "12thhaus")  # Key prefix and invalidation channel
+    SHARED_CACHE_SOCKET_TIMEOUT = float(os.getenv("SHARED_CACHE_SOCKET_TIMEOUT", "0.5"))
+    
+    # Rate Limiting (per API key, user or IP; shared across processes when a storage URL is set)
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "100"))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "100"))
+    RATE_LIMIT_AUTH_FAILURES_PER_MINUTE = float(os.getenv("RATE_LIMIT_AUTH_FAILURES_PER_MINUTE", "20"))
+    RATE_LIMIT_STORAGE_URL = os.getenv("RATE_LIMIT_STORAGE_URL", SHARED_CACHE_URL)  # memory:// or redis://
+    # Use X-Forwarded-For for the client IP (only behind a proxy that sets it); on by default on Vercel
+    RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "true" if os.getenv("VERCEL") else "false").lower() == "true"
+    RATE_LIMIT_TRUSTED_HOPS = max(1, int(os.getenv("RATE_LIMIT_TRUSTED_HOPS", "1")))  # Proxies appending to X-Forwarded-For
+    RATE_LIMIT_EXEMPT_PATHS = tuple(path.strip() for path in os.getenv("RATE_LIMIT_EXEMPT_PATHS", "/api/health").split(",")
+                                    if path.strip())  # Never charged to a bucket (liveness probes)
+    RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))  # Per-process buckets before LRU eviction
     
     # Session Configuration
     SECRET_KEY = os.getenv("SECRET_KEY", os.urandom(24).hex())  # For Flask sessions
@@ -55,7 +195,11 @@ class Config:
     # Validate required environment variables
     @classmethod
     def validate(cls):
-        required_vars = ["LANGCHAIN_API_KEY", "ANTHROPIC_API_KEY"]
+        if cls.LLM_BACKEND not in ("anthropic", "fake"):
+            raise ValueError("LLM_BACKEND must be 'anthropic' or 'fake'")
+        
+        # The fake backend runs fully offline
+        required_vars = ["LANGCHAIN_API_KEY", "ANTHROPIC_API_KEY"] if cls.LLM_BACKEND == "anthropic" else []
         
         # Add Logto requirements if authentication is enabled
         if cls.REQUIRE_AUTH_FOR_APIS:
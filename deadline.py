@@ -0,0 +1,87 @@
+"""
+Request deadlines for the 12thhaus Spiritual Platform
+A Deadline is created once at the HTTP edge and handed down through routing,
+specialist execution and synthesis; every awaited LLM call is bounded by the
+time left, and is cancelled when the budget runs out
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """
+    The request's time budget ran out during ``stage``.
+
+    ``partial`` holds whatever output was produced before the cut-off
+    (streamed LLM text, for example), or None.
+    """
+
+    def __init__(self, stage: str, partial: Optional[str] = None):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+        self.partial = partial
+
+
+class _OwnTimeout(Exception):
+    """Carries a timeout raised by the awaited call itself past wait_for"""
+
+    def __init__(self, error: BaseException):
+        super().__init__(str(error))
+        self.error = error
+
+
+async def _surface_own_timeouts(awaitable: Awaitable[T]) -> T:
+    try:
+        return await awaitable
+    except asyncio.TimeoutError as e:
+        raise _OwnTimeout(e) from None
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered"""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.budget = seconds
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def child(self, seconds: Optional[float]) -> "Deadline":
+        """A deadline no later than this one and at most ``seconds`` away"""
+        if seconds is None or seconds >= self.remaining():
+            return self
+        return Deadline(seconds, self._clock)
+
+    async def run(self, awaitable: Awaitable[T], stage: str) -> T:
+        """
+        Await ``awaitable`` within the remaining budget.
+
+        The awaitable is cancelled (closing its HTTP request, for LLM calls)
+        and DeadlineExceeded raised when time runs out. Timeouts raised by the
+        awaitable itself propagate unchanged.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage)
+        try:
+            return await asyncio.wait_for(_surface_own_timeouts(awaitable), remaining)
+        except _OwnTimeout as e:
+            own = e.error
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage) from None
+        raise own
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f}s of {self.budget}s)"
@@ -0,0 +1,235 @@
+"""
+Idempotency key store for the 12thhaus Spiritual Platform
+Lets clients retry POST /api/task safely: the first request with a key runs,
+concurrent duplicates wait for that run, and later duplicates within the TTL
+get the stored response replayed instead of paying for the agents again
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+MAX_KEY_LENGTH = 255
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotent_responses (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotent_responses_stored_at
+    ON idempotent_responses (stored_at);
+"""
+
+
+class IdempotencyError(Exception):
+    """Request that cannot proceed under its idempotency key; ``status`` is the HTTP status"""
+    status = 409
+
+
+class IdempotencyConflict(IdempotencyError):
+    """Key already used for a different request body"""
+    status = 422
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """The original request is still running after the wait timeout"""
+    status = 409
+
+
+@dataclass
+class StoredResponse:
+    """A finished response kept for replay"""
+    status: int
+    body: bytes
+    fingerprint: str
+    stored_at: float
+
+
+class _InFlight:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+
+
+def request_fingerprint(data: Any) -> str:
+    """Stable hash of a parsed request body, independent of key order and whitespace"""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Responses by idempotency key.
+
+    Up to ``max_entries`` responses are kept in memory; older ones are moved
+    to a SQLite database at ``spill_path`` (or dropped when unset). Entries
+    expire ``ttl_seconds`` after they were stored. Only responses with a
+    status below 500 are stored, so failed runs can be retried.
+    """
+
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 spill_path: Optional[str] = None,
+                 wait_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries if max_entries is not None else Config.IDEMPOTENCY_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.IDEMPOTENCY_TTL_SECONDS
+        self.spill_path = spill_path if spill_path is not None else Config.IDEMPOTENCY_SPILL_PATH
+        self.wait_seconds = wait_seconds if wait_seconds is not None else Config.IDEMPOTENCY_WAIT_SECONDS
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._responses: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        self.executed = 0
+        self.replayed = 0
+        self.spilled = 0
+
+        if self.spill_path:
+            with self._connection() as conn:
+                conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.spill_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def begin(self, key: str, fingerprint: str, timeout: Optional[float] = None) -> Optional[StoredResponse]:
+        """
+        Claim ``key`` or get the response already stored under it.
+
+        Returns None when the caller now owns the key and must call complete()
+        or release(). A duplicate of a running request waits up to ``timeout``
+        seconds for it to finish.
+
+        Raises:
+            IdempotencyConflict: The key was used with a different fingerprint
+            IdempotencyInProgress: The original request is still running
+        """
+        timeout = self.wait_seconds if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                stored = self._lookup(key)
+                if stored is not None:
+                    if stored.fingerprint != fingerprint:
+                        raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+                    self.replayed += 1
+                    return stored
+
+                flight = self._in_flight.get(key)
+                if flight is None:
+                    self._in_flight[key] = _InFlight(fingerprint)
+                    self.executed += 1
+                    return None
+                if flight.fingerprint != fingerprint:
+                    raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not flight.done.wait(remaining):
+                raise IdempotencyInProgress("A request with this Idempotency-Key is still being processed")
+            # Either the response is stored now or the run failed and the key is free to claim
+
+    def complete(self, key: str, status: int, body: bytes):
+        """Store the response of a claimed key and wake waiting duplicates"""
+        with self._lock:
+            flight = self._in_flight.pop(key, None)
+            if status < 500:
+                fingerprint = flight.fingerprint if flight else ""
+                self._responses[key] = StoredResponse(status, body, fingerprint, self._clock())
+                self._responses.move_to_end(key)
+                self._evict()
+        if flight is not None:
+            flight.done.set()
+
+    def release(self, key: str):
+        """Give up a claimed key without storing a response"""
+        with self._lock:
+            flight = self._in_flight.pop(key, None)
+        if flight is not None:
+            flight.done.set()
+
+    def _lookup(self, key: str) -> Optional[StoredResponse]:
+        stored = self._responses.get(key)
+        if stored is None and self.spill_path:
+            row = self._connection().execute(
+                "SELECT status, body, fingerprint, stored_at FROM idempotent_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                stored = StoredResponse(row[0], bytes(row[1]), row[2], row[3])
+        if stored is not None and self._clock() - stored.stored_at >= self.ttl_seconds:
+            self._responses.pop(key, None)
+            if self.spill_path:
+                self._connection().execute("DELETE FROM idempotent_responses WHERE key = ?", (key,))
+            return None
+        return stored
+
+    def _evict(self):
+        """Drop expired responses, then move the oldest to the spill database while over capacity"""
+        now = self._clock()
+        while self._responses:
+            key, stored = next(iter(self._responses.items()))
+            expired = now - stored.stored_at >= self.ttl_seconds
+            if not expired and len(self._responses) <= self.max_entries:
+                break
+            self._responses.popitem(last=False)
+            if not expired and self.spill_path:
+                self._spill(key, stored)
+
+    def _spill(self, key: str, stored: StoredResponse):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO idempotent_responses (key, fingerprint, status, body, stored_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, stored.fingerprint, stored.status, stored.body, stored.stored_at)
+        )
+        self.spilled += 1
+        if self.spilled % 100 == 0:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the spill database"""
+        if not self.spill_path:
+            return 0
+        cursor = self._connection().execute(
+            "DELETE FROM idempotent_responses WHERE stored_at <= ?", (self._clock() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_memory": len(self._responses),
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "spilled": self.spilled,
+        }
+
+
+_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Process-wide idempotency store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore()
+    return _store
@@ -0,0 +1,195 @@
+"""
+LLM backends for the 12thhaus Spiritual Platform
+``create_llm`` builds the chat model every agent talks to: Anthropic in
+production, or an offline fake with configurable latency, streaming rate,
+routing answers and injected errors for load testing our own overhead
+"""
+import asyncio
+import math
+import random
+import threading
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from config import Config
+
+BACKENDS = ("anthropic", "fake")
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# First keyword found in the task picks the fake router's answer
+ROUTING_KEYWORDS = (
+    ("deploy", "deployment"),
+    ("infrastructure", "deployment"),
+    ("report", "business_intelligence"),
+    ("analytic", "business_intelligence"),
+    ("revenue", "business_intelligence"),
+    ("campaign", "marketing_automation"),
+    ("marketing", "marketing_automation"),
+    ("newsletter", "marketing_automation"),
+    ("customer", "customer_operations"),
+    ("support", "customer_operations"),
+    ("seeker", "customer_operations"),
+)
+DEFAULT_ROUTE = "code_generation"
+# Marks the master agent's routing prompt, which gets an agent name back
+ROUTING_PROMPT_MARKER = "routing tasks to specialist agents"
+
+FILLER_WORDS = ("breathe", "align", "practice", "energy", "guidance", "balance", "intention", "session")
+
+# One generator per FAKE_LLM_SEED value, shared by every fake model in the process
+_seeded_randoms = {}
+_seeded_randoms_lock = threading.Lock()
+
+
+def keyword_route(task: str) -> str:
+    """Agent type for a task by keyword alone, for routing without a model"""
+    task = task.lower()
+    return next((agent for keyword, agent in ROUTING_KEYWORDS if keyword in task), DEFAULT_ROUTE)
+
+
+def _process_random(seed: int) -> random.Random:
+    """The process-wide generator for ``seed``, so per-task models draw different values"""
+    with _seeded_randoms_lock:
+        if seed not in _seeded_randoms:
+            _seeded_randoms[seed] = random.Random(seed)
+        return _seeded_randoms[seed]
+
+
+def create_llm(model: Optional[str] = None, temperature: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> Any:
+    """Chat model for the configured LLM_BACKEND"""
+    if Config.LLM_BACKEND == "fake":
+        return FakeChatModel()
+    if Config.LLM_BACKEND != "anthropic":
+        raise ValueError(f"Unknown LLM_BACKEND: {Config.LLM_BACKEND}")
+
+    from langchain_anthropic import ChatAnthropic
+    return ChatAnthropic(
+        model=model or Config.LLM_MODEL,
+        temperature=temperature if temperature is not None else Config.AGENT_TEMPERATURE,
+        max_tokens=max_tokens if max_tokens is not None else Config.AGENT_MAX_TOKENS,
+        api_key=Config.ANTHROPIC_API_KEY
+    )
+
+
+class FakeProviderError(Exception):
+    """Injected provider error; shaped like the Anthropic SDK's status errors"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Error code: {status_code} - injected by the fake LLM backend")
+        self.status_code = status_code
+        self.response = _FakeResponse(status_code, retry_after)
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, retry_after: Optional[float]):
+        self.status_code = status_code
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+
+
+class FakeChatModel:
+    """
+    Offline stand-in for a chat model with ``ainvoke`` and ``astream``.
+
+    Each call waits a first-token latency drawn from ``latency_distribution``
+    (``latency_ms`` is the median, ``latency_spread`` its relative spread),
+    then produces ``response_tokens`` words at ``tokens_per_second``. The
+    routing prompt is answered with an agent name: picked by keyword from the
+    task when ``routes`` is "keyword", otherwise cycled through the
+    comma-separated agent types it lists. ``error_rate`` of calls raise
+    FakeProviderError(``error_status``) instead. A ``seed`` makes runs repeatable;
+    without one, FAKE_LLM_SEED seeds a single generator shared by all fake models
+    in the process.
+    """
+
+    def __init__(self,
+                 latency_distribution: Optional[str] = None,
+                 latency_ms: Optional[float] = None,
+                 latency_spread: Optional[float] = None,
+                 tokens_per_second: Optional[float] = None,
+                 response_tokens: Optional[int] = None,
+                 routes: Optional[str] = None,
+                 error_rate: Optional[float] = None,
+                 error_status: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.model = "fake"
+        self.latency_distribution = latency_distribution or Config.FAKE_LLM_LATENCY_DISTRIBUTION
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+        self.latency_ms = latency_ms if latency_ms is not None else Config.FAKE_LLM_LATENCY_MS
+        self.latency_spread = latency_spread if latency_spread is not None else Config.FAKE_LLM_LATENCY_SPREAD
+        self.tokens_per_second = (tokens_per_second if tokens_per_second is not None
+                                  else Config.FAKE_LLM_TOKENS_PER_SECOND)
+        self.response_tokens = response_tokens if response_tokens is not None else Config.FAKE_LLM_RESPONSE_TOKENS
+        routes = routes if routes is not None else Config.FAKE_LLM_ROUTES
+        self.routes = [route.strip() for route in routes.split(",") if route.strip() and route.strip() != "keyword"]
+        self.error_rate = error_rate if error_rate is not None else Config.FAKE_LLM_ERROR_RATE
+        self.error_status = error_status if error_status is not None else Config.FAKE_LLM_ERROR_STATUS
+        if seed is None and Config.FAKE_LLM_SEED:
+            self._random = _process_random(int(Config.FAKE_LLM_SEED))
+        else:
+            self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._route_index = 0
+        self.calls = 0
+        self.errors = 0
+
+    def sample_latency(self) -> float:
+        """First-token latency in seconds"""
+        median = self.latency_ms / 1000.0
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                value = self._random.uniform(median * (1 - self.latency_spread), median * (1 + self.latency_spread))
+            elif self.latency_distribution == "exponential":
+                value = self._random.expovariate(math.log(2) / median) if median > 0 else 0.0
+            elif self.latency_distribution == "lognormal":
+                value = self._random.lognormvariate(math.log(median), self.latency_spread) if median > 0 else 0.0
+            else:
+                value = median
+        return max(0.0, value)
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+            failing = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failing:
+                self.errors += 1
+        return failing
+
+    def _reply(self, messages: List[Any]) -> List[str]:
+        """Tokens of the answer to ``messages``"""
+        system = next((message.content for message in messages if getattr(message, "type", "") == "system"), "")
+        if ROUTING_PROMPT_MARKER in system:
+            return [self._route(messages[-1].content if messages else "")]
+        return [f"{FILLER_WORDS[i % len(FILLER_WORDS)]} " for i in range(self.response_tokens)]
+
+    def _route(self, task: str) -> str:
+        if self.routes:
+            with self._lock:
+                route = self.routes[self._route_index % len(self.routes)]
+                self._route_index += 1
+            return route
+        return keyword_route(task)
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> AIMessage:
+        failing = self._start_call()
+        tokens = self._reply(messages)
+        await asyncio.sleep(self.sample_latency() + self._token_delay() * (len(tokens) - 1))
+        if failing:
+            raise FakeProviderError(self.error_status)
+        return AIMessage(content="".join(tokens).strip())
+
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[AIMessageChunk]:
+        failing = self._start_call()
+        tokens = self._reply(messages)
+        await asyncio.sleep(self.sample_latency())
+        if failing:
+            raise FakeProviderError(self.error_status)
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(self._token_delay())
+            yield AIMessageChunk(content=token)
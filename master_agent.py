@@ -4,16 +4,21 @@ Handles spiritual matchmaking and coordination between specialized agents
 """
 import asyncio
 import logging
+import time
 from typing import Dict, List, Any, Optional, Tuple
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_anthropic import ChatAnthropic
 from langsmith import traceable
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 
 from config import Config
+from deadline import Deadline, DeadlineExceeded
+from llm_backends import create_llm, keyword_route
+from resilience import LLMUnavailable, get_llm_guard, is_provider_failure, model_name
+from retry import AttemptStats, RetryPolicy
 from sop_reader import sop_reader
+from monitoring import StageTimer, get_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +33,7 @@ class TaskResponse(BaseModel):
     """Represents a response from a specialist agent"""
     agent_type: str = Field(..., description="Type of agent that handled the task")
     content: str = Field(..., description="The response content")
-    status: str = Field(..., description="Task status (completed, failed, in_progress)")
+    status: str = Field(..., description="Task status (completed, partial, timeout, unavailable, failed, in_progress)")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
 class AgentState(BaseModel):
@@ -38,6 +43,8 @@ class AgentState(BaseModel):
     agent_responses: List[TaskResponse] = Field(default_factory=list)
     final_response: Optional[str] = None
     error: Optional[str] = None
+    timings: Dict[str, float] = Field(default_factory=dict)
+    deadline: Optional[Any] = Field(default=None, exclude=True, description="Deadline shared by every stage")
 
 class MasterAgent:
     """
@@ -49,12 +56,8 @@ class MasterAgent:
         Config.validate()
         
         # Initialize LLM with LangSmith tracing
-        self.llm = ChatAnthropic(
-            model="claude-3-5-sonnet-20241022",
-            temperature=Config.AGENT_TEMPERATURE,
-            max_tokens=Config.AGENT_MAX_TOKENS,
-            api_key=Config.ANTHROPIC_API_KEY
-        )
+        self.llm = create_llm()
+        self.retry_policy = RetryPolicy()
         
         # Initialize SOP reader
         self.sop_reader = sop_reader
@@ -71,6 +74,9 @@ class MasterAgent:
             'marketing_automation': 'Marketing Automation Agent'
         }
         
+        # Stage breakdown (milliseconds) of the most recent process_task call
+        self.last_timings: Dict[str, float] = {}
+        
         # Initialize the master workflow
         self.workflow = self._create_workflow()
         
@@ -96,31 +102,68 @@ class MasterAgent:
         
         return workflow.compile()
     
+    def _deadline(self, state: AgentState) -> Deadline:
+        """The request's deadline, starting one now if the state came without"""
+        if state.deadline is None:
+            state.deadline = Deadline(Config.TASK_DEADLINE_SECONDS)
+        return state.deadline
+    
     @traceable
     async def _route_task(self, state: AgentState) -> AgentState:
         """Route the task to the appropriate specialist agent"""
+        timer = StageTimer()
+        deadline = self._deadline(state)
+        stats = AttemptStats()
         try:
-            # Get task routing prompt
-            routing_prompt = self._get_routing_prompt(state.task_request)
-            
-            # Get routing decision from LLM
-            response = await self.llm.ainvoke([
-                SystemMessage(content=routing_prompt),
-                HumanMessage(content=state.task_request.content)
-            ])
-            
-            # Parse routing decision
-            routing_decision = self._parse_routing_decision(response.content)
+            with timer.span("route"):
+                # Get task routing prompt
+                with timer.span("route.prompt_build"):
+                    routing_prompt = self._get_routing_prompt(state.task_request)
+                
+                # Get routing decision from LLM
+                with timer.span("route.llm"):
+                    messages = [
+                        SystemMessage(content=routing_prompt),
+                        HumanMessage(content=state.task_request.content)
+                    ]
+                    guard = get_llm_guard(model_name(self.llm))
+                    response = await self.retry_policy.run(
+                        lambda: guard.call(
+                            lambda: deadline.run(self.llm.ainvoke(messages), "route"),
+                            max_wait=min(Config.LLM_LIMIT_MAX_WAIT_SECONDS, deadline.remaining()),
+                            site="route"
+                        ),
+                        deadline, stats
+                    )
+                
+                # Parse routing decision
+                with timer.span("route.parse"):
+                    routing_decision = self._parse_routing_decision(response.content)
             
             state.routing_decision = routing_decision
             logger.info(f"Task routed to: {routing_decision}")
             
             return state
             
+        except (DeadlineExceeded, LLMUnavailable) as e:
+            # Fall back to keyword routing so whatever budget is left still goes to a specialist
+            logger.warning(f"{e}; routing by keyword")
+            state.routing_decision = keyword_route(state.task_request.content)
+            return state
+            
         except Exception as e:
+            if is_provider_failure(e):
+                # Retries are spent; a keyword guess still beats failing the whole request
+                logger.error(f"Error in task routing: {e}; routing by keyword")
+                state.routing_decision = keyword_route(state.task_request.content)
+                return state
             logger.error(f"Error in task routing: {e}")
             state.error = f"Routing error: {str(e)}"
             return state
+        
+        finally:
+            state.timings.update(timer.timings)
+            get_monitor().record_llm_attempts("master", **stats.as_dict())
     
     @traceable
     def _get_routing_prompt(self, task_request: TaskRequest) -> str:
@@ -189,15 +232,22 @@ If the task doesn't clearly fit any agent, choose the most appropriate one or "c
     @traceable
     async def _execute_task(self, state: AgentState) -> AgentState:
         """Execute the task using the selected specialist agent"""
+        timer = StageTimer()
         try:
-            if not state.routing_decision:
-                raise ValueError("No routing decision available")
-            
-            # Get the specialist agent
-            specialist_agent = self._get_specialist_agent(state.routing_decision)
+            with timer.span("execute"):
+                if not state.routing_decision:
+                    raise ValueError("No routing decision available")
+                
+                # Get the specialist agent
+                with timer.span("execute.agent_init"):
+                    specialist_agent = self._get_specialist_agent(state.routing_decision)
+                
+                # Execute task with specialist agent, within both the request deadline and its own timeout
+                agent_deadline = self._deadline(state).child(Config.AGENT_TIMEOUTS.get(state.routing_decision))
+                response = await specialist_agent.execute_task(state.task_request, deadline=agent_deadline)
             
-            # Execute task with specialist agent
-            response = await specialist_agent.execute_task(state.task_request)
+            # Fold the specialist's own breakdown under the execute stage
+            timer.merge(response.metadata.get("timings", {}), prefix="execute")
             
             # Add response to state
             state.agent_responses.append(response)
@@ -208,6 +258,9 @@ If the task doesn't clearly fit any agent, choose the most appropriate one or "c
             logger.error(f"Error in task execution: {e}")
             state.error = f"Execution error: {str(e)}"
             return state
+        
+        finally:
+            state.timings.update(timer.timings)
     
     def _get_specialist_agent(self, agent_type: str):
         """Get the specialist agent instance"""
@@ -237,6 +290,7 @@ If the task doesn't clearly fit any agent, choose the most appropriate one or "c
     @traceable
     async def _synthesize_response(self, state: AgentState) -> AgentState:
         """Synthesize the final response from agent outputs"""
+        start = time.perf_counter()
         try:
             if state.error:
                 state.final_response = f"Error: {state.error}"
@@ -251,6 +305,15 @@ If the task doesn't clearly fit any agent, choose the most appropriate one or "c
             
             if response.status == "completed":
                 state.final_response = response.content
+            elif response.status == "partial":
+                state.final_response = f"{response.content}\n\n[Response cut short: time limit reached]"
+            elif response.status == "unavailable":
+                retry_after = response.metadata.get("retry_after")
+                wait = f" in about {int(retry_after) + 1} seconds" if retry_after else " shortly"
+                state.final_response = f"The AI service is busy right now. Please try again{wait}."
+            elif response.status == "timeout":
+                state.final_response = ("The request ran out of time before a response was ready. "
+                                        "Please try again or simplify the request.")
             else:
                 state.final_response = f"Task {response.status}: {response.content}"
             
@@ -261,10 +324,36 @@ If the task doesn't clearly fit any agent, choose the most appropriate one or "c
             state.error = f"Synthesis error: {str(e)}"
             state.final_response = f"Error: {str(e)}"
             return state
+        
+        finally:
+            state.timings["synthesize"] = (time.perf_counter() - start) * 1000.0
+            # Expose the full pipeline breakdown alongside the specialist's own
+            for response in state.agent_responses:
+                response.metadata["timings"] = dict(state.timings)
+    
+    @traceable
+    async def process_task(self, task_content: str, priority: str = "medium", context: Dict[str, Any] = None,
+                           deadline: Optional[Deadline] = None) -> str:
+        """
+        Process a task request through the multi-agent system.
+        
+        ``deadline`` bounds the whole pipeline; it defaults to
+        TASK_DEADLINE_SECONDS from now.
+        """
+        final_response, _ = await self.process_task_with_status(task_content, priority, context, deadline)
+        return final_response
     
     @traceable
-    async def process_task(self, task_content: str, priority: str = "medium", context: Dict[str, Any] = None) -> str:
-        """Process a task request through the multi-agent system"""
+    async def process_task_with_status(self, task_content: str, priority: str = "medium",
+                                       context: Dict[str, Any] = None,
+                                       deadline: Optional[Deadline] = None) -> Tuple[str, str]:
+        """
+        Like process_task, but also returns the outcome.
+        
+        The outcome is the specialist's TaskResponse status ("completed",
+        "partial", "timeout", "unavailable", ...) or "failed" when routing,
+        execution or synthesis went wrong.
+        """
         try:
             # Create task request
             task_request = TaskRequest(
@@ -274,20 +363,37 @@ If the task doesn't clearly fit any agent, choose the most appropriate one or "c
             )
             
             # Create initial state
-            initial_state = AgentState(task_request=task_request)
+            initial_state = AgentState(
+                task_request=task_request,
+                deadline=deadline or Deadline(Config.TASK_DEADLINE_SECONDS)
+            )
             
             # Execute workflow
+            start = time.perf_counter()
             final_state = await self.workflow.ainvoke(initial_state)
+            total_ms = (time.perf_counter() - start) * 1000.0
             
             # Handle dict response from workflow
             if isinstance(final_state, dict):
-                return final_state.get("final_response", "No response generated")
+                timings = final_state.get("timings") or {}
+                final_response = final_state.get("final_response", "No response generated")
+                error = final_state.get("error")
+                responses = final_state.get("agent_responses") or []
             else:
-                return final_state.final_response or "No response generated"
+                timings = final_state.timings
+                final_response = final_state.final_response or "No response generated"
+                error = final_state.error
+                responses = final_state.agent_responses
+            
+            self.last_timings = dict(timings, total=total_ms)
+            get_monitor().record_stage_timings(self.last_timings)
+            
+            outcome = "failed" if error or not responses else responses[0].status
+            return final_response, outcome
             
         except Exception as e:
             logger.error(f"Error processing task: {e}")
-            return f"Error processing task: {str(e)}"
+            return f"Error processing task: {str(e)}", "failed"
     
     @traceable
     def get_system_status(self) -> Dict[str, Any]:
@@ -3,9 +3,14 @@ Monitoring and coordination system for 12thhaus Spiritual Platform
 Provides metrics, health checks, and system coordination
 """
 import asyncio
+import bisect
+import os
+import threading
 import time
 import logging
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import json
@@ -26,6 +31,9 @@ class AgentMetrics:
     average_response_time: float = 0.0
     last_activity: Optional[datetime] = None
     error_rate: float = 0.0
+    llm_retries: int = 0
+    llm_hedges: int = 0
+    llm_hedge_wins: int = 0
 
 @dataclass
 class SystemMetrics:
@@ -37,15 +45,166 @@ class SystemMetrics:
     uptime: float = 0.0
     agent_metrics: Dict[str, AgentMetrics] = field(default_factory=dict)
 
+# Rolling windows reported by get_system_health, in seconds
+HEALTH_WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+
+class RollingWindowCounter:
+    """
+    Ring of fixed-width time buckets counting task starts, completions and failures.
+    
+    Counts are updated incrementally as events are recorded, so reading a window
+    costs at most one pass over the ring regardless of how much history exists.
+    """
+    
+    def __init__(self, bucket_seconds: int = 10, horizon_seconds: int = 900, clock=time.monotonic):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = -(-horizon_seconds // bucket_seconds)
+        self._clock = clock
+        # Each bucket is [bucket_index, started, completed, failed]
+        self._buckets: List[List[int]] = [[-1, 0, 0, 0] for _ in range(self.num_buckets)]
+    
+    def _bucket(self, now: float) -> List[int]:
+        index = int(now // self.bucket_seconds)
+        bucket = self._buckets[index % self.num_buckets]
+        if bucket[0] != index:
+            # Slot belongs to an older lap of the ring; recycle it
+            bucket[0], bucket[1], bucket[2], bucket[3] = index, 0, 0, 0
+        return bucket
+    
+    def record_start(self):
+        """Count a task start in the current bucket"""
+        self._bucket(self._clock())[1] += 1
+    
+    def record_completion(self, success: bool):
+        """Count a task completion (and failure, if unsuccessful) in the current bucket"""
+        bucket = self._bucket(self._clock())
+        bucket[2] += 1
+        if not success:
+            bucket[3] += 1
+    
+    def totals(self, window_seconds: int) -> Dict[str, int]:
+        """Sum the buckets that fall inside the trailing window"""
+        current = int(self._clock() // self.bucket_seconds)
+        oldest = current - min(-(-window_seconds // self.bucket_seconds), self.num_buckets) + 1
+        started = completed = failed = 0
+        for index, bucket_started, bucket_completed, bucket_failed in self._buckets:
+            if oldest <= index <= current:
+                started += bucket_started
+                completed += bucket_completed
+                failed += bucket_failed
+        return {"started": started, "completed": completed, "failed": failed}
+    
+    def reset(self):
+        """Clear all buckets"""
+        for bucket in self._buckets:
+            bucket[0], bucket[1], bucket[2], bucket[3] = -1, 0, 0, 0
+
+class LatencyHistogram:
+    """
+    Fixed log-scale latency histogram (milliseconds).
+    
+    Bucket bounds grow by 20% per step from 0.05ms to ~10 minutes, so recording
+    is a binary search and percentiles are accurate to within one bucket.
+    """
+    
+    BOUNDS: List[float] = [0.05 * 1.2 ** i for i in range(91)]
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, value_ms: float):
+        """Record one observation"""
+        self.counts[bisect.bisect_left(self.BOUNDS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+    
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket containing the given percentile"""
+        if self.count == 0:
+            return 0.0
+        threshold = self.count * pct / 100.0
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= threshold and bucket_count:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        """Count, mean and tail percentiles"""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max
+        }
+
+class StageTimer:
+    """
+    Collects monotonic per-stage timings (milliseconds) for one task.
+    
+    Stages are named with dotted paths, e.g. ``route.llm`` or
+    ``execute.prompt_build``; repeated spans with the same name accumulate.
+    """
+    
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+    
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block under ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000.0)
+    
+    def record(self, name: str, elapsed_ms: float):
+        """Add an externally measured duration"""
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed_ms
+    
+    def merge(self, timings: Dict[str, float], prefix: str = ""):
+        """Fold another set of timings in, optionally under a prefix"""
+        for name, elapsed_ms in timings.items():
+            self.record(f"{prefix}.{name}" if prefix else name, elapsed_ms)
+
 class AgentMonitor:
     """Monitors agent performance and system health"""
     
-    def __init__(self):
+    def __init__(self, health_thresholds: Optional[Dict[str, float]] = None):
         self.start_time = datetime.now()
         self.metrics = SystemMetrics()
         self.task_history: List[Dict[str, Any]] = []
         self.max_history_size = 1000
         
+        # Incremented on every recorded change so cached views can detect staleness
+        self.version = 0
+        
+        # Rolling windows backing get_system_health
+        self.health_thresholds = {
+            "window_seconds": Config.HEALTH_WINDOW_SECONDS,
+            "warning_error_rate": Config.HEALTH_WARNING_ERROR_RATE,
+            "unhealthy_error_rate": Config.HEALTH_UNHEALTHY_ERROR_RATE,
+            "min_samples": Config.HEALTH_MIN_SAMPLES
+        }
+        if health_thresholds:
+            self.health_thresholds.update(health_thresholds)
+        self.system_window = RollingWindowCounter()
+        self.agent_windows: Dict[str, RollingWindowCounter] = {}
+        
+        # Per-stage latency histograms fed by StageTimer breakdowns
+        self.stage_histograms: Dict[str, LatencyHistogram] = {}
+        
+        # Successful LLM call latencies per agent type; their p95 is when a hedged request fires
+        self.llm_latency: Dict[str, LatencyHistogram] = {}
+        
         # Initialize LangSmith client if available
         self.langsmith_client = None
         if Config.LANGCHAIN_API_KEY:
@@ -81,6 +240,13 @@ class AgentMonitor:
         self.metrics.agent_metrics[agent_type].total_tasks += 1
         self.metrics.agent_metrics[agent_type].last_activity = datetime.now()
         self.metrics.total_requests += 1
+        
+        # Update rolling windows
+        if agent_type not in self.agent_windows:
+            self.agent_windows[agent_type] = RollingWindowCounter()
+        self.agent_windows[agent_type].record_start()
+        self.system_window.record_start()
+        self.version += 1
     
     @traceable
     def record_task_completion(self, task_id: str, success: bool, response_time: float, error: Optional[str] = None):
@@ -125,10 +291,79 @@ class AgentMonitor:
         # Update error rate
         if agent_metrics.total_tasks > 0:
             agent_metrics.error_rate = agent_metrics.failed_tasks / agent_metrics.total_tasks
+        
+        # Update rolling windows
+        if agent_type not in self.agent_windows:
+            self.agent_windows[agent_type] = RollingWindowCounter()
+        self.agent_windows[agent_type].record_completion(success)
+        self.system_window.record_completion(success)
+        self.version += 1
+    
+    def record_llm_attempts(self, agent_type: str, retries: int = 0, hedges: int = 0, hedge_wins: int = 0):
+        """Count LLM retries and hedged requests made on an agent's behalf"""
+        if not (retries or hedges):
+            return
+        if agent_type not in self.metrics.agent_metrics:
+            self.metrics.agent_metrics[agent_type] = AgentMetrics(agent_type=agent_type)
+        agent_metrics = self.metrics.agent_metrics[agent_type]
+        agent_metrics.llm_retries += retries
+        agent_metrics.llm_hedges += hedges
+        agent_metrics.llm_hedge_wins += hedge_wins
+        self.version += 1
+    
+    def get_llm_latency(self, agent_type: str) -> LatencyHistogram:
+        """Latency histogram (milliseconds) of an agent type's successful LLM calls"""
+        histogram = self.llm_latency.get(agent_type)
+        if histogram is None:
+            histogram = self.llm_latency.setdefault(agent_type, LatencyHistogram())
+        return histogram
+    
+    def record_stage_timings(self, timings: Dict[str, float], prefix: str = ""):
+        """Feed a per-stage timing breakdown (milliseconds) into the stage histograms"""
+        for stage, elapsed_ms in timings.items():
+            name = f"{prefix}.{stage}" if prefix else stage
+            histogram = self.stage_histograms.get(name)
+            if histogram is None:
+                histogram = self.stage_histograms[name] = LatencyHistogram()
+            histogram.record(elapsed_ms)
+    
+    def get_stage_latency(self) -> Dict[str, Dict[str, float]]:
+        """Summaries of every stage histogram"""
+        return {stage: histogram.summary() for stage, histogram in sorted(self.stage_histograms.items())}
+    
+    def _window_status(self, window: RollingWindowCounter) -> Tuple[str, Dict[str, int]]:
+        """Classify a rolling window against the configured health thresholds"""
+        totals = window.totals(int(self.health_thresholds["window_seconds"]))
+        completed = totals["completed"]
+        if completed < self.health_thresholds["min_samples"]:
+            # No recent evidence of failure
+            return "healthy", totals
+        
+        error_rate = totals["failed"] / completed
+        if error_rate < self.health_thresholds["warning_error_rate"]:
+            return "healthy", totals
+        if error_rate < self.health_thresholds["unhealthy_error_rate"]:
+            return "warning", totals
+        return "unhealthy", totals
+    
+    @staticmethod
+    def _window_summary(window: RollingWindowCounter) -> Dict[str, Dict[str, Any]]:
+        """Summarize every reporting window of a counter"""
+        summary = {}
+        for name, seconds in HEALTH_WINDOWS.items():
+            totals = window.totals(seconds)
+            totals["error_rate"] = totals["failed"] / totals["completed"] if totals["completed"] else 0.0
+            summary[name] = totals
+        return summary
     
     @traceable
     def get_system_health(self) -> Dict[str, Any]:
-        """Get current system health status"""
+        """
+        Get current system health status
+        
+        Status is derived from the trailing health window rather than all-time
+        totals, so past failures age out and the cost does not grow with history.
+        """
         current_time = datetime.now()
         uptime = (current_time - self.start_time).total_seconds()
         
@@ -142,22 +377,26 @@ class AgentMonitor:
         # Check agent health
         agent_health = {}
         for agent_type, metrics in self.metrics.agent_metrics.items():
+            window = self.agent_windows.get(agent_type)
+            status = self._window_status(window)[0] if window else "healthy"
             agent_health[agent_type] = {
-                "status": "healthy" if metrics.error_rate < 0.1 else "warning" if metrics.error_rate < 0.3 else "unhealthy",
+                "status": status,
                 "total_tasks": metrics.total_tasks,
                 "success_rate": 1 - metrics.error_rate,
                 "avg_response_time": metrics.average_response_time,
                 "last_activity": metrics.last_activity.isoformat() if metrics.last_activity else None
             }
         
+        system_status, _ = self._window_status(self.system_window)
+        
         return {
-            "system_status": "healthy" if success_rate > 0.9 else "warning" if success_rate > 0.7 else "unhealthy",
+            "system_status": system_status,
             "uptime_seconds": uptime,
             "total_requests": total_requests,
             "success_rate": success_rate,
             "agent_health": agent_health,
-            "recent_tasks": len([t for t in self.task_history if 
-                               (current_time - t["start_time"]).total_seconds() < 300])  # Last 5 minutes
+            "windows": self._window_summary(self.system_window),
+            "recent_tasks": self.system_window.totals(HEALTH_WINDOWS["5m"])["started"]  # Last 5 minutes
         }
     
     @traceable
@@ -177,10 +416,14 @@ class AgentMonitor:
                     "failed_tasks": metrics.failed_tasks,
                     "average_response_time": metrics.average_response_time,
                     "error_rate": metrics.error_rate,
+                    "llm_retries": metrics.llm_retries,
+                    "llm_hedges": metrics.llm_hedges,
+                    "llm_hedge_wins": metrics.llm_hedge_wins,
                     "last_activity": metrics.last_activity.isoformat() if metrics.last_activity else None
                 }
                 for agent_type, metrics in self.metrics.agent_metrics.items()
-            }
+            },
+            "stage_latency": self.get_stage_latency()
         }
     
     @traceable
@@ -226,18 +469,221 @@ class AgentMonitor:
         """Reset all metrics and history"""
         self.metrics = SystemMetrics()
         self.task_history = []
+        self.system_window.reset()
+        self.agent_windows = {}
+        self.stage_histograms = {}
+        self.llm_latency = {}
+        self.version += 1
         self.start_time = datetime.now()
         logger.info("Metrics reset")
 
+# Task states after which an entry only holds a result
+FINISHED_STATUSES = ("completed", "failed")
+# Task entry fields never shown to API clients or webhook receivers
+PRIVATE_TASK_FIELDS = ("owner", "callback_url")
+
+class TaskStore(dict):
+    """
+    Bounded mapping of task_id -> task entry for the CoordinationManager.
+    
+    Finished entries expire after ``ttl_seconds`` and the oldest finished
+    entries are evicted once ``max_entries`` is exceeded. Results larger than
+    ``max_result_bytes`` are written to ``spill_dir`` (or dropped when no spill
+    directory is configured) so large payloads are not pinned in memory.
+    """
+    
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 max_result_bytes: Optional[int] = None,
+                 spill_dir: Optional[str] = None,
+                 clock=time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries if max_entries is not None else Config.TASK_STORE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.TASK_RESULT_TTL_SECONDS
+        self.max_result_bytes = (max_result_bytes if max_result_bytes is not None
+                                 else Config.TASK_RESULT_MAX_BYTES)
+        self.spill_dir = spill_dir if spill_dir is not None else Config.TASK_RESULT_SPILL_DIR
+        self._clock = clock
+        self._lock = threading.RLock()
+        # Finished task ids in completion order, mapped to their finish time
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self.evicted = 0
+        self.spilled = 0
+    
+    def live_count(self) -> int:
+        """Number of queued or running tasks"""
+        return len(self) - len(self._finished)
+    
+    def add(self, task_id: str, **fields: Any) -> Dict[str, Any]:
+        """Register a new task entry"""
+        with self._lock:
+            self._finished.pop(task_id, None)
+            entry = dict(fields)
+            self[task_id] = entry
+            self.evict()
+            return entry
+    
+    def mark_running(self, task_id: str):
+        """Move a queued task to running"""
+        entry = self.get(task_id)
+        if entry is not None:
+            entry["status"] = "running"
+            entry["started_at"] = datetime.now()
+    
+    def mark_completed(self, task_id: str, result: Any):
+        """Store a task's result and wake any waiters"""
+        self._finish(task_id, "completed", result=result)
+    
+    def mark_failed(self, task_id: str, error: str):
+        """Record a task failure and wake any waiters"""
+        self._finish(task_id, "failed", error=error)
+    
+    def _finish(self, task_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            entry = self.get(task_id)
+            if entry is None:
+                return
+            entry["status"] = status
+            entry["finished_at"] = datetime.now()
+            if error is not None:
+                entry["error"] = error
+            if status == "completed":
+                self._store_result(task_id, entry, result)
+            self._finished[task_id] = self._clock()
+            self._finished.move_to_end(task_id)
+            self.evict()
+        self._notify(task_id)
+    
+    def _store_result(self, task_id: str, entry: Dict[str, Any], result: Any):
+        """Keep small results inline; spill or drop oversized ones"""
+        size = len((result if isinstance(result, str) else json.dumps(result, default=str)).encode())
+        entry["result_bytes"] = size
+        if size <= self.max_result_bytes:
+            entry["result"] = result
+            return
+        
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{task_id}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, default=str)
+            entry["result_path"] = path
+            self.spilled += 1
+        else:
+            logger.warning(f"Result for task {task_id} exceeds {self.max_result_bytes} bytes and was dropped")
+            entry["result_dropped"] = True
+    
+    def evict(self) -> int:
+        """Drop expired finished entries, then the oldest finished ones while over capacity"""
+        removed = 0
+        with self._lock:
+            now = self._clock()
+            while self._finished:
+                task_id, finished_at = next(iter(self._finished.items()))
+                if now - finished_at < self.ttl_seconds and len(self) <= self.max_entries:
+                    break
+                self._finished.popitem(last=False)
+                self._discard(task_id)
+                removed += 1
+            if len(self) > self.max_entries:
+                logger.warning(f"Task store holds {len(self)} live tasks (limit {self.max_entries})")
+        self.evicted += removed
+        return removed
+    
+    def remove(self, task_id: str):
+        """Forget a task entry without recording a result"""
+        with self._lock:
+            self._finished.pop(task_id, None)
+            self._discard(task_id)
+    
+    def _discard(self, task_id: str):
+        entry = self.pop(task_id, None)
+        if entry and entry.get("result_path"):
+            try:
+                os.remove(entry["result_path"])
+            except OSError:
+                pass
+    
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a task's status and, once finished, its result.
+        
+        Returns None for unknown or evicted tasks, including a spilled result
+        whose file disappears before it is read.
+        """
+        with self._lock:
+            if task_id in self._finished:
+                self.evict()
+            entry = self.get(task_id)
+            if entry is None:
+                return None
+            snapshot = {"task_id": task_id, **{k: v for k, v in entry.items() if k != "result_path"}}
+            path = entry.get("result_path")
+        
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot["result"] = json.load(f)
+            except OSError:
+                # Evicted by another thread after the lock was released
+                return None
+        return snapshot
+    
+    async def wait_for(self, task_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait until a task finishes and return get_result().
+        
+        Raises KeyError for unknown tasks and asyncio.TimeoutError on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self.get(task_id)
+            if entry is None:
+                raise KeyError(task_id)
+            if entry.get("status") in FINISHED_STATUSES:
+                return self.get_result(task_id)
+            future = loop.create_future()
+            self._waiters.setdefault(task_id, []).append((loop, future))
+        
+        try:
+            await asyncio.wait_for(future, timeout)
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(task_id, [])
+                if (loop, future) in waiters:
+                    waiters.remove((loop, future))
+                if not waiters:
+                    self._waiters.pop(task_id, None)
+        return self.get_result(task_id)
+    
+    def _notify(self, task_id: str):
+        with self._lock:
+            waiters = self._waiters.pop(task_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve_future, future)
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
 class CoordinationManager:
     """Manages coordination between agents and system resources"""
     
-    def __init__(self):
-        self.active_tasks: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, task_store: Optional[TaskStore] = None, durable_queue=None):
+        self.active_tasks: TaskStore = task_store if task_store is not None else TaskStore()
         self.resource_locks: Dict[str, asyncio.Lock] = {}
         self.max_concurrent_tasks = 10
         self.task_queue: asyncio.Queue = asyncio.Queue()
         self.worker_tasks: List[asyncio.Task] = []
+        # Optional SQLiteTaskQueue; its tasks survive restarts and can be shared across processes
+        self.durable_queue = durable_queue
+        self.durable_workers = 3
+        self.task_handlers: Dict[str, Any] = {}
+        # Event loop thread used when tasks are submitted from synchronous HTTP handlers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
     
     @traceable
     async def start_coordination(self):
@@ -246,9 +692,115 @@ class CoordinationManager:
         for i in range(3):  # 3 worker tasks
             worker = asyncio.create_task(self._worker())
             self.worker_tasks.append(worker)
-        
+    
+        if self.durable_queue is not None:
+            for i in range(self.durable_workers):
+                worker = asyncio.create_task(self._durable_worker(f"{os.getpid()}-{i}"))
+                self.worker_tasks.append(worker)
+    
         logger.info("Coordination manager started")
     
+    def start_background(self) -> asyncio.AbstractEventLoop:
+        """Start the workers on a daemon thread with its own event loop, once"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(target=self._run_background, args=(loop, ready),
+                                          name="coordination", daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+    
+    def _run_background(self, loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self.start_coordination())
+        ready.set()
+        loop.run_forever()
+    
+    def submit(self, coro, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop from another thread and return its result"""
+        loop = self.start_background()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+    
+    def register_handler(self, task_type: str, handler):
+        """Register the coroutine function that executes a durable task type"""
+        self.task_handlers[task_type] = handler
+    
+    async def _durable_worker(self, worker_id: str):
+        """Worker task for leasing tasks from the durable queue"""
+        while True:
+            try:
+                task = await asyncio.to_thread(self.durable_queue.dequeue, worker_id)
+                if task is None:
+                    await asyncio.sleep(Config.TASK_QUEUE_POLL_INTERVAL)
+                    continue
+    
+                await self._process_durable_task(task)
+    
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Durable worker error: {e}")
+                await asyncio.sleep(Config.TASK_QUEUE_POLL_INTERVAL)
+    
+    async def _process_durable_task(self, task):
+        """
+        Run a leased task and acknowledge or release it.
+        
+        The local entry only lives for this attempt (so a finished task can
+        send its webhook); the durable queue stays the source of truth for
+        status and results.
+        """
+        fields = {"callback_url": task.payload["callback_url"]} if task.payload.get("callback_url") else {}
+        self.active_tasks.add(task.id, status="queued", priority=task.priority,
+                              owner=task.owner, start_time=datetime.now(), **fields)
+    
+        handler = self.task_handlers.get(task.task_type)
+        if handler is None:
+            error = f"No handler registered for task type '{task.task_type}'"
+            await asyncio.to_thread(self.durable_queue.nack, task.id, task.receipt, error, False)
+            self.active_tasks.mark_failed(task.id, error)
+            self._send_callback(task.id)
+            return
+    
+        try:
+            self.active_tasks.mark_running(task.id)
+            result = await handler(task.payload)
+        except Exception as e:
+            logger.error(f"Durable task {task.id} attempt {task.attempts} failed: {e}")
+            status = await asyncio.to_thread(self.durable_queue.nack, task.id, task.receipt, str(e))
+            if status == "dead":
+                self.active_tasks.mark_failed(task.id, str(e))
+                self._send_callback(task.id)
+            else:
+                # Any worker process may pick up the retry
+                self.active_tasks.remove(task.id)
+            return
+    
+        if await asyncio.to_thread(self.durable_queue.ack, task.id, task.receipt, result):
+            self.active_tasks.mark_completed(task.id, result)
+            self._send_callback(task.id)
+        else:
+            logger.warning(f"Lease on durable task {task.id} expired before completion")
+            self.active_tasks.remove(task.id)
+    
+    async def enqueue_durable(self, task_type: str, payload: Dict[str, Any], priority: str = "medium",
+                              task_id: Optional[str] = None, owner: Optional[str] = None,
+                              callback_url: Optional[str] = None) -> str:
+        """Persist a serializable task description to the durable queue"""
+        if self.durable_queue is None:
+            raise RuntimeError("Durable task queue is not configured")
+    
+        if callback_url:
+            # Kept in the payload so whichever worker process finishes the task can deliver it
+            payload = dict(payload, callback_url=callback_url)
+        # No local entry: another process may run the task, so get_result reads the queue
+        return await asyncio.to_thread(
+            self.durable_queue.enqueue, task_type, payload, task_id, priority, 0.0, owner
+        )
+    
     async def _worker(self):
         """Worker task for processing queued tasks"""
         while True:
@@ -272,33 +824,53 @@ class CoordinationManager:
         task_id = task_info["task_id"]
         
         try:
+            self.active_tasks.mark_running(task_id)
+            
             # Execute the task
             result = await task_info["coro"]
             
             # Update task status
-            if task_id in self.active_tasks:
-                self.active_tasks[task_id]["status"] = "completed"
-                self.active_tasks[task_id]["result"] = result
+            self.active_tasks.mark_completed(task_id, result)
         
         except Exception as e:
             logger.error(f"Task {task_id} failed: {e}")
-            if task_id in self.active_tasks:
-                self.active_tasks[task_id]["status"] = "failed"
-                self.active_tasks[task_id]["error"] = str(e)
+            self.active_tasks.mark_failed(task_id, str(e))
+        
+        self._send_callback(task_id)
+    
+    def _send_callback(self, task_id: str):
+        """POST a finished task's result to its callback URL, if it has one"""
+        entry = self.active_tasks.get(task_id)
+        if not entry or not entry.get("callback_url"):
+            return
+        result = self.active_tasks.get_result(task_id)
+        if result is None:
+            return
+        payload = {key: value for key, value in result.items() if key not in PRIVATE_TASK_FIELDS}
+        try:
+            from webhooks import get_webhook_dispatcher
+            get_webhook_dispatcher().dispatch(entry["callback_url"], payload)
+        except Exception as e:
+            logger.error(f"Could not queue webhook for task {task_id}: {e}")
     
     @traceable
-    async def coordinate_task(self, task_id: str, task_coro, priority: str = "medium"):
-        """Coordinate a task execution"""
+    async def coordinate_task(self, task_id: str, task_coro, priority: str = "medium", owner: Optional[str] = None,
+                              callback_url: Optional[str] = None):
+        """Coordinate a task execution; ``callback_url`` receives the result once it finishes"""
         # Check if we're at capacity
-        if len(self.active_tasks) >= self.max_concurrent_tasks:
+        if self.active_tasks.live_count() >= self.max_concurrent_tasks:
             logger.warning(f"System at capacity, queuing task {task_id}")
         
         # Add to active tasks
-        self.active_tasks[task_id] = {
-            "status": "queued",
-            "priority": priority,
-            "start_time": datetime.now()
-        }
+        fields = {"callback_url": callback_url} if callback_url else {}
+        self.active_tasks.add(
+            task_id,
+            status="queued",
+            priority=priority,
+            owner=owner,
+            start_time=datetime.now(),
+            **fields
+        )
         
         # Queue the task
         await self.task_queue.put({
@@ -307,15 +879,46 @@ class CoordinationManager:
             "priority": priority
         })
     
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a coordinated task's status and result, or None if unknown or evicted"""
+        if self.durable_queue is not None:
+            # Durable tasks may be run by any worker process, so the queue holds their current state
+            result = self.durable_queue.get(task_id)
+            if result is not None:
+                return result
+        return self.active_tasks.get_result(task_id)
+    
+    async def wait_for(self, task_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a coordinated task to finish and return its result.
+        
+        Raises KeyError for unknown tasks and asyncio.TimeoutError on timeout.
+        """
+        if self.durable_queue is not None:
+            result = await asyncio.to_thread(self.durable_queue.get, task_id)
+            if result is not None:
+                return await asyncio.wait_for(self._poll_durable(task_id, result), timeout)
+        return await self.active_tasks.wait_for(task_id, timeout)
+    
+    async def _poll_durable(self, task_id: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Re-read a durable task until it finishes; None if it is purged meanwhile"""
+        while result is not None and result["status"] not in FINISHED_STATUSES:
+            await asyncio.sleep(Config.TASK_QUEUE_POLL_INTERVAL)
+            result = await asyncio.to_thread(self.durable_queue.get, task_id)
+        return result
+    
     @traceable
     def get_coordination_status(self) -> Dict[str, Any]:
         """Get current coordination status"""
         return {
             "active_tasks": len(self.active_tasks),
+            "live_tasks": self.active_tasks.live_count(),
+            "evicted_tasks": self.active_tasks.evicted,
             "queued_tasks": self.task_queue.qsize(),
             "max_concurrent_tasks": self.max_concurrent_tasks,
             "worker_tasks": len(self.worker_tasks),
-            "resource_locks": len(self.resource_locks)
+            "resource_locks": len(self.resource_locks),
+            "durable_queue": self.durable_queue.stats() if self.durable_queue is not None else None
         }
     
     async def shutdown(self):
@@ -332,6 +935,11 @@ class CoordinationManager:
 # Global instances
 monitor = AgentMonitor()
 coordinator = CoordinationManager()
+if Config.TASK_QUEUE_BACKEND == "sqlite":
+    from task_queue import DEFAULT_HANDLERS, SQLiteTaskQueue
+    coordinator.durable_queue = SQLiteTaskQueue()
+    for _task_type, _handler in DEFAULT_HANDLERS.items():
+        coordinator.register_handler(_task_type, _handler)
 
 def get_monitor() -> AgentMonitor:
     """Get the global monitor instance"""
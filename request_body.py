@@ -0,0 +1,166 @@
+"""
+Bounded request body reading for the 12thhaus Spiritual Platform
+Reads Content-Length or chunked request bodies from a handler's rfile with a
+byte limit enforced before and while reading, parses JSON straight from the
+bytes, and parses JSONL one line at a time so batch memory stays flat
+"""
+import json
+from typing import Any, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Largest single read from the socket for chunked bodies
+READ_SIZE = 64 * 1024
+
+
+class BodyError(ValueError):
+    """Request body that cannot be read; ``status`` is the HTTP status to answer with"""
+    status = 400
+
+
+class BodyTooLarge(BodyError):
+    """Request body over its size limit"""
+    status = 413
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON from bytes without decoding to str first"""
+    try:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    except ValueError as e:
+        raise BodyError("Invalid JSON") from e
+
+
+class BodyReader:
+    """
+    File-like view of one request body.
+
+    ``max_bytes`` is checked against Content-Length before anything is read,
+    and against the running total for chunked bodies, so oversized requests
+    are refused without buffering them.
+    """
+
+    def __init__(self, rfile, headers, max_bytes: int):
+        self.rfile = rfile
+        self.max_bytes = max_bytes
+        self.consumed = 0
+        self._chunk_left = 0
+        self._done = False
+
+        transfer_encoding = (headers.get('Transfer-Encoding') or '').lower()
+        self.chunked = 'chunked' in transfer_encoding
+        self.remaining: Optional[int] = None
+        if not self.chunked:
+            length = headers.get('Content-Length')
+            try:
+                self.remaining = int(length) if length is not None else 0
+            except ValueError:
+                raise BodyError("Invalid Content-Length")
+            if self.remaining < 0:
+                raise BodyError("Invalid Content-Length")
+            if self.remaining > max_bytes:
+                raise BodyTooLarge(f"Request body exceeds {max_bytes} bytes")
+
+    def _count(self, data: bytes) -> bytes:
+        self.consumed += len(data)
+        if self.consumed > self.max_bytes:
+            raise BodyTooLarge(f"Request body exceeds {self.max_bytes} bytes")
+        return data
+
+    def _next_chunk(self) -> bool:
+        """Start the next chunk; False after the terminating zero-size chunk"""
+        line = self.rfile.readline(1024)
+        try:
+            size = int(line.split(b';', 1)[0].strip(), 16)
+        except ValueError:
+            raise BodyError("Invalid chunked encoding")
+        if size == 0:
+            # Skip trailer fields up to the blank line
+            while self.rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                pass
+            self._done = True
+            return False
+        self._chunk_left = size
+        return True
+
+    def _read_chunked(self, size: int, line: bool) -> bytes:
+        parts = []
+        while not self._done and size != 0:
+            if self._chunk_left == 0 and not self._next_chunk():
+                break
+            # Never ask for more than one byte past the limit, whatever the chunk header declared
+            want = min(self._chunk_left, READ_SIZE, self.max_bytes - self.consumed + 1)
+            if size > 0:
+                want = min(want, size)
+            data = self.rfile.readline(want) if line else self.rfile.read(want)
+            if not data:
+                raise BodyError("Truncated chunked body")
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                self.rfile.readline(2)  # CRLF after chunk data
+            parts.append(self._count(data))
+            if size > 0:
+                size -= len(data)
+            if line and data.endswith(b'\n'):
+                break
+        return b''.join(parts)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.chunked:
+            return self._read_chunked(size, line=False)
+        if not self.remaining:
+            return b''
+        want = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.rfile.read(want)
+        self.remaining -= len(data)
+        if len(data) < want:
+            self.remaining = 0
+        return self._count(data)
+
+    def readline(self, limit: int = -1) -> bytes:
+        if self.chunked:
+            return self._read_chunked(limit, line=True)
+        if not self.remaining:
+            return b''
+        want = self.remaining if limit < 0 else min(limit, self.remaining)
+        data = self.rfile.readline(want)
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return self._count(data)
+
+
+def read_json(handler, max_bytes: int) -> Any:
+    """Read and parse a JSON request body of at most ``max_bytes``"""
+    return loads(BodyReader(handler.rfile, handler.headers, max_bytes).read())
+
+
+def iter_jsonl(handler, max_bytes: int, max_line_bytes: int) -> Iterator[Any]:
+    """
+    Parsed values of a JSONL request body, one per non-blank line.
+
+    The size checks on the headers run immediately so an oversized batch is
+    refused before a response is started; lines are then read and parsed
+    lazily, only the current line is held in memory, and a line longer than
+    ``max_line_bytes`` raises BodyTooLarge.
+    """
+    return _iter_lines(BodyReader(handler.rfile, handler.headers, max_bytes), max_line_bytes)
+
+
+def _iter_lines(reader: BodyReader, max_line_bytes: int) -> Iterator[Any]:
+    line_number = 0
+    while True:
+        line = reader.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > max_line_bytes:
+            raise BodyTooLarge(f"Line {line_number} exceeds {max_line_bytes} bytes")
+        if line.strip():
+            try:
+                yield loads(line)
+            except BodyError:
+                raise BodyError(f"Invalid JSON on line {line_number}")
@@ -0,0 +1,363 @@
+"""
+LLM call protection for the 12thhaus Spiritual Platform
+A circuit breaker and an AIMD concurrency limiter per model, so a slow or
+rate-limiting provider makes calls fail fast instead of piling up, and
+capacity returns gradually once latency and error rates recover
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from config import Config
+from deadline import DeadlineExceeded
+
+try:
+    from anthropic import APIConnectionError
+except ImportError:
+    APIConnectionError = ConnectionError
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Provider answers that mean "slow down" rather than "broken request"
+OVERLOAD_STATUS_CODES = (429, 503, 529)
+# Gentler decrease for latency creeping above the baseline than for explicit rate limiting
+LATENCY_BACKOFF = 0.9
+
+
+class LLMUnavailable(Exception):
+    """An LLM call refused without being attempted; ``retry_after`` is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(LLMUnavailable):
+    """The model's circuit is open after repeated failures"""
+
+
+class ConcurrencyLimited(LLMUnavailable):
+    """No concurrency slot became free in time"""
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    Whether an error signals provider overload (rate limits, overloaded, timeouts).
+
+    A request's own deadline running out is the caller's budget, not the
+    provider's, so DeadlineExceeded is never overload.
+    """
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in OVERLOAD_STATUS_CODES
+
+
+def output_tokens(result: Any) -> int:
+    """
+    Output size of an LLM call's result, for per-token latency.
+
+    Uses the provider's usage metadata when present and otherwise counts
+    whitespace-separated words of the text; at least 1.
+    """
+    usage = getattr(result, "usage_metadata", None)
+    if isinstance(usage, dict) and isinstance(usage.get("output_tokens"), int) and usage["output_tokens"] > 0:
+        return usage["output_tokens"]
+    text = result if isinstance(result, str) else getattr(result, "content", None)
+    return max(1, len(text.split())) if isinstance(text, str) else 1
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    Whether an error counts against the provider's health.
+
+    Overload, 5xx answers and connection failures do; errors in the request
+    itself or in our own code do not trip the breaker, and neither does the
+    caller's deadline running out.
+    """
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if is_overload(error) or isinstance(error, (APIConnectionError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker.
+
+    ``failure_threshold`` consecutive failures open the circuit; after
+    ``recovery_seconds`` it lets ``half_open_calls`` probe calls through and
+    closes again on the first success, or re-opens on a failure.
+    """
+
+    def __init__(self,
+                 failure_threshold: Optional[int] = None,
+                 recovery_seconds: Optional[float] = None,
+                 half_open_calls: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = (failure_threshold if failure_threshold is not None
+                                  else Config.LLM_BREAKER_FAILURE_THRESHOLD)
+        self.recovery_seconds = (recovery_seconds if recovery_seconds is not None
+                                 else Config.LLM_BREAKER_RECOVERY_SECONDS)
+        self.half_open_calls = half_open_calls if half_open_calls is not None else Config.LLM_BREAKER_HALF_OPEN_CALLS
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.version = 0
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str):
+        self._state = state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = self._clock()
+        if state == CLOSED:
+            self._failures = 0
+        self.version += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self.rejected += 1
+            retry_after = max(0.0, self.recovery_seconds - (self._clock() - self._opened_at))
+        raise CircuitOpen("LLM circuit is open", retry_after=retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def record_ignored(self):
+        """A permitted call ended without a verdict (cancelled or never started)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_after_seconds": (round(max(0.0, self.recovery_seconds - (self._clock() - self._opened_at)), 3)
+                                        if state == OPEN else 0.0),
+                "rejected": self.rejected,
+            }
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit.
+
+    Each success adds ``1 / limit`` (about +1 per round of calls); rate
+    limits and timeouts multiply the limit by ``backoff``. Latency is judged
+    per call site (routing and each specialist produce very different
+    answers): once a site has ``latency_window`` recent samples, their
+    median is compared with the lowest median that site has shown, and a
+    median above ``latency_tolerance`` times that baseline multiplies the
+    limit by LATENCY_BACKOFF and starts a fresh window.
+    """
+
+    def __init__(self,
+                 initial: Optional[int] = None,
+                 min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None,
+                 backoff: Optional[float] = None,
+                 latency_tolerance: Optional[float] = None,
+                 latency_window: Optional[int] = None):
+        self.min_limit = min_limit if min_limit is not None else Config.LLM_LIMIT_MIN
+        self.max_limit = max_limit if max_limit is not None else Config.LLM_LIMIT_MAX
+        self.backoff = backoff if backoff is not None else Config.LLM_LIMIT_BACKOFF
+        self.latency_tolerance = (latency_tolerance if latency_tolerance is not None
+                                  else Config.LLM_LATENCY_TOLERANCE)
+        self.latency_window = max(1, latency_window if latency_window is not None else Config.LLM_LATENCY_WINDOW)
+        initial = initial if initial is not None else Config.LLM_LIMIT_INITIAL
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.latency_baselines: Dict[str, float] = {}
+        self.rejected = 0
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    async def acquire(self, max_wait: float) -> bool:
+        """Take a slot, waiting up to ``max_wait`` seconds; False when none freed up"""
+        deadline = time.monotonic() + max_wait
+        delay = 0.005
+        while not self.try_acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self.rejected += 1
+                return False
+            # Slots are freed from other threads' event loops too, so poll rather than wait on a loop primitive
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return True
+
+    def _latency_high(self, latency: float, site: str) -> bool:
+        """Record a sample for ``site``; True when its windowed median is above tolerance"""
+        window = self._latencies.get(site)
+        if window is None:
+            window = self._latencies[site] = deque(maxlen=self.latency_window)
+        window.append(latency)
+        if len(window) < self.latency_window:
+            return False
+        median = sorted(window)[len(window) // 2]
+        baseline = self.latency_baselines.get(site)
+        if baseline is None or median < baseline:
+            self.latency_baselines[site] = baseline = median
+        if median > baseline * self.latency_tolerance:
+            window.clear()
+            return True
+        return False
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, site: str = "default"):
+        """Free a slot and adapt the limit to the call's outcome"""
+        with self._lock:
+            self.in_flight -= 1
+            before = int(self.limit)
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            elif latency is not None:
+                if self._latency_high(latency, site):
+                    self.limit = max(self.min_limit, self.limit * LATENCY_BACKOFF)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if int(self.limit) != before:
+                self.version += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency_baselines_ms": {site: round(baseline * 1000.0, 3)
+                                         for site, baseline in self.latency_baselines.items()},
+                "rejected": self.rejected,
+            }
+
+
+class LLMGuard:
+    """Circuit breaker plus concurrency limiter for one model"""
+
+    def __init__(self, name: str, breaker: Optional[CircuitBreaker] = None,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or AdaptiveLimiter()
+
+    async def call(self, fn: Callable[[], Awaitable[T]], max_wait: Optional[float] = None,
+                   site: str = "default") -> T:
+        """
+        Run ``fn()`` under the breaker and limiter.
+
+        Raises CircuitOpen or ConcurrencyLimited without calling ``fn`` when
+        the model should not be called now; errors from ``fn`` are re-raised
+        after being recorded. Successful calls feed the limiter their latency
+        per output token under ``site`` (e.g. "route" or an agent type).
+        """
+        self.breaker.before_call()
+        max_wait = Config.LLM_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        if not await self.limiter.acquire(max_wait):
+            self.breaker.record_ignored()
+            raise ConcurrencyLimited("LLM concurrency limit reached", retry_after=1.0)
+
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except (asyncio.CancelledError, DeadlineExceeded):
+            self.limiter.release()
+            self.breaker.record_ignored()
+            raise
+        except Exception as e:
+            self.limiter.release(overloaded=is_overload(e))
+            if is_provider_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_ignored()
+            raise
+        self.limiter.release(latency=(time.monotonic() - start) / output_tokens(result), site=site)
+        self.breaker.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"circuit": self.breaker.snapshot(), "concurrency": self.limiter.snapshot()}
+
+
+_guards: Dict[str, LLMGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def model_name(llm: Any) -> str:
+    """Key for an LLM client's guard"""
+    name = getattr(llm, "model", None)
+    return name if isinstance(name, str) else "default"
+
+
+def get_llm_guard(model: str) -> LLMGuard:
+    """Process-wide guard for ``model``"""
+    with _guards_lock:
+        guard = _guards.get(model)
+        if guard is None:
+            guard = _guards[model] = LLMGuard(model)
+        return guard
+
+
+def llm_guard_snapshot() -> Dict[str, Any]:
+    """Breaker state and concurrency limit of every model called so far"""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {guard.name: guard.snapshot() for guard in guards}
+
+
+def llm_guard_version() -> int:
+    """Changes whenever a breaker changes state or a limit changes"""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return sum(guard.breaker.version + guard.limiter.version for guard in guards) + len(guards)
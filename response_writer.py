@@ -0,0 +1,164 @@
+"""
+Shared JSON response writer for the 12thhaus Spiritual Platform
+Serializes compactly (with orjson when installed), writes precomputed CORS
+header blocks, compresses large bodies with brotli or gzip when the client
+accepts it and always sends Content-Length so connections can be kept alive
+"""
+import gzip
+import json
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CORS_ALLOW_HEADERS = 'Content-Type, Authorization, X-Organization-Id'
+
+
+# Datetimes go through default=str so output is identical with and without orjson
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson is not None else 0
+
+
+def dumps(data: Any) -> bytes:
+    """Compact JSON bytes; values JSON cannot represent are converted with str()"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str, option=_ORJSON_OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            # e.g. integers wider than 64 bits; the stdlib encoder handles those
+            pass
+    return json.dumps(data, separators=(',', ':'), default=str).encode()
+
+
+class HeaderBlock:
+    """Fixed response headers encoded once and appended to the header buffer in one step"""
+
+    def __init__(self, headers: Iterable[Tuple[str, str]]):
+        self.headers = tuple(headers)
+        self.encoded = b''.join(f"{name}: {value}\r\n".encode('latin-1') for name, value in self.headers)
+
+    def extend(self, *headers: Tuple[str, str]) -> 'HeaderBlock':
+        """New block with extra headers appended"""
+        return HeaderBlock(self.headers + headers)
+
+    def write(self, handler) -> None:
+        buffer = getattr(handler, '_headers_buffer', None) if isinstance(handler, BaseHTTPRequestHandler) else None
+        if buffer is not None:
+            buffer.append(self.encoded)
+            return
+        # Handlers that are not real BaseHTTPRequestHandlers (tests, adapters) get plain send_header calls
+        for name, value in self.headers:
+            handler.send_header(name, value)
+
+
+def json_headers(methods: str = 'GET, POST, OPTIONS', allow_headers: str = CORS_ALLOW_HEADERS,
+                 content_type: str = 'application/json') -> HeaderBlock:
+    """Content-Type and CORS headers of a JSON endpoint"""
+    return HeaderBlock((
+        ('Content-Type', content_type),
+        ('Access-Control-Allow-Origin', '*'),
+        ('Access-Control-Allow-Methods', methods),
+        ('Access-Control-Allow-Headers', allow_headers),
+    ))
+
+
+# Header blocks shared by the api/*.py handlers
+JSON_HEADERS = json_headers()
+JSON_GET_HEADERS = json_headers('GET, OPTIONS')
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported Content-Encoding for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best = None
+    for coding in candidates:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def write_json(handler,
+               status: int,
+               data: Any = None,
+               headers: HeaderBlock = JSON_HEADERS,
+               extra_headers: Optional[Dict[str, str]] = None,
+               body: Optional[bytes] = None) -> int:
+    """
+    Send a complete JSON response.
+
+    Args:
+        handler: BaseHTTPRequestHandler serving the request
+        status: HTTP status code
+        data: Value to serialize (ignored when ``body`` is given)
+        headers: Precomputed Content-Type/CORS header block
+        extra_headers: Per-response headers such as ETag or Cache-Control
+        body: Already serialized JSON bytes
+
+    Returns:
+        Number of body bytes written
+    """
+    if body is None:
+        body = dumps(data)
+
+    encoding = None
+    # Small bodies go out uncompressed; compression would not pay for itself
+    compressible = len(body) >= Config.RESPONSE_COMPRESS_MIN_BYTES
+    if compressible:
+        request_headers = getattr(handler, 'headers', None)
+        encoding = negotiate_encoding(request_headers.get('Accept-Encoding') if request_headers else None)
+        if encoding:
+            body = compress(body, encoding)
+
+    handler.send_response(status)
+    headers.write(handler)
+    if compressible:
+        handler.send_header('Vary', 'Accept-Encoding')
+    if encoding:
+        handler.send_header('Content-Encoding', encoding)
+    handler.send_header('Content-Length', str(len(body)))
+    for name, value in (extra_headers or {}).items():
+        if encoding and name == 'ETag' and not value.startswith('W/'):
+            # The ETag identifies the uncompressed body; only weakly valid for encoded bytes
+            value = f"W/{value}"
+        handler.send_header(name, value)
+    handler.end_headers()
+    handler.wfile.write(body)
+    return len(body)
+
+
+def write_error(handler, status: int, message: str, headers: HeaderBlock = JSON_HEADERS,
+                extra_headers: Optional[Dict[str, str]] = None) -> int:
+    """Send the {"status": "error", "message": ...} body used by the api handlers"""
+    return write_json(handler, status, {"status": "error", "message": message}, headers, extra_headers)
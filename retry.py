@@ -0,0 +1,200 @@
+"""
+LLM call retries for the 12thhaus Spiritual Platform
+Exponential backoff with jitter for transient provider errors, a process-wide
+retry budget so retries cannot multiply load during an outage, and optional
+hedged requests that race a second attempt against a slow first one
+"""
+import asyncio
+import random
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from config import Config
+from deadline import Deadline, DeadlineExceeded
+from resilience import APIConnectionError, LLMUnavailable
+
+T = TypeVar("T")
+
+# Backoff multiplier per retryable error class; rate limits back off hardest
+RETRY_DELAY_FACTORS = {
+    "rate_limited": 4.0,
+    "overloaded": 2.0,
+    "server_error": 1.0,
+    "connection": 1.0,
+}
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """Retryable error class of ``error``, or None when retrying cannot help"""
+    if isinstance(error, (LLMUnavailable, DeadlineExceeded)):
+        # Refused by our own breaker or out of time: another attempt would fail the same way
+        return None
+    if isinstance(error, (APIConnectionError, ConnectionError)):
+        return "connection"
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status in (503, 529):
+        return "overloaded"
+    if isinstance(status, int) and status >= 500:
+        return "server_error"
+    return None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The provider's Retry-After hint, if the error carries one"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all calls.
+
+    Every call deposits ``ratio`` tokens and every retry spends one, so once
+    the initial ``burst`` is used up retries stay below ``ratio`` of calls.
+    """
+
+    def __init__(self, ratio: Optional[float] = None, burst: Optional[int] = None):
+        self.ratio = ratio if ratio is not None else Config.LLM_RETRY_BUDGET_RATIO
+        self.burst = burst if burst is not None else Config.LLM_RETRY_BUDGET_BURST
+        self._tokens = float(self.burst)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(float(self.burst), self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            return self._tokens
+
+
+@dataclass
+class AttemptStats:
+    """What it took to get one answer"""
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"retries": self.retries, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+
+class RetryPolicy:
+    """
+    Retries transient LLM errors with exponential backoff and full jitter.
+
+    At most ``max_attempts`` attempts per call, never sleeping past the
+    deadline and only while the shared RetryBudget has tokens.
+    """
+
+    def __init__(self,
+                 max_attempts: Optional[int] = None,
+                 base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None,
+                 budget: Optional[RetryBudget] = None):
+        self.max_attempts = max_attempts if max_attempts is not None else Config.LLM_RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else Config.LLM_RETRY_BASE_DELAY_SECONDS
+        self.max_delay = max_delay if max_delay is not None else Config.LLM_RETRY_MAX_DELAY_SECONDS
+        self.budget = budget or get_retry_budget()
+
+    def backoff_delay(self, error: BaseException, retry: int) -> Optional[float]:
+        """Seconds to wait before retry number ``retry`` (0-based), or None to give up"""
+        kind = classify_error(error)
+        if kind is None:
+            return None
+        ceiling = min(self.max_delay, self.base_delay * RETRY_DELAY_FACTORS[kind] * (2 ** retry))
+        delay = random.uniform(0, ceiling)
+        hint = retry_after_seconds(error)
+        return max(delay, hint) if hint is not None else delay
+
+    async def run(self, attempt: Callable[[], Awaitable[T]], deadline: Deadline,
+                  stats: Optional[AttemptStats] = None, hedge_after: Optional[float] = None) -> T:
+        """
+        Await ``attempt()`` until it succeeds or the error is final.
+
+        With ``hedge_after`` (seconds) every attempt is hedged: a second call
+        starts if the first has not finished by then and the first answer wins.
+        Hedges spend retry budget like retries do.
+        """
+        stats = stats if stats is not None else AttemptStats()
+        self.budget.deposit()
+        retry = 0
+        while True:
+            try:
+                if hedge_after is None:
+                    return await attempt()
+                return await hedged(attempt, hedge_after, stats, self.budget)
+            except Exception as e:
+                delay = self.backoff_delay(e, retry)
+                if (delay is None or retry + 1 >= self.max_attempts
+                        or delay >= deadline.remaining() or not self.budget.withdraw()):
+                    raise
+            retry += 1
+            stats.retries += 1
+            await asyncio.sleep(delay)
+
+
+async def hedged(attempt: Callable[[], Awaitable[T]], hedge_after: float, stats: AttemptStats,
+                 budget: Optional[RetryBudget] = None) -> T:
+    """
+    Start ``attempt()``, and a second one if the first is still running after
+    ``hedge_after`` seconds; return the first success and cancel the other.
+
+    With ``budget`` the second call needs a token from it, so a provider
+    slowdown that pushes every call past the hedge point cannot double the
+    load. Raises the last error when both attempts fail.
+    """
+    first = asyncio.ensure_future(attempt())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done and (budget is None or budget.withdraw()):
+            stats.hedges += 1
+            tasks.append(asyncio.ensure_future(attempt()))
+        
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        stats.hedge_wins += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+_retry_budget: Optional[RetryBudget] = None
+_retry_budget_lock = threading.Lock()
+
+
+def get_retry_budget() -> RetryBudget:
+    """Process-wide retry budget"""
+    global _retry_budget
+    with _retry_budget_lock:
+        if _retry_budget is None:
+            _retry_budget = RetryBudget()
+        return _retry_budget
@@ -4,16 +4,21 @@ Each agent handles specific domain tasks with SOP context
 """
 import asyncio
 import logging
+import time
 from typing import Dict, List, Any, Optional
 from abc import ABC, abstractmethod
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_anthropic import ChatAnthropic
 from langsmith import traceable
 from pydantic import BaseModel, Field
 
 from config import Config
+from deadline import Deadline, DeadlineExceeded
+from llm_backends import create_llm
+from resilience import LLMUnavailable, get_llm_guard, model_name
+from retry import AttemptStats, RetryPolicy
 from sop_reader import sop_reader
 from master_agent import TaskRequest, TaskResponse
+from monitoring import StageTimer, get_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -22,35 +27,57 @@ class BaseSpecialistAgent(ABC):
     
     def __init__(self, agent_type: str):
         self.agent_type = agent_type
-        self.llm = ChatAnthropic(
-            model="claude-3-5-sonnet-20241022",
-            temperature=Config.AGENT_TEMPERATURE,
-            max_tokens=Config.AGENT_MAX_TOKENS,
-            api_key=Config.ANTHROPIC_API_KEY
-        )
+        
+        # Construction-time spans, reported with the first task's timings
+        self.init_timer = StageTimer()
+        with self.init_timer.span("llm_client"):
+            self.llm = create_llm()
+        self.retry_policy = RetryPolicy()
         self.sop_reader = sop_reader
-        self.sop = self.sop_reader.get_agent_specific_sop(agent_type)
+        with self.init_timer.span("sop_lookup"):
+            self.sop = self.sop_reader.get_agent_specific_sop(agent_type)
         
         logger.info(f"Initialized {self.agent_type} agent")
     
     @traceable
-    async def execute_task(self, task_request: TaskRequest) -> TaskResponse:
-        """Execute a task using this specialist agent"""
+    async def execute_task(self, task_request: TaskRequest, deadline: Optional[Deadline] = None) -> TaskResponse:
+        """
+        Execute a task using this specialist agent.
+        
+        The LLM call is cancelled once ``deadline`` (by default this agent's
+        AGENT_TIMEOUTS entry) passes; streamed text received by then is
+        returned with status "partial", otherwise the status is "timeout".
+        While the model's circuit is open the status is "unavailable".
+        Transient LLM errors are retried, and high-priority calls may be
+        hedged; the counts are reported in ``metadata["llm_attempts"]``.
+        """
+        if deadline is None:
+            deadline = Deadline(Config.AGENT_TIMEOUTS.get(self.agent_type, Config.TASK_DEADLINE_SECONDS))
+        timer = StageTimer()
+        if self.init_timer.timings:
+            timer.merge(self.init_timer.timings, prefix="init")
+            self.init_timer = StageTimer()
+        stats = AttemptStats()
+        
         try:
             # Get system prompt based on SOP
-            system_prompt = self._get_system_prompt()
+            with timer.span("system_prompt"):
+                system_prompt = self._get_system_prompt()
             
             # Create task-specific prompt
-            task_prompt = self._create_task_prompt(task_request)
+            with timer.span("prompt_build"):
+                task_prompt = self._create_task_prompt(task_request)
             
             # Execute task with LLM
-            response = await self.llm.ainvoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=task_prompt)
-            ])
+            with timer.span("llm"):
+                response_content = await self._invoke_llm([
+                    SystemMessage(content=system_prompt),
+                    HumanMessage(content=task_prompt)
+                ], timer, deadline, task_request.priority, stats)
             
             # Process response
-            processed_response = self._process_response(response.content, task_request)
+            with timer.span("process_response"):
+                processed_response = self._process_response(response_content, task_request)
             
             return TaskResponse(
                 agent_type=self.agent_type,
@@ -58,18 +85,116 @@ class BaseSpecialistAgent(ABC):
                 status="completed",
                 metadata={
                     "task_priority": task_request.priority,
-                    "context_used": bool(task_request.context)
+                    "context_used": bool(task_request.context),
+                    "llm_attempts": stats.as_dict(),
+                    "timings": timer.timings
                 }
             )
             
+        except LLMUnavailable as e:
+            logger.warning(f"{self.agent_type} agent: {e}")
+            return TaskResponse(
+                agent_type=self.agent_type,
+                content=f"Error: {str(e)}",
+                status="unavailable",
+                metadata={"retry_after": e.retry_after, "timings": timer.timings}
+            )
+            
+        except DeadlineExceeded as e:
+            logger.warning(f"{self.agent_type} agent: {e}")
+            metadata = {"deadline_exceeded": True, "timings": timer.timings}
+            if e.partial:
+                return TaskResponse(agent_type=self.agent_type, content=e.partial.strip(),
+                                    status="partial", metadata=metadata)
+            return TaskResponse(agent_type=self.agent_type, content=f"Error: {str(e)}",
+                                status="timeout", metadata=metadata)
+            
         except Exception as e:
             logger.error(f"Error in {self.agent_type} task execution: {e}")
             return TaskResponse(
                 agent_type=self.agent_type,
                 content=f"Error: {str(e)}",
                 status="failed",
-                metadata={"error": str(e)}
+                metadata={"error": str(e), "llm_attempts": stats.as_dict(), "timings": timer.timings}
+            )
+        
+        finally:
+            get_monitor().record_llm_attempts(self.agent_type, **stats.as_dict())
+    
+    async def _invoke_llm(self, messages: List[Any], timer: StageTimer, deadline: Optional[Deadline] = None,
+                          priority: Optional[str] = None, stats: Optional[AttemptStats] = None) -> str:
+        """
+        Call the LLM, recording time to first token when streaming is enabled.
+        
+        Raises DeadlineExceeded when ``deadline`` passes first; with streaming
+        its ``partial`` carries the text received so far. Raises
+        LLMUnavailable without calling the model while its circuit is open or
+        its concurrency limit is reached. Transient errors are retried per
+        ``retry_policy``; for hedged priorities a second call is raced once
+        the first runs past this agent type's p95 latency.
+        """
+        deadline = deadline or Deadline(Config.TASK_DEADLINE_SECONDS)
+        guard = get_llm_guard(model_name(self.llm))
+        
+        async def attempt() -> str:
+            start = time.perf_counter()
+            content = await guard.call(lambda: self._call_llm(messages, timer, deadline),
+                                       max_wait=min(Config.LLM_LIMIT_MAX_WAIT_SECONDS, deadline.remaining()),
+                                       site=self.agent_type)
+            get_monitor().get_llm_latency(self.agent_type).record((time.perf_counter() - start) * 1000.0)
+            return content
+        
+        return await self.retry_policy.run(attempt, deadline, stats, hedge_after=self._hedge_after(priority))
+    
+    def _hedge_after(self, priority: Optional[str]) -> Optional[float]:
+        """Seconds before a hedged request fires, or None when this call is not hedged"""
+        hedged = {p.strip() for p in Config.LLM_HEDGE_PRIORITIES.split(",") if p.strip()}
+        latency = get_monitor().get_llm_latency(self.agent_type)
+        if priority not in hedged or latency.count < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return latency.percentile(95) / 1000.0
+    
+    async def _call_llm(self, messages: List[Any], timer: StageTimer, deadline: Deadline) -> str:
+        if not Config.AGENT_STREAMING:
+            response = await deadline.run(self.llm.ainvoke(messages), "llm")
+            return response.content
+        
+        start = time.perf_counter()
+        message = None
+        stream = self.llm.astream(messages)
+        try:
+            while True:
+                try:
+                    chunk = await deadline.run(stream.__anext__(), "llm")
+                except StopAsyncIteration:
+                    break
+                if message is None:
+                    timer.record("llm_first_token", (time.perf_counter() - start) * 1000.0)
+                    message = chunk
+                else:
+                    message = message + chunk
+        except DeadlineExceeded as e:
+            e.partial = self._message_text(message) or None
+            raise
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        return self._message_text(message)
+    
+    def _message_text(self, message: Any) -> str:
+        """Text of a (possibly streamed) LLM message"""
+        if message is None:
+            return ""
+        content = message.content
+        if isinstance(content, list):
+            # Streamed content may arrive as typed blocks
+            content = "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in content
             )
+        return content
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt based on agent SOP"""
@@ -0,0 +1,136 @@
+"""
+Precomputed status documents for the 12thhaus Spiritual Platform
+Rebuilds expensive status payloads at a bounded rate and serves them as
+pre-serialized bytes with an ETag for conditional requests
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A serialized status document"""
+    body: bytes
+    etag: str
+    generated_at: float
+    version: Any = None
+    # Overrides the snapshot policy for documents that must not be reused for long
+    max_age: Optional[float] = None
+
+def make_etag(body: bytes) -> str:
+    """Build a strong ETag from a response body"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def extend_etag(etag: str, fields: Dict[str, Any]) -> str:
+    """Derive the ETag of a snapshot extended with per-request fields without hashing the body again"""
+    if not fields:
+        return etag
+    extra = json.dumps(fields, separators=(",", ":"), sort_keys=True, default=str).encode()
+    return '"' + etag.strip('"') + "-" + hashlib.blake2b(extra, digest_size=6).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Weak comparison is sufficient for GET revalidation
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def extend_document(body: bytes, fields: Dict[str, Any]) -> bytes:
+    """Append top-level fields to a serialized JSON object without re-serializing it"""
+    if not fields:
+        return body
+    extra = json.dumps(fields, separators=(",", ":"), default=str).encode()
+    if body == b"{}":
+        return extra
+    return body[:-1] + b"," + extra[1:]
+
+class StatusSnapshot:
+    """
+    Caches the output of a document builder.
+
+    The builder runs at most once per ``min_interval_ms``. Once the interval has
+    elapsed the document is only rebuilt if ``version_fn`` reports a change, or
+    if the snapshot is older than ``max_age_ms``. Concurrent callers share one
+    rebuild rather than each computing the document. Documents flagged by
+    ``degraded_fn`` are kept for at most ``degraded_max_age_ms`` so a
+    transient failure is not served for the full snapshot lifetime.
+    """
+
+    def __init__(self,
+                 builder: Callable[[], Dict[str, Any]],
+                 version_fn: Optional[Callable[[], Any]] = None,
+                 min_interval_ms: Optional[int] = None,
+                 max_age_ms: Optional[int] = None,
+                 degraded_fn: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 degraded_max_age_ms: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.builder = builder
+        self.version_fn = version_fn
+        self.min_interval = (min_interval_ms if min_interval_ms is not None
+                             else Config.STATUS_SNAPSHOT_INTERVAL_MS) / 1000.0
+        self.max_age = (max_age_ms if max_age_ms is not None
+                        else Config.STATUS_SNAPSHOT_MAX_AGE_MS) / 1000.0
+        self.degraded_fn = degraded_fn
+        self.degraded_max_age = (degraded_max_age_ms if degraded_max_age_ms is not None
+                                 else Config.STATUS_SNAPSHOT_DEGRADED_MAX_AGE_MS) / 1000.0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self.rebuilds = 0
+
+    def _current_version(self) -> Any:
+        if not self.version_fn:
+            return None
+        try:
+            return self.version_fn()
+        except Exception as e:
+            logger.warning(f"Status version check failed: {e}")
+            return None
+
+    def _is_fresh(self, snapshot: Optional[Snapshot], now: float) -> bool:
+        if snapshot is None:
+            return False
+        age = now - snapshot.generated_at
+        if snapshot.max_age is not None:
+            return age < snapshot.max_age
+        if age < self.min_interval:
+            return True
+        if age >= self.max_age or self.version_fn is None:
+            return False
+        return self._current_version() == snapshot.version
+
+    def get(self) -> Snapshot:
+        """Return the current snapshot, rebuilding it if it is stale"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, self._clock()):
+            return snapshot
+
+        with self._lock:
+            # Another thread may have rebuilt while we waited
+            snapshot = self._snapshot
+            now = self._clock()
+            if self._is_fresh(snapshot, now):
+                return snapshot
+
+            version = self._current_version()
+            document = self.builder()
+            body = json.dumps(document, separators=(",", ":"), default=str).encode()
+            degraded = self.degraded_fn is not None and self.degraded_fn(document)
+            snapshot = Snapshot(body=body, etag=make_etag(body), generated_at=now, version=version,
+                                max_age=self.degraded_max_age if degraded else None)
+            self._snapshot = snapshot
+            self.rebuilds += 1
+            return snapshot
+
+    def invalidate(self):
+        """Force the next get() to rebuild"""
+        self._snapshot = None
@@ -0,0 +1,338 @@
+"""
+Durable task queue for the 12thhaus Spiritual Platform
+SQLite (WAL mode) backed queue of serialized task descriptions with leases,
+acknowledgements, retries with backoff and dead-lettering. Safe to consume
+from several worker processes on one host.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Lower values are dequeued first
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queued_tasks (
+    id TEXT PRIMARY KEY,
+    task_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'ready',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    receipt TEXT,
+    worker_id TEXT,
+    owner TEXT,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_queued_tasks_ready
+    ON queued_tasks (status, priority, available_at);
+"""
+
+@dataclass
+class QueuedTask:
+    """A leased task handed to a worker"""
+    id: str
+    task_type: str
+    payload: Dict[str, Any]
+    priority: int
+    attempts: int
+    receipt: str
+    owner: Optional[str] = None
+
+class SQLiteTaskQueue:
+    """
+    Persistent queue backed by a SQLite database in WAL mode.
+
+    ``dequeue`` leases a task for ``visibility_timeout`` seconds. A task that is
+    not acknowledged before its lease expires becomes visible again. ``nack``
+    reschedules with exponential backoff and jitter until ``max_attempts`` is
+    reached, after which the task is dead-lettered.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 visibility_timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None,
+                 backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.path = path or Config.TASK_QUEUE_PATH
+        self.visibility_timeout = (visibility_timeout if visibility_timeout is not None
+                                   else Config.TASK_QUEUE_VISIBILITY_TIMEOUT)
+        self.max_attempts = max_attempts if max_attempts is not None else Config.TASK_QUEUE_MAX_ATTEMPTS
+        self.backoff_base = backoff_base if backoff_base is not None else Config.TASK_QUEUE_BACKOFF_BASE_SECONDS
+        self.backoff_max = backoff_max if backoff_max is not None else Config.TASK_QUEUE_BACKOFF_MAX_SECONDS
+        self._clock = clock
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self,
+                task_type: str,
+                payload: Dict[str, Any],
+                task_id: Optional[str] = None,
+                priority: str = "medium",
+                delay: float = 0.0,
+                owner: Optional[str] = None) -> str:
+        """Persist a task description and return its id"""
+        task_id = task_id or str(uuid.uuid4())
+        now = self._clock()
+        self._connection().execute(
+            "INSERT INTO queued_tasks (id, task_type, payload, priority, available_at, owner, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (task_id, task_type, json.dumps(payload), PRIORITY_ORDER.get(priority, 1),
+             now + delay, owner, now)
+        )
+        return task_id
+
+    def dequeue(self, worker_id: str = "", visibility_timeout: Optional[float] = None) -> Optional[QueuedTask]:
+        """Lease the next available task, or return None if the queue is empty"""
+        conn = self._connection()
+        lease = visibility_timeout if visibility_timeout is not None else self.visibility_timeout
+
+        while True:
+            now = self._clock()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM queued_tasks "
+                    "WHERE (status = 'ready' AND available_at <= ?) "
+                    "   OR (status = 'leased' AND lease_expires_at <= ?) "
+                    "ORDER BY priority, available_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row["attempts"] >= self.max_attempts:
+                    # Lease expired on its final attempt
+                    conn.execute(
+                        "UPDATE queued_tasks SET status = 'dead', receipt = NULL, finished_at = ?, "
+                        "last_error = COALESCE(last_error, 'visibility timeout exceeded') WHERE id = ?",
+                        (now, row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    logger.warning(f"Task {row['id']} dead-lettered after {row['attempts']} attempts")
+                    continue
+
+                receipt = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE queued_tasks SET status = 'leased', attempts = attempts + 1, "
+                    "lease_expires_at = ?, receipt = ?, worker_id = ? WHERE id = ?",
+                    (now + lease, receipt, worker_id, row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            return QueuedTask(
+                id=row["id"],
+                task_type=row["task_type"],
+                payload=json.loads(row["payload"]),
+                priority=row["priority"],
+                attempts=row["attempts"] + 1,
+                receipt=receipt,
+                owner=row["owner"]
+            )
+
+    def ack(self, task_id: str, receipt: str, result: Any = None) -> bool:
+        """Mark a leased task done; False if the lease was lost"""
+        cursor = self._connection().execute(
+            "UPDATE queued_tasks SET status = 'done', result = ?, receipt = NULL, finished_at = ? "
+            "WHERE id = ? AND receipt = ? AND status = 'leased'",
+            (json.dumps(result, default=str), self._clock(), task_id, receipt)
+        )
+        return cursor.rowcount == 1
+
+    def nack(self, task_id: str, receipt: str, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Release a leased task after a failure.
+
+        Returns the task's new status ('ready' or 'dead'), or None if the lease was lost.
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT attempts FROM queued_tasks WHERE id = ? AND receipt = ? AND status = 'leased'",
+            (task_id, receipt)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = self._clock()
+        if not retry or row["attempts"] >= self.max_attempts:
+            status, available_at, finished_at = "dead", now, now
+        else:
+            status, available_at, finished_at = "ready", now + self.backoff_delay(row["attempts"]), None
+
+        cursor = conn.execute(
+            "UPDATE queued_tasks SET status = ?, available_at = ?, finished_at = ?, last_error = ?, "
+            "receipt = NULL, lease_expires_at = NULL WHERE id = ? AND receipt = ?",
+            (status, available_at, finished_at, error, task_id, receipt)
+        )
+        return status if cursor.rowcount == 1 else None
+
+    def extend_lease(self, task_id: str, receipt: str, seconds: float) -> bool:
+        """Push a lease's expiry out for long-running work"""
+        cursor = self._connection().execute(
+            "UPDATE queued_tasks SET lease_expires_at = ? WHERE id = ? AND receipt = ? AND status = 'leased'",
+            (self._clock() + seconds, task_id, receipt)
+        )
+        return cursor.rowcount == 1
+
+    def backoff_delay(self, attempts: int) -> float:
+        """
+        Exponential backoff with equal jitter: a random delay between half the
+        ceiling and the ceiling, so a failed task always waits before it is
+        redelivered.
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** max(attempts - 1, 0)))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a task, including its result once done"""
+        row = self._connection().execute(
+            "SELECT * FROM queued_tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        status = {"ready": "queued", "leased": "running", "done": "completed", "dead": "failed"}[row["status"]]
+        task = {
+            "task_id": row["id"],
+            "task_type": row["task_type"],
+            "status": status,
+            "attempts": row["attempts"],
+            "owner": row["owner"]
+        }
+        if row["status"] == "done":
+            task["result"] = json.loads(row["result"]) if row["result"] is not None else None
+        if row["last_error"]:
+            task["error"] = row["last_error"]
+        return task
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Tasks that exhausted their retries"""
+        rows = self._connection().execute(
+            "SELECT id, task_type, attempts, last_error, finished_at FROM queued_tasks "
+            "WHERE status = 'dead' ORDER BY finished_at LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_dead_letter(self, task_id: str) -> bool:
+        """Give a dead-lettered task a fresh set of attempts"""
+        cursor = self._connection().execute(
+            "UPDATE queued_tasks SET status = 'ready', attempts = 0, available_at = ?, finished_at = NULL "
+            "WHERE id = ? AND status = 'dead'",
+            (self._clock(), task_id)
+        )
+        return cursor.rowcount == 1
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """Delete done and dead tasks finished before the cutoff"""
+        cursor = self._connection().execute(
+            "DELETE FROM queued_tasks WHERE status IN ('done', 'dead') AND finished_at < ?",
+            (self._clock() - older_than_seconds,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Task counts by status"""
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) AS count FROM queued_tasks GROUP BY status"
+        ).fetchall()
+        counts = {"ready": 0, "leased": 0, "done": 0, "dead": 0}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+async def _run_agent_task(payload: Dict[str, Any]) -> str:
+    """Run a serialized agent task through the master agent"""
+    from master_agent import get_master_agent
+    return await get_master_agent().process_task(
+        payload["task"],
+        payload.get("priority", "medium"),
+        payload.get("context") or {}
+    )
+
+# Task types a worker process knows how to execute
+DEFAULT_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+    "agent_task": _run_agent_task
+}
+
+async def run_worker(concurrency: int = 3, path: Optional[str] = None):
+    """Consume the durable queue until cancelled"""
+    from monitoring import CoordinationManager
+
+    coordinator = CoordinationManager(durable_queue=SQLiteTaskQueue(path))
+    for task_type, task_handler in DEFAULT_HANDLERS.items():
+        coordinator.register_handler(task_type, task_handler)
+    coordinator.durable_workers = concurrency
+
+    await coordinator.start_coordination()
+    logger.info(f"Durable queue worker {os.getpid()} started with {concurrency} slots")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await coordinator.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="12thhaus durable task queue")
+    parser.add_argument("command", choices=["worker", "stats", "dead-letters"])
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--path", default=None, help="Queue database path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "worker":
+        try:
+            asyncio.run(run_worker(args.concurrency, args.path))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "stats":
+        print(json.dumps(SQLiteTaskQueue(args.path).stats(), indent=2))
+    else:
+        print(json.dumps(SQLiteTaskQueue(args.path).dead_letters(), indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
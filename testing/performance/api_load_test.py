@@ -0,0 +1,454 @@
+"""
+Agent API Load Test
+Python-native load generator for /api/task, /api/status, /api/health and the
+organization routes. Runs open (fixed arrival rate) or closed (fixed
+concurrency) workloads, records HDR latency histograms and throughput per
+endpoint, and writes a JSON report gated on
+TEST_CONFIG['performance']['thresholds']
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from testing.test_config import TEST_CONFIG
+
+DEFAULT_REPORT = os.path.join(BASE_DIR, "testing", "reports", "load", "api_load_report.json")
+
+TASKS = (
+    "Plan a deployment for the booking site",
+    "Write a function that matches seekers with practitioners",
+    "Draft a newsletter campaign for the full moon workshop",
+    "Help a seeker reschedule their reading",
+    "Build a revenue report for last month",
+)
+
+
+class HdrHistogram:
+    """
+    High-dynamic-range latency histogram over integer microseconds.
+
+    Values keep their top ``significant_bits`` binary digits, so every
+    recorded value is exact to within 2**-(significant_bits - 1) relative
+    error (about 0.1% with the default 11 bits) at any magnitude.
+    """
+
+    def __init__(self, significant_bits: int = 11):
+        self.significant_bits = significant_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _bucket(self, value: int) -> Tuple[int, int]:
+        shift = max(0, value.bit_length() - self.significant_bits)
+        return (value >> shift) << shift, shift
+
+    def record(self, value_us: float):
+        value = max(0, int(value_us))
+        bucket, _ = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "HdrHistogram"):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        """Highest value equivalent to the given percentile, in microseconds"""
+        if not self.count:
+            return 0.0
+        threshold = max(1, -(-self.count * pct // 100))
+        cumulative = 0
+        for bucket in sorted(self.counts):
+            cumulative += self.counts[bucket]
+            if cumulative >= threshold:
+                _, shift = self._bucket(bucket)
+                return float(min(bucket + (1 << shift) - 1, self.max))
+        return float(self.max)
+
+    def summary_ms(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count / 1000.0, 3) if self.count else 0.0,
+            "min": round((self.min or 0) / 1000.0, 3),
+            "p50": round(self.percentile(50) / 1000.0, 3),
+            "p90": round(self.percentile(90) / 1000.0, 3),
+            "p95": round(self.percentile(95) / 1000.0, 3),
+            "p99": round(self.percentile(99) / 1000.0, 3),
+            "p999": round(self.percentile(99.9) / 1000.0, 3),
+            "max": round(self.max / 1000.0, 3),
+        }
+
+
+@dataclass
+class Endpoint:
+    """One request type in the workload mix"""
+    name: str
+    method: str
+    path: Callable[["LoadContext"], str]
+    body: Optional[Callable[["LoadContext"], Dict[str, Any]]] = None
+
+
+@dataclass
+class LoadContext:
+    """Per-run values request templates draw on"""
+    organization_id: str = ""
+    rng: random.Random = field(default_factory=random.Random)
+
+
+ENDPOINTS = {
+    "task": Endpoint("task", "POST", lambda ctx: "/api/task",
+                     lambda ctx: {"task": ctx.rng.choice(TASKS), "priority": "medium"}),
+    "status": Endpoint("status", "GET", lambda ctx: "/api/status"),
+    "health": Endpoint("health", "GET", lambda ctx: "/api/health"),
+    "organizations": Endpoint("organizations", "GET", lambda ctx: "/organizations?limit=20"),
+    "members": Endpoint("members", "GET", lambda ctx: f"/organizations/{ctx.organization_id}/members?limit=20"),
+}
+DEFAULT_MIX = "task=1,status=3,health=3,organizations=2,members=1"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """``name=weight,...`` into weights, dropping endpoints with no weight"""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        weights[name] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+class EndpointStats:
+    def __init__(self):
+        self.histogram = HdrHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+
+    def record(self, status: Optional[int], latency_us: float):
+        self.requests += 1
+        self.histogram.record(latency_us)
+        key = str(status) if status is not None else "error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+
+class LoadGenerator:
+    """
+    Drives the API with a weighted mix of endpoints.
+
+    ``model="closed"`` keeps ``concurrency`` virtual users busy back to back;
+    ``model="open"`` sends Poisson arrivals at ``rate`` per second regardless
+    of how fast responses come back (at most ``max_in_flight`` outstanding,
+    the rest counted as dropped). Open-model latency is measured from each
+    request's scheduled send time so a stalled server cannot hide its queueing.
+    """
+
+    def __init__(self, targets: Dict[str, str], mix: Dict[str, float], model: str = "closed",
+                 concurrency: int = 10, rate: float = 50.0, duration: float = 30.0,
+                 max_in_flight: int = 1000, token: str = "load-test", timeout: float = 30.0,
+                 context: Optional[LoadContext] = None, seed: Optional[int] = None):
+        if model not in ("open", "closed"):
+            raise ValueError("model must be 'open' or 'closed'")
+        self.targets = targets
+        self.mix = mix
+        self.model = model
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.max_in_flight = max_in_flight
+        self.token = token
+        self.timeout = timeout
+        self.context = context or LoadContext()
+        self.rng = random.Random(seed)
+        self.context.rng = self.rng
+        self.stats = {name: EndpointStats() for name in mix}
+        self.dropped = 0
+        self.elapsed = 0.0
+
+    def _pick(self) -> Endpoint:
+        names = list(self.mix)
+        return ENDPOINTS[self.rng.choices(names, weights=[self.mix[name] for name in names])[0]]
+
+    async def _send(self, client: httpx.AsyncClient, endpoint: Endpoint, user: int, scheduled: float):
+        url = self.targets[endpoint.name] + endpoint.path(self.context)
+        body = endpoint.body(self.context) if endpoint.body else None
+        headers = {"Authorization": f"Bearer {self.token}-{user}"}
+        status = None
+        try:
+            response = await client.request(endpoint.method, url, json=body, headers=headers)
+            status = response.status_code
+        except httpx.HTTPError:
+            pass
+        self.stats[endpoint.name].record(status, (time.perf_counter() - scheduled) * 1e6)
+
+    async def _closed(self, client: httpx.AsyncClient, stop_at: float):
+        async def user(index: int):
+            while time.perf_counter() < stop_at:
+                await self._send(client, self._pick(), index, time.perf_counter())
+
+        await asyncio.gather(*(user(index) for index in range(self.concurrency)))
+
+    async def _open(self, client: httpx.AsyncClient, stop_at: float):
+        in_flight = set()
+        scheduled = time.perf_counter()
+        arrival = 0
+        while scheduled < stop_at:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= self.max_in_flight:
+                self.dropped += 1
+            else:
+                task = asyncio.ensure_future(self._send(client, self._pick(), arrival % self.concurrency, scheduled))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            arrival += 1
+            scheduled += self.rng.expovariate(self.rate)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    async def run(self) -> Dict[str, Any]:
+        connections = self.concurrency if self.model == "closed" else self.max_in_flight
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            stop_at = started + self.duration
+            if self.model == "closed":
+                await self._closed(client, stop_at)
+            else:
+                await self._open(client, stop_at)
+            self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        overall = HdrHistogram()
+        endpoints = {}
+        for name, stats in self.stats.items():
+            overall.merge(stats.histogram)
+            endpoints[name] = _summarize(stats.requests, stats.errors, stats.histogram, self.elapsed)
+            endpoints[name]["status_codes"] = stats.status_codes
+        requests = sum(stats.requests for stats in self.stats.values())
+        errors = sum(stats.errors for stats in self.stats.values())
+        return {
+            "workload": {
+                "model": self.model,
+                "concurrency": self.concurrency,
+                "rate": self.rate if self.model == "open" else None,
+                "duration_seconds": round(self.elapsed, 3),
+                "mix": self.mix,
+                "dropped": self.dropped,
+            },
+            "overall": _summarize(requests, errors, overall, self.elapsed),
+            "endpoints": endpoints,
+        }
+
+
+def _summarize(requests: int, errors: int, histogram: HdrHistogram, elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 6) if requests else 0.0,
+        "success_rate": round(1 - errors / requests, 6) if requests else 0.0,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": histogram.summary_ms(),
+    }
+
+
+def evaluate(report: Dict[str, Any], thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Check the overall and per-endpoint results against the performance thresholds"""
+    thresholds = thresholds or TEST_CONFIG["performance"]["thresholds"]
+    checks = []
+    scopes = [("overall", report["overall"])] + list(report["endpoints"].items())
+    for scope, result in scopes:
+        if not result["requests"]:
+            continue
+        for name, value, limit, passed in (
+            ("p95_ms", result["latency_ms"]["p95"], thresholds["api_response_time_p95"],
+             result["latency_ms"]["p95"] <= thresholds["api_response_time_p95"]),
+            ("p99_ms", result["latency_ms"]["p99"], thresholds["api_response_time_p99"],
+             result["latency_ms"]["p99"] <= thresholds["api_response_time_p99"]),
+            ("error_rate", result["error_rate"], thresholds["error_rate"],
+             result["error_rate"] <= thresholds["error_rate"]),
+            ("success_rate", result["success_rate"], thresholds["success_rate"],
+             result["success_rate"] >= thresholds["success_rate"]),
+        ):
+            checks.append({"scope": scope, "check": name, "value": value, "limit": limit, "passed": passed})
+    if not report["overall"]["requests"]:
+        checks.append({"scope": "overall", "check": "requests", "value": 0, "limit": 1, "passed": False})
+    report["thresholds"] = thresholds
+    report["checks"] = checks
+    report["passed"] = all(check["passed"] for check in checks)
+    return report
+
+
+def _serve(server) -> str:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def start_local_servers(stack: ExitStack, llm_latency_ms: float = 0.0, llm_tokens_per_second: float = 0.0,
+                        members: int = 50) -> Tuple[Dict[str, str], LoadContext]:
+    """
+    Serve the API from this process on ephemeral ports.
+
+    Uses the offline fake LLM backend (no network; instant unless given a
+    latency and streaming rate), accepts any bearer token as that user and
+    turns rate limiting off, so the run measures our own request handling
+    and orchestration overhead.
+    """
+    from http.server import ThreadingHTTPServer
+    from unittest.mock import patch
+
+    import langsmith
+    from flask import Flask
+    from werkzeug.serving import make_server
+
+    from config import Config
+    from auth.organizations import OrganizationManager, OrganizationRole
+    from auth.rate_limit import RateLimiter
+
+    stack.enter_context(patch.object(Config, "LLM_BACKEND", "fake"))
+    stack.enter_context(patch.object(Config, "FAKE_LLM_LATENCY_MS", llm_latency_ms))
+    stack.enter_context(patch.object(Config, "FAKE_LLM_TOKENS_PER_SECOND", llm_tokens_per_second))
+    stack.enter_context(patch.object(Config, "REQUIRE_AUTH_FOR_APIS", False))
+    stack.enter_context(patch.object(Config, "LANGCHAIN_TRACING_V2", False))
+    configure_tracing = getattr(langsmith, "configure", None)
+    if configure_tracing is not None:
+        # Keep traces of synthetic load off the network; None restores the environment's setting
+        configure_tracing(enabled=False)
+        stack.callback(configure_tracing, enabled=None)
+
+    import api.health
+    import api.organizations
+    import api.status
+    import api.task
+
+    manager = OrganizationManager(storage_backend="memory")
+    organization = manager.create_organization(name="Load Test Circle", created_by="load-test-owner")
+    for index in range(members):
+        manager.add_member(organization.id, f"load-test-{index}", OrganizationRole.ADMIN)
+
+    def claims(token):
+        return {"sub": token, "organizations": [{"id": organization.id, "role": "admin"}]}
+
+    unlimited = RateLimiter(enabled=False)
+    stack.enter_context(patch("auth.vercel_auth.validate_jwt_token", side_effect=claims))
+    stack.enter_context(patch("auth.decorators.validate_jwt_token", side_effect=claims))
+    stack.enter_context(patch("auth.vercel_auth.get_rate_limiter", return_value=unlimited))
+    stack.enter_context(patch("auth.decorators.get_rate_limiter", return_value=unlimited))
+    stack.enter_context(patch("api.organizations.get_organization_manager", return_value=manager))
+
+    targets = {}
+    for name, module in (("task", api.task), ("status", api.status), ("health", api.health)):
+        quiet = type("handler", (module.handler,), {"log_message": lambda self, format, *args: None})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), quiet)
+        server.daemon_threads = True
+        stack.callback(server.server_close)
+        stack.callback(server.shutdown)
+        targets[name] = _serve(server)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app = Flask(__name__)
+    app.register_blueprint(api.organizations.organizations_bp)
+    org_server = make_server("127.0.0.1", 0, app, threaded=True)
+    stack.callback(org_server.server_close)
+    stack.callback(org_server.shutdown)
+    targets["organizations"] = targets["members"] = _serve(org_server)
+
+    return targets, LoadContext(organization_id=organization.id)
+
+
+def run_load_test(model: str = "closed", concurrency: int = 10, rate: float = 50.0, duration: float = 30.0,
+                  mix: str = DEFAULT_MIX, base_url: Optional[str] = None, organization_id: str = "",
+                  local: bool = False, llm_latency_ms: float = 0.0, llm_tokens_per_second: float = 0.0,
+                  seed: Optional[int] = None, thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Run one workload against ``base_url`` (or in-process servers) and evaluate it"""
+    weights = parse_mix(mix)
+    with ExitStack() as stack:
+        if local:
+            targets, context = start_local_servers(stack, llm_latency_ms, llm_tokens_per_second)
+        else:
+            base_url = (base_url or TEST_CONFIG["api"]["base_url"]).rstrip("/")
+            targets = {name: base_url for name in ENDPOINTS}
+            context = LoadContext(organization_id=organization_id)
+            if "members" in weights and not organization_id:
+                raise ValueError("--organization-id is required for the members endpoint")
+        generator = LoadGenerator(targets, weights, model=model, concurrency=concurrency, rate=rate,
+                                  duration=duration, context=context, seed=seed)
+        report = asyncio.run(generator.run())
+    report["target"] = "local" if local else base_url
+    return evaluate(report, thresholds)
+
+
+def print_report(report: Dict[str, Any]):
+    workload = report["workload"]
+    dropped = f", {workload['dropped']} arrivals dropped" if workload["dropped"] else ""
+    print(f"{workload['model']} model, {workload['duration_seconds']:.1f}s against {report['target']}{dropped}")
+    header = f"{'endpoint':<15}{'requests':>10}{'rps':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, result in [("overall", report["overall"])] + list(report["endpoints"].items()):
+        latency = result["latency_ms"]
+        print(f"{name:<15}{result['requests']:>10}{result['throughput_rps']:>10.1f}{result['errors']:>8}"
+              f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}{latency['max']:>10.2f}")
+    failed = [check for check in report["checks"] if not check["passed"]]
+    for check in failed:
+        print(f"FAIL {check['scope']} {check['check']}: {check['value']} (limit {check['limit']})")
+    print("PASS" if report["passed"] else "FAIL")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the agent API")
+    parser.add_argument("--model", choices=("closed", "open"), default="closed",
+                        help="closed: fixed concurrency; open: fixed arrival rate")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users (closed model)")
+    parser.add_argument("--rate", type=float, default=50.0, help="Requests per second (open model)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated endpoint=weight")
+    parser.add_argument("--base-url", help="API to drive (default: TEST_CONFIG api.base_url)")
+    parser.add_argument("--organization-id", default="", help="Organization for the members endpoint")
+    parser.add_argument("--local", action="store_true",
+                        help="Serve the API in this process with the fake LLM backend")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Median fake LLM time to first token with --local")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0,
+                        help="Fake LLM streaming rate with --local (0: instant)")
+    parser.add_argument("--seed", type=int, help="Seed for the request mix and arrivals")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    report = run_load_test(args.model, args.concurrency, args.rate, args.duration, args.mix, args.base_url,
+                           args.organization_id, args.local, args.llm_latency_ms, args.llm_tokens_per_second,
+                           args.seed)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    sys.exit(0 if report["passed"] else 1)
@@ -0,0 +1,318 @@
+"""
+Orchestration Hot Path Benchmark
+Measures per-call cost of the Python code every request runs through:
+routing prompt build and parse, specialist prompt building, SOP search,
+task monitoring, organization lookups and JWT validation with a cached
+JWKS. Results are compared against a stored baseline and any case slower
+than the baseline by more than the threshold is reported as a regression
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+
+# Cases this much faster than a microsecond move by timer noise alone; never flagged
+NOISE_FLOOR_US = 0.5
+
+SOP_WORDS = ("breathe", "align", "chakra", "intention", "session", "practitioner", "seeker", "energy",
+             "meditation", "balance", "ritual", "guidance")
+
+
+def measure(fn, number):
+    """Best-of-three microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def offline(stack: ExitStack):
+    """Fake LLM backend, no LangSmith tracing and no log output, so only our own code is timed"""
+    import langsmith
+
+    from config import Config
+
+    stack.enter_context(patch.object(Config, "LLM_BACKEND", "fake"))
+    stack.enter_context(patch.object(Config, "REQUIRE_AUTH_FOR_APIS", False))
+    stack.enter_context(patch.object(Config, "LANGCHAIN_TRACING_V2", False))
+    stack.enter_context(patch.object(Config, "LANGCHAIN_API_KEY", None))
+    configure_tracing = getattr(langsmith, "configure", None)
+    if configure_tracing is not None:
+        # None restores the environment's setting
+        configure_tracing(enabled=False)
+        stack.callback(configure_tracing, enabled=None)
+    # parse_routing[default] logs a warning on every call
+    logging.disable(logging.WARNING)
+    stack.callback(logging.disable, logging.NOTSET)
+
+
+def bench_routing(number: int) -> Dict[str, float]:
+    from master_agent import MasterAgent, TaskRequest
+
+    master = MasterAgent()
+    task = TaskRequest(content="Plan a deployment for the booking site before the full moon workshop",
+                       priority="high", context={"user_id": "user-1", "organization_id": "org-1"})
+    return {
+        "routing_prompt": measure(lambda: master._get_routing_prompt(task), number),
+        "parse_routing[exact]": measure(lambda: master._parse_routing_decision("deployment"), number),
+        "parse_routing[embedded]": measure(
+            lambda: master._parse_routing_decision("I would send this to marketing_automation."), number),
+        "parse_routing[default]": measure(lambda: master._parse_routing_decision("not sure"), number),
+    }
+
+
+def bench_specialists(number: int) -> Dict[str, float]:
+    from master_agent import TaskRequest
+    from specialist_agents import AGENT_REGISTRY
+
+    task = TaskRequest(content="Write a welcome sequence for new seekers", priority="medium",
+                       context={"user_id": "user-1"})
+    results = {}
+    for agent_type, agent_class in AGENT_REGISTRY.items():
+        agent = agent_class()
+        results[f"system_prompt[{agent_type}]"] = measure(agent._get_system_prompt, number)
+        results[f"task_prompt[{agent_type}]"] = measure(lambda: agent._create_task_prompt(task), number)
+    return results
+
+
+def build_sop_reader(directory: str, size: int):
+    """Reader over ``size`` synthetic text SOPs of about 2 KB each"""
+    from sop_reader import SOPReader
+
+    reader = SOPReader(directory)
+    for i in range(size):
+        words = [SOP_WORDS[(i + j) % len(SOP_WORDS)] for j in range(300)]
+        reader.sop_cache[f"practice_{i}"] = {"type": "text", "title": f"Practice guide {i}",
+                                             "content": " ".join(words)}
+    reader.sop_cache[f"practice_{size - 1}"]["content"] += " full moon release ceremony"
+    return reader
+
+
+def bench_sop_search(sizes: Sequence[int], number: int) -> Dict[str, float]:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            reader = build_sop_reader(directory, size)
+            results[f"search_sops[{size}]"] = measure(lambda: reader.search_sops("Full Moon Release"),
+                                                      max(1, number // size))
+    return results
+
+
+def bench_monitor(sizes: Sequence[int], number: int) -> Dict[str, float]:
+    from monitoring import AgentMonitor
+
+    results = {}
+    for size in sizes:
+        monitor = AgentMonitor()
+        monitor.max_history_size = size
+        for i in range(size):
+            monitor.record_task_start(f"seed-{i}", "customer_operations", "Help me book a session")
+            monitor.record_task_completion(f"seed-{i}", True, 0.25)
+        ids = (f"task-{i}" for i in itertools.count())
+
+        def start_and_complete():
+            task_id = next(ids)
+            monitor.record_task_start(task_id, "customer_operations", "Help me book a session")
+            monitor.record_task_completion(task_id, True, 0.25)
+
+        results[f"record_task[{size}]"] = measure(start_and_complete, number)
+    return results
+
+
+def bench_organizations(sizes: Sequence[int], number: int) -> Dict[str, float]:
+    from auth.organizations import OrganizationRole
+    from testing.performance.org_manager_benchmark import build_manager
+
+    results = {}
+    for size in sizes:
+        manager, orgs, _ = build_manager(10, size, 0)
+        org_id = orgs[len(orgs) // 2]
+        user_id = f"user-{len(orgs) // 2}-{size - 1}"
+        results[f"get_member[{size}]"] = measure(lambda: manager.get_member(org_id, user_id), number)
+        results[f"check_permission[{size}]"] = measure(
+            lambda: manager.check_permission(user_id, org_id, OrganizationRole.VIEWER), number)
+        results[f"get_user_organizations[{size}]"] = measure(
+            lambda: manager.get_user_organizations(user_id), number)
+    return results
+
+
+class _NoTokenCache:
+    """Verified-token cache that never hits, so every call verifies the signature"""
+
+    def get(self, token):
+        return None
+
+    def put(self, token, payload):
+        pass
+
+
+def bench_jwt(number: int) -> Dict[str, float]:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk, jwt
+
+    import auth.middleware as middleware
+    from auth.jwks import JWKSCache
+    from auth.token_cache import VerifiedTokenCache
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption()).decode()
+    public = jwk.construct(pem, algorithm="RS256").public_key().to_dict()
+    public.update({"kid": "bench", "use": "sig"})
+
+    endpoint = "https://bench.logto.app"
+    jwks = JWKSCache(lambda: ({"keys": [public]}, "public, max-age=3600"))
+    token = jwt.encode({"sub": "user-1", "aud": "bench-app", "iss": f"{endpoint}/oidc",
+                        "exp": int(time.time()) + 3600}, pem, algorithm="RS256", headers={"kid": "bench"})
+
+    with patch.object(middleware.logto_config, "LOGTO_ENDPOINT", endpoint), \
+         patch.object(middleware.logto_config, "LOGTO_APP_ID", "bench-app"), \
+         patch.object(middleware, "jwks_cache", jwks):
+        # Prime the JWKS so no case includes the fetch
+        assert jwks.get_key("bench") is not None
+
+        results = {"precheck_token": measure(lambda: middleware.precheck_token(token), number)}
+        with patch.object(middleware, "verified_tokens", _NoTokenCache()):
+            assert middleware.validate_jwt_token(token) is not None
+            results["validate_jwt[signature]"] = measure(lambda: middleware.validate_jwt_token(token),
+                                                         max(1, number // 10))
+        with patch.object(middleware, "verified_tokens", VerifiedTokenCache()):
+            middleware.validate_jwt_token(token)
+            results["validate_jwt[verified_cache]"] = measure(lambda: middleware.validate_jwt_token(token),
+                                                              number)
+    return results
+
+
+GROUPS = ("routing", "specialists", "sop_search", "monitor", "organizations", "jwt")
+
+
+def run_benchmark(groups: Sequence[str] = GROUPS,
+                  sop_sizes: Sequence[int] = (10, 100, 1000),
+                  history_sizes: Sequence[int] = (100, 1000, 10000),
+                  member_sizes: Sequence[int] = (10, 100, 1000),
+                  number: int = 2000) -> Dict[str, float]:
+    """Microseconds per call for every case in ``groups``"""
+    runners: Dict[str, Callable[[], Dict[str, float]]] = {
+        "routing": lambda: bench_routing(number),
+        "specialists": lambda: bench_specialists(number),
+        "sop_search": lambda: bench_sop_search(sop_sizes, number),
+        "monitor": lambda: bench_monitor(history_sizes, number),
+        "organizations": lambda: bench_organizations(member_sizes, number),
+        "jwt": lambda: bench_jwt(number),
+    }
+    unknown = set(groups) - set(runners)
+    if unknown:
+        raise ValueError(f"Unknown benchmark groups: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with ExitStack() as stack:
+        offline(stack)
+        for group in groups:
+            results.update(runners[group]())
+    return results
+
+
+def load_baseline(path: str) -> Optional[Dict[str, float]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path: str, results: Dict[str, float]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {
+        "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {name: round(value, 3) for name, value in sorted(results.items())},
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[Dict[str, Any]]:
+    """Cases slower than their baseline by more than ``threshold`` (0.25 = 25%)"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current > previous * (1 + threshold) and current - previous > NOISE_FLOOR_US:
+            regressions.append({"case": name, "baseline_us": previous, "current_us": current,
+                                "change": current / previous - 1})
+    return regressions
+
+
+def print_report(results: Dict[str, float], baseline: Optional[Dict[str, float]], threshold: float):
+    header = f"{'case (us/call)':<42}{'current':>12}{'baseline':>12}{'change':>10}"
+    print(header)
+    print("-" * len(header))
+
+    flagged = {regression["case"] for regression in compare(results, baseline or {}, threshold)}
+    for name, current in results.items():
+        previous = (baseline or {}).get(name)
+        if previous:
+            marker = "  REGRESSION" if name in flagged else ""
+            print(f"{name:<42}{current:>12.2f}{previous:>12.2f}{current / previous - 1:>+9.0%}{marker}")
+        else:
+            print(f"{name:<42}{current:>12.2f}{'-':>12}{'new':>10}")
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark orchestration hot paths against a stored baseline")
+    parser.add_argument("--groups", default=",".join(GROUPS), help="Comma-separated benchmark groups to run")
+    parser.add_argument("--sop-sizes", default="10,100,1000", help="Comma-separated SOP corpus sizes")
+    parser.add_argument("--history-sizes", default="100,1000,10000", help="Comma-separated task history sizes")
+    parser.add_argument("--member-sizes", default="10,100,1000", help="Comma-separated members per organization")
+    parser.add_argument("--number", type=int, default=2000, help="Calls per timing run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.25")),
+                        help="Fail if a case is slower than its baseline by more than this fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--json", dest="json_path", help="Write raw results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.groups.split(","), _sizes(args.sop_sizes), _sizes(args.history_sizes),
+                            _sizes(args.member_sizes), args.number)
+    baseline = load_baseline(args.baseline)
+    print_report(results, baseline, args.threshold)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline written to {args.baseline}")
+        exit(0)
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+        exit(0)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed more than {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression['case']}: {regression['baseline_us']:.2f} -> "
+                  f"{regression['current_us']:.2f} us ({regression['change']:+.0%})")
+    exit(1 if regressions else 0)
@@ -0,0 +1,124 @@
+"""
+OrganizationManager Lookup Benchmark
+Measures per-call cost of membership and invitation lookups as the number
+of organizations grows; indexed lookups should stay flat
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from auth.organizations import OrganizationManager, OrganizationRole
+
+# Single-pass measurements over cold data; reported but not held to the growth limit
+UNGATED_OPERATIONS = {"delete_organization", "sweep_per_invitation"}
+
+
+def build_manager(num_orgs, members_per_org, invitations_per_org):
+    """Populate an in-memory manager with synthetic data"""
+    manager = OrganizationManager(storage_backend="memory")
+    orgs, tokens = [], []
+
+    for i in range(num_orgs):
+        org = manager.create_organization(name=f"Org {i}", created_by=f"owner-{i}")
+        for j in range(members_per_org):
+            manager.add_member(org.id, f"user-{i}-{j}", OrganizationRole.VIEWER)
+        for j in range(invitations_per_org):
+            invitation = manager.create_invitation(org.id, f"invite-{i}-{j}@example.com",
+                                                   OrganizationRole.VIEWER, f"owner-{i}")
+            tokens.append(invitation.token)
+        orgs.append(org.id)
+
+    return manager, orgs, tokens
+
+
+def measure(fn, number):
+    """Best-of-three microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def run_benchmark(sizes, members_per_org=20, invitations_per_org=5, number=2000):
+    """Time each lookup at every data size"""
+    results = {}
+
+    for size in sizes:
+        manager, orgs, tokens = build_manager(size, members_per_org, invitations_per_org)
+        middle_org = orgs[len(orgs) // 2]
+        last_user = f"user-{len(orgs) // 2}-{members_per_org - 1}"
+        last_token = tokens[-1]
+
+        def add_remove():
+            manager.add_member(middle_org, "bench-user", OrganizationRole.EDITOR)
+            manager.remove_member(middle_org, "bench-user")
+
+        def create_revoke():
+            invitation = manager.create_invitation(middle_org, "bench@example.com",
+                                                   OrganizationRole.VIEWER, "bench")
+            manager.revoke_invitation(invitation.id)
+
+        results[size] = {
+            "get_member": measure(lambda: manager.get_member(middle_org, last_user), number),
+            "update_member_role": measure(
+                lambda: manager.update_member_role(middle_org, last_user, OrganizationRole.EDITOR), number),
+            "check_permission": measure(
+                lambda: manager.check_permission(last_user, middle_org, OrganizationRole.VIEWER), number),
+            "add_remove_member": measure(add_remove, number),
+            "get_invitation_by_token": measure(lambda: manager.get_invitation_by_token(last_token), number),
+            "get_organization_invitations": measure(
+                lambda: manager.get_organization_invitations(middle_org), number),
+            "create_revoke_invitation": measure(create_revoke, number),
+        }
+
+        # Deleting an organization only touches that organization's data
+        start = timeit.default_timer()
+        for org_id in orgs[:50]:
+            manager.delete_organization(org_id)
+        results[size]["delete_organization"] = (timeit.default_timer() - start) / min(50, len(orgs)) * 1e6
+
+        # Sweep cost scales with expired invitations, not total invitations
+        future = datetime.utcnow() + timedelta(days=30)
+        start = timeit.default_timer()
+        swept = manager.sweep_expired_invitations(now=future)
+        results[size]["sweep_per_invitation"] = (timeit.default_timer() - start) / max(swept, 1) * 1e6
+
+    return results
+
+
+def print_report(results):
+    sizes = sorted(results)
+    operations = list(results[sizes[0]])
+    header = f"{'operation (us/call)':<30}" + "".join(f"{size:>12}" for size in sizes) + f"{'growth':>10}"
+    print(header)
+    print("-" * len(header))
+
+    worst_growth = 0.0
+    for operation in operations:
+        values = [results[size][operation] for size in sizes]
+        growth = values[-1] / values[0] if values[0] else 0.0
+        if operation not in UNGATED_OPERATIONS:
+            worst_growth = max(worst_growth, growth)
+        print(f"{operation:<30}" + "".join(f"{value:>12.2f}" for value in values) + f"{growth:>9.1f}x")
+
+    return worst_growth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OrganizationManager lookups")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated organization counts")
+    parser.add_argument("--max-growth", type=float, default=3.0,
+                        help="Fail if any operation slows down more than this factor from smallest to largest size")
+    parser.add_argument("--json", dest="json_path", help="Write raw results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark([int(size) for size in args.sizes.split(",")])
+    worst_growth = print_report(results)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    exit(0 if worst_growth <= args.max_growth else 1)
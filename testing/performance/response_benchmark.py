@@ -0,0 +1,114 @@
+"""
+Response Writer Benchmark
+Measures per-response CPU cost and body size of the shared response writer
+against the per-handler pattern it replaced (five send_header calls and
+json.dumps(indent=2)) for small, medium and large payloads
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import response_writer
+from config import Config
+from response_writer import write_json
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+    """Handler wired to in-memory streams, skipping the socket setup of __init__"""
+
+    def __init__(self, accept_encoding=None):
+        self.wfile = io.BytesIO()
+        self.request_version = 'HTTP/1.1'
+        self.requestline = 'GET /api/bench HTTP/1.1'
+        self.command = 'GET'
+        self.headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def reset(self):
+        self.wfile.seek(0)
+        self.wfile.truncate()
+
+
+def legacy_write(handler, status, data):
+    """The handler boilerplate used before response_writer"""
+    handler.send_response(status)
+    handler.send_header('Content-type', 'application/json')
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    handler.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+    handler.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, X-Organization-Id')
+    handler.end_headers()
+    handler.wfile.write(json.dumps(data, indent=2).encode())
+
+
+def payloads():
+    task = {"id": "task-1", "status": "completed", "priority": "medium",
+            "response": {"agent": "code_generation", "output": "def handler():\n    return 42\n" * 4},
+            "context": {"user_id": "user-1", "organization_id": "org-1"}}
+    return {
+        "small": {"status": "healthy", "service": "12thhaus-spiritual", "version": "1.0.0", "authenticated": False},
+        "medium": task,
+        "large": {"tasks": [dict(task, id=f"task-{i}") for i in range(200)], "total": 200},
+    }
+
+
+def measure(fn, number):
+    """Best-of-three microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def run_benchmark(number=2000):
+    """Time each writer on each payload; returns {payload: {variant: {us, bytes}}}"""
+    results = {}
+    for name, data in payloads().items():
+        runs = {
+            "legacy": (BenchHandler(), legacy_write),
+            "writer": (BenchHandler(), write_json),
+            "writer_gzip": (BenchHandler('gzip, deflate'), write_json),
+        }
+        results[name] = {}
+        for variant, (handler, writer) in runs.items():
+            def once():
+                handler.reset()
+                handler._headers_buffer = []
+                writer(handler, 200, data)
+
+            once()
+            size = len(handler.wfile.getvalue())
+            results[name][variant] = {"us": measure(once, max(number // (20 if name == "large" else 1), 10)),
+                                      "bytes": size}
+    return results
+
+
+def print_report(results):
+    encoder = "orjson" if response_writer.orjson is not None else "json"
+    print(f"encoder: {encoder}, compression threshold: {Config.RESPONSE_COMPRESS_MIN_BYTES} bytes")
+    header = f"{'payload':<10}{'variant':<14}{'us/response':>14}{'bytes':>10}{'vs legacy':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, variants in results.items():
+        legacy = variants["legacy"]["us"]
+        for variant, result in variants.items():
+            speedup = legacy / result["us"] if result["us"] else 0.0
+            print(f"{name:<10}{variant:<14}{result['us']:>14.2f}{result['bytes']:>10}{speedup:>11.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the shared JSON response writer")
+    parser.add_argument("--number", type=int, default=2000, help="Responses per timing run")
+    parser.add_argument("--json", dest="json_path", help="Write raw results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.number)
+    print_report(results)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
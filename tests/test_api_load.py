@@ -0,0 +1,66 @@
+"""
+Tests for the Python API load-testing harness.
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testing.performance.api_load_test import HdrHistogram, evaluate, parse_mix, run_load_test
+
+THRESHOLDS = {"api_response_time_p95": 500, "api_response_time_p99": 1000,
+              "error_rate": 0.01, "success_rate": 0.99}
+
+
+def _result(requests, errors, p95, p99):
+    return {"requests": requests, "errors": errors, "error_rate": errors / requests,
+            "success_rate": 1 - errors / requests, "latency_ms": {"p95": p95, "p99": p99}}
+
+
+class TestHdrHistogram:
+    def test_percentiles_within_precision(self):
+        histogram = HdrHistogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+        assert histogram.percentile(50) == pytest.approx(50000, rel=0.001)
+        assert histogram.percentile(99) == pytest.approx(99000, rel=0.001)
+        assert histogram.percentile(100) == 100000
+
+    def test_merge(self):
+        first, second = HdrHistogram(), HdrHistogram()
+        first.record(1000)
+        second.record(3_000_000)
+        first.merge(second)
+        assert first.count == 2
+        assert first.summary_ms()["max"] == 3000.0
+
+
+class TestEvaluate:
+    def test_thresholds(self):
+        report = {"overall": _result(1000, 2, 120.0, 900.0),
+                  "endpoints": {"task": _result(100, 2, 700.0, 900.0)}}
+        evaluate(report, THRESHOLDS)
+
+        failed = {(check["scope"], check["check"]) for check in report["checks"] if not check["passed"]}
+        assert failed == {("task", "p95_ms"), ("task", "error_rate"), ("task", "success_rate")}
+        assert report["passed"] is False
+
+    def test_mix(self):
+        assert parse_mix("task=1,status=0,health") == {"task": 1.0, "health": 1.0}
+        with pytest.raises(ValueError):
+            parse_mix("nope=1")
+
+
+class TestLocalRun:
+    @pytest.mark.parametrize("model", ["closed", "open"])
+    def test_short_run_against_in_process_api(self, model):
+        report = run_load_test(model=model, concurrency=2, rate=40, duration=0.5, local=True, seed=3,
+                               thresholds=THRESHOLDS)
+
+        assert report["overall"]["requests"] > 0
+        assert report["overall"]["errors"] == 0
+        assert set(report["endpoints"]) == {"task", "status", "health", "organizations", "members"}
+        assert report["passed"] is True
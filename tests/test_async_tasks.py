@@ -0,0 +1,232 @@
+"""
+Tests for asynchronous /api/task jobs and webhook delivery.
+"""
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring import CoordinationManager
+from webhooks import SIGNATURE_HEADER, WebhookDispatcher, sign, validate_callback_url
+
+
+class StubReceiver(BaseHTTPRequestHandler):
+    """Records webhook deliveries; answers 503 to the first ``failures`` of them"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if server.redirect_to:
+            server.attempts += 1
+            self.send_response(307)
+            self.send_header('Location', server.redirect_to)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        with server.lock:
+            server.attempts += 1
+            failing = server.attempts <= server.failures
+            if not failing:
+                server.deliveries.append((dict(self.headers), json.loads(body)))
+                server.delivered.set()
+        self.send_response(503 if failing else 204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_receiver():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubReceiver)
+    httpd.lock = threading.Lock()
+    httpd.attempts = 0
+    httpd.failures = 0
+    httpd.redirect_to = None
+    httpd.deliveries = []
+    httpd.delivered = threading.Event()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/hook"
+    return httpd
+
+
+@pytest.fixture
+def receiver():
+    """Local receiver; loopback callbacks are allowed while it runs"""
+    httpd = _start_receiver()
+    with patch('webhooks.Config.WEBHOOK_ALLOW_PRIVATE_HOSTS', True):
+        yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestWebhookDispatcher:
+    def test_retries_until_delivered(self, receiver):
+        receiver.failures = 2
+        dispatcher = WebhookDispatcher(workers=1, max_retries=3, backoff_seconds=0.01, secret="s3cret")
+
+        assert dispatcher.dispatch(receiver.url, {"task_id": "t1"}).result(timeout=10)
+
+        headers, payload = receiver.deliveries[0]
+        assert payload == {"task_id": "t1"}
+        assert receiver.attempts == 3
+        assert headers[SIGNATURE_HEADER] == sign(b'{"task_id":"t1"}', "s3cret")
+        dispatcher.close()
+
+    def test_gives_up(self, receiver):
+        receiver.failures = 10
+        dispatcher = WebhookDispatcher(workers=1, max_retries=1, backoff_seconds=0.01)
+
+        assert dispatcher.dispatch(receiver.url, {}).result(timeout=10) is False
+        assert dispatcher.stats() == {"delivered": 0, "failed": 1}
+        dispatcher.close()
+
+    @pytest.mark.parametrize("url", ["ftp://example.com/x", "not a url", 42])
+    def test_invalid_callback_urls(self, url):
+        with pytest.raises(ValueError):
+            validate_callback_url(url)
+
+    def test_allowed_hosts(self):
+        with patch('webhooks.Config.WEBHOOK_ALLOWED_HOSTS', 'hooks.example.com'):
+            assert validate_callback_url("https://hooks.example.com/x")
+            with pytest.raises(ValueError):
+                validate_callback_url("https://elsewhere.example.com/x")
+
+    @pytest.mark.parametrize("url", ["http://127.0.0.1/hook", "http://localhost:8080/hook",
+                                     "http://169.254.169.254/latest/meta-data", "http://10.0.0.5/hook",
+                                     "http://192.168.1.1/hook", "http://[::1]/hook", "http://[::ffff:127.0.0.1]/hook",
+                                     "http://0.0.0.0/hook", "http://224.0.0.1/hook"])
+    def test_non_public_addresses_rejected(self, url):
+        with pytest.raises(ValueError):
+            validate_callback_url(url)
+
+    def test_public_address_accepted(self):
+        assert validate_callback_url("https://93.184.216.34/hook")
+
+    def test_connect_time_check_blocks_private_address(self):
+        # A host that passed validation but now resolves to loopback (DNS rebinding)
+        httpd = _start_receiver()
+        dispatcher = WebhookDispatcher(workers=1, max_retries=2, backoff_seconds=0.01)
+        try:
+            assert dispatcher.deliver(httpd.url, {"task_id": "t1"}) is False
+            assert httpd.attempts == 0
+            assert dispatcher.stats() == {"delivered": 0, "failed": 1}
+        finally:
+            dispatcher.close()
+            httpd.shutdown()
+            httpd.server_close()
+
+    def test_redirects_not_followed(self, receiver):
+        target = _start_receiver()
+        receiver.redirect_to = target.url
+        dispatcher = WebhookDispatcher(workers=1, max_retries=0)
+        try:
+            assert dispatcher.deliver(receiver.url, {"task_id": "t1"}) is False
+            assert receiver.attempts == 1
+            assert target.attempts == 0
+        finally:
+            dispatcher.close()
+            target.shutdown()
+            target.server_close()
+
+
+class TestCoordinatorCallbacks:
+    def test_finished_task_posts_result(self, receiver):
+        coordinator = CoordinationManager()
+        dispatcher = WebhookDispatcher(workers=1, max_retries=0)
+
+        async def work():
+            return {"answer": 42}
+
+        with patch('webhooks.get_webhook_dispatcher', return_value=dispatcher):
+            coordinator.submit(coordinator.coordinate_task("cb-1", work(), owner="user-1",
+                                                           callback_url=receiver.url))
+            assert receiver.delivered.wait(5)
+
+        _, payload = receiver.deliveries[0]
+        assert payload["task_id"] == "cb-1"
+        assert payload["status"] == "completed"
+        assert payload["result"] == {"answer": 42}
+        assert "owner" not in payload and "callback_url" not in payload
+        dispatcher.close()
+
+
+class TestAsyncEndpoint:
+    @pytest.fixture
+    def server(self, receiver):
+        import api.task as task_api
+
+        release = threading.Event()
+
+        async def process_task(task, priority, context, **kwargs):
+            await asyncio.to_thread(release.wait, 5)
+            return f"done: {task}", "completed"
+
+        agent = Mock()
+        agent.process_task_with_status = AsyncMock(side_effect=process_task)
+        coordinator = CoordinationManager()
+        dispatcher = WebhookDispatcher(workers=1, max_retries=0)
+        with patch.object(task_api, 'get_master_agent', return_value=agent, create=True), \
+             patch.object(task_api, 'get_coordinator', return_value=coordinator, create=True), \
+             patch('webhooks.get_webhook_dispatcher', return_value=dispatcher), \
+             patch('auth.vercel_auth.validate_jwt_token', return_value={"sub": "user-1"}):
+            httpd = ThreadingHTTPServer(("127.0.0.1", 0), task_api.handler)
+            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+            thread.start()
+            yield httpd.server_address[1], release
+            release.set()
+            httpd.shutdown()
+            httpd.server_close()
+            dispatcher.close()
+
+    def _request(self, port, method, path, payload=None):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        body = json.dumps(payload) if payload is not None else None
+        connection.request(method, path, body=body, headers={"Authorization": "Bearer t"})
+        response = connection.getresponse()
+        data = json.loads(response.read())
+        connection.close()
+        return response.status, data
+
+    def test_accepted_then_polled_and_delivered(self, server, receiver):
+        port, release = server
+        started = time.monotonic()
+        status, data = self._request(port, "POST", "/api/task?mode=async",
+                                     {"task": "heal", "callback_url": receiver.url})
+
+        assert status == 202
+        assert time.monotonic() - started < 2
+        task_id = data["task_id"]
+        assert data["status_url"] == f"/api/task/{task_id}"
+
+        status, polled = self._request(port, "GET", data["status_url"])
+        assert status == 200
+        assert polled["status"] in ("queued", "running")
+        assert "callback_url" not in polled
+
+        release.set()
+        assert receiver.delivered.wait(5)
+        status, polled = self._request(port, "GET", data["status_url"])
+        assert polled["status"] == "completed"
+        assert polled["result"]["response"] == "done: heal"
+        assert receiver.deliveries[0][1]["result"]["response"] == "done: heal"
+
+    def test_callback_requires_async_and_valid_url(self, server, receiver):
+        port, _ = server
+        status, _ = self._request(port, "POST", "/api/task", {"task": "heal", "callback_url": receiver.url})
+        assert status == 400
+        status, _ = self._request(port, "POST", "/api/task", {"task": "heal", "mode": "async",
+                                                              "callback_url": "file:///etc/passwd"})
+        assert status == 400
@@ -0,0 +1,186 @@
+"""
+Tests for the per-request AuthContext and the decorators that consume it.
+"""
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask, g
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.context import AuthContext, Permission, compile_roles, role_satisfies
+from auth.decorators import authenticated, optional_auth, organization_required, role_required
+from auth.organizations import OrganizationManager, OrganizationRole
+from auth.vercel_auth import authenticated_vercel, organization_required_vercel, role_required_vercel
+
+PAYLOAD = {
+    "sub": "user-1",
+    "email": "user@example.com",
+    "organizations": [
+        {"id": "org-1", "role": "editor"},
+        {"id": "org-2", "role": "admin"},
+        {"id": "org-1", "role": "admin"},
+        {"id": "org-3"},
+    ]
+}
+
+
+class TestAuthContext:
+    def test_role_map_built_once(self):
+        context = AuthContext(PAYLOAD)
+
+        assert context.roles_by_org == {"org-1": "editor", "org-2": "admin", "org-3": "viewer"}
+        assert context.default_organization_id == "org-1"
+        assert context.is_member("org-2")
+        assert not context.is_member("org-9")
+
+    def test_select_organization_sets_permissions(self):
+        context = AuthContext(PAYLOAD)
+
+        assert not context.select_organization("org-9")
+        assert context.permissions == Permission(0)
+
+        assert context.select_organization("org-1")
+        assert context.organization_role == "editor"
+        assert context.has_permission(Permission.WRITE)
+        assert not context.has_permission(Permission.MANAGE_MEMBERS)
+        assert context.has_permission(Permission.MANAGE_MEMBERS, org_id="org-2")
+        assert context.has_role(compile_roles(["editor", "admin"]))
+        assert not context.has_role(compile_roles(["admin", "owner"]))
+
+    def test_no_active_organization_has_no_role(self):
+        context = AuthContext(PAYLOAD)
+        assert compile_roles(["owner"]) == frozenset()
+        assert not context.has_role(compile_roles(["viewer", "editor", "admin"]))
+
+    @pytest.mark.parametrize("role,required,expected", [
+        ("admin", "viewer", True),
+        ("admin", "admin", True),
+        ("editor", "viewer", True),
+        ("editor", "admin", False),
+        ("viewer", "editor", False),
+        ("owner", "viewer", False),
+        ("admin", "owner", False),
+        (None, "viewer", False),
+    ])
+    def test_role_hierarchy(self, role, required, expected):
+        assert role_satisfies(role, required) is expected
+
+    def test_check_permission_uses_masks(self):
+        manager = OrganizationManager(storage_backend="memory")
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.add_member(org.id, "editor", OrganizationRole.EDITOR)
+
+        assert manager.check_permission("editor", org.id, OrganizationRole.VIEWER)
+        assert manager.check_permission("editor", org.id, OrganizationRole.EDITOR)
+        assert not manager.check_permission("editor", org.id, OrganizationRole.ADMIN)
+        assert not manager.check_permission("stranger", org.id, OrganizationRole.VIEWER)
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.fixture
+def valid_token():
+    with patch('auth.decorators.validate_jwt_token', return_value=PAYLOAD), \
+         patch('auth.vercel_auth.validate_jwt_token', return_value=PAYLOAD):
+        yield
+
+
+class TestFlaskDecorators:
+    def test_organization_and_role_from_context(self, app, valid_token):
+        @authenticated
+        @organization_required
+        @role_required("admin")
+        def endpoint():
+            return g.organization_id, g.auth_context.organization_role
+
+        headers = {"Authorization": "Bearer t", "X-Organization-Id": "org-2"}
+        with app.test_request_context(headers=headers):
+            assert endpoint() == ("org-2", "admin")
+
+        headers["X-Organization-Id"] = "org-1"
+        with app.test_request_context(headers=headers):
+            _, status = endpoint()
+            assert status == 403
+
+    def test_role_required_needs_the_context(self, app):
+        @role_required("admin")
+        def endpoint():
+            return "ok"
+
+        with app.test_request_context():
+            g.user_id = "user-1"
+            g.organization_id = "org-1"
+            g.organization_role = "admin"
+            _, status = endpoint()
+            assert status == 403
+
+    def test_non_member_organization_rejected(self, app, valid_token):
+        @authenticated
+        @organization_required
+        def endpoint():
+            return g.organization_id
+
+        headers = {"Authorization": "Bearer t", "X-Organization-Id": "org-9"}
+        with app.test_request_context(headers=headers):
+            _, status = endpoint()
+            assert status == 403
+
+    def test_context_built_without_authenticated(self, app):
+        @organization_required
+        def endpoint():
+            return g.organization_role
+
+        with app.test_request_context():
+            g.user_id = "user-1"
+            g.organizations = [{"id": "org-1", "role": "admin"}]
+            assert endpoint() == "admin"
+
+    def test_optional_auth_selects_member_organization_only(self, app, valid_token):
+        @optional_auth
+        def endpoint():
+            return getattr(g, 'organization_id', None)
+
+        with app.test_request_context(headers={"Authorization": "Bearer t", "X-Organization-Id": "org-3"}):
+            assert endpoint() == "org-3"
+            assert g.organization_role == "viewer"
+        with app.test_request_context(headers={"Authorization": "Bearer t", "X-Organization-Id": "org-9"}):
+            assert endpoint() is None
+
+
+class TestVercelDecorators:
+    def _handler(self, **headers):
+        handler = Mock()
+        handler.headers = {"Authorization": "Bearer t", **headers}
+        return handler
+
+    def test_authenticated_role_check(self, valid_token):
+        @authenticated_vercel
+        @organization_required_vercel
+        @role_required_vercel("admin", "editor")
+        def endpoint(handler):
+            return handler.organization_id, handler.organization_role
+
+        assert endpoint(self._handler()) == ("org-1", "editor")
+        assert endpoint(self._handler(**{"X-Organization-Id": "org-2"})) == ("org-2", "admin")
+
+        handler = self._handler(**{"X-Organization-Id": "org-3"})
+        assert endpoint(handler) is None
+        handler.send_response.assert_called_with(403)
+
+    def test_organization_required_defaults_to_first_organization(self):
+        @organization_required_vercel
+        def endpoint(handler):
+            return handler.organization_id, handler.organization_role
+
+        handler = Mock()
+        handler.user_id = "user-1"
+        handler.organization_id = None
+        handler.organizations = [{"id": "org-5", "role": "admin"}]
+        assert endpoint(handler) == ("org-5", "admin")
@@ -28,7 +28,7 @@ from auth.organizations import (
     OrganizationInvitation
 )
 from auth.vercel_auth import authenticated_vercel, optional_auth_vercel
-from auth.middleware import validate_jwt_token
+from auth.middleware import rejected_tokens, validate_jwt_token, verified_tokens
 from config import Config
 
 
@@ -48,6 +48,10 @@ class TestAuthenticationFlow(unittest.TestCase):
         })
         self.env_patcher.start()
         
+        # Each test verifies its token from scratch
+        verified_tokens.clear()
+        rejected_tokens.clear()
+        
         # Create test JWT payload
         self.test_payload = {
             'sub': 'test-user-123',
@@ -0,0 +1,208 @@
+"""
+Tests for request deadlines across the agent pipeline.
+"""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+from config import Config
+from deadline import Deadline, DeadlineExceeded
+from master_agent import AgentState, MasterAgent, TaskRequest, TaskResponse
+from specialist_agents import CodeGenerationAgent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _llm_response(content):
+    response = MagicMock()
+    response.content = content
+    return response
+
+
+async def _hang(*args, **kwargs):
+    await asyncio.sleep(30)
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_guards():
+    # Timeouts count against the breaker; keep them from leaking into other tests
+    with patch.dict(resilience._guards, clear=True):
+        yield
+
+
+class TestDeadline:
+    def test_remaining_and_child(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        clock.now += 4
+        assert deadline.remaining() == pytest.approx(6)
+
+        assert deadline.child(60) is deadline
+        assert deadline.child(None) is deadline
+        assert deadline.child(2).remaining() == pytest.approx(2)
+
+        clock.now += 10
+        assert deadline.expired
+        assert deadline.remaining() == 0
+
+    @pytest.mark.asyncio
+    async def test_run_cancels_the_call(self):
+        cancelled = asyncio.Event()
+
+        async def call():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await Deadline(0.05).run(call(), "llm")
+        assert exc_info.value.stage == "llm"
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_never_starts_the_call(self):
+        call = AsyncMock()
+        with pytest.raises(DeadlineExceeded):
+            await Deadline(0).run(call(), "route")
+
+    @pytest.mark.asyncio
+    async def test_call_timeouts_are_not_relabelled(self):
+        own = asyncio.TimeoutError("connect timeout")
+
+        async def call():
+            raise own
+
+        with pytest.raises(asyncio.TimeoutError) as exc_info:
+            await Deadline(30).run(call(), "llm")
+        assert exc_info.value is own
+
+        inner = DeadlineExceeded("synthesis")
+
+        async def nested():
+            raise inner
+
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await Deadline(30).run(nested(), "llm")
+        assert exc_info.value is inner
+
+
+class TestSpecialistDeadline:
+    @pytest.mark.asyncio
+    async def test_timeout_response(self):
+        agent = CodeGenerationAgent()
+        with patch.object(agent, 'llm') as mock_llm:
+            mock_llm.ainvoke = _hang
+            started = time.monotonic()
+            response = await agent.execute_task(TaskRequest(content="Write code"), deadline=Deadline(0.05))
+
+        assert time.monotonic() - started < 5
+        assert response.status == "timeout"
+        assert response.metadata["deadline_exceeded"] is True
+
+    @pytest.mark.asyncio
+    async def test_streamed_text_returned_as_partial(self):
+        from langchain_core.messages import AIMessageChunk
+
+        agent = CodeGenerationAgent()
+
+        async def astream(messages):
+            yield AIMessageChunk(content="Breathe in")
+            yield AIMessageChunk(content=", breathe out")
+            await asyncio.sleep(30)
+            yield AIMessageChunk(content=" never sent")
+
+        with patch.object(Config, 'AGENT_STREAMING', True):
+            with patch.object(agent, 'llm') as mock_llm:
+                mock_llm.astream = astream
+                response = await agent.execute_task(TaskRequest(content="Guide me"), deadline=Deadline(0.1))
+
+        assert response.status == "partial"
+        assert response.content == "Breathe in, breathe out"
+
+    @pytest.mark.asyncio
+    async def test_agent_timeout_from_config(self):
+        agent = CodeGenerationAgent()
+        with patch.dict(Config.AGENT_TIMEOUTS, {"code_generation": 0.05}):
+            with patch.object(agent, 'llm') as mock_llm:
+                mock_llm.ainvoke = _hang
+                response = await agent.execute_task(TaskRequest(content="Write code"))
+        assert response.status == "timeout"
+
+
+class TestPipelineDeadline:
+    @pytest.fixture
+    def master(self):
+        with patch.object(Config, 'validate', return_value=True):
+            master = MasterAgent()
+        return master
+
+    @pytest.mark.asyncio
+    async def test_slow_routing_falls_back_to_keywords(self, master):
+        master.llm = MagicMock()
+        master.llm.ainvoke = _hang
+        specialist = Mock()
+        specialist.execute_task = AsyncMock(side_effect=DeadlineExceeded("llm"))
+
+        with patch.object(master, '_get_specialist_agent', return_value=specialist) as get_agent, \
+             patch('master_agent.get_monitor'):
+            started = time.monotonic()
+            result = await master.process_task("Move our infrastructure to a new region", deadline=Deadline(0.05))
+
+        assert time.monotonic() - started < 5
+        get_agent.assert_called_once_with("deployment")
+        assert isinstance(result, str)
+
+    @pytest.mark.asyncio
+    async def test_specialist_gets_remaining_budget(self, master):
+        master.llm = MagicMock()
+        master.llm.ainvoke = AsyncMock(return_value=_llm_response("customer_operations"))
+        specialist = Mock()
+        specialist.execute_task = AsyncMock(return_value=TaskResponse(agent_type="customer_operations",
+                                                                      content="", status="timeout"))
+
+        with patch.object(master, '_get_specialist_agent', return_value=specialist), \
+             patch('master_agent.get_monitor'), \
+             patch.dict(Config.AGENT_TIMEOUTS, {"customer_operations": 2.0}):
+            result, outcome = await master.process_task_with_status("Help a seeker", deadline=Deadline(30))
+
+        agent_deadline = specialist.execute_task.call_args.kwargs["deadline"]
+        assert agent_deadline.remaining() <= 2.0
+        assert "ran out of time" in result
+        assert outcome == "timeout"
+
+    def test_partial_synthesis(self, master):
+        state = AgentState(task_request=TaskRequest(content="x"))
+        state.agent_responses.append(TaskResponse(agent_type="code_generation", content="half",
+                                                  status="partial"))
+        state = asyncio.run(master._synthesize_response(state))
+        assert state.final_response.startswith("half")
+        assert "time limit" in state.final_response
+
+
+class TestEdgeDeadline:
+    def test_header_only_shortens(self):
+        import api.task as task_api
+
+        handler = Mock()
+        for header, expected in (({}, 60), ({'X-Request-Timeout': '5'}, 5),
+                                 ({'X-Request-Timeout': '500'}, 60), ({'X-Request-Timeout': 'soon'}, 60)):
+            handler.headers = header
+            with patch.object(Config, 'TASK_DEADLINE_SECONDS', 60):
+                deadline = task_api.handler.request_deadline(handler)
+            assert deadline.budget == expected
@@ -0,0 +1,154 @@
+"""
+Tests for rolling-window health evaluation in AgentMonitor.
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring import AgentMonitor, RollingWindowCounter
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRollingWindowCounter:
+    """Test the bucketed counter"""
+
+    def test_totals_within_window(self):
+        clock = FakeClock()
+        counter = RollingWindowCounter(bucket_seconds=10, horizon_seconds=900, clock=clock)
+
+        counter.record_start()
+        counter.record_completion(True)
+        counter.record_start()
+        counter.record_completion(False)
+
+        totals = counter.totals(60)
+        assert totals == {"started": 2, "completed": 2, "failed": 1}
+
+    def test_events_age_out_of_window(self):
+        clock = FakeClock()
+        counter = RollingWindowCounter(bucket_seconds=10, horizon_seconds=900, clock=clock)
+
+        counter.record_completion(False)
+        clock.now += 120
+        counter.record_completion(True)
+
+        assert counter.totals(60)["failed"] == 0
+        assert counter.totals(300)["failed"] == 1
+        assert counter.totals(300)["completed"] == 2
+
+    def test_recycled_buckets_do_not_leak_old_counts(self):
+        clock = FakeClock()
+        counter = RollingWindowCounter(bucket_seconds=10, horizon_seconds=60, clock=clock)
+
+        counter.record_completion(False)
+        # Advance exactly one lap of the ring so the same slot is reused
+        clock.now += 60
+        counter.record_completion(True)
+
+        assert counter.totals(60) == {"started": 0, "completed": 1, "failed": 0}
+
+    def test_reset(self):
+        counter = RollingWindowCounter()
+        counter.record_start()
+        counter.reset()
+        assert counter.totals(900)["started"] == 0
+
+
+class TestWindowedSystemHealth:
+    """Test get_system_health against rolling windows"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def fresh_monitor(self, clock):
+        monitor = AgentMonitor()
+        monitor.system_window = RollingWindowCounter(clock=clock)
+        # Agent windows are created lazily; make them share the fake clock
+        original_start = monitor.record_task_start
+
+        def record_task_start(task_id, agent_type, task_content):
+            monitor.agent_windows.setdefault(agent_type, RollingWindowCounter(clock=clock))
+            return original_start(task_id, agent_type, task_content)
+
+        monitor.record_task_start = record_task_start
+        return monitor
+
+    def _run(self, monitor, count, failures, agent_type="test_agent"):
+        for i in range(count):
+            task_id = f"{agent_type}-{i}-{len(monitor.task_history)}"
+            monitor.record_task_start(task_id, agent_type, "Task")
+            monitor.record_task_completion(task_id, i >= failures, 1.0)
+
+    def test_old_failures_age_out(self, fresh_monitor, clock):
+        self._run(fresh_monitor, 10, failures=10)
+        assert fresh_monitor.get_system_health()["system_status"] == "unhealthy"
+        assert fresh_monitor.get_system_health()["agent_health"]["test_agent"]["status"] == "unhealthy"
+
+        # A day later the failures are outside every window
+        clock.now += 86400
+        health = fresh_monitor.get_system_health()
+        assert health["system_status"] == "healthy"
+        assert health["agent_health"]["test_agent"]["status"] == "healthy"
+        # All-time totals are still reported
+        assert health["total_requests"] == 10
+        assert health["success_rate"] == 0.0
+
+    def test_recent_failures_dominate(self, fresh_monitor, clock):
+        self._run(fresh_monitor, 10, failures=0)
+        clock.now += 600
+        self._run(fresh_monitor, 10, failures=5)
+
+        health = fresh_monitor.get_system_health()
+        assert health["system_status"] == "unhealthy"
+        assert health["windows"]["1m"]["error_rate"] == 0.5
+        assert health["windows"]["15m"]["completed"] == 20
+
+    def test_recent_tasks_uses_five_minute_window(self, fresh_monitor, clock):
+        self._run(fresh_monitor, 3, failures=0)
+        clock.now += 400
+        self._run(fresh_monitor, 2, failures=0)
+
+        assert fresh_monitor.get_system_health()["recent_tasks"] == 2
+
+    def test_configurable_thresholds(self, clock):
+        monitor = AgentMonitor(health_thresholds={
+            "warning_error_rate": 0.5,
+            "unhealthy_error_rate": 0.9,
+            "min_samples": 5
+        })
+        monitor.system_window = RollingWindowCounter(clock=clock)
+
+        # Below min_samples there is not enough evidence to degrade
+        for i in range(4):
+            monitor.record_task_start(f"t{i}", "agent", "Task")
+            monitor.record_task_completion(f"t{i}", False, 1.0)
+        assert monitor.get_system_health()["system_status"] == "healthy"
+
+        for i in range(4, 10):
+            monitor.record_task_start(f"t{i}", "agent", "Task")
+            monitor.record_task_completion(f"t{i}", True, 1.0)
+        # 4 failures out of 10 is under the relaxed warning threshold
+        assert monitor.get_system_health()["system_status"] == "healthy"
+
+    def test_reset_clears_windows(self, fresh_monitor):
+        self._run(fresh_monitor, 5, failures=5)
+        fresh_monitor.reset_metrics()
+
+        health = fresh_monitor.get_system_health()
+        assert health["system_status"] == "healthy"
+        assert health["recent_tasks"] == 0
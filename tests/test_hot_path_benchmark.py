@@ -0,0 +1,44 @@
+"""
+Tests for the orchestration hot path benchmark and its baseline comparison.
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testing.performance.hot_path_benchmark import (GROUPS, compare, load_baseline, run_benchmark,
+                                                    save_baseline)
+
+
+class TestCompare:
+    def test_flags_cases_over_threshold(self):
+        baseline = {"routing_prompt": 100.0, "search_sops[100]": 200.0, "get_member[10]": 0.2}
+        results = {"routing_prompt": 130.0, "search_sops[100]": 240.0, "get_member[10]": 0.4, "new_case": 5.0}
+
+        regressions = compare(results, baseline, threshold=0.25)
+
+        assert [regression["case"] for regression in regressions] == ["routing_prompt"]
+        assert regressions[0]["change"] == pytest.approx(0.3)
+
+    def test_baseline_round_trip(self, tmp_path):
+        path = str(tmp_path / "baselines" / "hot_paths.json")
+        assert load_baseline(path) is None
+        save_baseline(path, {"routing_prompt": 12.34567})
+        assert load_baseline(path) == {"routing_prompt": 12.346}
+
+
+class TestRun:
+    def test_quick_run_covers_every_group(self):
+        results = run_benchmark(GROUPS, sop_sizes=(5,), history_sizes=(10,), member_sizes=(5,), number=5)
+
+        for case in ("routing_prompt", "parse_routing[default]", "system_prompt[deployment]",
+                     "task_prompt[marketing_automation]", "search_sops[5]", "record_task[10]",
+                     "check_permission[5]", "validate_jwt[signature]", "validate_jwt[verified_cache]"):
+            assert results[case] > 0
+
+    def test_unknown_group(self):
+        with pytest.raises(ValueError):
+            run_benchmark(["nope"])
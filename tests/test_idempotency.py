@@ -0,0 +1,183 @@
+"""
+Tests for idempotency keys on POST /api/task.
+"""
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idempotency import (IdempotencyConflict, IdempotencyInProgress, IdempotencyStore,
+                         request_fingerprint)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestIdempotencyStore:
+    def test_first_claims_then_replays(self):
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="")
+        assert store.begin("k", "fp") is None
+        store.complete("k", 200, b'{"ok":true}')
+
+        stored = store.begin("k", "fp")
+        assert (stored.status, stored.body) == (200, b'{"ok":true}')
+        assert store.stats()["replayed"] == 1
+
+    def test_different_body_conflicts(self):
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="")
+        store.begin("k", "fp")
+        with pytest.raises(IdempotencyConflict):
+            store.begin("k", "other", timeout=0)
+        store.complete("k", 200, b'{}')
+        with pytest.raises(IdempotencyConflict):
+            store.begin("k", "other")
+
+    def test_fingerprint_ignores_key_order(self):
+        assert request_fingerprint({"a": 1, "b": [1, 2]}) == request_fingerprint({"b": [1, 2], "a": 1})
+        assert request_fingerprint({"a": 1}) != request_fingerprint({"a": 2})
+
+    def test_concurrent_duplicates_wait_for_first(self):
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="")
+        assert store.begin("k", "fp") is None
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            waiters = [pool.submit(store.begin, "k", "fp", 5) for _ in range(3)]
+            time.sleep(0.05)
+            store.complete("k", 200, b'"done"')
+            results = [waiter.result(timeout=5) for waiter in waiters]
+
+        assert all(result.body == b'"done"' for result in results)
+        assert store.stats()["executed"] == 1
+
+    def test_duplicate_times_out_while_running(self):
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="")
+        store.begin("k", "fp")
+        with pytest.raises(IdempotencyInProgress):
+            store.begin("k", "fp", timeout=0.01)
+
+    def test_failures_are_not_stored(self):
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="")
+        store.begin("k", "fp")
+        store.complete("k", 500, b'{"status":"error"}')
+        assert store.begin("k", "fp") is None
+        store.release("k")
+        assert store.begin("k", "fp") is None
+
+    def test_expiry(self):
+        clock = FakeClock()
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="", clock=clock)
+        store.begin("k", "fp")
+        store.complete("k", 200, b'{}')
+        clock.now += 61
+        assert store.begin("k", "fp") is None
+
+    def test_capacity_without_spill_drops_oldest(self):
+        store = IdempotencyStore(max_entries=2, ttl_seconds=60, spill_path="")
+        for key in ("a", "b", "c"):
+            store.begin(key, "fp")
+            store.complete(key, 200, key.encode())
+        assert store.stats()["in_memory"] == 2
+        assert store.begin("a", "fp") is None
+
+    def test_spill_to_sqlite(self, tmp_path):
+        clock = FakeClock()
+        store = IdempotencyStore(max_entries=2, ttl_seconds=60, spill_path=str(tmp_path / "idem.db"),
+                                 clock=clock)
+        for key in ("a", "b", "c"):
+            store.begin(key, "fp")
+            store.complete(key, 200, key.encode())
+
+        assert store.stats()["spilled"] == 1
+        assert store.begin("a", "fp").body == b"a"
+        clock.now += 61
+        assert store.purge_expired() == 1
+
+
+class TestTaskEndpoint:
+    @pytest.fixture
+    def server(self):
+        import api.task as task_api
+
+        started = threading.Event()
+        release = threading.Event()
+
+        async def process_task(task, priority, context, **kwargs):
+            started.set()
+            release.wait(5)
+            if task == "flaky" and agent.process_task_with_status.call_count == 1:
+                return "The AI service is busy right now. Please try again shortly.", "unavailable"
+            return f"done: {task}", "completed"
+
+        agent = Mock()
+        agent.process_task_with_status = AsyncMock(side_effect=process_task)
+        store = IdempotencyStore(max_entries=10, ttl_seconds=60, spill_path="", wait_seconds=5)
+        with patch.object(task_api, 'get_master_agent', return_value=agent, create=True), \
+             patch.object(task_api, 'get_idempotency_store', return_value=store), \
+             patch('auth.vercel_auth.validate_jwt_token', return_value={"sub": "user-1"}):
+            httpd = ThreadingHTTPServer(("127.0.0.1", 0), task_api.handler)
+            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+            thread.start()
+            yield httpd.server_address[1], agent, started, release
+            httpd.shutdown()
+            httpd.server_close()
+
+    def _post(self, port, task, key):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        connection.request("POST", "/api/task", body=json.dumps({"task": task}),
+                           headers={"Authorization": "Bearer t", "Idempotency-Key": key})
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        return response, data
+
+    def test_retries_run_once(self, server):
+        port, agent, started, release = server
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(self._post, port, "heal", "retry-1")
+            assert started.wait(5)
+            second = pool.submit(self._post, port, "heal", "retry-1")
+            time.sleep(0.05)
+            release.set()
+            responses = [first.result(timeout=5), second.result(timeout=5)]
+
+        replay, data = self._post(port, "heal", "retry-1")
+
+        assert agent.process_task_with_status.call_count == 1
+        assert [response.status for response, _ in responses] == [200, 200]
+        assert responses[0][1] == responses[1][1] == data
+        assert replay.headers["Idempotent-Replayed"] == "true"
+
+    def test_failed_run_is_not_replayed(self, server):
+        port, agent, _, release = server
+        release.set()
+        first, _ = self._post(port, "flaky", "retry-3")
+        retry, data = self._post(port, "flaky", "retry-3")
+
+        assert first.status == 503
+        assert retry.status == 200
+        assert json.loads(data)["response"] == "done: flaky"
+        assert retry.headers["Idempotent-Replayed"] is None
+        assert agent.process_task_with_status.call_count == 2
+
+    def test_key_reused_with_other_task(self, server):
+        port, _, _, release = server
+        release.set()
+        self._post(port, "heal", "retry-2")
+        response, data = self._post(port, "other", "retry-2")
+        assert response.status == 422
+        assert json.loads(data)["status"] == "error"
@@ -0,0 +1,159 @@
+"""
+Tests for the background expiry sweeper.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.org_storage import CachedOrganizationRepository, SQLiteOrganizationRepository
+from auth.organizations import OrganizationManager, OrganizationRole
+from auth.sweeper import ExpirySweeper
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "memory":
+        return OrganizationManager(storage_backend="memory")
+    repository = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")))
+    return OrganizationManager(repository=repository)
+
+
+def invite(manager, org, count, hours):
+    for i in range(count):
+        manager.create_invitation(org.id, f"{hours}-{i}@example.com", OrganizationRole.VIEWER,
+                                  "owner", expires_in_hours=hours)
+
+
+class TestRunOnce:
+    def test_sweeps_in_batches(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        invite(manager, org, 10, 1)
+        invite(manager, org, 2, 100)
+        sweeper = ExpirySweeper(manager, batch_size=3, batch_pause=0)
+
+        with patch.object(manager, "sweep_expired_invitations",
+                          wraps=manager.sweep_expired_invitations) as sweep:
+            result = sweeper.run_once(now=datetime.utcnow() + timedelta(hours=2))
+
+        assert result["invitations"] == 10
+        assert [call.args[1] for call in sweep.call_args_list] == [3, 3, 3, 3]
+        assert len(manager.get_organization_invitations(org.id, include_expired=True)) == 2
+        assert sweeper.stats()["invitations_swept"] == 10
+
+    def test_max_batches_leaves_rest_for_next_run(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        invite(manager, org, 5, 1)
+        sweeper = ExpirySweeper(manager, batch_size=2, max_batches=1, batch_pause=0)
+        later = datetime.utcnow() + timedelta(hours=2)
+
+        assert sweeper.run_once(now=later)["invitations"] == 2
+        assert sweeper.run_once(now=later)["invitations"] == 2
+        assert sweeper.run_once(now=later)["invitations"] == 1
+        assert sweeper.stats()["runs"] == 3
+
+    def test_nothing_expired(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        invite(manager, org, 3, 100)
+
+        result = ExpirySweeper(manager).run_once()
+
+        assert result["invitations"] == 0
+        assert len(manager.get_organization_invitations(org.id)) == 3
+
+
+class TestCachePurge:
+    def test_purges_expired_entries_in_order(self, tmp_path):
+        clock = FakeClock()
+        repository = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")),
+                                                  ttl_seconds=10, clock=clock)
+        manager = OrganizationManager(repository=repository)
+        orgs = [manager.create_organization(name=f"Org {i}", created_by="owner") for i in range(4)]
+        repository.clear()
+
+        for org in orgs[:2]:
+            manager.get_organization(org.id)
+        clock.now = 5
+        for org in orgs[2:]:
+            manager.get_organization(org.id)
+
+        clock.now = 12
+        assert repository.purge_expired_cache(limit=1) == 1
+        assert repository.purge_expired_cache() == 1
+        assert repository.stats()["entries"] == 2
+
+        clock.now = 20
+        assert ExpirySweeper(manager, batch_pause=0).run_once()["cache_entries"] == 2
+        assert repository.stats()["entries"] == 0
+
+    def test_overwritten_entries_not_purged_early(self, tmp_path):
+        clock = FakeClock()
+        repository = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")),
+                                                  ttl_seconds=10, clock=clock)
+        manager = OrganizationManager(repository=repository)
+        org = manager.create_organization(name="Org", created_by="owner")
+        clock.now = 8
+        manager.update_organization(org.id, name="Renamed")
+
+        clock.now = 11
+        repository.purge_expired_cache()
+
+        hits = repository.hits
+        assert manager.get_organization(org.id).name == "Renamed"
+        assert repository.hits == hits + 1
+
+    def test_expiry_queue_stays_bounded(self, tmp_path):
+        repository = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")),
+                                                  max_entries=5)
+        manager = OrganizationManager(repository=repository)
+        org = manager.create_organization(name="Org", created_by="owner")
+        for i in range(100):
+            manager.update_organization(org.id, name=f"Org {i}")
+
+        assert len(repository._expiry_queue) <= 10
+
+
+class TestThread:
+    def test_start_and_stop(self):
+        manager = OrganizationManager(storage_backend="memory")
+        org = manager.create_organization(name="Org", created_by="owner")
+        invite(manager, org, 3, -1)
+        sweeper = ExpirySweeper(manager, interval_seconds=0.01)
+
+        assert sweeper.start()
+        assert not sweeper.start()
+        deadline = time.time() + 2
+        while sweeper.stats()["invitations_swept"] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        sweeper.stop()
+
+        assert sweeper.stats()["invitations_swept"] == 3
+        assert not sweeper.running
+        assert manager.get_organization_invitations(org.id, include_expired=True) == []
+
+    def test_errors_are_counted(self):
+        manager = OrganizationManager(storage_backend="memory")
+        sweeper = ExpirySweeper(manager, interval_seconds=0.01)
+
+        with patch.object(manager, "sweep_expired_invitations", side_effect=RuntimeError("db down")):
+            sweeper.start()
+            deadline = time.time() + 2
+            while sweeper.stats()["errors"] == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            sweeper.stop()
+
+        assert sweeper.stats()["errors"] >= 1
@@ -0,0 +1,210 @@
+"""
+Tests for the JWKS cache used by auth.middleware, against a local stub JWKS server.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth.middleware as middleware
+from auth.jwks import JWKSCache, parse_max_age
+from auth.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _signing_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    public = jwk.construct(pem, algorithm='RS256').public_key().to_dict()
+    public.update({'kid': kid, 'use': 'sig'})
+    return pem, public
+
+
+class StubIdP:
+    """Serves a mutable JWKS document and counts requests"""
+
+    def __init__(self):
+        self.keys = []
+        self.cache_control = 'public, max-age=600'
+        self.fail = False
+        self.requests = 0
+        self.delay = 0.0
+
+        idp = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                idp.requests += 1
+                time.sleep(idp.delay)
+                if idp.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps({'keys': idp.keys}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', idp.cache_control)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def idp():
+    stub = StubIdP()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def configured(idp):
+    """Point auth.middleware at the stub IdP with a fresh cache"""
+    clock = FakeClock()
+    cache = JWKSCache(middleware._fetch_jwks, clock=clock)
+    with patch.object(middleware.logto_config, 'LOGTO_ENDPOINT', idp.endpoint), \
+         patch.object(middleware.logto_config, 'LOGTO_APP_ID', 'test-app'), \
+         patch.object(middleware, 'jwks_cache', cache), \
+         patch.object(middleware, 'verified_tokens', VerifiedTokenCache()):
+        yield cache, clock
+
+
+def _token(pem, kid, idp):
+    claims = {
+        'sub': 'user-1',
+        'aud': 'test-app',
+        'iss': f"{idp.endpoint}/oidc",
+        'exp': int(time.time()) + 3600
+    }
+    return jwt.encode(claims, pem, algorithm='RS256', headers={'kid': kid})
+
+
+class TestParseMaxAge:
+    def test_values(self):
+        assert parse_max_age('public, max-age=600') == 600
+        assert parse_max_age('s-maxage=10') == 10
+        assert parse_max_age('no-store') == 0
+        assert parse_max_age(None) is None
+        assert parse_max_age(object()) is None
+
+
+class TestTokenValidation:
+    def test_keys_fetched_once_across_requests(self, idp, configured):
+        pem, public = _signing_key('k1')
+        idp.keys = [public]
+        token = _token(pem, 'k1', idp)
+
+        for _ in range(5):
+            middleware.verified_tokens.clear()
+            assert middleware.validate_jwt_token(token)['sub'] == 'user-1'
+        assert idp.requests == 1
+
+    def test_unknown_kid_triggers_single_refetch(self, idp, configured):
+        cache, clock = configured
+        old_pem, old_public = _signing_key('old')
+        idp.keys = [old_public]
+        assert middleware.validate_jwt_token(_token(old_pem, 'old', idp))
+
+        # Key rotation: new kid appears before the cached set expires
+        new_pem, new_public = _signing_key('new')
+        idp.keys = [old_public, new_public]
+        clock.now += 60
+        assert middleware.validate_jwt_token(_token(new_pem, 'new', idp))
+        assert idp.requests == 2
+
+        # Unknown kids cannot force a refetch storm
+        assert middleware.validate_jwt_token(_token(new_pem, 'bogus', idp)) is None
+        assert middleware.validate_jwt_token(_token(new_pem, 'bogus', idp)) is None
+        assert idp.requests == 2
+
+    def test_last_known_good_served_during_outage(self, idp, configured):
+        cache, clock = configured
+        pem, public = _signing_key('k1')
+        idp.keys = [public]
+        token = _token(pem, 'k1', idp)
+        assert middleware.validate_jwt_token(token)
+
+        idp.fail = True
+        clock.now += 601
+        middleware.verified_tokens.clear()
+        assert middleware.validate_jwt_token(token)['sub'] == 'user-1'
+        assert cache.stats()['stale'] is True
+        assert cache.failure_count == 1
+
+
+class TestJWKSCache:
+    def test_cache_control_sets_expiry_and_refreshes_ahead(self, idp):
+        clock = FakeClock()
+        idp.keys = [{'kid': 'a', 'kty': 'RSA'}]
+        idp.cache_control = 'max-age=100'
+        cache = JWKSCache(lambda: _fetch_from(idp), clock=clock)
+
+        cache.get_key('a')
+        clock.now += 50
+        cache.get_key('a')
+        assert idp.requests == 1
+
+        # Inside the refresh-ahead window the current keys are served while a thread refetches
+        clock.now += 35
+        assert cache.get_key('a') is not None
+        for _ in range(50):
+            if idp.requests == 2 and not cache._refreshing:
+                break
+            time.sleep(0.01)
+        assert idp.requests == 2
+
+    def test_concurrent_misses_share_one_fetch(self, idp):
+        idp.keys = [{'kid': 'a', 'kty': 'RSA'}]
+        idp.delay = 0.1
+        cache = JWKSCache(lambda: _fetch_from(idp))
+
+        threads = [threading.Thread(target=cache.get_key, args=('a',)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert idp.requests == 1
+
+    def test_no_keys_and_idp_down(self, idp):
+        idp.fail = True
+        cache = JWKSCache(lambda: _fetch_from(idp))
+        assert cache.get_jwks() is None
+        assert cache.get_key('a') is None
+
+
+def _fetch_from(idp):
+    import requests
+    response = requests.get(f"{idp.endpoint}/oidc/jwks", timeout=5)
+    response.raise_for_status()
+    return response.json(), response.headers.get('Cache-Control')
@@ -0,0 +1,269 @@
+"""
+Tests for the organization repository backends and the write-through cache.
+"""
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.org_storage import (
+    CachedOrganizationRepository,
+    MemoryOrganizationRepository,
+    PostgresOrganizationRepository,
+    SQLiteOrganizationRepository,
+    create_repository
+)
+from auth.organizations import OrganizationManager, OrganizationRole
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _postgres_repository():
+    dsn = os.getenv("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL not set")
+    try:
+        repository = PostgresOrganizationRepository(dsn, min_connections=1, max_connections=4)
+    except Exception as e:
+        pytest.skip(f"Postgres unavailable: {e}")
+    with repository._cursor() as cursor:
+        cursor.execute("TRUNCATE auth_organizations, auth_organization_members, auth_organization_invitations")
+    return repository
+
+
+@pytest.fixture(params=["memory", "sqlite", "cached_sqlite", "postgres"])
+def repository(request, tmp_path):
+    if request.param == "memory":
+        repo = MemoryOrganizationRepository()
+    elif request.param == "sqlite":
+        repo = SQLiteOrganizationRepository(str(tmp_path / "orgs.db"))
+    elif request.param == "cached_sqlite":
+        repo = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")))
+    else:
+        repo = _postgres_repository()
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def manager(repository):
+    return OrganizationManager(repository=repository)
+
+
+class TestRepositoryContract:
+    """Every backend behaves the same through OrganizationManager"""
+
+    def test_organization_round_trip(self, manager):
+        org = manager.create_organization(name="Sacred Circle", created_by="owner",
+                                          description="Weekly", metadata={"tier": "pro"})
+        manager.update_organization(org.id, name="Sacred Circle II")
+
+        stored = manager.get_organization(org.id)
+        assert stored.name == "Sacred Circle II"
+        assert stored.metadata == {"tier": "pro"}
+        assert isinstance(stored.created_at, datetime)
+
+    def test_membership(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        manager.update_member_role(org.id, "u1", OrganizationRole.EDITOR)
+
+        assert manager.get_member(org.id, "u1").role == OrganizationRole.EDITOR
+        assert [m.user_id for m in manager.get_organization_members(org.id)] == ["owner", "u1"]
+        assert [o.id for o, _ in manager.get_user_organizations("u1")] == [org.id]
+
+        assert manager.remove_member(org.id, "u1")
+        assert manager.get_member(org.id, "u1") is None
+        assert manager.get_user_organizations("u1") == []
+
+    def test_invitations(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        invitation = manager.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER, "owner")
+
+        member = manager.accept_invitation(invitation.token, "invitee")
+        assert member.role == OrganizationRole.VIEWER
+
+        stored = manager.get_invitation_by_token(invitation.token)
+        assert stored.accepted_by == "invitee"
+        assert manager.get_organization_invitations(org.id) == []
+        assert len(manager.get_organization_invitations(org.id, include_expired=True)) == 1
+
+        assert manager.revoke_invitation(invitation.id)
+        assert manager.get_invitation_by_token(invitation.token) is None
+
+    def test_sweep_expired(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        for hours in (1, 2, 100):
+            manager.create_invitation(org.id, f"{hours}@example.com", OrganizationRole.VIEWER,
+                                      "owner", expires_in_hours=hours)
+
+        later = datetime.utcnow() + timedelta(hours=3)
+        assert manager.sweep_expired_invitations(now=later, limit=1) == 1
+        assert manager.sweep_expired_invitations(now=later) == 1
+        assert len(manager.get_organization_invitations(org.id, include_expired=True)) == 1
+
+    def test_delete_organization_cascades(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        invitation = manager.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER, "owner")
+
+        assert manager.delete_organization(org.id)
+        assert not manager.delete_organization(org.id)
+        assert manager.get_organization(org.id) is None
+        assert manager.get_user_organizations("u1") == []
+        assert manager.get_invitation_by_token(invitation.token) is None
+
+
+class TestPersistence:
+    def test_sqlite_survives_new_manager(self, tmp_path):
+        path = str(tmp_path / "orgs.db")
+        first = OrganizationManager(repository=SQLiteOrganizationRepository(path))
+        org = first.create_organization(name="Org", created_by="owner")
+
+        second = OrganizationManager(repository=SQLiteOrganizationRepository(path))
+        assert second.get_member(org.id, "owner").role == OrganizationRole.ADMIN
+
+    def test_sqlite_transaction_rolls_back(self, tmp_path):
+        repo = SQLiteOrganizationRepository(str(tmp_path / "orgs.db"))
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+
+        with pytest.raises(RuntimeError):
+            with repo.transaction():
+                manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+                raise RuntimeError("abort")
+
+        assert manager.get_member(org.id, "u1") is None
+
+
+class TestWriteThroughCache:
+    @pytest.fixture
+    def cached(self, tmp_path):
+        clock = FakeClock()
+        backend = SQLiteOrganizationRepository(str(tmp_path / "orgs.db"))
+        return CachedOrganizationRepository(backend, ttl_seconds=30, clock=clock), backend, clock
+
+    def test_reads_served_from_cache(self, cached):
+        repo, backend, clock = cached
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+
+        repo.clear()
+        before = repo.stats()
+        for _ in range(5):
+            manager.check_permission("owner", org.id, OrganizationRole.VIEWER)
+        assert repo.stats()["misses"] - before["misses"] == 1
+        assert repo.stats()["hits"] - before["hits"] == 4
+
+    def test_writes_update_cached_reads(self, cached):
+        repo, backend, clock = cached
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.get_organization_members(org.id)
+
+        manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        assert len(manager.get_organization_members(org.id)) == 2
+        manager.update_member_role(org.id, "u1", OrganizationRole.ADMIN)
+        assert manager.get_member(org.id, "u1").role == OrganizationRole.ADMIN
+
+    def test_failed_write_leaves_cached_record_unchanged(self, cached, monkeypatch):
+        repo, backend, clock = cached
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        manager.get_member(org.id, "u1")
+
+        def failing_save(member):
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(backend, "save_member", failing_save)
+        with pytest.raises(RuntimeError):
+            manager.update_member_role(org.id, "u1", OrganizationRole.ADMIN)
+
+        assert manager.get_member(org.id, "u1").role == OrganizationRole.VIEWER
+        assert not manager.check_permission("u1", org.id, OrganizationRole.ADMIN)
+
+    def test_external_changes_visible_after_ttl_or_invalidation(self, cached):
+        repo, backend, clock = cached
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+        assert manager.get_member(org.id, "u1") is None
+
+        # Another instance writes directly to the shared database
+        OrganizationManager(repository=backend).add_member(org.id, "u1", OrganizationRole.VIEWER)
+        assert manager.get_member(org.id, "u1") is None
+
+        repo.invalidate_organization(org.id)
+        assert manager.get_member(org.id, "u1") is not None
+
+        backend.delete_member(org.id, "u1")
+        clock.now += 31
+        assert manager.get_member(org.id, "u1") is None
+
+    def test_rollback_discards_only_its_writes(self, cached):
+        repo, backend, clock = cached
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+        other = manager.create_organization(name="Other", created_by="owner")
+        manager.get_organization_members(other.id)
+
+        with pytest.raises(RuntimeError):
+            with repo.transaction():
+                manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+                assert manager.get_member(org.id, "u1") is not None
+                raise RuntimeError("abort")
+
+        assert manager.get_member(org.id, "u1") is None
+        before = repo.stats()
+        manager.get_organization_members(other.id)
+        assert repo.stats()["hits"] - before["hits"] == 1
+
+    def test_uncommitted_writes_invisible_to_other_threads(self, cached):
+        repo, backend, clock = cached
+        manager = OrganizationManager(repository=repo)
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.get_organization_members(org.id)
+
+        def other_thread_members():
+            seen = []
+            reader = threading.Thread(target=lambda: seen.append(len(manager.get_organization_members(org.id))))
+            reader.start()
+            reader.join()
+            return seen[0]
+
+        with repo.transaction():
+            manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+            assert len(manager.get_organization_members(org.id)) == 2
+            assert other_thread_members() == 1
+
+        assert other_thread_members() == 2
+
+
+class TestCreateRepository:
+    def test_backend_names(self, tmp_path, monkeypatch):
+        from config import Config
+
+        monkeypatch.setattr(Config, "ORG_SQLITE_PATH", str(tmp_path / "orgs.db"))
+
+        assert isinstance(create_repository("memory"), MemoryOrganizationRepository)
+        sqlite_repo = create_repository("sqlite")
+        assert isinstance(sqlite_repo, CachedOrganizationRepository)
+        assert isinstance(sqlite_repo.backend, SQLiteOrganizationRepository)
+        with pytest.raises(ValueError):
+            create_repository("mongodb")
+
+    def test_postgres_placeholder_rewrite(self):
+        sql, count = PostgresOrganizationRepository._to_postgres("SELECT a FROM t WHERE x = ? AND y = ?")
+        assert sql == "SELECT a FROM t WHERE x = $1 AND y = $2"
+        assert count == 2
@@ -0,0 +1,273 @@
+"""
+Tests for bulk member and invitation operations.
+"""
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.org_storage import CachedOrganizationRepository, SQLiteOrganizationRepository
+from auth.organizations import OrganizationManager, OrganizationRole
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "memory":
+        return OrganizationManager(storage_backend="memory")
+    repository = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")))
+    return OrganizationManager(repository=repository)
+
+
+@pytest.fixture
+def org(manager):
+    return manager.create_organization(name="Org", created_by="owner")
+
+
+class TestAddMembers:
+    def test_adds_and_reports_per_item(self, manager, org):
+        manager.add_member(org.id, "existing", OrganizationRole.VIEWER)
+        items = [{"user_id": f"u{i}", "role": "viewer"} for i in range(50)]
+        items += [{"user_id": "existing", "role": "editor"}, {"user_id": "owner", "role": "admin"}]
+
+        results = manager.add_members(org.id, items, invited_by="owner")
+
+        assert [r.status for r in results[-2:]] == ["updated", "unchanged"]
+        assert all(r.status == "added" for r in results[:50])
+        assert len(manager.get_organization_members(org.id)) == 52
+        assert manager.get_member(org.id, "existing").role == OrganizationRole.EDITOR
+        assert [o.id for o, _ in manager.get_user_organizations("u7")] == [org.id]
+
+    def test_invalid_item_rejects_batch(self, manager, org):
+        results = manager.add_members(org.id, [
+            {"user_id": "u1", "role": "viewer"},
+            {"user_id": "u2", "role": "superuser"},
+            {"user_id": "u1", "role": "editor"},
+            {"role": "viewer"},
+        ])
+
+        assert [r.status for r in results] == ["skipped", "invalid", "invalid", "invalid"]
+        assert results[2].error == "Duplicate user_id in request"
+        assert manager.get_member(org.id, "u1") is None
+
+    def test_partial_mode_applies_valid_items(self, manager, org):
+        results = manager.add_members(org.id, [
+            {"user_id": "u1", "role": "viewer"},
+            {"user_id": "u2", "role": "superuser"},
+        ], all_or_nothing=False)
+
+        assert [r.success for r in results] == [True, False]
+        assert manager.get_member(org.id, "u1") is not None
+
+    def test_unknown_organization(self, manager):
+        assert manager.add_members("missing", [{"user_id": "u1", "role": "viewer"}]) is None
+
+    def test_cannot_demote_the_last_admin(self, manager, org):
+        results = manager.add_members(org.id, [{"user_id": "owner", "role": "viewer"},
+                                               {"user_id": "u1", "role": "editor"}])
+
+        assert results[0].error == "Organization must keep at least one admin"
+        assert manager.get_member(org.id, "owner").role == OrganizationRole.ADMIN
+        assert manager.get_member(org.id, "u1") is None
+
+    def test_demotion_allowed_when_batch_adds_an_admin(self, manager, org):
+        results = manager.add_members(org.id, [{"user_id": "owner", "role": "viewer"},
+                                               {"user_id": "u1", "role": "admin"}])
+
+        assert [r.status for r in results] == ["updated", "added"]
+        assert manager.get_member(org.id, "owner").role == OrganizationRole.VIEWER
+
+    def test_protected_members_keep_their_role(self, manager, org):
+        manager.add_member(org.id, "admin2", OrganizationRole.ADMIN)
+        results = manager.add_members(org.id, [{"user_id": "owner", "role": "viewer"}],
+                                      protected_user_ids=("owner",))
+
+        assert results[0].error == "Cannot change your own role"
+        assert manager.get_member(org.id, "owner").role == OrganizationRole.ADMIN
+
+
+class TestUpdateMemberRoles:
+    def test_updates_existing_members(self, manager, org):
+        manager.add_members(org.id, [{"user_id": f"u{i}", "role": "viewer"} for i in range(3)])
+
+        results = manager.update_member_roles(org.id, [
+            {"user_id": "u0", "role": "editor"},
+            {"user_id": "u1", "role": OrganizationRole.ADMIN},
+            {"user_id": "u2", "role": "viewer"},
+        ])
+
+        assert [r.status for r in results] == ["updated", "updated", "unchanged"]
+        assert manager.get_member(org.id, "u1").role == OrganizationRole.ADMIN
+
+    def test_missing_and_protected_members(self, manager, org):
+        results = manager.update_member_roles(org.id, [
+            {"user_id": "ghost", "role": "editor"},
+            {"user_id": "owner", "role": "viewer"},
+        ], protected_user_ids=("owner",))
+
+        assert [r.error for r in results] == ["Member not found", "Cannot change your own role"]
+
+    def test_keeps_an_admin(self, manager, org):
+        manager.add_member(org.id, "admin2", OrganizationRole.ADMIN)
+        results = manager.update_member_roles(org.id, [
+            {"user_id": "owner", "role": "viewer"},
+            {"user_id": "admin2", "role": "editor"},
+        ])
+
+        assert all(r.error == "Organization must keep at least one admin" for r in results)
+        assert manager.get_member(org.id, "owner").role == OrganizationRole.ADMIN
+
+
+class TestCreateInvitations:
+    def test_creates_invitations(self, manager, org):
+        results = manager.create_invitations(org.id, [
+            {"email": f"user{i}@example.com", "role": "viewer"} for i in range(20)
+        ], created_by="owner")
+
+        assert all(r.status == "created" for r in results)
+        assert len(manager.get_organization_invitations(org.id)) == 20
+        assert manager.get_invitation_by_token(results[5].invitation.token).email == "user5@example.com"
+
+    def test_validation(self, manager, org):
+        results = manager.create_invitations(org.id, [
+            {"email": "not-an-email", "role": "viewer"},
+            {"email": "a@example.com", "role": "admin"},
+            {"email": "b@example.com", "role": "viewer"},
+            {"email": "B@example.com", "role": "viewer"},
+        ], created_by="editor", assignable_roles=(OrganizationRole.VIEWER,), all_or_nothing=False)
+
+        assert [r.status for r in results] == ["invalid", "invalid", "created", "invalid"]
+        assert [i.email for i in manager.get_organization_invitations(org.id)] == ["b@example.com"]
+
+
+class TestAtomicWrites:
+    def test_sqlite_batch_rolls_back_on_failure(self, tmp_path):
+        repository = SQLiteOrganizationRepository(str(tmp_path / "orgs.db"))
+        manager = OrganizationManager(repository=repository)
+        org = manager.create_organization(name="Org", created_by="owner")
+
+        original = repository._execute_many
+
+        def fail_after_write(name, rows):
+            original(name, rows)
+            raise RuntimeError("disk full")
+
+        with patch.object(repository, "_execute_many", side_effect=fail_after_write):
+            with pytest.raises(RuntimeError):
+                manager.add_members(org.id, [{"user_id": f"u{i}", "role": "viewer"} for i in range(10)])
+
+        assert len(manager.get_organization_members(org.id)) == 1
+
+
+@pytest.fixture
+def client():
+    from api.organizations import organizations_bp
+
+    manager = OrganizationManager(storage_backend="memory")
+    org = manager.create_organization(name="Org", created_by="admin-user")
+    manager.add_member(org.id, "editor-user", OrganizationRole.EDITOR)
+
+    app = Flask(__name__)
+    app.register_blueprint(organizations_bp)
+
+    def claims(user_id, role):
+        return {"sub": user_id, "organizations": [{"id": org.id, "role": role}]}
+
+    with patch('api.organizations.get_organization_manager', return_value=manager):
+        yield app.test_client(), manager, org, claims
+
+
+class TestBulkEndpoints:
+    def _post(self, client, path, payload, claims, method="post"):
+        with patch('auth.decorators.validate_jwt_token', return_value=claims):
+            return getattr(client, method)(path, json=payload, headers={"Authorization": "Bearer t"})
+
+    def test_add_members(self, client):
+        http, manager, org, claims = client
+        response = self._post(http, f"/organizations/{org.id}/members/bulk",
+                              {"members": [{"user_id": f"u{i}", "role": "viewer"} for i in range(500)]},
+                              claims("admin-user", "admin"))
+
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body["succeeded"] == 500 and body["applied"]
+        assert len(manager.get_organization_members(org.id)) == 502
+
+    def test_rejected_batch_is_422(self, client):
+        http, manager, org, claims = client
+        response = self._post(http, f"/organizations/{org.id}/members/bulk",
+                              {"members": [{"user_id": "u1", "role": "viewer"}, {"user_id": "u2", "role": "x"}]},
+                              claims("admin-user", "admin"))
+
+        assert response.status_code == 422
+        body = response.get_json()
+        assert [item["status"] for item in body["results"]] == ["skipped", "invalid"]
+        assert manager.get_member(org.id, "u1") is None
+
+    def test_partial_success_is_207(self, client):
+        http, manager, org, claims = client
+        response = self._post(http, f"/organizations/{org.id}/members/bulk",
+                              {"members": [{"user_id": "u1", "role": "viewer"}, {"user_id": "u2", "role": "x"}],
+                               "atomic": False},
+                              claims("admin-user", "admin"))
+
+        assert response.status_code == 207
+        assert manager.get_member(org.id, "u1") is not None
+
+    def test_add_members_protects_caller(self, client):
+        http, manager, org, claims = client
+        manager.add_member(org.id, "admin2", OrganizationRole.ADMIN)
+        response = self._post(http, f"/organizations/{org.id}/members/bulk",
+                              {"members": [{"user_id": "admin-user", "role": "viewer"}]},
+                              claims("admin-user", "admin"))
+
+        assert response.status_code == 422
+        assert response.get_json()["results"][0]["error"] == "Cannot change your own role"
+        assert manager.get_member(org.id, "admin-user").role == OrganizationRole.ADMIN
+
+    def test_update_roles_protects_caller(self, client):
+        http, manager, org, claims = client
+        response = self._post(http, f"/organizations/{org.id}/members/bulk",
+                              {"members": [{"user_id": "admin-user", "role": "viewer"}]},
+                              claims("admin-user", "admin"), method="patch")
+
+        assert response.status_code == 422
+        assert response.get_json()["results"][0]["error"] == "Cannot change your own role"
+
+    def test_editor_invites_viewers_only(self, client):
+        http, manager, org, claims = client
+        response = self._post(http, f"/organizations/{org.id}/invitations/bulk",
+                              {"invitations": [{"email": "a@example.com", "role": "viewer"},
+                                               {"email": "b@example.com", "role": "admin"}]},
+                              claims("editor-user", "editor"))
+
+        assert response.status_code == 422
+        assert response.get_json()["results"][1]["error"] == "Cannot invite with role admin"
+
+        response = self._post(http, f"/organizations/{org.id}/invitations/bulk",
+                              {"invitations": [{"email": "a@example.com", "role": "viewer"}]},
+                              claims("editor-user", "editor"))
+        assert response.status_code == 201
+        assert "invitation_url" in response.get_json()["results"][0]
+
+    def test_organization_must_match_context(self, client):
+        http, manager, org, claims = client
+        other = manager.create_organization(name="Other", created_by="someone")
+        response = self._post(http, f"/organizations/{other.id}/members/bulk",
+                              {"members": [{"user_id": "u1", "role": "viewer"}]},
+                              claims("admin-user", "admin"))
+
+        assert response.status_code == 403
+        assert manager.get_member(other.id, "u1") is None
+
+    def test_batch_size_limit(self, client):
+        http, manager, org, claims = client
+        with patch('api.organizations.Config.ORG_BULK_MAX_ITEMS', 2):
+            response = self._post(http, f"/organizations/{org.id}/members/bulk",
+                                  {"members": [{"user_id": f"u{i}", "role": "viewer"} for i in range(3)]},
+                                  claims("admin-user", "admin"))
+        assert response.status_code == 413
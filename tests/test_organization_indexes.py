@@ -0,0 +1,104 @@
+"""
+Tests for OrganizationManager membership and invitation indexes.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.organizations import OrganizationManager, OrganizationRole
+
+
+@pytest.fixture
+def manager():
+    return OrganizationManager(storage_backend="memory")
+
+
+class TestMembershipIndex:
+    def test_re_adding_member_does_not_duplicate(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        manager.add_member(org.id, "u1", OrganizationRole.EDITOR)
+
+        members = manager.get_organization_members(org.id)
+        assert [m.user_id for m in members] == ["owner", "u1"]
+        assert manager.get_member(org.id, "u1").role == OrganizationRole.EDITOR
+        assert len(manager.get_user_organizations("u1")) == 1
+
+    def test_remove_member_updates_user_index(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        manager.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        assert manager.remove_member(org.id, "u1")
+
+        assert manager.get_member(org.id, "u1") is None
+        assert manager.get_user_organizations("u1") == []
+        assert not manager.update_member_role(org.id, "u1", OrganizationRole.ADMIN)
+
+    def test_delete_organization_cleans_indexes(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        keep = manager.create_organization(name="Keep", created_by="owner")
+        invitation = manager.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER, "owner")
+        kept = manager.create_invitation(keep.id, "b@example.com", OrganizationRole.VIEWER, "owner")
+
+        assert manager.delete_organization(org.id)
+
+        assert [o.id for o, _ in manager.get_user_organizations("owner")] == [keep.id]
+        assert manager.get_invitation_by_token(invitation.token) is None
+        assert manager.get_invitation_by_token(kept.token) is not None
+        assert manager.get_organization_invitations(org.id) == []
+
+
+class TestInvitationIndexes:
+    def test_org_invitation_index(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        other = manager.create_organization(name="Other", created_by="owner")
+        first = manager.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER, "owner")
+        manager.create_invitation(other.id, "b@example.com", OrganizationRole.VIEWER, "owner")
+
+        assert [i.id for i in manager.get_organization_invitations(org.id)] == [first.id]
+
+        assert manager.revoke_invitation(first.id)
+        assert manager.get_organization_invitations(org.id) == []
+        assert manager.get_invitation_by_token(first.token) is None
+        assert not manager.revoke_invitation(first.id)
+
+    def test_expired_invitation_not_returned_by_token(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        invitation = manager.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER,
+                                               "owner", expires_in_hours=0)
+        assert manager.get_invitation_by_token(invitation.token) is None
+
+
+class TestInvitationSweep:
+    def test_sweep_removes_only_expired(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        short = manager.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER,
+                                          "owner", expires_in_hours=1)
+        long = manager.create_invitation(org.id, "b@example.com", OrganizationRole.VIEWER,
+                                         "owner", expires_in_hours=100)
+
+        removed = manager.sweep_expired_invitations(now=datetime.utcnow() + timedelta(hours=2))
+
+        assert removed == 1
+        remaining = manager.get_organization_invitations(org.id, include_expired=True)
+        assert [i.id for i in remaining] == [long.id]
+        assert short.id not in manager.repository._invitations
+
+    def test_sweep_skips_revoked_and_respects_limit(self, manager):
+        org = manager.create_organization(name="Org", created_by="owner")
+        invitations = [
+            manager.create_invitation(org.id, f"{i}@example.com", OrganizationRole.VIEWER,
+                                      "owner", expires_in_hours=1)
+            for i in range(5)
+        ]
+        manager.revoke_invitation(invitations[0].id)
+        later = datetime.utcnow() + timedelta(hours=2)
+
+        assert manager.sweep_expired_invitations(now=later, limit=2) == 2
+        assert manager.sweep_expired_invitations(now=later) == 2
+        assert manager.repository._invitation_expiry == []
+        assert manager.get_organization_invitations(org.id, include_expired=True) == []
@@ -0,0 +1,154 @@
+"""
+Tests for cursor pagination and field projection of organization listings.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.org_storage import CachedOrganizationRepository, SQLiteOrganizationRepository
+from auth.organizations import (
+    OrganizationManager,
+    OrganizationRole,
+    decode_cursor,
+    encode_cursor,
+    member_page_key
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "memory":
+        return OrganizationManager(storage_backend="memory")
+    repository = CachedOrganizationRepository(SQLiteOrganizationRepository(str(tmp_path / "orgs.db")))
+    return OrganizationManager(repository=repository)
+
+
+@pytest.fixture
+def org(manager):
+    org = manager.create_organization(name="Org", created_by="owner")
+    # Identical join times force the user ID tie-breaker
+    joined_at = datetime(2024, 1, 1)
+    for i in range(25):
+        member = manager.add_member(org.id, f"u{i:02d}", OrganizationRole.VIEWER)
+        member.joined_at = joined_at + timedelta(minutes=i % 5)
+        manager.repository.save_member(member)
+    return org
+
+
+class TestCursor:
+    def test_round_trip(self):
+        key = (datetime(2024, 5, 1, 12, 30, 15, 123456), "abc")
+        assert decode_cursor(encode_cursor(key)) == key
+        assert "=" not in encode_cursor(key)
+
+    @pytest.mark.parametrize("cursor", ["", "not-base64!", "bnVsbA", "WzFd"])
+    def test_invalid(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestManagerIterators:
+    def test_members_stable_order_across_pages(self, manager, org):
+        expected = sorted(manager.get_organization_members(org.id), key=member_page_key)
+
+        paged = list(manager.iter_organization_members(org.id, page_size=4))
+
+        assert [m.user_id for m in paged] == [m.user_id for m in expected]
+        assert len(paged) == 26
+
+    def test_resume_after_key(self, manager, org):
+        members = list(manager.iter_organization_members(org.id, page_size=7))
+        resumed = list(manager.iter_organization_members(org.id, after=member_page_key(members[9]), page_size=3))
+
+        assert resumed == members[10:]
+
+    def test_iterator_is_lazy(self, manager, org):
+        with patch.object(manager.repository, "list_members_page",
+                          wraps=manager.repository.list_members_page) as list_page:
+            iterator = manager.iter_organization_members(org.id, page_size=5)
+            next(iterator)
+
+        assert list_page.call_count == 1
+
+    def test_user_memberships(self, manager):
+        orgs = [manager.create_organization(name=f"Org {i}", created_by="owner") for i in range(5)]
+
+        pairs = list(manager.iter_user_memberships("owner", page_size=2))
+
+        assert sorted(org.id for org, _ in pairs) == sorted(org.id for org in orgs)
+        assert all(member.role == OrganizationRole.ADMIN for _, member in pairs)
+        assert [org.id for org, _ in manager.get_user_organizations("owner")] == [org.id for org, _ in pairs]
+
+    def test_invitations_skip_expired(self, manager, org):
+        for i in range(6):
+            manager.create_invitation(org.id, f"user{i}@example.com", OrganizationRole.VIEWER,
+                                      created_by="owner", expires_in_hours=-1 if i % 2 else 24)
+
+        pending = list(manager.iter_organization_invitations(org.id, page_size=2))
+        everything = list(manager.iter_organization_invitations(org.id, include_expired=True, page_size=2))
+
+        assert [inv.email for inv in pending] == ["user0@example.com", "user2@example.com", "user4@example.com"]
+        assert len(everything) == 6
+
+
+@pytest.fixture
+def client():
+    from api.organizations import organizations_bp
+
+    manager = OrganizationManager(storage_backend="memory")
+    org = manager.create_organization(name="Org", created_by="admin-user")
+    for i in range(5):
+        manager.add_member(org.id, f"u{i}", OrganizationRole.VIEWER)
+
+    app = Flask(__name__)
+    app.register_blueprint(organizations_bp)
+    claims = {"sub": "admin-user", "organizations": [{"id": org.id, "role": "admin"}]}
+
+    with patch('api.organizations.get_organization_manager', return_value=manager), \
+         patch('auth.decorators.validate_jwt_token', return_value=claims):
+        yield app.test_client(), org
+
+
+class TestListingEndpoints:
+    HEADERS = {"Authorization": "Bearer t"}
+
+    def test_members_follow_next_cursor(self, client):
+        http, org = client
+        seen, cursor = [], None
+        while True:
+            query = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            body = http.get(f"/organizations/{org.id}/members", query_string=query, headers=self.HEADERS).get_json()
+            assert body["total"] == len(body["members"]) <= 2
+            seen += [member["user_id"] for member in body["members"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        assert sorted(seen) == sorted(["admin-user"] + [f"u{i}" for i in range(5)])
+        assert len(seen) == 6
+
+    def test_field_projection(self, client):
+        http, org = client
+        response = http.get(f"/organizations/{org.id}/members", query_string={"fields": "role,user_id"},
+                            headers=self.HEADERS)
+
+        members = response.get_json()["members"]
+        assert all(set(member) == {"user_id", "role"} for member in members)
+
+        response = http.get("/organizations", query_string={"fields": "id,name"}, headers=self.HEADERS)
+        assert response.get_json()["organizations"] == [{"id": org.id, "name": "Org"}]
+        assert response.get_json()["next_cursor"] is None
+
+    @pytest.mark.parametrize("query", [{"fields": "id,secret"}, {"limit": 0}, {"limit": "many"},
+                                       {"limit": 5000}, {"cursor": "garbage"}])
+    def test_invalid_parameters(self, client, query):
+        http, org = client
+        response = http.get(f"/organizations/{org.id}/members", query_string=query, headers=self.HEADERS)
+        assert response.status_code == 400
@@ -0,0 +1,322 @@
+"""
+Tests for token pre-validation, the rejected token cache and per-client rate limiting.
+"""
+import os
+import sys
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask, jsonify
+from jose import jwt
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth.middleware as middleware
+from auth.decorators import apply_rate_limit_headers, authenticated, optional_auth, require_api_key
+from auth.rate_limit import MemoryRateLimitStore, RateLimiter, RedisRateLimitStore, client_ip, client_key
+from auth.token_cache import RejectedTokenCache, VerifiedTokenCache
+from auth.vercel_auth import authenticated_vercel, optional_auth_vercel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _token(**claims):
+    claims = {"sub": "user-1", "exp": int(time.time()) + 3600, **claims}
+    return jwt.encode(claims, "secret", algorithm="HS256")
+
+
+class TestPrecheck:
+    @pytest.mark.parametrize("token,reason", [
+        ("garbage", "malformed"),
+        ("a.b.c", "malformed"),
+        ("a.b.c.d", "malformed"),
+    ])
+    def test_structure(self, token, reason):
+        assert middleware.precheck_token(token) == reason
+
+    def test_expired(self):
+        assert middleware.precheck_token(_token(exp=int(time.time()) - 3600)) == "expired"
+        # Within the leeway the exact check is left to jwt.decode
+        assert middleware.precheck_token(_token(exp=int(time.time()) - 5)) is None
+
+    def test_alg_none_and_bad_exp(self):
+        header = jwt.encode({"sub": "x"}, "secret", algorithm="HS256").split(".")
+        unsigned = "eyJhbGciOiJub25lIn0." + header[1] + "."
+        assert middleware.precheck_token(unsigned) == "unsupported_algorithm"
+        assert middleware.precheck_token(_token(exp="tomorrow")) == "malformed"
+
+    def test_valid_token_passes(self):
+        assert middleware.precheck_token(_token()) is None
+
+
+@pytest.fixture
+def validation():
+    """Fresh caches and a counting signature check"""
+    with patch.object(middleware, 'verified_tokens', VerifiedTokenCache()), \
+         patch.object(middleware, 'rejected_tokens', RejectedTokenCache()), \
+         patch.object(middleware.jwks_cache, 'get_jwks', return_value={"keys": []}) as get_jwks, \
+         patch('auth.middleware.jwt.decode', side_effect=jwt.JWTError("Signature verification failed")) as decode:
+        yield get_jwks, decode
+
+
+class TestFastRejection:
+    def test_garbage_never_reaches_jwks(self, validation):
+        get_jwks, decode = validation
+        for _ in range(5):
+            assert middleware.validate_jwt_token("not-a-jwt") is None
+            assert middleware.validate_jwt_token(_token(exp=1)) is None
+
+        assert get_jwks.call_count == 0
+        assert decode.call_count == 0
+
+    def test_forged_token_verified_once(self, validation):
+        _, decode = validation
+        token = _token()
+        for _ in range(5):
+            assert middleware.validate_jwt_token(token) is None
+        assert decode.call_count == 1
+        assert middleware.rejected_tokens.stats()["hits"] == 4
+
+    def test_rejections_expire(self):
+        clock = FakeClock()
+        cache = RejectedTokenCache(ttl=60, clock=clock)
+        cache.put("t", "invalid")
+        assert cache.get("t") == "invalid"
+        clock.now += 61
+        assert cache.get("t") is None
+
+    def test_not_yet_valid_token_not_cached(self):
+        token = _token(nbf=int(time.time()) + 30)
+        with patch.object(middleware, 'verified_tokens', VerifiedTokenCache()), \
+             patch.object(middleware, 'rejected_tokens', RejectedTokenCache()), \
+             patch.object(middleware.jwks_cache, 'get_jwks', return_value={"keys": []}), \
+             patch('auth.middleware.jwt.decode',
+                   side_effect=jwt.JWTClaimsError("The token is not yet valid (nbf)")) as decode:
+            assert middleware.validate_jwt_token(token) is None
+            assert len(middleware.rejected_tokens) == 0
+
+            # Once it is valid, the next request verifies it again
+            decode.side_effect = None
+            decode.return_value = {"sub": "user-1"}
+            assert middleware.validate_jwt_token(token) == {"sub": "user-1"}
+
+    def test_unknown_kid_not_cached(self, validation):
+        with patch.object(middleware.jwks_cache, 'get_key', return_value=None):
+            token = jwt.encode({"sub": "x", "exp": int(time.time()) + 60}, "secret", algorithm="HS256",
+                               headers={"kid": "rotated"})
+            assert middleware.validate_jwt_token(token) is None
+        assert len(middleware.rejected_tokens) == 0
+
+
+class TestTokenBucket:
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        store = MemoryRateLimitStore(clock=clock)
+
+        results = [store.consume("user:a", capacity=3, rate=1.0) for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[2].remaining == 0
+        assert results[3].retry_after == pytest.approx(1.0)
+        clock.now += 1.5
+        assert store.consume("user:a", capacity=3, rate=1.0).allowed
+        assert store.consume("user:b", capacity=3, rate=1.0).remaining == 2
+
+    def test_zero_cost_only_checks(self):
+        store = MemoryRateLimitStore(clock=FakeClock())
+        assert store.consume("k", capacity=1, rate=1.0, cost=0).allowed
+        assert store.consume("k", capacity=1, rate=1.0).allowed
+        assert not store.consume("k", capacity=1, rate=1.0, cost=0).allowed
+
+    def test_buckets_bounded(self):
+        store = MemoryRateLimitStore(max_buckets=10, clock=FakeClock())
+        for i in range(50):
+            store.consume(f"ip:{i}", capacity=5, rate=1.0)
+        assert len(store) == 10
+
+    def test_store_errors_allow(self):
+        store = Mock()
+        store.consume.side_effect = ConnectionError("down")
+        limiter = RateLimiter(store)
+        assert limiter.hit("user:a") is None
+        assert limiter.stats()["errors"] == 1
+
+    def test_client_keys(self):
+        assert client_key("key", "secret-api-key").startswith("key:")
+        assert "secret-api-key" not in client_key("key", "secret-api-key")
+        assert client_ip("10.0.0.1", "1.2.3.4", trust_proxy=True) == "1.2.3.4"
+        assert client_ip("10.0.0.1", "1.2.3.4", trust_proxy=False) == "10.0.0.1"
+
+    def test_client_ip_ignores_spoofed_hops(self):
+        # The client sent "6.6.6.6"; the trusted proxy appended the address it actually saw
+        assert client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4", trust_proxy=True) == "1.2.3.4"
+        assert client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4, 10.0.0.2", trust_proxy=True, trusted_hops=2) == "1.2.3.4"
+        # Fewer hops than trusted proxies: the header did not come from them
+        assert client_ip("10.0.0.1", "1.2.3.4", trust_proxy=True, trusted_hops=2) == "10.0.0.1"
+
+
+@pytest.fixture
+def limiter():
+    limiter = RateLimiter(MemoryRateLimitStore(clock=FakeClock()), per_minute=60, burst=3,
+                          auth_failures_per_minute=2)
+    with patch('auth.decorators.get_rate_limiter', return_value=limiter), \
+         patch('auth.vercel_auth.get_rate_limiter', return_value=limiter):
+        yield limiter
+
+
+@pytest.fixture
+def client(limiter):
+    app = Flask(__name__)
+    app.after_request(apply_rate_limit_headers)
+
+    @app.route('/private')
+    @authenticated
+    def private():
+        return jsonify({'user': 'ok'})
+
+    @app.route('/public')
+    @optional_auth
+    def public():
+        return jsonify({'public': True})
+
+    @app.route('/api/health')
+    @optional_auth
+    def health():
+        return jsonify({'status': 'healthy'})
+
+    @app.route('/service')
+    @require_api_key
+    def service():
+        return jsonify({'service': True})
+
+    return app.test_client()
+
+
+class TestDecorators:
+    HEADERS = {"Authorization": "Bearer t"}
+
+    def test_user_limited_with_headers(self, client):
+        with patch('auth.decorators.validate_jwt_token', return_value={"sub": "user-1"}):
+            responses = [client.get('/private', headers=self.HEADERS) for _ in range(4)]
+
+        assert [r.status_code for r in responses] == [200, 200, 200, 429]
+        assert responses[0].headers["X-RateLimit-Limit"] == "3"
+        assert responses[0].headers["X-RateLimit-Remaining"] == "2"
+        assert int(responses[3].headers["Retry-After"]) >= 1
+        assert "X-RateLimit-Reset" in responses[3].headers
+
+    def test_bad_tokens_block_ip_before_validation(self, client):
+        with patch('auth.decorators.validate_jwt_token', return_value=None) as validate:
+            statuses = [client.get('/private', headers=self.HEADERS).status_code for _ in range(4)]
+
+        assert statuses == [403, 403, 429, 429]
+        assert validate.call_count == 2
+
+    def test_anonymous_requests_use_ip_bucket(self, client):
+        statuses = [client.get('/public').status_code for _ in range(4)]
+        assert statuses == [200, 200, 200, 429]
+
+    def test_health_is_not_rate_limited(self, client):
+        statuses = [client.get('/api/health').status_code for _ in range(10)]
+        assert statuses == [200] * 10
+        assert client.get('/public').status_code == 200
+
+    def test_vercel_health_is_not_rate_limited(self, limiter):
+        @optional_auth_vercel
+        def endpoint(handler):
+            return "ok"
+
+        def handler(path):
+            h = Mock()
+            h.headers = {}
+            h.path = path
+            h.client_address = ("10.0.0.9", 5000)
+            return h
+
+        assert [endpoint(handler("/api/health?probe=1")) for _ in range(10)] == ["ok"] * 10
+        assert [endpoint(handler("/api/status")) for _ in range(4)] == ["ok"] * 3 + [None]
+
+    def test_health_ignores_auth_failure_block(self, client, limiter):
+        with patch('auth.decorators.validate_jwt_token', return_value=None), \
+             patch('auth.vercel_auth.validate_jwt_token', return_value=None):
+            assert [client.get('/private', headers=self.HEADERS).status_code for _ in range(3)] == [403, 403, 429]
+            statuses = [client.get('/api/health', headers=self.HEADERS).status_code for _ in range(5)]
+
+            @optional_auth_vercel
+            def endpoint(handler):
+                return "ok"
+
+            h = Mock()
+            h.headers = dict(self.HEADERS)
+            h.path = "/api/health"
+            h.client_address = ("127.0.0.1", 5000)
+            vercel = [endpoint(h) for _ in range(5)]
+
+        assert statuses == [200] * 5
+        assert vercel == ["ok"] * 5
+
+    def test_api_key_bucket(self, client):
+        with patch.dict(os.environ, {'VALID_API_KEYS': 'k1,k2'}):
+            first = [client.get('/service', headers={'X-API-Key': 'k1'}).status_code for _ in range(4)]
+            second = client.get('/service', headers={'X-API-Key': 'k2'}).status_code
+
+        assert first == [200, 200, 200, 429]
+        assert second == 200
+
+    def test_disabled(self, client, limiter):
+        limiter.enabled = False
+        with patch('auth.decorators.validate_jwt_token', return_value={"sub": "user-1"}):
+            responses = [client.get('/private', headers=self.HEADERS) for _ in range(5)]
+        assert all(r.status_code == 200 for r in responses)
+        assert "X-RateLimit-Limit" not in responses[0].headers
+
+    def test_vercel_429(self, limiter):
+        @authenticated_vercel
+        def endpoint(handler):
+            return "ok"
+
+        def handler():
+            h = Mock()
+            h.headers = {"Authorization": "Bearer t"}
+            h.client_address = ("10.0.0.9", 5000)
+            return h
+
+        with patch('auth.vercel_auth.validate_jwt_token', return_value={"sub": "user-1"}):
+            results = [endpoint(handler()) for _ in range(3)]
+            limited = handler()
+            assert endpoint(limited) is None
+
+        assert results == ["ok"] * 3
+        limited.send_response.assert_called_with(429)
+        sent = {call.args[0] for call in limited.send_header.call_args_list}
+        assert {"X-RateLimit-Limit", "Retry-After"} <= sent
+
+
+def _redis_url():
+    url = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+    try:
+        store = RedisRateLimitStore(url)
+        store._client.ping()
+    except Exception:
+        pytest.skip("Redis-compatible server not reachable")
+    return url
+
+
+class TestRedisStore:
+    def test_buckets_shared_between_processes(self):
+        url = _redis_url()
+        first, second = RedisRateLimitStore(url), RedisRateLimitStore(url)
+        first.reset("test:shared")
+
+        assert first.consume("test:shared", capacity=2, rate=0.01).allowed
+        assert second.consume("test:shared", capacity=2, rate=0.01).allowed
+        assert not first.consume("test:shared", capacity=2, rate=0.01).allowed
+        first.reset("test:shared")
@@ -0,0 +1,194 @@
+"""
+Tests for bounded request body reading and the /api/task JSONL batch endpoint.
+"""
+import http.client
+import io
+import json
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from request_body import BodyError, BodyReader, BodyTooLarge, iter_jsonl, read_json
+
+
+def _handler(body: bytes, headers):
+    handler = Mock()
+    handler.rfile = io.BytesIO(body)
+    handler.headers = headers
+    return handler
+
+
+def _chunked(*chunks: bytes) -> bytes:
+    encoded = b''.join(b'%x;ext=1\r\n%s\r\n' % (len(chunk), chunk) for chunk in chunks)
+    return encoded + b'0\r\nX-Trailer: yes\r\n\r\n'
+
+
+class TestBodyReader:
+    def test_content_length(self):
+        handler = _handler(b'{"task": "read"}trailing', {'Content-Length': '16'})
+        assert read_json(handler, 1024) == {"task": "read"}
+        assert handler.rfile.read() == b'trailing'
+
+    def test_missing_length_is_empty(self):
+        reader = BodyReader(io.BytesIO(b'ignored'), {}, 1024)
+        assert reader.read() == b''
+
+    @pytest.mark.parametrize("length", ["abc", "-1"])
+    def test_bad_length(self, length):
+        with pytest.raises(BodyError) as exc_info:
+            BodyReader(io.BytesIO(b''), {'Content-Length': length}, 1024)
+        assert exc_info.value.status == 400
+
+    def test_declared_length_over_limit_refused_before_reading(self):
+        rfile = io.BytesIO(b'x' * 100)
+        with pytest.raises(BodyTooLarge) as exc_info:
+            BodyReader(rfile, {'Content-Length': '100'}, 99)
+        assert exc_info.value.status == 413
+        assert rfile.tell() == 0
+
+    def test_chunked(self):
+        body = _chunked(b'{"task": ', b'"chunked"}') + b'next request'
+        handler = _handler(body, {'Transfer-Encoding': 'chunked'})
+        assert read_json(handler, 1024) == {"task": "chunked"}
+        assert handler.rfile.read() == b'next request'
+
+    def test_chunked_over_limit(self):
+        handler = _handler(_chunked(b'a' * 60, b'b' * 60), {'Transfer-Encoding': 'chunked'})
+        with pytest.raises(BodyTooLarge):
+            read_json(handler, 100)
+
+    def test_huge_chunk_header_reads_at_most_limit_plus_one(self):
+        body = b'%x\r\n' % (50 * 1024 * 1024) + b'x' * (5 * 1024 * 1024)
+        rfile = io.BytesIO(body)
+        header_bytes = body.index(b'\n') + 1
+        with pytest.raises(BodyTooLarge):
+            BodyReader(rfile, {'Transfer-Encoding': 'chunked'}, 1024).read()
+        assert rfile.tell() - header_bytes <= 1024 + 1
+
+    def test_bad_chunk_size(self):
+        with pytest.raises(BodyError):
+            BodyReader(io.BytesIO(b'zz\r\n'), {'Transfer-Encoding': 'chunked'}, 100).read()
+
+    def test_invalid_json(self):
+        with pytest.raises(BodyError, match="Invalid JSON"):
+            read_json(_handler(b'{nope', {'Content-Length': '5'}), 100)
+
+
+class TestJsonl:
+    BODY = b'{"task": "a"}\n\n{"task": "b"}\r\n{"task": "c"}'
+
+    def test_lines(self):
+        handler = _handler(self.BODY, {'Content-Length': str(len(self.BODY))})
+        assert [item["task"] for item in iter_jsonl(handler, 1024, 64)] == ["a", "b", "c"]
+
+    def test_lines_across_chunks(self):
+        handler = _handler(_chunked(self.BODY[:5], self.BODY[5:20], self.BODY[20:]),
+                           {'Transfer-Encoding': 'chunked'})
+        assert [item["task"] for item in iter_jsonl(handler, 1024, 64)] == ["a", "b", "c"]
+
+    def test_long_line(self):
+        handler = _handler(self.BODY, {'Content-Length': str(len(self.BODY))})
+        with pytest.raises(BodyTooLarge, match="Line 1"):
+            list(iter_jsonl(handler, 1024, 8))
+
+    def test_bad_line(self):
+        body = b'{"task": "a"}\n{oops\n'
+        items = iter_jsonl(_handler(body, {'Content-Length': str(len(body))}), 1024, 64)
+        assert next(items) == {"task": "a"}
+        with pytest.raises(BodyError, match="line 2"):
+            next(items)
+
+    def test_oversized_batch_refused_eagerly(self):
+        with pytest.raises(BodyTooLarge):
+            iter_jsonl(_handler(b'', {'Content-Length': '2048'}), 1024, 64)
+
+
+class TestTaskEndpoint:
+    @pytest.fixture
+    def server(self):
+        import api.task as task_api
+
+        agent = Mock()
+        agent.process_task_with_status = AsyncMock(side_effect=lambda task, priority, context, **kwargs: (f"done: {task}", "completed"))
+        payload = {"sub": "user-1", "email": "seeker@example.com"}
+        with patch.object(task_api, 'get_master_agent', return_value=agent, create=True), \
+             patch('auth.vercel_auth.validate_jwt_token', return_value=payload), \
+             patch.object(task_api.Config, 'TASK_MAX_BODY_BYTES', 256), \
+             patch.object(task_api.Config, 'TASK_MAX_BATCH_ITEMS', 3):
+            httpd = ThreadingHTTPServer(("127.0.0.1", 0), task_api.handler)
+            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+            thread.start()
+            yield httpd.server_address[1], agent
+            httpd.shutdown()
+            httpd.server_close()
+
+    def _post(self, port, body, content_type="application/json", **headers):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        headers = {"Authorization": "Bearer t", "Content-Type": content_type, **headers}
+        connection.request("POST", "/api/task", body=body, headers=headers,
+                           encode_chunked="Transfer-Encoding" in headers)
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        return response, data
+
+    def test_single_task(self, server):
+        port, _ = server
+        response, data = self._post(port, json.dumps({"task": "heal"}))
+        assert response.status == 200
+        assert json.loads(data)["response"] == "done: heal"
+
+    def test_missing_content_length_is_bad_request(self, server):
+        port, agent = server
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        connection.putrequest("POST", "/api/task")
+        connection.putheader("Authorization", "Bearer t")
+        connection.endheaders()
+        response = connection.getresponse()
+
+        assert response.status == 400
+        assert json.loads(response.read())["message"] == "Invalid JSON"
+        agent.process_task_with_status.assert_not_called()
+
+    def test_oversized_body_413(self, server):
+        port, agent = server
+        response, data = self._post(port, json.dumps({"task": "x" * 500}))
+        assert response.status == 413
+        assert json.loads(data)["status"] == "error"
+        agent.process_task_with_status.assert_not_called()
+
+    def test_chunked_task(self, server):
+        port, _ = server
+        body = iter([b'{"task": ', b'"chunked"}'])
+        response, data = self._post(port, body, **{"Transfer-Encoding": "chunked"})
+        assert json.loads(data)["response"] == "done: chunked"
+
+    def test_jsonl_batch_streams_results(self, server):
+        port, _ = server
+        body = b'{"task": "a"}\n{"priority": "high"}\n{"task": "b"}\n'
+        response, data = self._post(port, body, "application/x-ndjson")
+
+        assert response.status == 200
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in data.splitlines()]
+        assert [line["index"] for line in lines] == [0, 1, 2]
+        assert lines[0]["response"] == "done: a"
+        assert lines[1]["status"] == "error"
+        assert lines[2]["response"] == "done: b"
+
+    def test_jsonl_batch_item_limit(self, server):
+        port, agent = server
+        body = b''.join(b'{"task": "t%d"}\n' % i for i in range(5))
+        _, data = self._post(port, body, "application/x-ndjson")
+
+        lines = [json.loads(line) for line in data.splitlines()]
+        assert len(lines) == 4
+        assert "exceeds 3 tasks" in lines[-1]["message"]
+        assert agent.process_task_with_status.call_count == 3
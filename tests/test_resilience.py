@@ -0,0 +1,273 @@
+"""
+Tests for the LLM circuit breaker and adaptive concurrency limiter.
+"""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+from deadline import Deadline, DeadlineExceeded
+from master_agent import TaskRequest
+from resilience import (CLOSED, HALF_OPEN, OPEN, AdaptiveLimiter, CircuitBreaker, CircuitOpen,
+                        ConcurrencyLimited, LLMGuard, get_llm_guard, is_overload, llm_guard_snapshot,
+                        output_tokens)
+from retry import RetryPolicy
+from specialist_agents import CustomerOperationsAgent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class ServerError(Exception):
+    status_code = 500
+
+
+class FakeLLM:
+    """Local stand-in for a chat model with injectable latency and errors"""
+
+    def __init__(self, latency=0.0, errors=()):
+        self.model = "fake-model"
+        self.latency = latency
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        return type("Message", (), {"content": "Namaste"})()
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_guards():
+    with patch.dict(resilience._guards, clear=True):
+        yield
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_fails_fast(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=10, half_open_calls=1, clock=clock)
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpen) as exc_info:
+            breaker.before_call()
+        assert exc_info.value.retry_after == pytest.approx(10)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=10, half_open_calls=1, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.state == HALF_OPEN
+
+        breaker.before_call()
+        with pytest.raises(CircuitOpen):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        clock.now += 10
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=10, half_open_calls=1)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+
+class TestAdaptiveLimiter:
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=10, backoff=0.5, latency_tolerance=2.0)
+        for _ in range(4):
+            assert limiter.try_acquire()
+            limiter.release(latency=0.1)
+        assert limiter.snapshot()["limit"] == 3
+
+    def test_rate_limit_halves(self):
+        limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=10, backoff=0.5, latency_tolerance=2.0)
+        limiter.try_acquire()
+        limiter.release(overloaded=True)
+        assert limiter.snapshot()["limit"] == 4
+        for _ in range(5):
+            limiter.try_acquire()
+            limiter.release(overloaded=True)
+        assert limiter.snapshot()["limit"] == 1
+
+    def test_latency_above_baseline_backs_off(self):
+        limiter = AdaptiveLimiter(initial=10, min_limit=1, max_limit=10, backoff=0.5, latency_tolerance=2.0,
+                                  latency_window=1)
+        limiter.try_acquire()
+        limiter.release(latency=0.1)
+        limiter.try_acquire()
+        limiter.release(latency=0.5)
+        assert limiter.snapshot()["limit"] == 9
+
+    def test_mixed_call_lengths_keep_the_limit(self):
+        limiter = AdaptiveLimiter(initial=20, min_limit=1, max_limit=100, backoff=0.5, latency_tolerance=2.0,
+                                  latency_window=5)
+        # Short routing replies alternate with much longer specialist generations
+        for _ in range(100):
+            limiter.try_acquire()
+            limiter.release(latency=1.0, site="route")
+            limiter.try_acquire()
+            limiter.release(latency=15.0, site="customer_operations")
+        assert limiter.snapshot()["limit"] >= 20
+        assert limiter.snapshot()["latency_baselines_ms"] == {"route": 1000.0, "customer_operations": 15000.0}
+
+        # A sustained slowdown at one site still backs off, once per window
+        before = limiter.limit
+        for _ in range(5):
+            limiter.try_acquire()
+            limiter.release(latency=45.0, site="customer_operations")
+        assert limiter.limit < before
+
+    def test_single_slow_call_is_not_a_slowdown(self):
+        limiter = AdaptiveLimiter(initial=10, min_limit=1, max_limit=10, backoff=0.5, latency_tolerance=2.0,
+                                  latency_window=5)
+        for latency in [0.1] * 10 + [5.0] + [0.1] * 4:
+            limiter.try_acquire()
+            limiter.release(latency=latency, site="route")
+        assert limiter.snapshot()["limit"] == 10
+
+    def test_output_tokens(self):
+        usage = type("Message", (), {"content": "x", "usage_metadata": {"output_tokens": 40}})()
+        assert output_tokens(usage) == 40
+        assert output_tokens("breathe align practice") == 3
+        assert output_tokens(None) == 1
+
+    @pytest.mark.asyncio
+    async def test_acquire_gives_up(self):
+        limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, backoff=0.5, latency_tolerance=2.0)
+        assert limiter.try_acquire()
+        assert await limiter.acquire(0.02) is False
+        assert limiter.snapshot()["rejected"] == 1
+
+
+class TestLLMGuard:
+    def _guard(self, **breaker):
+        return LLMGuard("fake-model",
+                        CircuitBreaker(failure_threshold=2, recovery_seconds=30, half_open_calls=1, **breaker),
+                        AdaptiveLimiter(initial=4, min_limit=1, max_limit=10, backoff=0.5, latency_tolerance=2.0))
+
+    def test_is_overload(self):
+        assert is_overload(RateLimited())
+        assert is_overload(asyncio.TimeoutError())
+        assert not is_overload(ServerError())
+        assert not is_overload(DeadlineExceeded("llm"))
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_the_model(self):
+        guard = self._guard()
+        llm = FakeLLM(errors=[ServerError(), ServerError()])
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                await guard.call(lambda: llm.ainvoke([]))
+
+        started = time.monotonic()
+        with pytest.raises(CircuitOpen):
+            await guard.call(lambda: llm.ainvoke([]))
+        assert time.monotonic() - started < 0.1
+        assert llm.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_shrink_the_limit(self):
+        guard = self._guard()
+        llm = FakeLLM(errors=[RateLimited()])
+        with pytest.raises(RateLimited):
+            await guard.call(lambda: llm.ainvoke([]))
+        assert guard.limiter.snapshot()["limit"] == 2
+        assert guard.breaker.snapshot()["consecutive_failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_request_errors_do_not_trip_the_breaker(self):
+        guard = self._guard()
+        llm = FakeLLM(errors=[ValueError("bad prompt")] * 3)
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await guard.call(lambda: llm.ainvoke([]))
+        assert guard.breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_client_deadlines_do_not_trip_the_breaker(self):
+        guard = self._guard()
+        llm = FakeLLM(latency=0.2)
+        for _ in range(5):
+            deadline = Deadline(0.01)
+            with pytest.raises(DeadlineExceeded):
+                await guard.call(lambda: deadline.run(llm.ainvoke([]), "llm"))
+
+        assert guard.breaker.state == CLOSED
+        assert guard.breaker.snapshot()["consecutive_failures"] == 0
+        assert guard.limiter.snapshot()["limit"] == 4
+        assert guard.limiter.snapshot()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limited(self):
+        guard = LLMGuard("fake-model", CircuitBreaker(failure_threshold=2, recovery_seconds=30, half_open_calls=1),
+                         AdaptiveLimiter(initial=1, min_limit=1, max_limit=1, backoff=0.5, latency_tolerance=2.0))
+        llm = FakeLLM(latency=0.2)
+        slow = asyncio.create_task(guard.call(lambda: llm.ainvoke([])))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ConcurrencyLimited):
+            await guard.call(lambda: llm.ainvoke([]), max_wait=0.02)
+        await slow
+        assert guard.limiter.snapshot()["in_flight"] == 0
+
+
+class TestSpecialistFallback:
+    @pytest.mark.asyncio
+    async def test_open_circuit_returns_unavailable(self):
+        agent = CustomerOperationsAgent()
+        llm = FakeLLM(errors=[ServerError()] * 10)
+        agent.llm = llm
+        agent.retry_policy = RetryPolicy(max_attempts=1)
+        get_llm_guard("fake-model").breaker.failure_threshold = 2
+
+        statuses = [(await agent.execute_task(TaskRequest(content="Help"))).status for _ in range(3)]
+
+        assert statuses == ["failed", "failed", "unavailable"]
+        assert llm.calls == 2
+        assert llm_guard_snapshot()["fake-model"]["circuit"]["state"] == OPEN
+
+
+class TestStatusDocument:
+    def test_llm_section(self):
+        import api.status as status_api
+
+        get_llm_guard("fake-model")
+        with patch.object(status_api, 'get_master_agent', create=True) as get_agent, \
+             patch.object(status_api, 'get_monitor', create=True) as get_monitor:
+            get_agent.return_value.get_system_status.return_value = {}
+            get_monitor.return_value.get_system_health.return_value = {}
+            get_monitor.return_value.get_performance_metrics.return_value = {}
+            document = status_api.build_status_document()
+
+        assert document["llm"]["fake-model"]["circuit"]["state"] == CLOSED
+        assert "limit" in document["llm"]["fake-model"]["concurrency"]
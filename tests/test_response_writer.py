@@ -0,0 +1,145 @@
+"""
+Tests for the shared JSON response writer.
+"""
+import gzip
+import http.client
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_writer
+from response_writer import HeaderBlock, dumps, json_headers, negotiate_encoding, write_error, write_json
+
+
+class TestDumps:
+    def test_compact(self):
+        assert dumps({"a": [1, 2], "b": None}) == b'{"a":[1,2],"b":null}'
+
+    def test_stdlib_fallback_matches(self):
+        data = {"when": datetime(2024, 1, 2, 3, 4, 5), "n": 1.5, "nested": {"x": "y"}, "role": object}
+        fast = dumps(data)
+        with patch.object(response_writer, 'orjson', None):
+            assert dumps(data) == fast
+        assert json.loads(fast)["when"] == "2024-01-02 03:04:05"
+
+    def test_values_orjson_rejects(self):
+        assert json.loads(dumps({"big": 2 ** 70, 1: "int key"})) == {"big": 2 ** 70, "1": "int key"}
+
+
+class TestNegotiation:
+    @pytest.mark.parametrize("header,expected", [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "gzip"),
+    ])
+    def test_gzip(self, header, expected):
+        with patch.object(response_writer, 'brotli', None):
+            negotiate_encoding.cache_clear()
+            assert negotiate_encoding(header) == expected
+        negotiate_encoding.cache_clear()
+
+    def test_prefers_brotli_when_installed(self):
+        with patch.object(response_writer, 'brotli', Mock()):
+            negotiate_encoding.cache_clear()
+            assert negotiate_encoding("gzip, br") == "br"
+            assert negotiate_encoding("gzip, br;q=0.1") == "gzip"
+        negotiate_encoding.cache_clear()
+
+
+class TestHeaderBlock:
+    def test_falls_back_to_send_header(self):
+        handler = Mock()
+        handler.headers = {}
+        write_json(handler, 418, {"ok": True}, json_headers('GET'), {"X-Extra": "1"})
+
+        handler.send_response.assert_called_once_with(418)
+        sent = [call.args for call in handler.send_header.call_args_list]
+        assert ("Access-Control-Allow-Methods", "GET") in sent
+        assert ("Content-Length", str(len(b'{"ok":true}'))) in sent
+        assert ("X-Extra", "1") in sent
+        handler.wfile.write.assert_called_once_with(b'{"ok":true}')
+
+    def test_extend(self):
+        block = HeaderBlock((("A", "1"),)).extend(("B", "2"))
+        assert block.encoded == b"A: 1\r\nB: 2\r\n"
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/error":
+            write_error(self, 400, "bad request")
+        else:
+            size = int(self.path.strip("/") or 1)
+            write_json(self, 200, {"items": ["spiritual"] * size})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestOverHTTP:
+    def test_keep_alive_with_content_length(self, server):
+        connection = http.client.HTTPConnection("127.0.0.1", server)
+        for path in ("/1", "/error", "/2"):
+            connection.request("GET", path)
+            response = connection.getresponse()
+            body = response.read()
+            assert int(response.headers["Content-Length"]) == len(body)
+            assert response.headers["Access-Control-Allow-Origin"] == "*"
+        connection.close()
+
+        assert json.loads(body) == {"items": ["spiritual", "spiritual"]}
+
+    def test_large_bodies_compressed_on_request(self, server):
+        connection = http.client.HTTPConnection("127.0.0.1", server)
+        connection.request("GET", "/500", headers={"Accept-Encoding": "gzip"})
+        response = connection.getresponse()
+        body = response.read()
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert len(json.loads(gzip.decompress(body))["items"]) == 500
+
+        connection.request("GET", "/500")
+        response = connection.getresponse()
+        assert "Content-Encoding" not in response.headers
+        assert len(json.loads(response.read())["items"]) == 500
+
+        connection.request("GET", "/1", headers={"Accept-Encoding": "gzip"})
+        response = connection.getresponse()
+        assert "Content-Encoding" not in response.headers
+        response.read()
+        connection.close()
+
+    def test_compressed_etag_is_weak(self):
+        handler = Mock()
+        handler.headers = {"Accept-Encoding": "gzip"}
+        write_json(handler, 200, body=b'{"x":"' + b"a" * 4096 + b'"}', extra_headers={"ETag": '"abc"'})
+
+        sent = dict(call.args for call in handler.send_header.call_args_list)
+        assert sent["ETag"] == 'W/"abc"'
+        assert sent["Content-Encoding"] == "gzip"
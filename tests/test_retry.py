@@ -0,0 +1,264 @@
+"""
+Tests for LLM call retries and hedged requests.
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+import retry
+from config import Config
+from deadline import Deadline, DeadlineExceeded
+import monitoring
+from master_agent import AgentState, MasterAgent, TaskRequest
+from monitoring import AgentMonitor
+from resilience import CircuitOpen
+from retry import AttemptStats, RetryBudget, RetryPolicy, classify_error, hedged
+from specialist_agents import CustomerOperationsAgent
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(status_code=status_code,
+                                  headers={"retry-after": retry_after} if retry_after else {})
+
+
+class FakeLLM:
+    """Local stand-in for a chat model; ``latencies`` and ``errors`` are consumed per call"""
+
+    def __init__(self, latencies=(), errors=()):
+        self.model = "fake-model"
+        self.latencies = list(latencies)
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        error = self.errors.pop(0) if self.errors else None
+        await asyncio.sleep(self.latencies.pop(0) if self.latencies else 0)
+        if error is not None:
+            raise error
+        return type("Message", (), {"content": f"answer {self.calls}"})()
+
+
+def _llm_response(content):
+    response = MagicMock()
+    response.content = content
+    return response
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("budget", RetryBudget(ratio=0.2, burst=10))
+    return RetryPolicy(max_attempts=kwargs.pop("max_attempts", 3), base_delay=0.001, max_delay=0.01, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_guards():
+    with patch.dict(resilience._guards, clear=True):
+        yield
+
+
+class TestClassification:
+    @pytest.mark.parametrize("error, kind", [
+        (ProviderError(429), "rate_limited"),
+        (ProviderError(529), "overloaded"),
+        (ProviderError(502), "server_error"),
+        (ConnectionResetError(), "connection"),
+        (ProviderError(400), None),
+        (ValueError("bad prompt"), None),
+        (DeadlineExceeded("llm"), None),
+        (CircuitOpen("open"), None),
+    ])
+    def test_classify(self, error, kind):
+        assert classify_error(error) == kind
+
+    def test_backoff_grows_and_honours_retry_after(self):
+        policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=100.0, budget=RetryBudget(0.2, 10))
+        assert all(0 <= policy.backoff_delay(ProviderError(502), 2) <= 4.0 for _ in range(50))
+        assert all(0 <= policy.backoff_delay(ProviderError(429), 0) <= 4.0 for _ in range(50))
+        assert policy.backoff_delay(ProviderError(429, retry_after="7"), 0) >= 7.0
+        assert policy.backoff_delay(ProviderError(400), 0) is None
+
+
+class TestRetryPolicy:
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self):
+        llm = FakeLLM(errors=[ProviderError(429), ProviderError(503)])
+        stats = AttemptStats()
+        result = await _policy().run(lambda: llm.ainvoke([]), Deadline(5), stats)
+        assert result.content == "answer 3"
+        assert stats.retries == 2
+
+    @pytest.mark.asyncio
+    async def test_permanent_errors_are_not(self):
+        llm = FakeLLM(errors=[ProviderError(400)])
+        with pytest.raises(ProviderError):
+            await _policy().run(lambda: llm.ainvoke([]), Deadline(5))
+        assert llm.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_max_attempts(self):
+        llm = FakeLLM(errors=[ProviderError(500)] * 5)
+        with pytest.raises(ProviderError):
+            await _policy(max_attempts=2).run(lambda: llm.ainvoke([]), Deadline(5))
+        assert llm.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_retries_across_calls(self):
+        budget = RetryBudget(ratio=0.0, burst=1)
+        llm = FakeLLM(errors=[ProviderError(500)] * 10)
+        for _ in range(2):
+            with pytest.raises(ProviderError):
+                await _policy(budget=budget).run(lambda: llm.ainvoke([]), Deadline(5))
+        assert llm.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_no_retry_past_the_deadline(self):
+        llm = FakeLLM(errors=[ProviderError(429, retry_after="30")])
+        with pytest.raises(ProviderError):
+            await _policy().run(lambda: llm.ainvoke([]), Deadline(5))
+        assert llm.calls == 1
+
+
+class TestHedging:
+    @pytest.mark.asyncio
+    async def test_slow_first_attempt_loses(self):
+        llm = FakeLLM(latencies=[5, 0])
+        stats = AttemptStats()
+        result = await hedged(lambda: llm.ainvoke([]), 0.02, stats)
+        assert result.content == "answer 2"
+        assert (stats.hedges, stats.hedge_wins) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_fast_first_attempt_is_not_hedged(self):
+        llm = FakeLLM()
+        stats = AttemptStats()
+        await hedged(lambda: llm.ainvoke([]), 1.0, stats)
+        assert llm.calls == 1 and stats.hedges == 0
+
+    @pytest.mark.asyncio
+    async def test_hedge_survives_first_failure(self):
+        llm = FakeLLM(latencies=[0.05, 0.1], errors=[ProviderError(400)])
+        stats = AttemptStats()
+        result = await hedged(lambda: llm.ainvoke([]), 0.01, stats)
+        assert result.content == "answer 2"
+
+    @pytest.mark.asyncio
+    async def test_hedges_spend_the_retry_budget(self):
+        budget = RetryBudget(ratio=0.0, burst=1)
+        llm = FakeLLM(latencies=[0.05, 0, 0.05, 0])
+        stats = AttemptStats()
+        await hedged(lambda: llm.ainvoke([]), 0.01, stats, budget)
+        result = await hedged(lambda: llm.ainvoke([]), 0.01, stats, budget)
+
+        assert result.content == "answer 3"
+        assert stats.hedges == 1 and llm.calls == 3
+
+
+class TestSpecialistRetries:
+    @pytest.fixture
+    def agent(self):
+        agent = CustomerOperationsAgent()
+        agent.retry_policy = _policy()
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_retries_reported_per_agent(self, agent):
+        agent.llm = FakeLLM(errors=[ProviderError(503)])
+        monitor = AgentMonitor()
+        with patch('specialist_agents.get_monitor', return_value=monitor):
+            response = await agent.execute_task(TaskRequest(content="Help"))
+
+        assert response.status == "completed"
+        assert response.metadata["llm_attempts"]["retries"] == 1
+        metrics = monitor.get_performance_metrics()["agent_metrics"]["customer_operations"]
+        assert metrics["llm_retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_high_priority_is_hedged_past_p95(self, agent):
+        monitor = AgentMonitor()
+        for _ in range(Config.LLM_HEDGE_MIN_SAMPLES):
+            monitor.get_llm_latency("customer_operations").record(20.0)
+        agent.llm = FakeLLM(latencies=[5, 0, 5, 0])
+        with patch('specialist_agents.get_monitor', return_value=monitor), \
+             patch.object(Config, 'LLM_HEDGE_PRIORITIES', 'high'):
+            response = await agent.execute_task(TaskRequest(content="Help", priority="high"),
+                                                deadline=Deadline(2))
+            normal = await agent.execute_task(TaskRequest(content="Help", priority="medium"),
+                                              deadline=Deadline(0.5))
+
+        assert response.status == "completed"
+        assert response.metadata["llm_attempts"]["hedge_wins"] == 1
+        assert normal.status == "timeout"
+        metrics = monitor.get_performance_metrics()["agent_metrics"]["customer_operations"]
+        assert metrics["llm_hedges"] == 1
+
+
+class TestHedgingAcrossTasks:
+    @pytest.mark.asyncio
+    async def test_latency_learned_across_tasks_enables_hedging(self):
+        # Every task gets a new specialist; the latency it learns from lives on the monitor
+        llm = FakeLLM(latencies=[0.01] * 5 + [5, 0])
+        monitor = AgentMonitor()
+        with patch.object(Config, 'LLM_BACKEND', 'fake'), \
+             patch.object(Config, 'ANTHROPIC_API_KEY', None), \
+             patch.object(Config, 'LANGCHAIN_API_KEY', None), \
+             patch.object(Config, 'REQUIRE_AUTH_FOR_APIS', False), \
+             patch.object(Config, 'FAKE_LLM_LATENCY_MS', 0.0), \
+             patch.object(Config, 'LLM_HEDGE_PRIORITIES', 'high'), \
+             patch.object(Config, 'LLM_HEDGE_MIN_SAMPLES', 5), \
+             patch.object(monitoring, 'monitor', monitor), \
+             patch.object(retry, '_retry_budget', RetryBudget(ratio=0.2, burst=10)), \
+             patch('specialist_agents.create_llm', return_value=llm):
+            master = MasterAgent()
+            for _ in range(6):
+                result = await master.process_task("Support a seeker with a booking", priority="high",
+                                                   deadline=Deadline(2))
+
+        assert result.endswith("answer 7")
+        assert monitor.get_llm_latency("customer_operations").count == 6
+        metrics = monitor.get_performance_metrics()["agent_metrics"]["customer_operations"]
+        assert (metrics["llm_hedges"], metrics["llm_hedge_wins"]) == (1, 1)
+
+
+class TestRoutingRetries:
+    @pytest.fixture
+    def master(self):
+        with patch.object(Config, 'validate', return_value=True):
+            master = MasterAgent()
+        master.retry_policy = _policy()
+        return master
+
+    @pytest.mark.asyncio
+    async def test_transient_routing_error_is_retried(self, master):
+        master.llm = MagicMock(model="fake-model")
+        master.llm.ainvoke = AsyncMock(side_effect=[ProviderError(529), _llm_response("deployment")])
+        with patch('master_agent.get_monitor'):
+            state = await master._route_task(AgentState(task_request=TaskRequest(content="Help")))
+        assert state.routing_decision == "deployment"
+        assert state.error is None
+
+    @pytest.mark.asyncio
+    async def test_routing_failure_falls_back_to_keywords(self, master):
+        master.llm = FakeLLM(errors=[ProviderError(503)] * 3)
+        with patch('master_agent.get_monitor'):
+            state = await master._route_task(AgentState(task_request=TaskRequest(content="Plan a deployment")))
+        assert state.routing_decision == "deployment"
+        assert state.error is None
+
+    @pytest.mark.asyncio
+    async def test_routing_bug_is_reported_not_misrouted(self, master):
+        master.llm = FakeLLM()
+        with patch.object(master, '_get_routing_prompt', side_effect=KeyError("agent_sops")), \
+             patch('master_agent.get_monitor'):
+            state = await master._route_task(AgentState(task_request=TaskRequest(content="Plan a deployment")))
+        assert state.routing_decision is None
+        assert state.error.startswith("Routing error")
@@ -0,0 +1,255 @@
+"""
+Tests for the shared cache and the auth/organization layers that use it.
+Two clients attached to one in-process server stand in for two API processes.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth.jwks import JWKSCache
+from auth.org_storage import CachedOrganizationRepository, SQLiteOrganizationRepository
+from auth.organizations import OrganizationManager, OrganizationRole
+from auth.shared_cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    MemoryCacheServer,
+    RedisCacheBackend,
+    SharedCache,
+    create_shared_cache,
+    get_serializer
+)
+from auth.token_cache import VerifiedTokenCache, token_digest
+
+
+@pytest.fixture
+def server():
+    return MemoryCacheServer()
+
+
+def client(server, serializer="json"):
+    return SharedCache(MemoryCacheBackend(server), serializer=serializer, namespace="test")
+
+
+class FailingBackend(CacheBackend):
+    def _fail(self, *args):
+        raise ConnectionError("cache down")
+
+    get_many = set_many = delete_many = publish = subscribe = _fail
+
+
+class TestSharedCache:
+    def test_batches_are_single_round_trips(self, server):
+        cache = client(server)
+        cache.set_many({"a": 1, "b": {"x": [1, 2]}, "c": None}, ttl=60)
+        before = server.round_trips
+
+        assert cache.get_many(["a", "b", "c", "missing"]) == {"a": 1, "b": {"x": [1, 2]}, "c": None}
+        assert server.round_trips - before == 1
+
+    def test_entries_expire(self):
+        clock = [0.0]
+        server = MemoryCacheServer(clock=lambda: clock[0])
+        cache = client(server)
+        cache.set("k", "v", ttl=10)
+
+        clock[0] = 9.9
+        assert cache.get("k") == "v"
+        clock[0] = 10
+        assert cache.get("k") is None
+
+    def test_invalidations_reach_other_clients_only(self, server):
+        first, second = client(server), client(server)
+        seen_first, seen_second = [], []
+        first.on_invalidate(seen_first.extend)
+        second.on_invalidate(seen_second.extend)
+
+        first.set("k", 1, ttl=60)
+        second.delete("k")
+        first.set("filled", 1, ttl=60, invalidate=False)
+
+        assert seen_first == ["k"]
+        assert seen_second == ["k"]
+        assert first.get("k") is None
+
+    def test_backend_errors_degrade_to_misses(self):
+        cache = SharedCache(FailingBackend())
+        cache.set("k", 1, ttl=60)
+        cache.on_invalidate(lambda keys: None)
+
+        assert cache.get("k", "default") == "default"
+        assert cache.stats()["errors"] == 3
+
+    def test_msgpack_serializer(self, server):
+        pytest.importorskip("msgpack")
+        cache = client(server, serializer="msgpack")
+        cache.set("k", {"nested": [1, "two"]}, ttl=60)
+        assert cache.get("k") == {"nested": [1, "two"]}
+
+    def test_configuration(self):
+        assert create_shared_cache("") is None
+        assert isinstance(create_shared_cache("memory://").backend, MemoryCacheBackend)
+        with pytest.raises(ValueError):
+            create_shared_cache("memcached://localhost")
+        with pytest.raises(ValueError):
+            get_serializer("pickle")
+
+
+@pytest.fixture
+def processes(tmp_path, server):
+    """Two repository stacks over one database and one shared cache server"""
+    path = str(tmp_path / "orgs.db")
+
+    def stack():
+        backend = SQLiteOrganizationRepository(path)
+        repo = CachedOrganizationRepository(backend, ttl_seconds=300, shared_cache=client(server))
+        return OrganizationManager(repository=repo), repo
+
+    return stack(), stack()
+
+
+class TestSharedOrganizationCache:
+    def test_writes_invalidate_other_processes(self, processes):
+        (first, _), (second, _) = processes
+        org = first.create_organization(name="Org", created_by="owner")
+        assert second.get_member(org.id, "u1") is None
+
+        first.add_member(org.id, "u1", OrganizationRole.VIEWER)
+        assert second.get_member(org.id, "u1").role == OrganizationRole.VIEWER
+        assert [o.id for o, _ in second.get_user_organizations("u1")] == [org.id]
+
+        first.update_member_role(org.id, "u1", OrganizationRole.ADMIN)
+        assert second.get_member(org.id, "u1").role == OrganizationRole.ADMIN
+
+        first.delete_organization(org.id)
+        assert second.get_organization(org.id) is None
+        assert second.get_member(org.id, "u1") is None
+
+    def test_reads_filled_by_one_process_serve_the_other(self, processes, server):
+        (first, first_repo), (second, second_repo) = processes
+        org = first.create_organization(name="Org", created_by="owner",
+                                        metadata={"tier": "pro"})
+        invitation = first.create_invitation(org.id, "a@example.com", OrganizationRole.EDITOR, "owner")
+        first_repo.clear()
+        first.get_organization_members(org.id)
+        first.get_invitation_by_token(invitation.token)
+
+        second_repo.backend.close()
+        second_repo.backend = None  # any backend access would now fail
+
+        members = second.get_organization_members(org.id)
+        assert [(m.user_id, m.role) for m in members] == [("owner", OrganizationRole.ADMIN)]
+        stored = second.get_invitation_by_token(invitation.token)
+        assert stored.role == OrganizationRole.EDITOR
+        assert stored.expires_at == invitation.expires_at
+
+    def test_uncommitted_rows_stay_local(self, processes):
+        (first, first_repo), (second, _) = processes
+        org = first.create_organization(name="Org", created_by="owner")
+        assert second.get_member(org.id, "u1") is None
+
+        with pytest.raises(RuntimeError):
+            with first_repo.transaction():
+                first.add_member(org.id, "u1", OrganizationRole.VIEWER)
+                assert first.get_member(org.id, "u1") is not None
+                raise RuntimeError("abort")
+
+        assert first.get_member(org.id, "u1") is None
+        assert second.get_member(org.id, "u1") is None
+
+    def test_invalidation_sent_after_commit(self, processes):
+        (first, first_repo), (second, _) = processes
+        org = first.create_organization(name="Org", created_by="owner")
+        second.get_organization_members(org.id)
+
+        with first_repo.transaction():
+            first.add_member(org.id, "u1", OrganizationRole.VIEWER)
+            assert len(second.get_organization_members(org.id)) == 1
+
+        assert len(second.get_organization_members(org.id)) == 2
+
+    def test_expired_sweep_drops_remote_invitation_entries(self, processes):
+        from datetime import datetime, timedelta
+
+        (first, _), (second, second_repo) = processes
+        org = first.create_organization(name="Org", created_by="owner")
+        first.create_invitation(org.id, "a@example.com", OrganizationRole.VIEWER, "owner", expires_in_hours=1)
+        second.get_organization_invitations(org.id, include_expired=True)
+
+        first.sweep_expired_invitations(now=datetime.utcnow() + timedelta(hours=2))
+        assert not any(key[0] == "invitations" for key in second_repo._entries)
+
+
+class TestSharedTokenAndKeyCaches:
+    def test_token_verified_once_across_processes(self, server):
+        first = VerifiedTokenCache(shared_cache=client(server))
+        second = VerifiedTokenCache(shared_cache=client(server))
+        first.put("tok", {"sub": "u1", "exp": time.time() + 60})
+
+        assert second.get("tok")["sub"] == "u1"
+        assert second.stats()["shared_hits"] == 1
+        assert second.get("tok")["sub"] == "u1"
+        assert second.stats()["hits"] == 1
+        assert server.keys() == [f"test:token:{token_digest('tok')}"]
+
+    def test_expired_shared_token_not_served(self, server):
+        first = VerifiedTokenCache(shared_cache=client(server))
+        now = [time.time()]
+        second = VerifiedTokenCache(shared_cache=client(server), clock=lambda: now[0])
+        first.put("tok", {"sub": "u1", "exp": now[0] + 60})
+
+        now[0] += 61
+        assert second.get("tok") is None
+
+    def test_jwks_fetched_once_across_processes(self, server):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {"keys": [{"kid": f"k{len(calls)}"}]}, "max-age=300"
+
+        first = JWKSCache(fetch, shared_cache=client(server))
+        second = JWKSCache(fetch, shared_cache=client(server), unknown_kid_interval=0)
+
+        assert first.get_key("k1") is not None
+        assert second.get_key("k1") is not None
+        assert len(calls) == 1
+
+        # A kid missing from the shared set still reaches the IdP
+        assert second.get_key("k2") is not None
+        assert len(calls) == 2
+
+
+def _redis_url():
+    url = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+    try:
+        backend = RedisCacheBackend(url)
+        backend._client.ping()
+    except Exception:
+        pytest.skip("Redis-compatible server not reachable")
+    return url
+
+
+class TestRedisBackend:
+    def test_round_trip_and_invalidation(self):
+        url = _redis_url()
+        first, second = create_shared_cache(url), create_shared_cache(url)
+        seen = []
+        second.on_invalidate(seen.extend)
+        time.sleep(0.2)
+
+        first.set_many({"redis-test:a": 1, "redis-test:b": [2]}, ttl=5)
+        assert second.get_many(["redis-test:a", "redis-test:b"]) == {"redis-test:a": 1, "redis-test:b": [2]}
+
+        first.delete_many(["redis-test:a", "redis-test:b"])
+        deadline = time.time() + 2
+        while not seen and time.time() < deadline:
+            time.sleep(0.05)
+        assert "redis-test:a" in seen
+
+        first.close()
+        second.close()
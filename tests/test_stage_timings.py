@@ -0,0 +1,139 @@
+"""
+Tests for per-stage timing instrumentation in the agent pipeline.
+"""
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from monitoring import AgentMonitor, LatencyHistogram, StageTimer
+from master_agent import MasterAgent, TaskRequest
+from specialist_agents import CodeGenerationAgent
+
+
+class TestStageTimer:
+    def test_span_records_elapsed_milliseconds(self):
+        timer = StageTimer()
+        with timer.span("stage"):
+            time.sleep(0.01)
+        assert timer.timings["stage"] >= 10.0
+
+    def test_repeated_spans_accumulate(self):
+        timer = StageTimer()
+        timer.record("llm", 5.0)
+        timer.record("llm", 7.0)
+        assert timer.timings["llm"] == 12.0
+
+    def test_span_records_on_exception(self):
+        timer = StageTimer()
+        with pytest.raises(ValueError):
+            with timer.span("failing"):
+                raise ValueError("boom")
+        assert "failing" in timer.timings
+
+    def test_merge_with_prefix(self):
+        timer = StageTimer()
+        timer.merge({"llm": 3.0, "prompt_build": 1.0}, prefix="execute")
+        assert timer.timings == {"execute.llm": 3.0, "execute.prompt_build": 1.0}
+
+
+class TestLatencyHistogram:
+    def test_percentiles_within_one_bucket(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 101):
+            histogram.record(float(value))
+
+        assert histogram.count == 100
+        assert histogram.summary()["mean_ms"] == pytest.approx(50.5)
+        assert 50 <= histogram.percentile(50) <= 50 * 1.2
+        assert 95 <= histogram.percentile(95) <= 95 * 1.2
+        assert histogram.percentile(100) == 100.0
+
+    def test_empty_histogram(self):
+        assert LatencyHistogram().percentile(99) == 0.0
+
+    def test_monitor_stage_histograms(self):
+        monitor = AgentMonitor()
+        monitor.record_stage_timings({"route": 10.0, "execute": 200.0})
+        monitor.record_stage_timings({"route": 20.0})
+
+        latency = monitor.get_performance_metrics()["stage_latency"]
+        assert latency["route"]["count"] == 2
+        assert latency["execute"]["count"] == 1
+
+
+def _llm_response(content):
+    response = MagicMock()
+    response.content = content
+    return response
+
+
+class TestSpecialistTimings:
+    @pytest.mark.asyncio
+    async def test_execute_task_attaches_breakdown(self):
+        agent = CodeGenerationAgent()
+        with patch.object(agent, 'llm') as mock_llm:
+            mock_llm.ainvoke = AsyncMock(return_value=_llm_response("```code```"))
+            response = await agent.execute_task(TaskRequest(content="Write code"))
+
+        timings = response.metadata["timings"]
+        for stage in ("init.sop_lookup", "init.llm_client", "system_prompt",
+                      "prompt_build", "llm", "process_response"):
+            assert stage in timings
+
+        # Construction spans are only reported once
+        with patch.object(agent, 'llm') as mock_llm:
+            mock_llm.ainvoke = AsyncMock(return_value=_llm_response("```code```"))
+            second = await agent.execute_task(TaskRequest(content="Write code"))
+        assert "init.sop_lookup" not in second.metadata["timings"]
+
+    @pytest.mark.asyncio
+    async def test_streaming_records_time_to_first_token(self):
+        from langchain_core.messages import AIMessageChunk
+
+        agent = CodeGenerationAgent()
+
+        async def astream(messages):
+            for piece in ("Hello", " ", "world"):
+                yield AIMessageChunk(content=piece)
+
+        with patch.object(Config, 'AGENT_STREAMING', True):
+            with patch.object(agent, 'llm') as mock_llm:
+                mock_llm.astream = astream
+                response = await agent.execute_task(TaskRequest(content="Greet"))
+
+        assert response.status == "completed"
+        assert "Hello world" in response.content
+        assert "llm_first_token" in response.metadata["timings"]
+        assert response.metadata["timings"]["llm_first_token"] <= response.metadata["timings"]["llm"]
+
+
+class TestMasterAgentTimings:
+    @pytest.mark.asyncio
+    async def test_pipeline_breakdown_recorded(self):
+        with patch.object(Config, 'validate', return_value=True):
+            master = MasterAgent()
+
+        master.llm = MagicMock()
+        master.llm.ainvoke = AsyncMock(return_value=_llm_response("code_generation"))
+
+        specialist = CodeGenerationAgent()
+        specialist.llm = MagicMock()
+        specialist.llm.ainvoke = AsyncMock(return_value=_llm_response("```done```"))
+
+        monitor = AgentMonitor()
+        with patch.object(master, '_get_specialist_agent', return_value=specialist):
+            with patch('master_agent.get_monitor', return_value=monitor):
+                result = await master.process_task("Write code")
+
+        assert result == "```done```"
+        for stage in ("route", "route.prompt_build", "route.llm", "execute",
+                      "execute.agent_init", "execute.llm", "synthesize", "total"):
+            assert stage in master.last_timings
+        assert "route.llm" in monitor.get_stage_latency()
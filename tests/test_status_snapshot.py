@@ -0,0 +1,188 @@
+"""
+Tests for the precomputed /api/status snapshot and the liveness-only /api/health.
+"""
+import importlib.util
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from status_snapshot import StatusSnapshot, etag_matches, extend_document, extend_etag
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStatusSnapshot:
+    """Test snapshot rebuild policy"""
+
+    def test_rebuilds_at_most_once_per_interval(self):
+        clock = FakeClock()
+        calls = []
+        snapshot = StatusSnapshot(lambda: calls.append(1) or {"n": len(calls)},
+                                  min_interval_ms=500, max_age_ms=10000, clock=clock)
+
+        first = snapshot.get()
+        clock.now += 0.2
+        assert snapshot.get() is first
+        clock.now += 0.4
+        assert snapshot.get() is not first
+        assert len(calls) == 2
+
+    def test_unchanged_version_reuses_snapshot_until_max_age(self):
+        clock = FakeClock()
+        version = {"value": 1}
+        snapshot = StatusSnapshot(lambda: {"ok": True}, version_fn=lambda: version["value"],
+                                  min_interval_ms=100, max_age_ms=5000, clock=clock)
+
+        first = snapshot.get()
+        clock.now += 1
+        assert snapshot.get() is first
+
+        version["value"] = 2
+        second = snapshot.get()
+        assert second is not first
+        assert second.version == 2
+
+        clock.now += 10
+        assert snapshot.get() is not second
+        assert snapshot.rebuilds == 3
+
+    def test_compact_body_and_stable_etag(self):
+        snapshot = StatusSnapshot(lambda: {"a": 1, "b": [1, 2]}, min_interval_ms=0, max_age_ms=0)
+        first = snapshot.get()
+        second = snapshot.get()
+
+        assert first.body == b'{"a":1,"b":[1,2]}'
+        assert first.etag == second.etag
+
+    def test_invalidate(self):
+        calls = []
+        snapshot = StatusSnapshot(lambda: calls.append(1) or {}, min_interval_ms=60000)
+        snapshot.get()
+        snapshot.invalidate()
+        snapshot.get()
+        assert len(calls) == 2
+
+    def test_degraded_document_expires_quickly(self):
+        clock = FakeClock()
+        documents = iter([{"status": "partial"}, {"status": "ok"}])
+        snapshot = StatusSnapshot(lambda: next(documents), degraded_fn=lambda doc: doc["status"] == "partial",
+                                  min_interval_ms=60000, degraded_max_age_ms=100, clock=clock)
+
+        assert json.loads(snapshot.get().body)["status"] == "partial"
+        clock.now += 0.2
+        healthy = snapshot.get()
+        assert json.loads(healthy.body)["status"] == "ok"
+        clock.now += 30
+        assert snapshot.get() is healthy
+
+
+class TestSnapshotHelpers:
+    def test_extend_document(self):
+        body = extend_document(b'{"a":1}', {"authenticated": False})
+        assert json.loads(body) == {"a": 1, "authenticated": False}
+        assert extend_document(b'{}', {"x": 1}) == b'{"x":1}'
+        assert extend_document(b'{"a":1}', {}) == b'{"a":1}'
+
+    def test_extend_etag_depends_on_fields(self):
+        assert extend_etag('"abc"', {}) == '"abc"'
+        anonymous = extend_etag('"abc"', {"authenticated": False})
+        assert anonymous == extend_etag('"abc"', {"authenticated": False})
+        assert anonymous != extend_etag('"abc"', {"authenticated": True, "user_id": "u1"})
+        assert anonymous != extend_etag('"abd"', {"authenticated": False})
+
+    def test_etag_matches(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches('*', '"abc"')
+        assert not etag_matches(None, '"abc"')
+        assert not etag_matches('"other"', '"abc"')
+
+
+@pytest.fixture
+def api_server():
+    """Serve the status and health handlers on a local port"""
+    servers = []
+
+    def start(handler_class):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestStatusEndpoint:
+    """Test conditional GET against the status handler"""
+
+    def test_etag_round_trip(self, api_server):
+        import api.status as status_api
+
+        snapshot = StatusSnapshot(lambda: {"health": {"system_status": "healthy"}},
+                                  min_interval_ms=60000)
+        with patch.object(status_api, 'status_snapshot', snapshot):
+            base_url = api_server(status_api.handler)
+
+            with urllib.request.urlopen(base_url) as response:
+                etag = response.headers['ETag']
+                payload = json.loads(response.read())
+                assert response.headers['Content-Length']
+
+            assert payload["health"]["system_status"] == "healthy"
+            assert payload["authenticated"] is False
+
+            request = urllib.request.Request(base_url, headers={'If-None-Match': etag})
+            with pytest.raises(urllib.error.HTTPError) as exc_info:
+                urllib.request.urlopen(request)
+            assert exc_info.value.code == 304
+            assert snapshot.rebuilds == 1
+
+
+    def test_degrades_when_master_agent_cannot_import(self):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api", "status.py")
+        spec = importlib.util.spec_from_file_location("status_without_agent", path)
+        module = importlib.util.module_from_spec(spec)
+        with patch.dict(sys.modules, {"master_agent": None}):
+            spec.loader.exec_module(module)
+
+        document = json.loads(module.status_snapshot.get().body)
+        assert document["status"] == "partial"
+
+
+class TestHealthEndpoint:
+    """Test that health is a trivial liveness path"""
+
+    def test_health_does_not_touch_monitor(self, api_server):
+        import api.health as health_api
+        import monitoring
+
+        with patch.object(monitoring.AgentMonitor, 'get_system_health',
+                          side_effect=AssertionError("health probe evaluated monitoring")):
+            base_url = api_server(health_api.handler)
+            with urllib.request.urlopen(base_url) as response:
+                payload = json.loads(response.read())
+
+        assert payload["status"] == "healthy"
+        assert "system_health" not in payload
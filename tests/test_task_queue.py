@@ -0,0 +1,226 @@
+"""
+Tests for the durable SQLite task queue and its CoordinationManager integration.
+"""
+import multiprocessing
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from monitoring import CoordinationManager
+from task_queue import SQLiteTaskQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue.db")
+
+
+class TestSQLiteTaskQueue:
+    def test_enqueue_dequeue_ack(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path)
+        task_id = queue.enqueue("agent_task", {"task": "Write code"})
+
+        task = queue.dequeue("w1")
+        assert task.id == task_id
+        assert task.payload == {"task": "Write code"}
+        assert task.attempts == 1
+        assert queue.dequeue("w2") is None
+
+        assert queue.ack(task.id, task.receipt, "done")
+        assert queue.get(task_id)["status"] == "completed"
+        assert queue.get(task_id)["result"] == "done"
+
+    def test_priority_order(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path)
+        queue.enqueue("t", {"n": 1}, priority="low")
+        queue.enqueue("t", {"n": 2}, priority="high")
+        queue.enqueue("t", {"n": 3}, priority="medium")
+
+        assert [queue.dequeue().payload["n"] for _ in range(3)] == [2, 3, 1]
+
+    def test_tasks_survive_reopen(self, queue_path):
+        SQLiteTaskQueue(queue_path).enqueue("t", {"persisted": True})
+        assert SQLiteTaskQueue(queue_path).dequeue().payload == {"persisted": True}
+
+    def test_expired_lease_is_redelivered(self, queue_path):
+        clock = FakeClock()
+        queue = SQLiteTaskQueue(queue_path, visibility_timeout=30, clock=clock)
+        queue.enqueue("t", {})
+
+        first = queue.dequeue("w1")
+        clock.now += 31
+        second = queue.dequeue("w2")
+
+        assert second.id == first.id
+        assert second.attempts == 2
+        # The stale worker can no longer acknowledge
+        assert not queue.ack(first.id, first.receipt)
+        assert queue.ack(second.id, second.receipt)
+
+    def test_nack_backs_off_then_dead_letters(self, queue_path):
+        clock = FakeClock()
+        queue = SQLiteTaskQueue(queue_path, max_attempts=2, backoff_base=10, clock=clock)
+        task_id = queue.enqueue("t", {})
+
+        task = queue.dequeue()
+        assert queue.nack(task.id, task.receipt, "boom") == "ready"
+        assert queue.dequeue() is None  # still backing off
+
+        clock.now += 10
+        task = queue.dequeue()
+        assert queue.nack(task.id, task.receipt, "boom again") == "dead"
+
+        dead = queue.dead_letters()
+        assert [row["id"] for row in dead] == [task_id]
+        assert dead[0]["last_error"] == "boom again"
+        assert queue.get(task_id)["status"] == "failed"
+
+        assert queue.requeue_dead_letter(task_id)
+        assert queue.dequeue().attempts == 1
+
+    def test_backoff_uses_equal_jitter(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path, backoff_base=2, backoff_max=30)
+        assert all(4 <= queue.backoff_delay(3) <= 8 for _ in range(50))
+        assert all(15 <= queue.backoff_delay(10) <= 30 for _ in range(50))
+
+    def test_lease_expiring_on_last_attempt_dead_letters(self, queue_path):
+        clock = FakeClock()
+        queue = SQLiteTaskQueue(queue_path, visibility_timeout=5, max_attempts=1, clock=clock)
+        queue.enqueue("t", {})
+
+        queue.dequeue()
+        clock.now += 6
+        assert queue.dequeue() is None
+        assert queue.stats()["dead"] == 1
+
+    def test_purge_finished(self, queue_path):
+        clock = FakeClock()
+        queue = SQLiteTaskQueue(queue_path, clock=clock)
+        queue.enqueue("t", {})
+        task = queue.dequeue()
+        queue.ack(task.id, task.receipt)
+
+        clock.now += 100
+        assert queue.purge_finished(older_than_seconds=50) == 1
+        assert queue.stats() == {"ready": 0, "leased": 0, "done": 0, "dead": 0}
+
+
+def _consume(path, results):
+    queue = SQLiteTaskQueue(path)
+    while True:
+        task = queue.dequeue(str(os.getpid()))
+        if task is None:
+            return
+        results.put(task.payload["n"])
+        queue.ack(task.id, task.receipt)
+
+
+class TestMultiProcessWorkers:
+    def test_each_task_delivered_once(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path)
+        for n in range(60):
+            queue.enqueue("t", {"n": n})
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [context.Process(target=_consume, args=(queue_path, results)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        seen = [results.get(timeout=10) for _ in range(60)]
+        for worker in workers:
+            worker.join(timeout=10)
+
+        assert sorted(seen) == list(range(60))
+        assert queue.stats()["done"] == 60
+
+
+class TestCoordinatorIntegration:
+    @pytest.mark.asyncio
+    async def test_durable_task_runs_through_handler(self, queue_path):
+        coordinator = CoordinationManager(durable_queue=SQLiteTaskQueue(queue_path))
+
+        async def echo(payload):
+            return payload["message"].upper()
+
+        coordinator.register_handler("echo", echo)
+        await coordinator.start_coordination()
+        task_id = await coordinator.enqueue_durable("echo", {"message": "hello"})
+        result = await coordinator.wait_for(task_id, timeout=5)
+        await coordinator.shutdown()
+
+        assert result["status"] == "completed"
+        assert result["result"] == "HELLO"
+        assert coordinator.get_coordination_status()["durable_queue"]["done"] == 1
+
+    @pytest.mark.asyncio
+    async def test_result_readable_from_another_process_queue(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path)
+        task_id = queue.enqueue("echo", {})
+        task = queue.dequeue()
+        queue.ack(task.id, task.receipt, {"answer": 42})
+
+        coordinator = CoordinationManager(durable_queue=SQLiteTaskQueue(queue_path))
+        assert coordinator.get_result(task_id)["result"] == {"answer": 42}
+
+    @pytest.mark.asyncio
+    async def test_task_finished_by_another_worker(self, queue_path):
+        coordinator = CoordinationManager(durable_queue=SQLiteTaskQueue(queue_path))
+        task_id = await coordinator.enqueue_durable("echo", {}, owner="user-1")
+        assert coordinator.get_result(task_id)["status"] == "queued"
+        assert len(coordinator.active_tasks) == 0
+
+        other = SQLiteTaskQueue(queue_path)
+        task = other.dequeue("other-process")
+        other.ack(task.id, task.receipt, "done elsewhere")
+
+        with patch.object(Config, "TASK_QUEUE_POLL_INTERVAL", 0.01):
+            result = await coordinator.wait_for(task_id, timeout=5)
+        assert result["status"] == "completed"
+        assert result["result"] == "done elsewhere"
+        assert coordinator.get_result(task_id)["owner"] == "user-1"
+
+    @pytest.mark.asyncio
+    async def test_retried_task_leaves_no_local_entry(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path)
+        coordinator = CoordinationManager(durable_queue=queue)
+
+        async def flaky(payload):
+            raise RuntimeError("try again")
+
+        coordinator.register_handler("flaky", flaky)
+        await coordinator.enqueue_durable("flaky", {})
+        await coordinator._process_durable_task(queue.dequeue())
+
+        assert len(coordinator.active_tasks) == 0
+        assert queue.stats()["ready"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_task_type_dead_letters(self, queue_path):
+        queue = SQLiteTaskQueue(queue_path)
+        coordinator = CoordinationManager(durable_queue=queue)
+        await coordinator.start_coordination()
+        task_id = await coordinator.enqueue_durable("missing", {})
+        result = await coordinator.wait_for(task_id, timeout=5)
+        await coordinator.shutdown()
+
+        assert result["status"] == "failed"
+        assert queue.stats()["dead"] == 1
+
+    @pytest.mark.asyncio
+    async def test_enqueue_without_queue_raises(self):
+        with pytest.raises(RuntimeError):
+            await CoordinationManager().enqueue_durable("echo", {})
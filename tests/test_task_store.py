@@ -0,0 +1,189 @@
+"""
+Tests for the bounded CoordinationManager task store and result retrieval.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring import CoordinationManager, TaskStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTaskStoreEviction:
+    def test_finished_tasks_expire_after_ttl(self):
+        clock = FakeClock()
+        store = TaskStore(max_entries=100, ttl_seconds=60, clock=clock)
+        store.add("t1", status="queued")
+        store.mark_completed("t1", "done")
+
+        assert store.get_result("t1")["result"] == "done"
+        clock.now += 61
+        assert store.get_result("t1") is None
+        assert store.evicted == 1
+
+    def test_live_tasks_are_never_evicted(self):
+        clock = FakeClock()
+        store = TaskStore(max_entries=2, ttl_seconds=60, clock=clock)
+        store.add("live", status="queued")
+        clock.now += 1000
+        store.add("other", status="queued")
+        store.add("third", status="queued")
+
+        assert "live" in store
+        assert store.live_count() == 3
+
+    def test_oldest_finished_evicted_when_over_capacity(self):
+        store = TaskStore(max_entries=3, ttl_seconds=3600)
+        for i in range(3):
+            store.add(f"t{i}", status="queued")
+            store.mark_completed(f"t{i}", i)
+        store.add("t3", status="queued")
+
+        assert "t0" not in store
+        assert set(store) == {"t1", "t2", "t3"}
+
+    def test_large_results_dropped_without_spill_dir(self):
+        store = TaskStore(max_result_bytes=10, spill_dir="")
+        store.add("big", status="queued")
+        store.mark_completed("big", "x" * 100)
+
+        result = store.get_result("big")
+        assert result["status"] == "completed"
+        assert result["result_dropped"] is True
+        assert "result" not in result
+
+    def test_result_size_counts_utf8_bytes(self):
+        store = TaskStore(max_result_bytes=10, spill_dir="")
+        store.add("text", status="queued")
+        store.mark_completed("text", "ॐ" * 4)
+
+        result = store.get_result("text")
+        assert result["result_bytes"] == 12
+        assert result["result_dropped"] is True
+
+    def test_large_results_spilled_to_disk(self, tmp_path):
+        clock = FakeClock()
+        store = TaskStore(max_result_bytes=10, spill_dir=str(tmp_path), ttl_seconds=60, clock=clock)
+        store.add("big", status="queued")
+        store.mark_completed("big", {"payload": "x" * 100})
+
+        assert "result" not in store["big"]
+        assert len(list(tmp_path.iterdir())) == 1
+
+        # Reading back loads the spilled payload; expiry removes the file
+        assert store.get_result("big")["result"] == {"payload": "x" * 100}
+        clock.now += 61
+        store.evict()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_spilled_result_removed_before_read_reports_expired(self, tmp_path):
+        store = TaskStore(max_result_bytes=10, spill_dir=str(tmp_path), ttl_seconds=60)
+        store.add("big", status="queued")
+        store.mark_completed("big", {"payload": "x" * 100})
+
+        # Simulates an eviction racing the read once the lock is released
+        for path in tmp_path.iterdir():
+            path.unlink()
+        assert store.get_result("big") is None
+
+
+class TestWaitFor:
+    @pytest.mark.asyncio
+    async def test_wait_for_completion(self):
+        coordinator = CoordinationManager()
+        await coordinator.start_coordination()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "worker_result"
+
+        await coordinator.coordinate_task("w1", work())
+        result = await coordinator.wait_for("w1", timeout=2)
+        await coordinator.shutdown()
+
+        assert result["status"] == "completed"
+        assert result["result"] == "worker_result"
+
+    @pytest.mark.asyncio
+    async def test_wait_for_timeout(self):
+        coordinator = CoordinationManager()
+        coordinator.active_tasks.add("slow", status="queued")
+
+        with pytest.raises(asyncio.TimeoutError):
+            await coordinator.wait_for("slow", timeout=0.05)
+        assert coordinator.active_tasks._waiters == {}
+
+    @pytest.mark.asyncio
+    async def test_wait_for_unknown_task(self):
+        with pytest.raises(KeyError):
+            await CoordinationManager().wait_for("missing", timeout=0.1)
+
+    @pytest.mark.asyncio
+    async def test_wait_for_already_finished(self):
+        coordinator = CoordinationManager()
+        coordinator.active_tasks.add("done", status="queued")
+        coordinator.active_tasks.mark_failed("done", "boom")
+
+        result = await coordinator.wait_for("done", timeout=0.1)
+        assert result["status"] == "failed"
+        assert result["error"] == "boom"
+
+
+class TestTaskPollingEndpoint:
+    @pytest.fixture
+    def server(self):
+        import api.task as task_api
+
+        coordinator = CoordinationManager()
+        with patch.object(task_api, 'get_coordinator', return_value=coordinator, create=True):
+            httpd = ThreadingHTTPServer(("127.0.0.1", 0), task_api.handler)
+            thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+            thread.start()
+            yield f"http://127.0.0.1:{httpd.server_address[1]}", coordinator
+            httpd.shutdown()
+            httpd.server_close()
+
+    def test_poll_by_path(self, server):
+        base_url, coordinator = server
+        coordinator.active_tasks.add("abc", status="queued")
+        coordinator.active_tasks.mark_completed("abc", {"answer": 42})
+
+        with urllib.request.urlopen(f"{base_url}/api/task/abc") as response:
+            payload = json.loads(response.read())
+
+        assert payload["status"] == "completed"
+        assert payload["result"] == {"answer": 42}
+
+    def test_poll_by_query(self, server):
+        base_url, coordinator = server
+        coordinator.active_tasks.add("q1", status="queued")
+
+        with urllib.request.urlopen(f"{base_url}/api/task?id=q1") as response:
+            assert json.loads(response.read())["status"] == "queued"
+
+    def test_unknown_and_foreign_tasks_are_not_found(self, server):
+        base_url, coordinator = server
+        coordinator.active_tasks.add("private", status="queued", owner="someone-else")
+
+        for path in ("/api/task/missing", "/api/task/private"):
+            with pytest.raises(urllib.error.HTTPError) as exc_info:
+                urllib.request.urlopen(base_url + path)
+            assert exc_info.value.code == 404
@@ -0,0 +1,133 @@
+"""
+Tests for the verified-token cache and single verification per request.
+"""
+import os
+import sys
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from jose import jwt
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth.middleware as middleware
+from auth.token_cache import VerifiedTokenCache, token_digest
+from auth.vercel_auth import authenticated_vercel
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestVerifiedTokenCache:
+    def test_hit_until_exp(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(max_ttl=3600, clock=clock)
+        cache.put("tok", {"sub": "u1", "exp": clock.now + 60})
+
+        assert cache.get("tok")["sub"] == "u1"
+        clock.now += 60
+        assert cache.get("tok") is None
+        assert len(cache) == 0
+
+    def test_not_served_before_nbf(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        cache.put("tok", {"sub": "u1", "nbf": clock.now + 10, "exp": clock.now + 100})
+
+        assert cache.get("tok") is None
+        clock.now += 10
+        assert cache.get("tok") is not None
+
+    def test_max_ttl_caps_long_lived_tokens(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(max_ttl=30, clock=clock)
+        cache.put("tok", {"sub": "u1", "exp": clock.now + 3600})
+
+        clock.now += 31
+        assert cache.get("tok") is None
+
+    def test_expired_payload_not_cached(self):
+        clock = FakeClock()
+        cache = VerifiedTokenCache(clock=clock)
+        cache.put("tok", {"sub": "u1", "exp": clock.now - 1})
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        cache.put("a", {"sub": "a"})
+        cache.put("b", {"sub": "b"})
+        cache.get("a")
+        cache.put("c", {"sub": "c"})
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_keys_are_digests(self):
+        cache = VerifiedTokenCache()
+        cache.put("secret-token", {"sub": "u1"})
+        assert list(cache._entries) == [token_digest("secret-token")]
+
+
+@pytest.fixture
+def signed_token():
+    claims = {
+        "sub": "user-1",
+        "exp": int(time.time()) + 300,
+        "organizations": [{"id": "org-1", "role": "admin"}]
+    }
+    return jwt.encode(claims, "secret", algorithm="HS256"), claims
+
+
+@pytest.fixture
+def counting_decode(signed_token):
+    """Count signature verifications against a fresh token cache"""
+    _, claims = signed_token
+    with patch.object(middleware, 'verified_tokens', VerifiedTokenCache()), \
+         patch.object(middleware.jwks_cache, 'get_jwks', return_value={"keys": []}), \
+         patch('auth.middleware.jwt.decode', return_value=claims) as decode:
+        yield decode
+
+
+class TestSingleVerification:
+    def test_repeated_validation_verifies_once(self, signed_token, counting_decode):
+        token, _ = signed_token
+        for _ in range(3):
+            assert middleware.validate_jwt_token(token)["sub"] == "user-1"
+        assert counting_decode.call_count == 1
+
+    def test_vercel_request_verifies_once(self, signed_token, counting_decode):
+        token, _ = signed_token
+        handler = Mock()
+        handler.headers = {"Authorization": f"Bearer {token}"}
+
+        @authenticated_vercel
+        def endpoint(handler):
+            return handler.organization_id
+
+        assert endpoint(handler) == "org-1"
+        assert handler.organization_role == "admin"
+        assert counting_decode.call_count == 1
+
+    def test_flask_decorators_verify_once(self, signed_token, counting_decode):
+        from flask import Flask, g
+        from auth.decorators import authenticated, organization_required
+
+        token, _ = signed_token
+        app = Flask(__name__)
+
+        @authenticated
+        @organization_required
+        def endpoint():
+            return g.organization_id
+
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            assert endpoint() == "org-1"
+        assert counting_decode.call_count == 1
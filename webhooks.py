@@ -0,0 +1,213 @@
+"""
+Webhook dispatcher for the 12thhaus Spiritual Platform
+Delivers asynchronous task results to caller-supplied callback URLs over a
+pooled HTTP session, retrying connection errors and 429/5xx responses with
+exponential backoff, off the request and event loop threads. Callbacks may
+only reach public addresses, checked when the URL is accepted and again on
+every connect, and redirects are never followed
+"""
+import hashlib
+import hmac
+import ipaddress
+import logging
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from config import Config
+from response_writer import dumps
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-12thhaus-Signature'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class BlockedAddress(ValueError):
+    """A callback host resolved to a loopback, private or otherwise non-public address"""
+
+
+def is_public_address(address: str) -> bool:
+    """False for loopback, private, link-local, reserved, multicast and unspecified addresses"""
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_public(host: str, port: Optional[int] = None) -> str:
+    """
+    First address of ``host``, raising BlockedAddress if any of its addresses
+    is not public (unless WEBHOOK_ALLOW_PRIVATE_HOSTS is set).
+
+    Resolution errors propagate as socket.gaierror.
+    """
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = [info[4][0] for info in infos]
+    if not Config.WEBHOOK_ALLOW_PRIVATE_HOSTS:
+        blocked = [address for address in addresses if not is_public_address(address)]
+        if blocked:
+            raise BlockedAddress(f"callback host {host} resolves to non-public address {blocked[0]}")
+    return addresses[0]
+
+
+def validate_callback_url(url: Any) -> str:
+    """
+    Check a caller-supplied callback URL.
+
+    Raises ValueError unless it is an http(s) URL whose host is allowed by
+    WEBHOOK_ALLOWED_HOSTS (any host when that setting is empty) and does not
+    resolve to a non-public address. Hosts that do not resolve right now are
+    accepted; every delivery checks the address again when it connects.
+    """
+    if not isinstance(url, str):
+        raise ValueError("callback_url must be a string")
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL")
+    allowed = [host.strip().lower() for host in Config.WEBHOOK_ALLOWED_HOSTS.split(',') if host.strip()]
+    if allowed and parsed.hostname.lower() not in allowed:
+        raise ValueError(f"callback_url host {parsed.hostname} is not allowed")
+    try:
+        resolve_public(parsed.hostname)
+    except socket.gaierror:
+        pass
+    except BlockedAddress as e:
+        raise ValueError(f"callback_url host {parsed.hostname} is not allowed: {e}") from e
+    return url
+
+
+class _PublicOnlyConnection:
+    """Connects to the address it just checked, so a DNS answer cannot change between check and connect"""
+
+    def _new_conn(self):
+        self._dns_host = resolve_public(self.host, self.port)
+        return super()._new_conn()
+
+
+class _PublicHTTPConnection(_PublicOnlyConnection, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicOnlyConnection, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class PublicOnlyAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections refuse non-public addresses"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _PublicHTTPConnectionPool,
+            'https': _PublicHTTPSConnectionPool,
+        }
+
+
+def sign(body: bytes, secret: str) -> str:
+    """HMAC-SHA256 signature receivers can use to verify a delivery"""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class WebhookDispatcher:
+    """
+    Sends JSON POSTs to callback URLs from a small worker pool.
+
+    Connections are kept alive per host in a shared ``requests.Session``;
+    each delivery is retried up to ``max_retries`` times with exponential
+    backoff before it is counted as failed.
+    """
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 pool_size: Optional[int] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_seconds: Optional[float] = None,
+                 timeout: Optional[float] = None,
+                 secret: Optional[str] = None):
+        self.timeout = timeout if timeout is not None else Config.WEBHOOK_TIMEOUT_SECONDS
+        self.secret = secret if secret is not None else Config.WEBHOOK_SECRET
+        pool_size = pool_size if pool_size is not None else Config.WEBHOOK_POOL_SIZE
+        retry = Retry(
+            total=max_retries if max_retries is not None else Config.WEBHOOK_MAX_RETRIES,
+            backoff_factor=backoff_seconds if backoff_seconds is not None else Config.WEBHOOK_BACKOFF_SECONDS,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        adapter = PublicOnlyAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers if workers is not None else Config.WEBHOOK_WORKERS,
+            thread_name_prefix='webhook'
+        )
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.failed = 0
+
+    def dispatch(self, url: str, payload: Dict[str, Any]) -> Future:
+        """Queue a delivery; the future resolves to True once the receiver answered 2xx"""
+        return self._executor.submit(self.deliver, url, payload)
+
+    def deliver(self, url: str, payload: Dict[str, Any]) -> bool:
+        """POST ``payload`` to ``url`` in the calling thread, with retries; a redirect counts as a failure"""
+        body = dumps(payload)
+        headers = {'Content-Type': 'application/json'}
+        if self.secret:
+            headers[SIGNATURE_HEADER] = sign(body, self.secret)
+
+        try:
+            response = self.session.post(url, data=body, headers=headers, timeout=self.timeout,
+                                         allow_redirects=False)
+            ok = 200 <= response.status_code < 300
+            if not ok:
+                logger.warning(f"Webhook to {url} answered {response.status_code}")
+        except (requests.RequestException, BlockedAddress) as e:
+            logger.warning(f"Webhook to {url} failed: {e}")
+            ok = False
+
+        with self._lock:
+            if ok:
+                self.delivered += 1
+            else:
+                self.failed += 1
+        return ok
+
+    def stats(self) -> Dict[str, int]:
+        return {"delivered": self.delivered, "failed": self.failed}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+_dispatcher: Optional[WebhookDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """Process-wide WebhookDispatcher from the WEBHOOK_* settings"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WebhookDispatcher()
+    return _dispatcher